@@ -717,14 +717,18 @@ class SuperAgentCLI(cmd.Cmd):
           semantic  - 查看语义记忆
           procedural- 查看程序记忆
           export    - 导出记忆数据
+          import    - 导入记忆数据
           continuity- 显示 CONTINUITY.md
+          migrate   - 将 JSON 记忆目录迁移到 SQLite/FTS5 存储
 
         示例:
           memory stats              # 查看统计
           memory query error        # 查询包含"error"的记忆
           memory episodic 10        # 查看最近10条情节记忆
           memory semantic arch      # 查询包含"arch"的语义记忆
-          memory export backup.json # 导出到文件
+          memory export backup.jsonl # 导出到文件
+          memory import backup.jsonl # 从导出文件恢复
+          memory migrate            # 迁移到 .superagent/memory/memory.db
         """
         if not self.orchestrator or not self.orchestrator.memory_manager:
             print("\n❌ 记忆系统未初始化")
@@ -755,10 +759,17 @@ class SuperAgentCLI(cmd.Cmd):
                 category = args_list[1] if len(args_list) > 1 else None
                 self._memory_procedural(category)
             elif subcommand == "export":
-                filename = args_list[1] if len(args_list) > 1 else "memory_export.json"
+                filename = args_list[1] if len(args_list) > 1 else "memory_export.jsonl"
                 self._memory_export(filename)
+            elif subcommand == "import":
+                if len(args_list) < 2:
+                    print("\n❌ 请指定导入文件")
+                    return
+                self._memory_import(args_list[1])
             elif subcommand == "continuity":
                 self._memory_continuity()
+            elif subcommand == "migrate":
+                self._memory_migrate()
             else:
                 print(f"\n❌ 未知子命令: {subcommand}")
                 print("   使用 'help memory' 查看帮助")
@@ -876,35 +887,50 @@ class SuperAgentCLI(cmd.Cmd):
             print(f"   实践: {mem.get('practice', '')[:100]}...")
 
     def _memory_export(self, filename: str):
-        """导出记忆数据"""
-        import json
-
-        # 收集所有记忆
-        episodic = asyncio.run(self.orchestrator.memory_manager.get_episodic_memories(limit=1000))
-        semantic = asyncio.run(self.orchestrator.memory_manager.query_semantic_memory())
-        procedural = asyncio.run(self.orchestrator.memory_manager.get_procedural_memories())
-
-        memory_payload = {
-            "export_time": str(datetime.now()),
-            "episodic_count": len(episodic),
-            "semantic_count": len(semantic),
-            "procedural_count": len(procedural),
-            "episodic": episodic,
-            "semantic": semantic,
-            "procedural": procedural
-        }
-
+        """导出记忆数据 (JSON Lines, 流式写出)"""
         output_path = self.project_root / filename
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(memory_payload, f, ensure_ascii=False, indent=2)
+        counts = asyncio.run(self.orchestrator.memory_manager.export_memories(output_path))
 
         print(f"\n✓ 记忆已导出到: {output_path}")
-        print(f"  总计: {len(episodic) + len(semantic) + len(procedural)} 条")
+        print(f"  总计: {sum(counts.values())} 条")
+
+    def _memory_import(self, filename: str):
+        """导入记忆数据 (memory export 生成的文件)"""
+        input_path = self.project_root / filename
+        if not input_path.exists():
+            print(f"\n❌ 文件不存在: {input_path}")
+            return
+
+        counts = asyncio.run(self.orchestrator.memory_manager.import_memories(input_path))
+
+        print(f"\n✓ 已导入: {input_path}")
+        for memory_type, count in counts.items():
+            print(f"  - {memory_type}: {count} 条")
+
+    def _memory_migrate(self):
+        """迁移 JSON 记忆目录到 SQLite/FTS5 存储"""
+        from memory.sqlite_store import migrate_memory_tree
+
+        memory_dir = self.project_root / ".superagent" / "memory"
+        print("\n正在迁移记忆数据...")
+        counts = migrate_memory_tree(memory_dir)
+
+        print(f"\n✓ 已迁移到: {memory_dir / 'memory.db'}")
+        for memory_type, count in counts.items():
+            print(f"  - {memory_type}: {count} 条")
+
+        # 切换存储后端并保存配置, 之后启动的会话读取迁移后的数据库
+        self.config.memory.storage_backend = "sqlite"
+        save_config(self.config)
+        print("\n✓ 已将 memory.storage_backend 设置为 sqlite (重启后生效)")
 
     def _memory_continuity(self):
         """显示 CONTINUITY.md"""
         continuity_file = self.project_root / ".superagent" / "memory" / "CONTINUITY.md"
 
+        # CONTINUITY.md 为延迟渲染, 显示前先落盘
+        asyncio.run(self.orchestrator.memory_manager.flush())
+
         if not continuity_file.exists():
             print("\n❌ CONTINUITY.md 文件不存在")
             return
@@ -1310,7 +1336,9 @@ class SuperAgentCLI(cmd.Cmd):
             print("  memory semantic    - 查看语义记忆")
             print("  memory procedural  - 查看程序记忆")
             print("  memory export      - 导出记忆数据")
+            print("  memory import      - 导入记忆数据")
             print("  memory continuity  - 显示 CONTINUITY.md")
+            print("  memory migrate     - 迁移到 SQLite/FTS5 存储")
 
             print("\n代码审查:")
             print("  review status  - 查看审查配置")
@@ -51,6 +51,31 @@ TOKEN_SAVINGS = Counter(
     ['agent_type', 'optimization_type']  # optimization_type: compression, incremental
 )
 
+# 上下文压缩缓存指标 (命中率 = hit / (hit + miss))
+CONTEXT_CACHE_REQUESTS = Counter(
+    'superagent_context_cache_requests_total',
+    'Total number of context compression cache lookups',
+    ['tier', 'result']  # tier: memory, disk; result: hit, miss
+)
+
+CONTEXT_CACHE_BYTES = Gauge(
+    'superagent_context_cache_bytes',
+    'Bytes held by the context compression cache',
+    ['tier']
+)
+
+# 步骤结果缓存指标 (命中时不调用 Agent)
+STEP_CACHE_REQUESTS = Counter(
+    'superagent_step_cache_requests_total',
+    'Total number of step result cache lookups',
+    ['result']  # result: hit, miss
+)
+
+STEP_CACHE_BYTES = Gauge(
+    'superagent_step_cache_bytes',
+    'Bytes held by the on-disk step result cache'
+)
+
 # 错误和异常指标
 ERRORS_TOTAL = Counter(
     'superagent_errors_total',
@@ -131,3 +156,19 @@ class MetricsManager:
     @staticmethod
     def record_error(error_type: str, module: str):
         ERRORS_TOTAL.labels(error_type=error_type, module=module).inc()
+
+    @staticmethod
+    def record_context_cache(tier: str, result: str):
+        CONTEXT_CACHE_REQUESTS.labels(tier=tier, result=result).inc()
+
+    @staticmethod
+    def update_context_cache_bytes(tier: str, size: int):
+        CONTEXT_CACHE_BYTES.labels(tier=tier).set(size)
+
+    @staticmethod
+    def record_step_cache(result: str):
+        STEP_CACHE_REQUESTS.labels(result=result).inc()
+
+    @staticmethod
+    def update_step_cache_bytes(size: int):
+        STEP_CACHE_BYTES.set(size)
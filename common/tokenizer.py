@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Token 计数
+
+统一的分词器接口, 供 TokenMonitor、SmartContextCompressor 等估算 Token 数:
+- BPETokenizer: 离线字节级 BPE, 从本地词表文件加载 (tiktoken 格式: 每行
+  "base64(token) rank", rank 即合并优先级)
+- HeuristicTokenizer: 无词表时的快速估算 (CJK 每字 1 个, 英文单词按长度, 数字每 3 位 1 个)
+
+计数结果按内容哈希缓存; count_batch 对批内重复内容只计算一次。
+默认分词器由环境变量 SUPERAGENT_TOKENIZER_VOCAB 指定的词表决定, 未设置时使用启发式估算。
+"""
+
+import base64
+import hashlib
+import logging
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+VOCAB_ENV = "SUPERAGENT_TOKENIZER_VOCAB"
+
+# 计数缓存的条目上限; 短文本直接以内容为键, 长文本以 blake2b 摘要为键
+_MEMO_SIZE = 8192
+_MEMO_INLINE_CHARS = 64
+# BPE 片段缓存上限 (常见单词反复出现)
+_PIECE_CACHE_SIZE = 65536
+
+# 预分词 (近似 cl100k 的切分规则; 字母不含下划线, 下划线按标点处理)
+_PRETOKEN_RE = re.compile(
+    r"'(?i:[sdmt]|ll|ve|re)"
+    r"|(?:[^\r\n\w]|_)?[^\W\d_]+"
+    r"|\d{1,3}"
+    r"| ?(?:[^\s\w]|_)+[\r\n]*"
+    r"|\s*[\r\n]+"
+    r"|\s+(?!\S)"
+    r"|\s+"
+)
+
+# 启发式估算
+_CJK_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+_WORD_RE = re.compile(r"[^\W\d_぀-ヿ㐀-䶿一-鿿가-힯]+")
+_DIGITS_RE = re.compile(r"\d+")
+_PUNCT_RE = re.compile(r"[^\w\s]|_")
+_NEWLINES_RE = re.compile(r"\n+")
+
+
+class Tokenizer(ABC):
+    """分词器基类: 子类实现 _count, 基类负责按内容哈希缓存"""
+
+    name = "base"
+
+    def __init__(self) -> None:
+        self._memo: "OrderedDict[Union[str, bytes], int]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    @abstractmethod
+    def _count(self, text: str) -> int:
+        """计算 Token 数 (不经过缓存)"""
+
+    @staticmethod
+    def _memo_key(text: str) -> Union[str, bytes]:
+        if len(text) <= _MEMO_INLINE_CHARS:
+            return text
+        return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    def count(self, text: str) -> int:
+        """计算文本的 Token 数"""
+        if not text:
+            return 0
+        key = self._memo_key(text)
+        with self._memo_lock:
+            cached = self._memo.get(key)
+            if cached is not None:
+                self._memo.move_to_end(key)
+                return cached
+
+        tokens = self._count(text)
+        with self._memo_lock:
+            self._memo[key] = tokens
+            if len(self._memo) > _MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return tokens
+
+    def count_batch(self, texts: Iterable[str]) -> List[int]:
+        """批量计数, 批内相同内容只计算一次"""
+        results: Dict[str, int] = {}
+        counts = []
+        for text in texts:
+            tokens = results.get(text)
+            if tokens is None:
+                tokens = results[text] = self.count(text)
+            counts.append(tokens)
+        return counts
+
+    def chars_per_token(self, text: str) -> float:
+        """该文本的平均每 Token 字符数 (用于把 Token 上限换算为字符上限)"""
+        tokens = self.count(text)
+        return len(text) / tokens if tokens else 4.0
+
+
+class HeuristicTokenizer(Tokenizer):
+    """无词表时的快速估算"""
+
+    name = "heuristic"
+
+    def _count(self, text: str) -> int:
+        return (
+            len(_CJK_RE.findall(text))
+            + sum((len(word) + 5) // 6 for word in _WORD_RE.findall(text))
+            + sum((len(digits) + 2) // 3 for digits in _DIGITS_RE.findall(text))
+            + len(_PUNCT_RE.findall(text))
+            + len(_NEWLINES_RE.findall(text))
+        )
+
+
+class BPETokenizer(Tokenizer):
+    """离线字节级 BPE 分词器"""
+
+    name = "bpe"
+
+    def __init__(self, ranks: Dict[bytes, int]) -> None:
+        """初始化
+
+        Args:
+            ranks: token 字节串 -> rank (rank 越小越先合并)
+        """
+        super().__init__()
+        self.ranks = ranks
+        self._pieces: Dict[bytes, int] = {}
+        self._pieces_lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "BPETokenizer":
+        """从 tiktoken 格式的词表文件加载"""
+        ranks: Dict[bytes, int] = {}
+        with open(path, 'rb') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    token, rank = line.split()
+                    ranks[base64.b64decode(token)] = int(rank)
+                except ValueError as e:
+                    raise ValueError(f"词表格式错误 {path}:{line_no}: {e}") from e
+        return cls(ranks)
+
+    def encode_piece(self, piece: bytes) -> List[bytes]:
+        """对单个预分词片段做 BPE 合并, 返回 token 字节串列表"""
+        ranks = self.ranks
+        if piece in ranks:
+            return [piece]
+        parts = [piece[i:i + 1] for i in range(len(piece))]
+        while len(parts) > 1:
+            best_index = -1
+            best_rank = None
+            for i in range(len(parts) - 1):
+                rank = ranks.get(parts[i] + parts[i + 1])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best_index, best_rank = i, rank
+            if best_index < 0:
+                break
+            parts[best_index:best_index + 2] = [parts[best_index] + parts[best_index + 1]]
+        return parts
+
+    def encode(self, text: str) -> List[bytes]:
+        """编码为 token 字节串列表"""
+        tokens: List[bytes] = []
+        for piece in _PRETOKEN_RE.findall(text):
+            tokens.extend(self.encode_piece(piece.encode('utf-8', 'surrogatepass')))
+        return tokens
+
+    def _count(self, text: str) -> int:
+        total = 0
+        pieces = self._pieces
+        for piece in _PRETOKEN_RE.findall(text):
+            data = piece.encode('utf-8', 'surrogatepass')
+            tokens = pieces.get(data)
+            if tokens is None:
+                tokens = len(self.encode_piece(data))
+                with self._pieces_lock:
+                    if len(pieces) >= _PIECE_CACHE_SIZE:
+                        pieces.clear()
+                    pieces[data] = tokens
+            total += tokens
+        return total
+
+
+def load_tokenizer(vocab_path: Union[str, Path, None] = None) -> Tokenizer:
+    """加载分词器: 词表可用时使用 BPE, 否则退回启发式估算
+
+    Args:
+        vocab_path: 词表文件路径, None 时读取环境变量 SUPERAGENT_TOKENIZER_VOCAB
+    """
+    vocab_path = vocab_path or os.environ.get(VOCAB_ENV)
+    if vocab_path:
+        try:
+            tokenizer = BPETokenizer.from_file(vocab_path)
+            logger.info(f"已加载 BPE 词表: {vocab_path} ({len(tokenizer.ranks)} tokens)")
+            return tokenizer
+        except (OSError, ValueError) as e:
+            logger.warning(f"加载 BPE 词表失败, 使用启发式估算: {e}")
+    return HeuristicTokenizer()
+
+
+_default_tokenizer: Optional[Tokenizer] = None
+_default_lock = threading.Lock()
+
+
+def get_tokenizer() -> Tokenizer:
+    """获取进程内共享的默认分词器 (首次调用时加载)"""
+    global _default_tokenizer
+    if _default_tokenizer is None:
+        with _default_lock:
+            if _default_tokenizer is None:
+                _default_tokenizer = load_tokenizer()
+    return _default_tokenizer
+
+
+def set_tokenizer(tokenizer: Optional[Tokenizer]) -> None:
+    """替换默认分词器 (None 表示下次使用时重新加载)"""
+    global _default_tokenizer
+    _default_tokenizer = tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """使用默认分词器计数"""
+    return get_tokenizer().count(text)
+
+
+def count_tokens_batch(texts: Iterable[str]) -> List[int]:
+    """使用默认分词器批量计数"""
+    return get_tokenizer().count_batch(texts)
@@ -36,6 +36,7 @@ class Paths(Enum):
     PROCEDURAL_DIR = "procedural"
     CONTINUITY_FILE = "CONTINUITY.md"
     INDEX_FILE = "memory_index.json"
+    CACHE_DIR = ".superagent/cache"
 
 
 class MemoryConfig(Enum):
@@ -43,6 +44,37 @@ class MemoryConfig(Enum):
     CACHE_TTL = 300        # 5分钟缓存 TTL
     MAX_CACHE_SIZE = 1000  # 每个类型的最大缓存条目数
     BATCH_SIZE = 50        # 批量处理大小
+    IMPORT_BATCH_SIZE = 500  # 导入记忆时每批 save_many 的条数
+    CACHE_MAX_BYTES = 64 * 1024 * 1024  # 查询缓存的总字节预算 (所有类型合计)
+    CACHE_PROTECTED_RATIO = 0.8  # SLRU 保护区占每个类型容量的比例
+    CACHE_WHEEL_RESOLUTION = 1.0  # 缓存 TTL 时间轮的槽位粒度(秒)
+    SIMILARITY_NUM_PERM = 64  # 相似度索引的 MinHash 签名长度
+    SIMILARITY_BANDS = 32     # 相似度索引的 LSH 段数 (每段 2 行, 约 0.2 Jaccard 起召回)
+    POSTINGS_FLUSH_INTERVAL = 5  # 自维护索引的后端落盘类别/标签倒排索引的最小间隔(秒)
+    WRITE_BEHIND_MAX_LATENCY = 0.05  # 写回队列: 入队到落盘的最大延迟(秒)
+    WRITE_BEHIND_BATCH_SIZE = 100    # 写回队列: 达到该条数立即落盘
+    CONTINUITY_RENDER_DELAY = 1.0    # CONTINUITY.md 追加后延迟渲染的秒数 (防抖)
+    RETENTION_MAX_AGE_DAYS = 30        # 情节记忆超过该天数后移入压缩归档
+    RETENTION_MAX_HOT_ENTRIES = 10000  # 热存储最多保留的情节记忆条数
+    RETENTION_INTERVAL = 3600          # 后台归档任务的运行间隔(秒)
+    RETENTION_BATCH_SIZE = 500         # 每批归档的条数
+
+
+class ContextConfig(Enum):
+    """上下文压缩配置"""
+    CACHE_MAX_ENTRIES = 1000               # 压缩结果缓存: 内存层最大条目数
+    CACHE_MAX_BYTES = 32 * 1024 * 1024     # 压缩结果缓存: 内存层字节预算
+    CACHE_MAX_DISK_BYTES = 256 * 1024 * 1024  # 压缩结果缓存: 磁盘层字节预算
+    CACHE_DISK_PRUNE_EVERY = 200           # 每写入多少个磁盘缓存文件检查一次预算
+    CACHE_SUBDIR = "compression"           # 磁盘层位于 .superagent/cache/ 下的子目录
+
+
+class StepCacheConfig(Enum):
+    """步骤结果缓存配置"""
+    MAX_DISK_BYTES = 512 * 1024 * 1024     # 磁盘字节预算, 超出时删除最久未访问的结果
+    PRUNE_EVERY = 50                       # 每写入多少个结果检查一次预算
+    SUBDIR = "steps"                       # 位于 .superagent/cache/ 下的子目录
+    HASH_CHUNK_SIZE = 1024 * 1024          # 计算输入文件指纹时每次读取的字节数
 
 
 class ReviewConfig(Enum):
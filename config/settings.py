@@ -34,6 +34,7 @@ ENV_CONFIG_MAPPING: Dict[str, tuple[str, Optional[str]]] = {
     "SUPERAGENT_WORKER_CONCURRENCY": ("distribution", "worker_concurrency"),
     "SUPERAGENT_MEMORY_ENABLED": ("memory", "enabled"),
     "SUPERAGENT_MEMORY_RETENTION_DAYS": ("memory", "retention_days"),
+    "SUPERAGENT_MEMORY_BACKEND": ("memory", "storage_backend"),
     "SUPERAGENT_ORCHESTRATION_PARALLEL": ("orchestration", "enable_parallel_execution"),
     "SUPERAGENT_ORCHESTRATION_MAX_TASKS": ("orchestration", "max_parallel_tasks"),
     "SUPERAGENT_TOKEN_OPT_ENABLED": ("token_optimization", "enabled"),
@@ -58,6 +59,17 @@ class MemoryConfig(BaseModel):
     # 是否自动保存 CONTINUITY.md
     auto_save_continuity: bool = True
 
+    # 存储后端: json (每条一个文件) / segment (分段日志) / sqlite (SQLite + FTS5)
+    storage_backend: str = "json"
+
+    @field_validator('storage_backend')
+    @classmethod
+    def validate_storage_backend(cls, v: str) -> str:
+        allowed = ["json", "segment", "sqlite"]
+        if v.lower() not in allowed:
+            raise ValueError(f"记忆存储后端必须是 {allowed} 之一")
+        return v.lower()
+
 
 class CodeReviewConfig(BaseModel):
     """代码审查配置"""
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+快照内容的内容寻址存储
+
+IncrementalUpdater 缓存的文件内容按快照哈希存放为独立的 zlib 压缩文件
+(blobs/ab/cdef...), 快照索引只保存元数据:
+- 相同内容只存一份 (哈希已存在时跳过写入)
+- 写入先写临时文件再原子替换, 读到的 blob 总是完整的
+- 垃圾回收只删除未被引用且超过宽限期的 blob, 避免误删其他进程刚写入、尚未进入索引的内容
+"""
+
+import logging
+import os
+import time
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# 垃圾回收宽限期 (秒)
+GC_GRACE_SECONDS = 3600
+
+
+class BlobStore:
+    """按哈希寻址的压缩内容存储"""
+
+    def __init__(self, root: Path, compress_level: int = 6, gc_grace_seconds: float = GC_GRACE_SECONDS) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.compress_level = compress_level
+        self.gc_grace_seconds = gc_grace_seconds
+
+    def _path(self, blob_hash: str) -> Path:
+        return self.root / blob_hash[:2] / blob_hash[2:]
+
+    def exists(self, blob_hash: str) -> bool:
+        return self._path(blob_hash).exists()
+
+    def put(self, blob_hash: str, content: str) -> bool:
+        """写入内容 (已存在时跳过)
+
+        Returns:
+            bool: 是否实际写入
+        """
+        path = self._path(blob_hash)
+        if path.exists():
+            return False
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        data = zlib.compress(content.encode('utf-8', 'surrogatepass'), self.compress_level)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return True
+
+    def get(self, blob_hash: str) -> Optional[str]:
+        """读取内容 (不存在或已损坏时返回 None)"""
+        try:
+            with open(self._path(blob_hash), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            return zlib.decompress(data).decode('utf-8', 'surrogatepass')
+        except (zlib.error, UnicodeDecodeError) as e:
+            logger.warning(f"快照内容损坏: {blob_hash}, {e}")
+            return None
+
+    def iter_hashes(self) -> Iterator[str]:
+        """遍历所有 blob 的哈希"""
+        for shard in self.root.iterdir():
+            if not shard.is_dir() or len(shard.name) != 2:
+                continue
+            for path in shard.iterdir():
+                if not path.name.endswith('.tmp'):
+                    yield shard.name + path.name
+
+    def gc(self, referenced: Iterable[str]) -> int:
+        """删除未被引用的 blob (修改时间在宽限期内的 blob 不删除)
+
+        Args:
+            referenced: 仍被快照引用的哈希
+
+        Returns:
+            int: 删除的 blob 数
+        """
+        keep: Set[str] = set(referenced)
+        cutoff = time.time() - self.gc_grace_seconds
+        removed = 0
+        for blob_hash in list(self.iter_hashes()):
+            if blob_hash in keep:
+                continue
+            path = self._path(blob_hash)
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+内容定义分块 (CDC) 与块级增量
+
+大文件只改动少量内容时, 按内容定义的边界切块, 新旧版本共享的块只需引用, 增量大小与实际改动成正比:
+- 切分点由内容决定 (与 FastCDC 相同的归一化思路): 块长度未达到平均值时使用更严格的掩码,
+  超过平均值后使用更宽松的掩码, 并限制最小/最大块长度; 插入或删除内容只影响附近的切分点
+- 切分点对齐到行尾, 每行的指纹由 zlib.crc32 计算, 不需要逐字节的 Python 循环
+- 块以 blake2b 摘要标识; 增量由 copy (引用旧内容的区间) 和 insert (新内容) 操作组成
+"""
+
+import hashlib
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+# 默认块长度 (字符)
+MIN_CHUNK_SIZE = 512
+AVG_CHUNK_SIZE = 4096
+MAX_CHUNK_SIZE = 32768
+
+
+@dataclass
+class Chunk:
+    """内容块"""
+    start: int      # 在文本中的起始位置 (字符)
+    length: int     # 长度 (字符)
+    digest: bytes   # 内容摘要
+
+
+def _masks(avg_size: int) -> Tuple[int, int]:
+    """归一化掩码: 平均块长度对应 k 位, 之前用 k+2 位, 之后用 k-2 位"""
+    bits = max(4, avg_size.bit_length() - 1)
+    # 以平均行长 ~40 字符折算为按行判断的位数
+    line_bits = max(1, bits - 5)
+    return (1 << (line_bits + 2)) - 1, (1 << max(1, line_bits - 2)) - 1
+
+
+def chunk_text(
+    text: str,
+    min_size: int = MIN_CHUNK_SIZE,
+    avg_size: int = AVG_CHUNK_SIZE,
+    max_size: int = MAX_CHUNK_SIZE
+) -> List[Chunk]:
+    """按内容定义的行边界切块"""
+    strict_mask, loose_mask = _masks(avg_size)
+    chunks: List[Chunk] = []
+    start = 0
+    position = 0
+    for line in text.splitlines(keepends=True):
+        position += len(line)
+        size = position - start
+        if size < min_size:
+            continue
+        fingerprint = zlib.crc32(line.encode('utf-8', 'surrogatepass'))
+        mask = strict_mask if size < avg_size else loose_mask
+        if (fingerprint & mask) == 0 or size >= max_size:
+            chunks.append(Chunk(start, size, _digest(text, start, position)))
+            start = position
+    if start < len(text):
+        chunks.append(Chunk(start, len(text) - start, _digest(text, start, len(text))))
+    return chunks
+
+
+def _digest(text: str, start: int, end: int) -> bytes:
+    return hashlib.blake2b(text[start:end].encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def chunk_delta(old_text: str, new_text: str, **sizes: int) -> Dict[str, Any]:
+    """计算块级增量
+
+    Returns:
+        Dict: {"ops": [...], "copied": 复用的字符数, "inserted": 新增的字符数, "ratio": 差异比例}
+        ops 中 {"op": "copy", "start": 旧内容位置, "length": 长度} 引用旧内容,
+        {"op": "insert", "text": 新内容} 为新增内容; 相邻操作已合并。
+    """
+    old_chunks: Dict[bytes, Chunk] = {}
+    for chunk in chunk_text(old_text, **sizes):
+        old_chunks.setdefault(chunk.digest, chunk)
+
+    ops: List[Dict[str, Any]] = []
+    copied = inserted = 0
+    for chunk in chunk_text(new_text, **sizes):
+        source = old_chunks.get(chunk.digest)
+        last = ops[-1] if ops else None
+        if source is not None:
+            copied += chunk.length
+            if last and last["op"] == "copy" and last["start"] + last["length"] == source.start:
+                last["length"] += chunk.length
+            else:
+                ops.append({"op": "copy", "start": source.start, "length": chunk.length})
+        else:
+            text = new_text[chunk.start:chunk.start + chunk.length]
+            inserted += chunk.length
+            if last and last["op"] == "insert":
+                last["text"] += text
+            else:
+                ops.append({"op": "insert", "text": text})
+
+    total = len(old_text) + len(new_text)
+    ratio = 1.0 - 2.0 * copied / total if total else 0.0
+    return {"ops": ops, "copied": copied, "inserted": inserted, "ratio": ratio}
+
+
+def apply_chunk_delta(old_text: str, delta: Dict[str, Any]) -> str:
+    """在旧内容上应用块级增量"""
+    parts = []
+    for op in delta["ops"]:
+        if op["op"] == "copy":
+            parts.append(old_text[op["start"]:op["start"] + op["length"]])
+        else:
+            parts.append(op["text"])
+    return "".join(parts)
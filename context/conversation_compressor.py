@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+增量对话历史压缩器
+
+为长时间运行的会话维护 "滚动摘要 + 有 Token 上限的最近消息":
+- 新消息追加到尾部; 尾部超出 Token 或条数上限时, 最旧的消息被折叠进摘要
+- 折叠只对被移出的消息做一次关键信息提取, 每轮开销与新增消息数成正比
+- 摘要按类别保留最近的若干条关键信息, 渲染结果缓存到下次折叠
+- 状态可序列化 (to_dict / from_dict), 会话恢复时无需重新计算
+"""
+
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from common.tokenizer import count_tokens
+from .smart_compressor import ExtractedInfo, KeyInformationExtractor, SmartContextCompressor
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+# 摘要中每个类别保留的关键信息条数 (保留最近折叠的)
+_MAX_ITEMS_PER_CATEGORY = 20
+_CATEGORIES = ("product", "tech", "requirements", "decisions", "constraints")
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    """估算单条消息的 Token 数 (与 compress_messages 的估算一致)"""
+    content = message.get("content", "")
+    if isinstance(content, str):
+        return count_tokens(content)
+    return 100  # 多模态消息估算
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    """取出消息中的文本部分 (多模态消息只取 text 项)"""
+    content = message.get("content", "")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(
+            item.get("text", "") for item in content
+            if isinstance(item, dict) and item.get("type") == "text"
+        )
+    return str(content)
+
+
+class ConversationCompressor:
+    """滚动摘要 + Token 上限尾部的有状态对话压缩器"""
+
+    def __init__(
+        self,
+        max_tail_tokens: int = 8000,
+        max_tail_messages: Optional[int] = None,
+        max_summary_chars: int = 2000
+    ) -> None:
+        """初始化
+
+        Args:
+            max_tail_tokens: 原样保留的最近消息的 Token 上限
+            max_tail_messages: 最近消息的条数上限 (None 表示只按 Token 限制)
+            max_summary_chars: 摘要的字符数上限
+        """
+        self.max_tail_tokens = max_tail_tokens
+        self.max_tail_messages = max_tail_messages
+        self.max_summary_chars = max_summary_chars
+
+        self._tail: Deque[Dict[str, Any]] = deque()
+        self._tail_tokens: Deque[int] = deque()
+        self.tail_tokens = 0
+
+        # 类别 -> 关键信息 (dict 保持插入顺序, 重复出现时移到末尾)
+        self._summary: Dict[str, Dict[str, None]] = {category: {} for category in _CATEGORIES}
+        self.folded_count = 0
+        self._summary_text: Optional[str] = None
+
+        self._extractor = KeyInformationExtractor()
+        self._compressor: Optional[SmartContextCompressor] = None
+
+    # ========== 更新 ==========
+
+    def add(self, message: Dict[str, Any]) -> None:
+        """追加一条消息, 必要时将最旧的消息折叠进摘要"""
+        tokens = estimate_message_tokens(message)
+        if tokens > self.max_tail_tokens:
+            # 单条消息本身超出上限: 压缩后保留 (只在加入时压缩一次)
+            if self._compressor is None:
+                self._compressor = SmartContextCompressor()
+            message = self._compressor.compress_message(dict(message))
+            tokens = min(estimate_message_tokens(message), self.max_tail_tokens)
+
+        self._tail.append(message)
+        self._tail_tokens.append(tokens)
+        self.tail_tokens += tokens
+        self._evict()
+
+    def extend(self, messages: Iterable[Dict[str, Any]]) -> None:
+        """追加多条消息"""
+        for message in messages:
+            self.add(message)
+
+    def _evict(self) -> None:
+        """尾部超出上限时折叠最旧的消息 (至少保留最新的一条)"""
+        while len(self._tail) > 1 and (
+            self.tail_tokens > self.max_tail_tokens
+            or (self.max_tail_messages is not None and len(self._tail) > self.max_tail_messages)
+        ):
+            message = self._tail.popleft()
+            self.tail_tokens -= self._tail_tokens.popleft()
+            self._fold(message)
+
+    def _fold(self, message: Dict[str, Any]) -> None:
+        """将一条消息的关键信息并入滚动摘要"""
+        info = self._extractor.extract(_message_text(message))
+        for category in _CATEGORIES:
+            items = self._summary[category]
+            for item in getattr(info, category):
+                items.pop(item, None)
+                items[item] = None
+            while len(items) > _MAX_ITEMS_PER_CATEGORY:
+                del items[next(iter(items))]
+        self.folded_count += 1
+        self._summary_text = None
+
+    def clear(self) -> None:
+        """清空全部状态"""
+        self._tail.clear()
+        self._tail_tokens.clear()
+        self.tail_tokens = 0
+        for items in self._summary.values():
+            items.clear()
+        self.folded_count = 0
+        self._summary_text = None
+
+    # ========== 读取 ==========
+
+    def summary(self) -> str:
+        """滚动摘要文本 (未折叠过消息时为空字符串)"""
+        if self._summary_text is None:
+            # 最近折叠的信息排在前面, 剪裁时优先保留
+            info = ExtractedInfo(**{
+                category: list(reversed(items)) for category, items in self._summary.items()
+            })
+            self._summary_text = info.to_summary(self.max_summary_chars) if self.folded_count else ""
+        return self._summary_text
+
+    def messages(self) -> List[Dict[str, Any]]:
+        """压缩后的消息列表: [摘要消息] + 最近消息"""
+        result: List[Dict[str, Any]] = []
+        if self.folded_count:
+            result.append({
+                "role": "system",
+                "content": f"**对话摘要** (已折叠 {self.folded_count} 条消息)\n\n{self.summary()}"
+            })
+        result.extend(self._tail)
+        return result
+
+    def __len__(self) -> int:
+        return len(self._tail)
+
+    # ========== 序列化 ==========
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出状态 (可 JSON 序列化)"""
+        return {
+            "version": STATE_VERSION,
+            "max_tail_tokens": self.max_tail_tokens,
+            "max_tail_messages": self.max_tail_messages,
+            "max_summary_chars": self.max_summary_chars,
+            "tail": list(self._tail),
+            "tail_tokens": list(self._tail_tokens),
+            "summary": {category: list(items) for category, items in self._summary.items()},
+            "folded_count": self.folded_count,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "ConversationCompressor":
+        """从 to_dict() 的结果恢复 (不重新提取或估算)"""
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"不支持的对话压缩状态版本: {state.get('version')}")
+
+        compressor = cls(
+            max_tail_tokens=state["max_tail_tokens"],
+            max_tail_messages=state.get("max_tail_messages"),
+            max_summary_chars=state["max_summary_chars"]
+        )
+        compressor._tail.extend(state["tail"])
+        compressor._tail_tokens.extend(state["tail_tokens"])
+        compressor.tail_tokens = sum(compressor._tail_tokens)
+        for category in _CATEGORIES:
+            compressor._summary[category] = dict.fromkeys(state["summary"].get(category, []))
+        compressor.folded_count = state["folded_count"]
+        return compressor
@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+基于 inotify 的实时脏文件跟踪 (仅 Linux)
+
+InotifyWatcher 通过 ctypes 直接调用 libc 的 inotify 接口, 为项目中每个目录添加监视,
+把文件的写入、创建、删除和移动记录到脏路径集合中:
+- 跳过 SKIP_DIRS 中的目录以及被 .gitignore 忽略的路径 (支持各级目录下的 .gitignore)
+- 新建或移入的目录会递归添加监视, 其中已有的文件记为脏
+- 删除或移出的目录以目录路径记录在 dirty_dirs 中, 由调用方按前缀展开为具体文件
+- 内核事件队列溢出、监视数达到上限或 .gitignore 发生变化时标记 overflowed,
+  调用方应退回全量扫描并调用 reset()
+
+有运行中的事件循环时, 通过 add_reader 持续消费事件, 避免两次检查点之间内核队列溢出。
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import re
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# inotify 常量 (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+
+class WatchUnavailable(Exception):
+    """当前平台或环境无法使用 inotify"""
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        raise WatchUnavailable(f"inotify 仅支持 Linux (当前: {sys.platform})")
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        raise WatchUnavailable("libc 不提供 inotify 接口")
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+def _translate_pattern(pattern: str) -> str:
+    """gitignore 通配符 -> 正则 (** 跨目录, * 和 ? 不跨目录)"""
+    result = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            result.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            result.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            result.append("[^/]*")
+        elif c == "?":
+            result.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end < 0:
+                result.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                result.append(f"[{body}]")
+                i = end
+        else:
+            result.append(re.escape(c))
+        i += 1
+    return "".join(result)
+
+
+class GitIgnoreRules:
+    """.gitignore 规则匹配 (各级目录的 .gitignore 作用于其子路径, 后出现的规则优先)"""
+
+    def __init__(self) -> None:
+        # (规则所在目录, 正则, 是否取反, 是否只匹配目录, 是否匹配完整相对路径)
+        self._rules: List[Tuple[str, "re.Pattern", bool, bool, bool]] = []
+
+    def load(self, rel_dir: str, gitignore: Path) -> None:
+        """加载目录下的 .gitignore (rel_dir 为项目相对路径, 使用 / 分隔, 根目录为 "")"""
+        try:
+            lines = gitignore.read_text(encoding="utf-8", errors="replace").splitlines()
+        except OSError:
+            return
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            line = line.replace("\\", "")
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            line = line.lstrip("/")
+            regex = re.compile(_translate_pattern(line) + r"\Z")
+            self._rules.append((rel_dir, regex, negate, dir_only, anchored))
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """判断项目相对路径 (/ 分隔) 是否被忽略"""
+        ignored = False
+        name = rel_path.rsplit("/", 1)[-1]
+        for rel_dir, regex, negate, dir_only, anchored in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if rel_dir:
+                if not rel_path.startswith(rel_dir + "/"):
+                    continue
+                target = rel_path[len(rel_dir) + 1:]
+            else:
+                target = rel_path
+            if regex.match(target if anchored else name):
+                ignored = not negate
+        return ignored
+
+
+class InotifyWatcher:
+    """递归监视项目目录, 维护脏路径集合"""
+
+    def __init__(self, project_root: Path, skip_dirs: Iterable[str] = ()):
+        self.project_root = Path(project_root)
+        self.skip_dirs = frozenset(skip_dirs)
+        self.ignore = GitIgnoreRules()
+
+        # 自上次 reset() 以来变化的文件和被删除/移出的目录 (项目相对路径, 系统分隔符)
+        self.dirty: Set[str] = set()
+        self.dirty_dirs: Set[str] = set()
+        self.overflowed = False
+
+        self._libc = None
+        self._fd: Optional[int] = None
+        self._watches: Dict[int, str] = {}  # wd -> 目录相对路径 ("" 为根目录, / 分隔)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def running(self) -> bool:
+        return self._fd is not None
+
+    def start(self) -> None:
+        """创建 inotify 实例并监视整个项目 (失败时抛出 WatchUnavailable)"""
+        if self.running:
+            return
+        self._libc = _load_libc()
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise WatchUnavailable(f"inotify_init1 失败: {os.strerror(ctypes.get_errno())}")
+        self._fd = fd
+        try:
+            self._add_tree("", mark_dirty=False)
+        except WatchUnavailable:
+            self.close()
+            raise
+        if self.overflowed:
+            self.close()
+            raise WatchUnavailable("inotify 监视数不足 (fs.inotify.max_user_watches)")
+
+        try:
+            self._loop = asyncio.get_running_loop()
+            self._loop.add_reader(fd, self._read_events)
+        except (RuntimeError, NotImplementedError):
+            self._loop = None  # 没有事件循环时在 peek/reset 中按需读取
+        logger.info(f"已启动文件监视: {self.project_root} ({len(self._watches)} 个目录)")
+
+    def close(self) -> None:
+        """停止监视"""
+        if self._fd is None:
+            return
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.remove_reader(self._fd)
+        self._loop = None
+        os.close(self._fd)
+        self._fd = None
+        self._watches.clear()
+
+    def _abs(self, rel_path: str) -> Path:
+        return self.project_root / rel_path if rel_path else self.project_root
+
+    @staticmethod
+    def _join(rel_dir: str, name: str) -> str:
+        return f"{rel_dir}/{name}" if rel_dir else name
+
+    def _skipped(self, rel_path: str, is_dir: bool) -> bool:
+        name = rel_path.rsplit("/", 1)[-1]
+        if name in self.skip_dirs:
+            return True
+        return self.ignore.is_ignored(rel_path, is_dir)
+
+    def _add_tree(self, rel_dir: str, mark_dirty: bool) -> None:
+        """为目录及其子目录添加监视 (mark_dirty 时把其中的文件记为脏)"""
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            abs_dir = self._abs(current)
+            gitignore = abs_dir / ".gitignore"
+            if gitignore.is_file():
+                self.ignore.load(current, gitignore)
+
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(abs_dir), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOSPC:
+                    logger.warning("inotify 监视数达到上限, 需要全量扫描")
+                    self.overflowed = True
+                    return
+                continue  # 目录已被删除或不可访问
+            self._watches[wd] = current
+
+            try:
+                entries = list(os.scandir(abs_dir))
+            except OSError:
+                continue
+            for entry in entries:
+                rel_path = self._join(current, entry.name)
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if self._skipped(rel_path, is_dir):
+                    continue
+                if is_dir:
+                    stack.append(rel_path)
+                elif mark_dirty:
+                    self.dirty.add(os.path.join(*rel_path.split("/")))
+
+    def _read_events(self) -> None:
+        """读取并处理所有待处理事件"""
+        if self._fd is None:
+            return
+        while True:
+            try:
+                data = os.read(self._fd, _READ_SIZE)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                logger.warning(f"读取 inotify 事件失败: {e}")
+                self.overflowed = True
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                self._handle_event(wd, mask, name)
+
+    def _handle_event(self, wd: int, mask: int, name: str) -> None:
+        if mask & IN_Q_OVERFLOW:
+            logger.warning("inotify 事件队列溢出, 需要全量扫描")
+            self.overflowed = True
+            return
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return
+
+        rel_dir = self._watches.get(wd)
+        if rel_dir is None or not name:
+            return  # 已移除的监视, 或目录自身的事件 (由父目录的事件处理)
+
+        rel_path = self._join(rel_dir, name)
+        is_dir = bool(mask & IN_ISDIR)
+        if name == ".gitignore":
+            # 忽略规则变化后已有的监视范围不再准确
+            self.overflowed = True
+        if self._skipped(rel_path, is_dir):
+            return
+
+        if is_dir:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._add_tree(rel_path, mark_dirty=True)
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self.dirty_dirs.add(os.path.join(*rel_path.split("/")))
+                prefix = rel_path + "/"
+                for stale in [w for w, d in self._watches.items() if d == rel_path or d.startswith(prefix)]:
+                    del self._watches[stale]
+            return
+
+        self.dirty.add(os.path.join(*rel_path.split("/")))
+
+    def peek(self) -> Optional[Tuple[Set[str], Set[str]]]:
+        """当前的 (脏文件, 被删除/移出的目录); 溢出后返回 None"""
+        self._read_events()
+        if self.overflowed:
+            return None
+        return set(self.dirty), set(self.dirty_dirs)
+
+    def reset(self) -> None:
+        """建立新的检查点: 清空脏路径集合和溢出标记
+
+        溢出后调用前应完成一次全量扫描。.gitignore 变化导致的溢出会在这里重新建立监视。
+        """
+        self._read_events()
+        if self.overflowed and self._fd is not None:
+            for wd in list(self._watches):
+                self._libc.inotify_rm_watch(self._fd, wd)
+            self._watches.clear()
+            self.ignore = GitIgnoreRules()
+            self.overflowed = False
+            self._add_tree("", mark_dirty=False)
+        self.dirty.clear()
+        self.dirty_dirs.clear()
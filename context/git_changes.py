@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+基于 Git 的变更检测
+
+项目是 Git 仓库时, 由 Git 给出脏文件集合, 增量更新只需快照和比较这些路径:
+- 检查点: 记录 HEAD、相对 HEAD 的脏路径 (git status --porcelain=v2 -z) 和
+  暂存区中各文件的 blob id (git ls-files -s -z)
+- 检查点之后的变更候选 = 检查点时的脏路径 ∪ 当前脏路径 ∪ 检查点以来提交涉及的路径
+  (git diff --raw -z <检查点 HEAD>)
+- 检查点时干净的已跟踪文件, 其旧内容按 blob id 从 Git 读取 (git cat-file blob)
+
+被 .gitignore 忽略的文件不参与检测。未跟踪文件过多、Git 不可用或不是 Git 仓库时返回 None,
+由调用方退回文件系统扫描。
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默认未跟踪文件上限: 超过时 Git 模式不再比文件系统扫描更快
+DEFAULT_MAX_UNTRACKED = 2000
+
+
+class GitCommandError(Exception):
+    """Git 命令执行失败"""
+
+
+@dataclass
+class GitCheckpoint:
+    """变更检测检查点"""
+    head: Optional[str]                                # HEAD 提交 (空仓库为 None)
+    dirty: Set[str] = field(default_factory=set)       # 相对 HEAD 有变化或未跟踪的路径
+    blobs: Dict[str, str] = field(default_factory=dict)  # 暂存区 blob id (路径 -> sha)
+
+
+class GitChangeDetector:
+    """通过 Git 获取脏文件集合"""
+
+    def __init__(
+        self,
+        project_root: Path,
+        skip_dirs: Iterable[str] = (),
+        max_untracked: int = DEFAULT_MAX_UNTRACKED
+    ):
+        """初始化
+
+        Args:
+            project_root: 项目根目录 (可以是仓库的子目录)
+            skip_dirs: 跳过的目录名
+            max_untracked: 未跟踪文件上限, 超过时放弃 Git 模式
+        """
+        self.project_root = Path(project_root)
+        self.skip_dirs = frozenset(skip_dirs)
+        self.max_untracked = max_untracked
+        # 项目根目录相对仓库根目录的前缀 ("" 表示仓库根目录; None 表示尚未探测)
+        self._prefix: Optional[str] = None
+        self._available: Optional[bool] = None
+
+    async def _git(self, *args: str) -> bytes:
+        """执行 git 命令并返回 stdout"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "git", *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=self.project_root
+            )
+        except FileNotFoundError as e:
+            raise GitCommandError("git 未安装") from e
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise GitCommandError(f"git {args[0]} 失败: {stderr.decode(errors='replace').strip()}")
+        return stdout
+
+    async def is_available(self) -> bool:
+        """项目是否位于 Git 工作区内 (结果缓存)"""
+        if self._available is None:
+            try:
+                output = await self._git("rev-parse", "--is-inside-work-tree", "--show-prefix")
+                lines = output.decode('utf-8', 'surrogateescape').splitlines()
+                self._available = bool(lines) and lines[0] == "true"
+                self._prefix = lines[1] if len(lines) > 1 else ""
+            except GitCommandError as e:
+                logger.debug(f"Git 变更检测不可用: {e}")
+                self._available = False
+        return self._available
+
+    def _to_project_path(self, repo_path: bytes) -> Optional[str]:
+        """仓库相对路径 -> 项目相对路径 (项目外或位于跳过目录时返回 None)"""
+        path = repo_path.decode('utf-8', 'surrogateescape')
+        if self._prefix:
+            if not path.startswith(self._prefix):
+                return None
+            path = path[len(self._prefix):]
+        parts = path.split('/')
+        if self.skip_dirs.intersection(parts):
+            return None
+        return os.path.join(*parts)
+
+    def _pathspec(self) -> List[str]:
+        return ["--", "."] + [f":(exclude,glob)**/{name}/**" for name in sorted(self.skip_dirs)]
+
+    async def _head(self) -> Optional[str]:
+        try:
+            return (await self._git("rev-parse", "--verify", "-q", "HEAD")).decode().strip() or None
+        except GitCommandError:
+            return None  # 空仓库
+
+    async def _status(self) -> Tuple[Set[str], int]:
+        """相对 HEAD 的脏路径和未跟踪文件数 (git status --porcelain=v2 -z)"""
+        output = await self._git(
+            "status", "--porcelain=v2", "-z", "--untracked-files=all", *self._pathspec()
+        )
+        dirty: Set[str] = set()
+        untracked = 0
+        records = output.split(b"\0")
+        i = 0
+        while i < len(records):
+            record = records[i]
+            i += 1
+            if not record:
+                continue
+            kind = record[:1]
+            if kind == b"1":
+                paths = [record.split(b" ", 8)[8]]
+            elif kind == b"2":
+                # 重命名/复制: 下一条记录是原路径
+                paths = [record.split(b" ", 9)[9], records[i]]
+                i += 1
+            elif kind == b"u":
+                paths = [record.split(b" ", 10)[10]]
+            elif kind == b"?":
+                paths = [record[2:]]
+                untracked += 1
+            else:
+                continue
+            for repo_path in paths:
+                path = self._to_project_path(repo_path)
+                if path is not None:
+                    dirty.add(path)
+        return dirty, untracked
+
+    async def _tracked_blobs(self) -> Dict[str, str]:
+        """暂存区中各文件的 blob id (git ls-files -s -z)"""
+        output = await self._git("ls-files", "-s", "-z", "--full-name", *self._pathspec())
+        blobs: Dict[str, str] = {}
+        for record in output.split(b"\0"):
+            if not record:
+                continue
+            info, repo_path = record.split(b"\t", 1)
+            mode, sha, stage = info.split(b" ")
+            if stage != b"0" or not mode.startswith(b"100"):
+                continue  # 冲突中的条目、符号链接和子模块
+            path = self._to_project_path(repo_path)
+            if path is not None:
+                blobs[path] = sha.decode()
+        return blobs
+
+    async def _diff_paths(self, base: str) -> Set[str]:
+        """base 提交与工作区之间有差异的已跟踪路径 (git diff --raw -z)"""
+        output = await self._git("diff", "--raw", "-z", "--no-renames", base, *self._pathspec())
+        paths: Set[str] = set()
+        records = output.split(b"\0")
+        # 格式: ":<mode> <mode> <sha> <sha> <status>\0<path>\0"
+        for i in range(0, len(records) - 1, 2):
+            if records[i].startswith(b":"):
+                path = self._to_project_path(records[i + 1])
+                if path is not None:
+                    paths.add(path)
+        return paths
+
+    async def checkpoint(self) -> Optional[GitCheckpoint]:
+        """记录检查点 (Git 模式不可用时返回 None)"""
+        if not await self.is_available():
+            return None
+        try:
+            head = await self._head()
+            dirty, untracked = await self._status()
+            if untracked > self.max_untracked:
+                logger.info(f"未跟踪文件过多 ({untracked}), 使用文件系统扫描")
+                return None
+            blobs = await self._tracked_blobs()
+        except GitCommandError as e:
+            logger.warning(f"记录 Git 检查点失败: {e}")
+            return None
+        return GitCheckpoint(head=head, dirty=dirty, blobs=blobs)
+
+    async def changed_since(self, checkpoint: GitCheckpoint) -> Optional[Set[str]]:
+        """检查点以来可能变化的路径 (Git 模式不可用时返回 None)
+
+        返回的是候选集合: 其中的路径仍需比较内容, 集合外的路径保证未变化。
+        检查点已经确定使用 Git 模式, 这里不再检查未跟踪文件上限。
+        """
+        try:
+            dirty, _ = await self._status()
+            candidates = dirty | checkpoint.dirty
+            head = await self._head()
+            if head != checkpoint.head:
+                if checkpoint.head is None:
+                    return None  # 检查点时仓库为空, 无法与提交比较
+                candidates |= await self._diff_paths(checkpoint.head)
+        except GitCommandError as e:
+            logger.warning(f"Git 变更检测失败: {e}")
+            return None
+        return candidates
+
+    async def read_blob(self, sha: str) -> Optional[bytes]:
+        """读取 blob 内容"""
+        try:
+            return await self._git("cat-file", "blob", sha)
+        except GitCommandError as e:
+            logger.warning(f"读取 Git blob 失败: {sha}, {e}")
+            return None
@@ -7,23 +7,39 @@
 基于V2.2.0的incremental_updater.py实现
 """
 
+import os
 import json
 import hashlib
 import logging
 import asyncio
 import aiofiles
-from typing import Dict, List, Optional, Tuple, Any, Union
+from concurrent.futures import ThreadPoolExecutor
+from stat import S_ISREG
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Any, Union
 from pathlib import Path
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, asdict, replace
 from datetime import datetime
 import shutil
-import difflib
 
 from common.security import validate_path
 from common.exceptions import SecurityError
+from .blob_store import BlobStore
+from .git_changes import DEFAULT_MAX_UNTRACKED, GitChangeDetector, GitCheckpoint
+from .fs_watcher import InotifyWatcher, WatchUnavailable
+from .line_diff import DEFAULT_MAX_BYTES, DEFAULT_TIME_BUDGET, DiffResult, diff_texts
+from .chunking import apply_chunk_delta, chunk_delta
 
 logger = logging.getLogger(__name__)
 
+# 项目快照时跳过的目录
+SKIP_DIRS = frozenset({'.git', 'node_modules', '__pycache__', '.venv', 'venv', '.superagent'})
+
+# 分块哈希的块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 索引文件格式版本 (旧版为 {path: snapshot} 的扁平字典)
+INDEX_VERSION = 2
+
 
 @dataclass
 class FileSnapshot:
@@ -33,7 +49,8 @@ class FileSnapshot:
     mtime: float                 # 修改时间
     hash: str                    # MD5哈希
     snapshot_time: float         # 拍摄时间
-    content: Optional[str] = None  # 缓存内容用于diff
+    content: Optional[str] = None  # 缓存内容用于diff (二进制文件为 None)
+    inode: int = 0               # inode 号 (0 表示未知)
 
     def to_dict(self) -> Dict:
         return {
@@ -42,9 +59,23 @@ class FileSnapshot:
             "mtime": self.mtime,
             "hash": self.hash,
             "snapshot_time": self.snapshot_time,
-            "content": None  # 序列化时排除内容以节省空间
+            "content": None,  # 序列化时排除内容以节省空间
+            "inode": self.inode
         }
 
+    def matches_stat(self, stat: os.stat_result) -> bool:
+        """文件元数据未变化时可直接复用该快照的哈希
+
+        与 git 的 racy-clean 规则一致: 文件在快照前 1 秒内被修改过时,
+        同一 mtime 下仍可能有未观察到的写入, 此时不复用。
+        """
+        return (
+            self.size == stat.st_size
+            and self.mtime == stat.st_mtime
+            and (not self.inode or self.inode == stat.st_ino)
+            and self.mtime < self.snapshot_time - 1.0
+        )
+
     @classmethod
     def from_dict(cls, data: Dict) -> 'FileSnapshot':
         return cls(**data)
@@ -54,12 +85,14 @@ class FileSnapshot:
 class ChangeRecord:
     """变更记录"""
     path: str
-    change_type: str  # "added", "modified", "deleted"
+    change_type: str  # "added", "modified", "deleted", "renamed", "copied"
     old_snapshot: Optional[FileSnapshot] = None
     new_snapshot: Optional[FileSnapshot] = None
     diff_ratio: float = 0.0  # 差异比例 (0-1)
     diff: Optional[str] = None  # diff内容(如果适用)
     timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+    old_path: Optional[str] = None  # 重命名/复制的来源路径
+    chunk_delta: Optional[Dict[str, Any]] = None  # 大文件的块级增量 (代替 diff)
 
     def to_dict(self) -> Dict:
         return {
@@ -67,7 +100,9 @@ class ChangeRecord:
             "change_type": self.change_type,
             "diff_ratio": self.diff_ratio,
             "diff": self.diff,
-            "timestamp": self.timestamp
+            "timestamp": self.timestamp,
+            "old_path": self.old_path,
+            "chunk_delta": self.chunk_delta
         }
 
 
@@ -92,6 +127,35 @@ class IncrementalConfig:
     # 快照存储目录 (相对于项目根目录)
     snapshot_dir: str = ".superagent/snapshots"
 
+    # 哈希线程数 (0 表示按 CPU 数自动选择)
+    hash_workers: int = 0
+
+    # 全项目变更检测方式: "auto" (Git 仓库中只检测 Git 报告的脏路径) 或 "filesystem"
+    change_detection: str = "auto"
+
+    # 未跟踪文件超过此数量时 Git 模式退回文件系统扫描
+    git_max_untracked: int = DEFAULT_MAX_UNTRACKED
+
+    # 是否用 inotify 实时跟踪脏文件 (仅 Linux, 不可用时使用上面的检测方式)
+    watch: bool = False
+
+    # 单个文件 diff 的内容大小 (字符数) 与时间 (秒) 上限, 超出时使用完整内容
+    diff_max_bytes: int = DEFAULT_MAX_BYTES
+    diff_time_budget: float = DEFAULT_TIME_BUDGET
+
+    # 内容达到此长度 (字符) 的文件使用内容定义分块的块级增量代替行 diff
+    chunk_min_size: int = 256 * 1024
+
+    # 重命名检测: 删除与新增的文件内容哈希相同时合并为 "renamed";
+    # rename_similarity 不为 None 时, 相似度不低于该值的文件对也视为重命名
+    # (最多比较 rename_limit 个文件对)
+    detect_renames: bool = True
+    rename_similarity: Optional[float] = None
+    rename_limit: int = 100
+
+    # 复制检测: 新增文件与检测前某个文件内容相同时记为 "copied"
+    detect_copies: bool = False
+
     def to_dict(self) -> Dict:
         return {
             "enabled": self.enabled,
@@ -99,10 +163,54 @@ class IncrementalConfig:
             "incremental_threshold": self.incremental_threshold,
             "max_snapshots_per_file": self.max_snapshots_per_file,
             "cache_content": self.cache_content,
-            "snapshot_dir": self.snapshot_dir
+            "snapshot_dir": self.snapshot_dir,
+            "hash_workers": self.hash_workers,
+            "change_detection": self.change_detection,
+            "git_max_untracked": self.git_max_untracked,
+            "watch": self.watch,
+            "diff_max_bytes": self.diff_max_bytes,
+            "diff_time_budget": self.diff_time_budget,
+            "chunk_min_size": self.chunk_min_size,
+            "detect_renames": self.detect_renames,
+            "rename_similarity": self.rename_similarity,
+            "rename_limit": self.rename_limit,
+            "detect_copies": self.detect_copies
         }
 
 
+def hash_file(abs_path: Path, keep_content: bool = False) -> Tuple[str, Optional[str]]:
+    """分块计算文件的 MD5 (按字节读取, 适用于二进制文件)
+
+    Args:
+        abs_path: 文件绝对路径
+        keep_content: 是否同时返回 UTF-8 文本内容
+
+    Returns:
+        Tuple[哈希, 文本内容 (未要求或不是 UTF-8 文本时为 None)]
+    """
+    md5 = hashlib.md5()
+    chunks = [] if keep_content else None
+    with open(abs_path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            md5.update(chunk)
+            if chunks is not None:
+                chunks.append(chunk)
+
+    content = decode_text(b"".join(chunks)) if chunks is not None else None
+    return md5.hexdigest(), content
+
+
+def decode_text(data: bytes) -> Optional[str]:
+    """按 UTF-8 解码文件内容 (与文本模式读取一致: 统一换行符); 不是文本时返回 None"""
+    try:
+        return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+    except UnicodeDecodeError:
+        return None
+
+
 class IncrementalUpdater:
     """增量更新检测器"""
 
@@ -124,34 +232,99 @@ class IncrementalUpdater:
         self.snapshot_dir = self.project_root / self.config.snapshot_dir
         self.snapshot_dir.mkdir(parents=True, exist_ok=True)
 
-        # 索引文件
+        # 索引文件 (只含元数据) 与内容存储
         self.index_file = self.snapshot_dir / "index.json"
+        self.blobs = BlobStore(self.snapshot_dir / "blobs")
 
-        # 索引
+        # 索引: 每个文件的当前快照, 以及被替换的历史版本 (旧 -> 新)
+        self.history: Dict[str, List[FileSnapshot]] = {}
         self.snapshots = self._load_index()
 
+        # 哈希线程池 (首次使用时创建)
+        self._hash_executor: Optional[ThreadPoolExecutor] = None
+
         logger.info(
             f"增量更新器初始化完成: {self.snapshot_dir}, "
             f"索引文件: {len(self.snapshots)} 个条目"
         )
 
-    def _load_index(self) -> Dict[str, Dict]:
-        """加载索引"""
+    def _load_index(self) -> Dict[str, FileSnapshot]:
+        """加载索引 (同时填充 self.history)"""
         if self.index_file.exists():
             try:
                 with open(self.index_file, 'r', encoding='utf-8') as f:
                     index_data = json.load(f)
-                    # 将字典转换回 FileSnapshot 对象以供 snapshots 属性使用
-                    return {path: FileSnapshot.from_dict(d) for path, d in index_data.items()}
+                if index_data.get("version") != INDEX_VERSION:
+                    # 旧版扁平索引: 只有当前快照
+                    index_data = {"snapshots": index_data, "history": {}}
+                # 将字典转换回 FileSnapshot 对象以供 snapshots 属性使用
+                self.history = {
+                    path: [FileSnapshot.from_dict(d) for d in versions]
+                    for path, versions in index_data.get("history", {}).items()
+                }
+                return {path: FileSnapshot.from_dict(d) for path, d in index_data["snapshots"].items()}
             except Exception as e:
                 logger.warning(f"加载索引失败 ({type(e).__name__}): {e}")
         return {}
 
     async def _save_index(self):
-        """异步保存索引"""
-        async with aiofiles.open(self.index_file, 'w', encoding='utf-8') as f:
-            data = {path: snap.to_dict() for path, snap in self.snapshots.items()}
-            await f.write(json.dumps(data, ensure_ascii=False, indent=2))
+        """异步保存索引 (紧凑 JSON, 先写临时文件再原子替换)"""
+        data = {
+            "version": INDEX_VERSION,
+            "snapshots": {path: snap.to_dict() for path, snap in self.snapshots.items()},
+            "history": {
+                path: [snap.to_dict() for snap in versions]
+                for path, versions in self.history.items() if versions
+            }
+        }
+        tmp_file = self.index_file.with_name(f"{self.index_file.name}.tmp")
+        async with aiofiles.open(tmp_file, 'w', encoding='utf-8') as f:
+            await f.write(json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+        os.replace(tmp_file, self.index_file)
+
+    async def _store_snapshots(self, snapshots: Dict[str, FileSnapshot]) -> None:
+        """把快照记入索引
+
+        内容写入 blob 存储 (相同内容只存一份), 索引中的快照不再持有内容;
+        被替换的旧版本进入历史, 每个文件最多保留 max_snapshots_per_file 个版本 (含当前)。
+        """
+        blobs = {snap.hash: snap.content for snap in snapshots.values() if snap.content is not None}
+        if blobs:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._put_blobs, blobs)
+
+        history_limit = max(0, self.config.max_snapshots_per_file - 1)
+        for path, snap in snapshots.items():
+            previous = self.snapshots.get(path)
+            if previous is not None and previous.hash != snap.hash and history_limit:
+                versions = self.history.setdefault(path, [])
+                versions.append(previous)
+                del versions[:-history_limit]
+            self.snapshots[path] = snap if snap.content is None else replace(snap, content=None)
+
+    def _put_blobs(self, blobs: Dict[str, str]) -> None:
+        for blob_hash, content in blobs.items():
+            self.blobs.put(blob_hash, content)
+
+    async def load_content(self, snapshot: Optional[FileSnapshot]) -> Optional[str]:
+        """获取快照内容 (快照对象未持有内容时从 blob 存储按需读取)"""
+        if snapshot is None:
+            return None
+        if snapshot.content is not None:
+            return snapshot.content
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.blobs.get, snapshot.hash)
+
+    async def _with_content(self, snapshot: Optional[FileSnapshot]) -> Optional[FileSnapshot]:
+        """返回带内容的快照副本 (用于计算 diff)"""
+        if snapshot is None or snapshot.content is not None:
+            return snapshot
+        content = await self.load_content(snapshot)
+        return snapshot if content is None else replace(snapshot, content=content)
+
+    def get_history(self, file_path: str) -> List[FileSnapshot]:
+        """获取文件的历史快照 (旧 -> 新, 不含当前快照)"""
+        return list(self.history.get(file_path, []))
 
     async def take_snapshot(
         self,
@@ -164,14 +337,9 @@ class IncrementalUpdater:
             tasks = [self._take_single_snapshot(path, save=False) for path in file_path]
             results = await asyncio.gather(*tasks)
             
-            snapshots = {}
-            for path, snap in zip(file_path, results):
-                if snap:
-                    snapshots[path] = snap
-                    if save:
-                        self.snapshots[path] = snap
-            
+            snapshots = {path: snap for path, snap in zip(file_path, results) if snap}
             if save:
+                await self._store_snapshots(snapshots)
                 await self._save_index()
             return snapshots
         
@@ -200,54 +368,139 @@ class IncrementalUpdater:
 
         # 计算文件信息 (stat 是阻塞的, 但通常很快)
         stat = abs_path.stat()
-        size = stat.st_size
-        mtime = stat.st_mtime
 
-        # 异步读取内容
         if content is None:
-            try:
-                async with aiofiles.open(abs_path, mode='r', encoding='utf-8') as f:
-                    content = await f.read()
-            except Exception as e:
-                logger.warning(f"异步读取文件失败 ({type(e).__name__}): {abs_path}, {e}")
-                return None
+            # 元数据未变化时复用已有哈希, 否则在线程池中按字节读取并哈希
+            snapshot = self._reuse_snapshot(file_path, stat)
+            if snapshot is None:
+                loop = asyncio.get_running_loop()
+                try:
+                    file_hash, content = await loop.run_in_executor(
+                        self._get_hash_executor(), hash_file, abs_path, self.config.cache_content
+                    )
+                except OSError as e:
+                    logger.warning(f"读取文件失败 ({type(e).__name__}): {abs_path}, {e}")
+                    return None
+                snapshot = self._new_snapshot(file_path, stat, file_hash, content)
+        else:
+            snapshot = self._new_snapshot(file_path, stat, hashlib.md5(content.encode()).hexdigest(), content)
 
-        file_hash = hashlib.md5(content.encode()).hexdigest()
+        if save:
+            await self._store_snapshots({file_path: snapshot})
+            await self._save_index()
+            
+        return snapshot
 
-        snapshot = FileSnapshot(
+    def _new_snapshot(
+        self,
+        file_path: str,
+        stat: os.stat_result,
+        file_hash: str,
+        content: Optional[str]
+    ) -> FileSnapshot:
+        return FileSnapshot(
             path=file_path,
-            size=size,
-            mtime=mtime,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
             hash=file_hash,
             snapshot_time=datetime.now().timestamp(),
-            content=content if self.config.cache_content else None
+            content=content if self.config.cache_content else None,
+            inode=stat.st_ino
         )
 
-        if save:
-            self.snapshots[file_path] = snapshot
-            await self._save_index()
-            
-        return snapshot
+    def snapshot_from_bytes(self, file_path: str, data: bytes) -> FileSnapshot:
+        """由内存中的文件内容构造快照 (例如从 Git 读取的旧版本)"""
+        return FileSnapshot(
+            path=file_path,
+            size=len(data),
+            mtime=0.0,
+            hash=hashlib.md5(data).hexdigest(),
+            snapshot_time=datetime.now().timestamp(),
+            content=decode_text(data) if self.config.cache_content else None
+        )
+
+    def _reuse_snapshot(self, file_path: str, stat: os.stat_result) -> Optional[FileSnapshot]:
+        """stat 快速路径: 大小、mtime、inode 均未变化时复用已保存的快照
+
+        需要缓存内容但 blob 存储中没有该内容 (二进制文件或 blob 已丢失) 时不复用。
+        """
+        previous = self.snapshots.get(file_path)
+        if previous is None or not previous.matches_stat(stat):
+            return None
+        if self.config.cache_content and previous.content is None and not self.blobs.exists(previous.hash):
+            return None
+        return replace(previous, snapshot_time=datetime.now().timestamp(), inode=stat.st_ino)
+
+    def _get_hash_executor(self) -> ThreadPoolExecutor:
+        """哈希线程池 (文件读取和 MD5 计算都会释放 GIL)"""
+        if self._hash_executor is None:
+            workers = self.config.hash_workers or min(32, (os.cpu_count() or 1) + 4)
+            self._hash_executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="snapshot-hash"
+            )
+        return self._hash_executor
+
+    def _scan_project(self) -> List[Tuple[str, os.stat_result]]:
+        """遍历项目文件 (剪枝跳过目录), 返回 (相对路径, stat) 列表"""
+        results = []
+        root = str(self.project_root)
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            rel_dir = os.path.relpath(dirpath, root)
+            for name in filenames:
+                if name in SKIP_DIRS:
+                    continue
+                try:
+                    stat = os.stat(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+                if not S_ISREG(stat.st_mode):
+                    continue
+                rel_path = name if rel_dir == '.' else os.path.join(rel_dir, name)
+                results.append((rel_path, stat))
+        return results
 
     async def take_project_snapshot(self, save: bool = True) -> Dict[str, FileSnapshot]:
-        """拍摄项目所有文件快照 (异步)"""
-        # 跳过这些目录
-        skip_dirs = {'.git', 'node_modules', '__pycache__', '.venv', 'venv', '.superagent'}
-        
-        file_paths = []
-        for path in self.project_root.rglob('*'):
-            if path.is_file():
-                skip = False
-                for skip_dir in skip_dirs:
-                    if skip_dir in path.parts:
-                        skip = True
-                        break
-                if not skip:
-                    rel_path = str(path.relative_to(self.project_root))
-                    file_paths.append(rel_path)
-
-        # 并发执行快照
-        return await self.take_snapshot(file_paths, save=save)
+        """拍摄项目所有文件快照 (异步)
+
+        元数据未变化的文件直接复用已保存的哈希, 其余文件在线程池中分块哈希。
+        """
+        loop = asyncio.get_running_loop()
+        entries = await loop.run_in_executor(None, self._scan_project)
+
+        snapshots: Dict[str, FileSnapshot] = {}
+        pending = []
+        for rel_path, stat in entries:
+            snapshot = self._reuse_snapshot(rel_path, stat)
+            if snapshot is not None:
+                snapshots[rel_path] = snapshot
+            else:
+                pending.append((rel_path, stat))
+
+        if pending:
+            keep_content = self.config.cache_content
+            executor = self._get_hash_executor()
+
+            def hash_pending() -> List[Optional[Tuple[str, Optional[str]]]]:
+                def hash_one(item):
+                    try:
+                        return hash_file(self.project_root / item[0], keep_content)
+                    except OSError as e:
+                        logger.warning(f"读取文件失败 ({type(e).__name__}): {item[0]}, {e}")
+                        return None
+                return list(executor.map(hash_one, pending))
+
+            results = await loop.run_in_executor(None, hash_pending)
+            for (rel_path, stat), result in zip(pending, results):
+                if result is not None:
+                    snapshots[rel_path] = self._new_snapshot(rel_path, stat, *result)
+
+        logger.debug(f"项目快照: {len(snapshots)} 个文件, 重新哈希 {len(pending)} 个")
+
+        if save:
+            await self._store_snapshots(snapshots)
+            await self._save_index()
+        return snapshots
 
     async def detect_changes(
         self,
@@ -300,9 +553,10 @@ class IncrementalUpdater:
             return None  # 无变更
         else:
             change_type = "modified"
-            diff_ratio = self._calculate_diff_ratio(
-                old_snapshot, new_snapshot
-            )
+            old_snapshot = await self._with_content(old_snapshot)
+            new_snapshot = await self._with_content(new_snapshot)
+            diff_result = await self._compute_diff(old_snapshot, new_snapshot)
+            diff_ratio = diff_result.ratio
 
         record = ChangeRecord(
             path=new_snapshot.path if new_snapshot else old_snapshot.path,
@@ -312,11 +566,9 @@ class IncrementalUpdater:
             diff_ratio=diff_ratio
         )
 
-        if change_type == "modified" and diff_ratio < self.config.incremental_threshold:
-            record.diff = self._generate_diff(
-                old_snapshot.content or "",
-                new_snapshot.content or ""
-            )
+        if change_type == "modified" and diff_result.complete and diff_ratio < self.config.incremental_threshold:
+            record.diff = diff_result.diff
+            record.chunk_delta = diff_result.chunk_delta
 
         return record
 
@@ -348,11 +600,120 @@ class IncrementalUpdater:
                 tasks.append(self._detect_async_change(old_snapshot, after=None))
 
         results = await asyncio.gather(*tasks)
-        changes = [r for r in results if r]
+        changes = await self._pair_renames([r for r in results if r], before_snapshots)
         
         logger.info(f"检测到 {len(changes)} 个变更")
         return changes
 
+    async def detect_path_changes(
+        self,
+        paths: Iterable[str],
+        before_snapshots: Dict[str, FileSnapshot]
+    ) -> List[ChangeRecord]:
+        """只检测指定路径的变更 (异步)
+
+        用于调用方已知候选路径的场景 (例如 Git 脏文件集合), 路径集合之外的文件视为未变化。
+        """
+        paths = sorted(set(paths))
+        existing = [path for path in paths if (self.project_root / path).is_file()]
+        after_snapshots = await self.take_snapshot(existing, save=False) if existing else {}
+
+        tasks = []
+        for path in paths:
+            old_snapshot = before_snapshots.get(path)
+            new_snapshot = after_snapshots.get(path)
+            if old_snapshot is None and new_snapshot is None:
+                continue
+            if old_snapshot is not None and new_snapshot is not None and old_snapshot.hash == new_snapshot.hash:
+                continue
+            if new_snapshot is None:
+                tasks.append(self._detect_async_change(old_snapshot, after=None))
+            else:
+                tasks.append(self._detect_async_change(old_snapshot, new_snapshot))
+
+        results = await asyncio.gather(*tasks)
+        changes = await self._pair_renames([r for r in results if r], before_snapshots)
+        logger.info(f"检测到 {len(changes)} 个变更 (候选路径 {len(paths)} 个)")
+        return changes
+
+    async def _pair_renames(
+        self,
+        changes: List[ChangeRecord],
+        before_snapshots: Dict[str, FileSnapshot]
+    ) -> List[ChangeRecord]:
+        """把内容相同 (或足够相似) 的删除 + 新增合并为重命名, 可选地把新增识别为复制"""
+        added = [c for c in changes if c.change_type == "added"]
+        if not added or not (self.config.detect_renames or self.config.detect_copies):
+            return changes
+        deleted = [c for c in changes if c.change_type == "deleted"] if self.config.detect_renames else []
+
+        paired: List[ChangeRecord] = []
+        used = set()
+
+        # 内容哈希完全相同
+        deleted_by_hash: Dict[str, List[ChangeRecord]] = {}
+        for record in deleted:
+            deleted_by_hash.setdefault(record.old_snapshot.hash, []).append(record)
+        for record in added:
+            sources = deleted_by_hash.get(record.new_snapshot.hash)
+            if sources:
+                source = sources.pop(0)
+                used.update((id(source), id(record)))
+                paired.append(self._moved_record("renamed", source.old_snapshot, record.new_snapshot))
+
+        # 内容相似
+        similarity = self.config.rename_similarity
+        remaining_deleted = [c for c in deleted if id(c) not in used]
+        remaining_added = [c for c in added if id(c) not in used]
+        pair_count = len(remaining_deleted) * len(remaining_added)
+        if similarity is not None and 0 < pair_count <= self.config.rename_limit:
+            loop = asyncio.get_running_loop()
+            candidates = []
+            for source in remaining_deleted:
+                old_snapshot = await self._with_content(source.old_snapshot)
+                for record in remaining_added:
+                    new_snapshot = await self._with_content(record.new_snapshot)
+                    result = await loop.run_in_executor(None, self._diff, old_snapshot, new_snapshot, 1.0 - similarity)
+                    if result.complete and 1.0 - result.ratio >= similarity:
+                        candidates.append((result.ratio, source, record, old_snapshot, new_snapshot, result))
+            for ratio, source, record, old_snapshot, new_snapshot, result in sorted(candidates, key=lambda c: c[0]):
+                if id(source) in used or id(record) in used:
+                    continue
+                used.update((id(source), id(record)))
+                moved = self._moved_record("renamed", old_snapshot, new_snapshot, ratio)
+                if ratio < self.config.incremental_threshold:
+                    moved.diff, moved.chunk_delta = result.diff, result.chunk_delta
+                paired.append(moved)
+
+        # 复制 (来源为检测前的任意文件)
+        if self.config.detect_copies:
+            sources_by_hash = {snap.hash: snap for snap in before_snapshots.values()}
+            for record in added:
+                source = sources_by_hash.get(record.new_snapshot.hash)
+                if id(record) not in used and source is not None and source.path != record.path:
+                    used.add(id(record))
+                    paired.append(self._moved_record("copied", source, record.new_snapshot))
+
+        if not paired:
+            return changes
+        return [c for c in changes if id(c) not in used] + paired
+
+    @staticmethod
+    def _moved_record(
+        change_type: str,
+        old_snapshot: FileSnapshot,
+        new_snapshot: FileSnapshot,
+        diff_ratio: float = 0.0
+    ) -> ChangeRecord:
+        return ChangeRecord(
+            path=new_snapshot.path,
+            change_type=change_type,
+            old_snapshot=old_snapshot,
+            new_snapshot=new_snapshot,
+            diff_ratio=diff_ratio,
+            old_path=old_snapshot.path
+        )
+
     async def get_incremental_update(
         self,
         file_path: str,
@@ -407,7 +768,7 @@ class IncrementalUpdater:
             # 新增文件
             result.update({
                 "change_type": "added",
-                "content": new_snapshot.content if new_snapshot else None,
+                "content": await self.load_content(new_snapshot),
                 "diff_ratio": 1.0
             })
             return result
@@ -430,25 +791,31 @@ class IncrementalUpdater:
             return result
 
         # 文件被修改
-        diff_ratio = self._calculate_diff_ratio(old_snapshot, new_snapshot)
-        diff = self._generate_diff(
-            old_snapshot.content or "",
-            new_snapshot.content or ""
-        )
+        old_snapshot = await self._with_content(old_snapshot)
+        new_snapshot = await self._with_content(new_snapshot)
+        diff_result = await self._compute_diff(old_snapshot, new_snapshot)
+        diff_ratio = diff_result.ratio
+        diff = diff_result.diff or ""
+
+        if diff_result.chunk_delta is not None:
+            diff_size = diff_result.chunk_delta["inserted"]
+        else:
+            diff_size = len(diff)
 
         result.update({
             "change_type": "modified",
             "diff_ratio": diff_ratio,
-            "diff_size": len(diff),
+            "diff_size": diff_size,
             "old_hash": old_snapshot.hash,
             "new_hash": new_snapshot.hash
         })
 
-        if diff_ratio < self.config.incremental_threshold:
+        if diff_result.complete and diff_ratio < self.config.incremental_threshold:
             # 差异小于阈值,使用增量更新
             result.update({
                 "use_incremental": True,
-                "diff": diff
+                "diff": diff,
+                "chunk_delta": diff_result.chunk_delta
             })
         else:
             # 差异大于阈值,使用完整内容
@@ -527,12 +894,15 @@ class IncrementalUpdater:
         if update["change_type"] == "modified":
             try:
                 if update.get("use_incremental"):
-                    # 应用diff
-                    if content and update.get("diff"):
-                        new_content = self._apply_diff(
-                            content,
-                            update["diff"]
-                        )
+                    # 应用diff (大文件为块级增量)
+                    if content and (update.get("diff") or update.get("chunk_delta")):
+                        if update.get("chunk_delta"):
+                            new_content = apply_chunk_delta(content, update["chunk_delta"])
+                        else:
+                            new_content = self._apply_diff(
+                                content,
+                                update["diff"]
+                            )
                         async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
                             await f.write(new_content)
                         await self.take_snapshot(update["file_path"])
@@ -555,10 +925,15 @@ class IncrementalUpdater:
         return False
 
     async def cleanup_old_snapshots(self) -> int:
-        """清理过期的快照 (异步)"""
+        """清理过期的快照 (异步)
+
+        删除过期快照, 把每个文件的历史版本裁剪到 max_snapshots_per_file,
+        再回收不再被任何快照引用的内容 blob。
+        """
         from datetime import datetime as dt
 
         cutoff_time = dt.now().timestamp() - self.config.retention_days * 24 * 3600
+        history_limit = max(0, self.config.max_snapshots_per_file - 1)
         cleaned = 0
 
         for path, snap in list(self.snapshots.items()):
@@ -566,19 +941,40 @@ class IncrementalUpdater:
                 del self.snapshots[path]
                 cleaned += 1
 
+        for path, versions in list(self.history.items()):
+            kept = [snap for snap in versions if snap.snapshot_time >= cutoff_time]
+            kept = kept[-history_limit:] if history_limit else []
+            cleaned += len(versions) - len(kept)
+            if kept:
+                self.history[path] = kept
+            else:
+                del self.history[path]
+
         if cleaned > 0:
             await self._save_index()
             logger.info(f"清理了 {cleaned} 个旧快照")
 
+        referenced = {snap.hash for snap in self.snapshots.values()}
+        referenced.update(snap.hash for versions in self.history.values() for snap in versions)
+        loop = asyncio.get_running_loop()
+        removed = await loop.run_in_executor(None, self.blobs.gc, referenced)
+        if removed:
+            logger.info(f"回收了 {removed} 个未引用的快照内容")
+
         return cleaned
 
     async def get_change_summary_async(self) -> Dict[str, Any]:
         """获取变更摘要 (异步)"""
-        changes = await self.detect_project_changes()
-        
+        return self.summarize_changes(await self.detect_project_changes())
+
+    @staticmethod
+    def summarize_changes(changes: List[ChangeRecord]) -> Dict[str, Any]:
+        """按变更类型汇总变更记录"""
         added = [c.path for c in changes if c.change_type == "added"]
         modified = [c.path for c in changes if c.change_type == "modified"]
         deleted = [c.path for c in changes if c.change_type == "deleted"]
+        renamed = [c.path for c in changes if c.change_type == "renamed"]
+        copied = [c.path for c in changes if c.change_type == "copied"]
         
         changes_by_file = {c.path: c.change_type for c in changes}
         
@@ -586,6 +982,9 @@ class IncrementalUpdater:
             "added": added,
             "modified": modified,
             "deleted": deleted,
+            "renamed": renamed,
+            "copied": copied,
+            "moved_from": {c.path: c.old_path for c in changes if c.old_path},
             "total_changes": len(changes),
             "changes_by_file": changes_by_file,
             "timestamp": datetime.now().isoformat()
@@ -604,34 +1003,50 @@ class IncrementalUpdater:
         
         return self.snapshots.get(file_path)
 
-    def _calculate_diff_ratio(self, old_val: Union[FileSnapshot, str], new_val: Union[FileSnapshot, str]) -> float:
-        """计算差异比例"""
+    def _diff(
+        self,
+        old_val: Union[FileSnapshot, str, None],
+        new_val: Union[FileSnapshot, str, None],
+        max_ratio: Optional[float] = None
+    ) -> DiffResult:
+        """一次计算差异比例和 unified diff (受 diff_max_bytes / diff_time_budget 限制)"""
+        if isinstance(old_val, FileSnapshot) and isinstance(new_val, FileSnapshot):
+            if old_val.hash == new_val.hash:
+                return DiffResult(ratio=0.0, diff="")
+            if old_val.content is None and new_val.content is None:
+                return DiffResult(ratio=1.0, complete=False)  # 二进制或未缓存内容, 无法计算差异
+
         old_content = old_val.content if isinstance(old_val, FileSnapshot) else old_val
         new_content = new_val.content if isinstance(new_val, FileSnapshot) else new_val
-        
-        if not old_content or not new_content:
-            if not old_content and not new_content:
-                return 0.0
-            return 1.0
-        
-        import difflib
-        matcher = difflib.SequenceMatcher(None, old_content, new_content)
-        return 1.0 - matcher.ratio()
+        if old_content and new_content and max(len(old_content), len(new_content)) >= self.config.chunk_min_size:
+            # 大文件: 块级增量, 开销与改动成正比
+            delta = chunk_delta(old_content, new_content)
+            return DiffResult(ratio=delta["ratio"], chunk_delta=delta)
+        return diff_texts(
+            old_content or "",
+            new_content or "",
+            max_ratio=max_ratio,
+            max_bytes=self.config.diff_max_bytes,
+            time_budget=self.config.diff_time_budget
+        )
 
-    def _generate_diff(self, old_text: str, new_text: str) -> str:
-        """生成文本差异"""
-        import difflib
-        diff = difflib.unified_diff(
-            old_text.splitlines(keepends=True),
-            new_text.splitlines(keepends=True),
-            fromfile='before',
-            tofile='after'
+    async def _compute_diff(self, old_snapshot: FileSnapshot, new_snapshot: FileSnapshot) -> DiffResult:
+        """在线程池中计算 diff, 不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self._diff, old_snapshot, new_snapshot, self.config.incremental_threshold
         )
-        return ''.join(diff)
+
+    def _calculate_diff_ratio(self, old_val: Union[FileSnapshot, str], new_val: Union[FileSnapshot, str]) -> float:
+        """计算差异比例"""
+        return self._diff(old_val, new_val).ratio
+
+    def _generate_diff(self, old_text: str, new_text: str) -> str:
+        """生成文本差异 (超出预算时返回空字符串)"""
+        return self._diff(old_text, new_text).diff or ""
 
     def _apply_diff(self, old_text: str, diff_text: str) -> str:
-        """应用文本差异 (使用 difflib.unified_diff 生成的 diff)"""
-        import difflib
+        """应用文本差异 (unified diff 格式)"""
         import re
 
         # 尝试使用 patch 逻辑
@@ -685,23 +1100,131 @@ class IncrementalUpdater:
         return "".join(result)
 
 class IncrementalUpdateManager:
-    """增量更新管理器 - 集成封装"""
-    def __init__(self, project_root: Union[str, Path]):
+    """增量更新管理器 - 集成封装
+
+    全项目检测时, 若项目是 Git 仓库 (且 change_detection 为 "auto"), before_agent_execution
+    只记录 Git 检查点并快照当时的脏文件, 之后的检测只比较 Git 报告的候选路径,
+    开销与变更文件数成正比; 否则退回对整个项目的文件系统扫描。
+
+    watch=True 时优先使用 inotify 监视: 首次检查点做一次全项目快照作为基线, 之后每个检查点
+    只重新快照监视到的脏路径, 检测也只比较这些路径; 事件队列溢出时对整个项目重新扫描。
+    """
+    def __init__(self, project_root: Union[str, Path], config: IncrementalConfig = None):
         self.project_root = Path(project_root)
-        self.updater = IncrementalUpdater(self.project_root)
+        self.updater = IncrementalUpdater(self.project_root, config)
+
+        self.git: Optional[GitChangeDetector] = None
+        if self.updater.config.change_detection == "auto":
+            self.git = GitChangeDetector(self.project_root, SKIP_DIRS, self.updater.config.git_max_untracked)
+
+        # Git 检查点, 以及检查点时拍摄的脏文件快照
+        self._checkpoint: Optional[GitCheckpoint] = None
+        self._checkpoint_snapshots: Dict[str, FileSnapshot] = {}
+
+        # inotify 监视, 以及最近一个检查点时的项目快照基线
+        self._watch_enabled = self.updater.config.watch
+        self._watcher: Optional[InotifyWatcher] = None
+        self._watch_baseline: Dict[str, FileSnapshot] = {}
 
     async def before_agent_execution(self, files: List[str] = None) -> Dict[str, Any]:
         """Agent执行前的准备工作 (异步)"""
+        self._checkpoint = None
+        self._checkpoint_snapshots = {}
+
         if files:
             await self.updater.take_snapshot(files)
+            return await self.updater.get_change_summary_async()
+
+        if self._watch_enabled and await self._watch_checkpoint():
+            return self.updater.summarize_changes(await self._detect_changes())
+
+        if self.git is not None:
+            self._checkpoint = await self.git.checkpoint()
+        if self._checkpoint is not None:
+            dirty = [path for path in self._checkpoint.dirty if (self.project_root / path).is_file()]
+            if dirty:
+                self._checkpoint_snapshots = await self.updater.take_snapshot(dirty)
         else:
             await self.updater.take_project_snapshot()
-        
-        return await self.updater.get_change_summary_async()
+
+        return self.updater.summarize_changes(await self._detect_changes())
+
+    async def _watch_checkpoint(self) -> bool:
+        """用 inotify 建立检查点 (监视不可用时返回 False)"""
+        if self._watcher is None:
+            watcher = InotifyWatcher(self.project_root, SKIP_DIRS)
+            try:
+                watcher.start()
+            except WatchUnavailable as e:
+                logger.info(f"文件监视不可用, 使用其他检测方式: {e}")
+                self._watch_enabled = False
+                return False
+            self._watcher = watcher
+            # 先启动监视再拍摄基线, 拍摄期间的修改会留在脏集合中, 之后重新比较
+            self._watch_baseline = await self.updater.take_project_snapshot()
+            return True
+
+        state = self._watcher.peek()
+        # 先重置再快照, 快照期间发生的修改计入下一个检查点
+        self._watcher.reset()
+        if state is None:
+            self._watch_baseline = await self.updater.take_project_snapshot()
+            return True
+
+        candidates = self._expand_dirty(*state)
+        existing = [path for path in candidates if (self.project_root / path).is_file()]
+        snapshots = await self.updater.take_snapshot(existing) if existing else {}
+        for path in candidates:
+            self._watch_baseline.pop(path, None)
+        self._watch_baseline.update(snapshots)
+        return True
+
+    def _expand_dirty(self, dirty: Set[str], dirty_dirs: Set[str]) -> Set[str]:
+        """脏路径集合: 被删除或移出的目录展开为基线中该目录下的文件"""
+        candidates = set(dirty)
+        for directory in dirty_dirs:
+            prefix = directory + os.sep
+            candidates.update(path for path in self._watch_baseline if path.startswith(prefix))
+        return candidates
+
+    async def _detect_changes(self) -> List[ChangeRecord]:
+        """检测变更: 有监视或 Git 检查点时只比较候选路径, 否则扫描整个项目"""
+        if self._watcher is not None:
+            state = self._watcher.peek()
+            if state is None:
+                return await self.updater.detect_project_changes(self._watch_baseline)
+            candidates = self._expand_dirty(*state)
+            return await self.updater.detect_path_changes(candidates, self._watch_baseline)
+
+        if self._checkpoint is not None:
+            candidates = await self.git.changed_since(self._checkpoint)
+            if candidates is not None:
+                before = await self._checkpoint_before(candidates)
+                return await self.updater.detect_path_changes(candidates, before)
+        return await self.updater.detect_project_changes()
+
+    async def _checkpoint_before(self, candidates: Iterable[str]) -> Dict[str, FileSnapshot]:
+        """候选路径在检查点时的快照
+
+        检查点时的脏文件使用当时拍摄的快照; 干净的已跟踪文件与暂存区一致, 按 blob id 从 Git 读取。
+        """
+        before: Dict[str, FileSnapshot] = {}
+        from_git = []
+        for path in candidates:
+            if path in self._checkpoint_snapshots:
+                before[path] = self._checkpoint_snapshots[path]
+            elif path not in self._checkpoint.dirty and path in self._checkpoint.blobs:
+                from_git.append(path)
+
+        blobs = await asyncio.gather(*(self.git.read_blob(self._checkpoint.blobs[path]) for path in from_git))
+        for path, data in zip(from_git, blobs):
+            if data is not None:
+                before[path] = self.updater.snapshot_from_bytes(path, data)
+        return before
 
     async def after_agent_execution(self, files: List[str] = None) -> Dict[str, Any]:
         """Agent执行后的变更检测 (异步)"""
-        changes = await self.updater.detect_project_changes()
+        changes = await self._detect_changes()
         if files:
             changes = [c for c in changes if c.path in files]
             
@@ -713,7 +1236,7 @@ class IncrementalUpdateManager:
 
     async def get_updates(self, files: List[str] = None) -> List[ChangeRecord]:
         """获取文件更新 (异步)"""
-        changes = await self.updater.detect_project_changes()
+        changes = await self._detect_changes()
         if files:
             return [c for c in changes if c.path in files]
         return changes
@@ -721,3 +1244,9 @@ class IncrementalUpdateManager:
     async def get_incremental_updates_for_context(self, files: List[str] = None) -> List[Dict[str, Any]]:
         """获取用于上下文的增量更新 (异步)"""
         return await self.updater.get_incremental_context(files)
+
+    def close(self) -> None:
+        """停止文件监视"""
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
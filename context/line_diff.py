@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+按行 diff 引擎
+
+替代 difflib.SequenceMatcher / unified_diff, 避免大文件或重复内容较多的文件出现二次复杂度:
+- 去掉公共前缀和后缀后, 把每行映射为整数 id (相同内容的行只哈希一次)
+- patience 算法: 以两侧各只出现一次的行为锚点, 按最长递增子序列对齐后递归处理锚点之间的区间
+- 没有唯一行的小区间用限制编辑距离的 Myers 算法细化, 大区间整体视为替换
+- 差异比例与 unified diff 在同一次计算中得到; 比例按匹配行的字符数加权,
+  与 SequenceMatcher.ratio() 的字符口径一致
+
+两侧大小差异已超过阈值时直接返回比例下界; 超过字节或时间预算时返回 complete=False,
+调用方应退回全量内容更新。
+"""
+
+import bisect
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 默认预算
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+DEFAULT_TIME_BUDGET = 2.0
+
+# Myers 细化的区间上限 (行数乘积) 与编辑距离上限
+_MYERS_MAX_CELLS = 250_000
+_MYERS_MAX_EDITS = 200
+
+Opcode = Tuple[str, int, int, int, int]
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+@dataclass
+class DiffResult:
+    """diff 结果"""
+    ratio: float                 # 差异比例 (0-1)
+    diff: Optional[str] = None   # unified diff (未完成计算时为 None)
+    complete: bool = True        # 是否在预算内完成计算
+    chunk_delta: Optional[Dict[str, Any]] = None  # 块级增量 (大文件代替 diff, 见 context.chunking)
+
+
+def _intern(old_lines: Sequence[str], new_lines: Sequence[str]) -> Tuple[List[int], List[int]]:
+    ids: Dict[str, int] = {}
+    old_ids = [ids.setdefault(line, len(ids)) for line in old_lines]
+    new_ids = [ids.setdefault(line, len(ids)) for line in new_lines]
+    return old_ids, new_ids
+
+
+def _unique_anchors(a: List[int], a0: int, a1: int, b: List[int], b0: int, b1: int) -> List[Tuple[int, int]]:
+    """两侧区间内都只出现一次的行, 按 a 中位置排序后取 b 位置的最长递增子序列"""
+    counts: Dict[int, List[int]] = {}
+    for i in range(a0, a1):
+        entry = counts.get(a[i])
+        if entry is None:
+            counts[a[i]] = [1, i, 0, -1]
+        else:
+            entry[0] += 1
+    for j in range(b0, b1):
+        entry = counts.get(b[j])
+        if entry is not None and entry[0] == 1:
+            entry[2] += 1
+            entry[3] = j
+    pairs = sorted((entry[1], entry[3]) for entry in counts.values() if entry[0] == 1 and entry[2] == 1)
+    if not pairs:
+        return []
+
+    # 最长递增子序列 (patience sorting)
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect.bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_index.append(k)
+        else:
+            tails[pos] = j
+            tail_index[pos] = k
+        previous[k] = tail_index[pos - 1] if pos else -1
+    result = []
+    k = tail_index[-1]
+    while k >= 0:
+        result.append(pairs[k])
+        k = previous[k]
+    result.reverse()
+    return result
+
+
+def _myers(a: List[int], a0: int, a1: int, b: List[int], b0: int, b1: int) -> Optional[List[Tuple[int, int]]]:
+    """限制编辑距离的 Myers 算法, 返回匹配行对; 编辑距离超过上限时返回 None"""
+    n, m = a1 - a0, b1 - b0
+    max_d = min(n + m, _MYERS_MAX_EDITS)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace = []
+    for d in range(max_d + 1):
+        trace.append(v[:])  # 第 d 轮开始前的 V
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[a0 + x] == b[b0 + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _myers_backtrack(trace, d, offset, n, m, a0, b0)
+    return None
+
+
+def _myers_backtrack(
+    trace: List[List[int]], d_final: int, offset: int, n: int, m: int, a0: int, b0: int
+) -> List[Tuple[int, int]]:
+    matches = []
+    x, y = n, m
+    for d in range(d_final, 0, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[offset + prev_k]
+        prev_y = prev_x - prev_k
+        # 沿对角线回退到这一步编辑之后的位置
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((a0 + x, b0 + y))
+        x, y = prev_x, prev_y
+    while x > 0 and y > 0:
+        x -= 1
+        y -= 1
+        matches.append((a0 + x, b0 + y))
+    matches.reverse()
+    return matches
+
+
+def _match_lines(a: List[int], b: List[int], deadline: float) -> List[Tuple[int, int]]:
+    """返回按位置递增的匹配行对 (i, j)"""
+    matches: List[Tuple[int, int]] = []
+    stack = [(0, len(a), 0, len(b))]
+    steps = 0
+    while stack:
+        a0, a1, b0, b1 = stack.pop()
+        steps += 1
+        if steps & 0xFF == 0 and time.monotonic() > deadline:
+            raise _BudgetExceeded()
+
+        # 公共前缀和后缀
+        while a0 < a1 and b0 < b1 and a[a0] == b[b0]:
+            matches.append((a0, b0))
+            a0 += 1
+            b0 += 1
+        tail = []
+        while a0 < a1 and b0 < b1 and a[a1 - 1] == b[b1 - 1]:
+            a1 -= 1
+            b1 -= 1
+            tail.append((a1, b1))
+        matches.extend(tail)
+        if a0 == a1 or b0 == b1:
+            continue
+
+        anchors = _unique_anchors(a, a0, a1, b, b0, b1)
+        if anchors:
+            # 锚点之间的区间后进先出, 逆序压栈; 结果最后统一排序
+            bounds = [(a0 - 1, b0 - 1)] + anchors + [(a1, b1)]
+            for (pi, pj), (ni, nj) in zip(bounds, bounds[1:]):
+                if ni - pi > 1 and nj - pj > 1:
+                    stack.append((pi + 1, ni, pj + 1, nj))
+            matches.extend(anchors)
+        elif (a1 - a0) * (b1 - b0) <= _MYERS_MAX_CELLS:
+            refined = _myers(a, a0, a1, b, b0, b1)
+            if refined:
+                matches.extend(refined)
+        # 否则整个区间视为替换
+    matches.sort()
+    return matches
+
+
+def _opcodes(matches: List[Tuple[int, int]], n: int, m: int) -> List[Opcode]:
+    """匹配行对 -> difflib 风格的操作码"""
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for mi, mj in matches + [(n, m)]:
+        if i < mi or j < mj:
+            tag = 'replace' if i < mi and j < mj else ('delete' if i < mi else 'insert')
+            opcodes.append((tag, i, mi, j, mj))
+        if mi < n and mj < m:
+            if opcodes and opcodes[-1][0] == 'equal':
+                _, ei1, _, ej1, _ = opcodes[-1]
+                opcodes[-1] = ('equal', ei1, mi + 1, ej1, mj + 1)
+            else:
+                opcodes.append(('equal', mi, mi + 1, mj, mj + 1))
+        i, j = mi + 1, mj + 1
+    return opcodes
+
+
+def _grouped(opcodes: List[Opcode], n: int = 3) -> List[List[Opcode]]:
+    """按上下文行数分组 (与 SequenceMatcher.get_grouped_opcodes 相同)"""
+    codes = list(opcodes) or [('equal', 0, 1, 0, 1)]
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    nn = n + n
+    groups = []
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > nn:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        groups.append(group)
+    return groups
+
+
+def _format_range(start: int, stop: int) -> str:
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def format_unified(
+    old_lines: Sequence[str],
+    new_lines: Sequence[str],
+    opcodes: List[Opcode],
+    fromfile: str = 'before',
+    tofile: str = 'after',
+    context: int = 3
+) -> str:
+    """按操作码生成 unified diff (格式与 difflib.unified_diff 一致)"""
+    out: List[str] = []
+    for group in _grouped(opcodes, context):
+        if not out:
+            out.append(f"--- {fromfile}\n")
+            out.append(f"+++ {tofile}\n")
+        first, last = group[0], group[-1]
+        out.append(f"@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@\n")
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                out.extend(' ' + line for line in old_lines[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                out.extend('-' + line for line in old_lines[i1:i2])
+            if tag in ('replace', 'insert'):
+                out.extend('+' + line for line in new_lines[j1:j2])
+    return ''.join(out)
+
+
+def diff_texts(
+    old_text: str,
+    new_text: str,
+    max_ratio: Optional[float] = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    time_budget: float = DEFAULT_TIME_BUDGET,
+    context: int = 3
+) -> DiffResult:
+    """一次计算差异比例和 unified diff
+
+    Args:
+        old_text: 旧内容
+        new_text: 新内容
+        max_ratio: 只关心低于此比例的差异; 大小差异已超过它时直接返回比例下界 (complete=False)
+        max_bytes: 两侧内容总长度上限
+        time_budget: 计算时间上限 (秒)
+        context: 上下文行数
+
+    Returns:
+        DiffResult: complete=False 时 ratio 为下界 (或 1.0), diff 为 None
+    """
+    total = len(old_text) + len(new_text)
+    if old_text == new_text:
+        return DiffResult(ratio=0.0, diff="")
+    if not old_text or not new_text:
+        ratio = 1.0
+    else:
+        ratio = None
+
+    size_bound = abs(len(old_text) - len(new_text)) / total
+    if max_ratio is not None and size_bound >= max_ratio:
+        return DiffResult(ratio=max(size_bound, ratio or 0.0), complete=False)
+    if total > max_bytes:
+        return DiffResult(ratio=1.0, complete=False)
+
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+    try:
+        a, b = _intern(old_lines, new_lines)
+        matches = _match_lines(a, b, time.monotonic() + time_budget)
+    except _BudgetExceeded:
+        return DiffResult(ratio=1.0, complete=False)
+
+    if ratio is None:
+        matched_chars = sum(len(old_lines[i]) for i, _ in matches)
+        ratio = 1.0 - 2.0 * matched_chars / total
+    opcodes = _opcodes(matches, len(old_lines), len(new_lines))
+    return DiffResult(ratio=ratio, diff=format_unified(old_lines, new_lines, opcodes, context=context))
@@ -9,13 +9,24 @@
 
 import re
 import hashlib
+import json
 import logging
-from typing import Dict, List, Tuple, Optional, Any
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple, Optional, Any
 from pathlib import Path
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+
+from common.monitoring import MetricsManager
+from common.tokenizer import get_tokenizer
+from config.constants import ContextConfig, Paths
 
 logger = logging.getLogger(__name__)
 
+# 压缩规则 (提取模式、摘要格式等) 变化时递增, 使缓存的旧结果失效
+COMPRESSOR_VERSION = 2
+
 
 @dataclass
 class CompressionStats:
@@ -36,6 +47,11 @@ class CompressionStats:
         }
 
 
+_STATS_FIELDS = tuple(f.name for f in fields(CompressionStats))
+# 内存层每个缓存项的固定开销估计 (键、元组、统计对象)
+_ENTRY_OVERHEAD = 256
+
+
 @dataclass
 class ExtractedInfo:
     """提取的关键信息"""
@@ -116,6 +132,60 @@ class ExtractedInfo:
         return "\n".join(result_lines)
 
 
+class _Collector:
+    """单个类别的扫描状态: 每个模式的结果列表和下一个允许的起点"""
+
+    __slots__ = ("values", "seen", "next_starts")
+
+    def __init__(self, size: int):
+        self.values: List[List[str]] = [[] for _ in range(size)]
+        self.seen: List[set] = [set() for _ in range(size)]
+        # 与 findall 一致: 同一模式的匹配互不重叠
+        self.next_starts: List[int] = [0] * size
+
+    def add(self, index: int, value: str) -> None:
+        if value and len(value) < 500 and value not in self.seen[index]:  # 避免过长匹配
+            self.seen[index].add(value)
+            self.values[index].append(value)
+
+    def shift(self, offset: int) -> None:
+        """缓冲区丢弃前 offset 个字符后平移起点"""
+        self.next_starts = [max(0, pos - offset) for pos in self.next_starts]
+
+
+class _PatternGroup:
+    """一个类别的预编译模式
+
+    每个模式单独用 finditer 扫描: re 对单个模式能利用字面量前缀快速跳过不可能匹配的位置,
+    合并成一个交替表达式反而会让每个位置都尝试全部分支 (实测慢 2~3 倍)。
+    """
+
+    def __init__(self, patterns: List[str], flags: int = 0):
+        self.patterns = [re.compile(pattern, flags) for pattern in patterns]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def scan(self, text: str, pos: int, stop: int, collector: _Collector) -> None:
+        """扫描 text[pos:], 收集起点在 stop 之前的匹配 (与 findall 的取值规则一致)"""
+        next_starts = collector.next_starts
+        for index, pattern in enumerate(self.patterns):
+            groups = pattern.groups
+            add = collector.add
+            for m in pattern.finditer(text, max(pos, next_starts[index])):
+                if m.start() >= stop:
+                    break
+                next_starts[index] = m.end()
+                if groups == 0:
+                    value = m.group()
+                elif groups == 1:
+                    value = m.group(1) or ""
+                else:
+                    # 多捕获组以空格连接
+                    value = ' '.join(g for g in m.groups() if g)
+                add(index, value.strip())
+
+
 class KeyInformationExtractor:
     """关键信息提取器 - 提取5类关键信息(支持中英文)"""
 
@@ -182,22 +252,65 @@ class KeyInformationExtractor:
             ]
         }
 
+        # 预编译各类别的模式
+        self._engines = {
+            category: _PatternGroup(patterns, re.IGNORECASE)
+            for category, patterns in self.patterns.items()
+        }
+
     def extract(self, content: str) -> ExtractedInfo:
         """提取关键信息"""
-        extracted_info = ExtractedInfo()
+        collectors = {category: _Collector(len(engine)) for category, engine in self._engines.items()}
+        for category, engine in self._engines.items():
+            engine.scan(content, 0, len(content), collectors[category])
+        return self._build(collectors)
+
+    def extract_stream(self, chunks: Iterable[str], overlap: int = 4096) -> ExtractedInfo:
+        """流式提取: 按块处理输入, 只保留当前块和重叠窗口, 结果与 extract() 一致
+
+        块末尾 overlap 个字符之内的内容留到下一块再扫描, 以便跨块的匹配完整
+        (单条结果本身不超过 500 字符)。
 
-        for category, patterns in self.patterns.items():
-            for pattern in patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE)
-                for match in matches:
-                    # 处理元组情况(多捕获组)
-                    if isinstance(match, tuple):
-                        match = ' '.join(str(g) for g in match if g)
-                    match = str(match).strip()
-                    if match and len(match) < 500:  # 避免过长匹配
-                        if match not in getattr(extracted_info, category):
-                            getattr(extracted_info, category).append(match)
+        Args:
+            chunks: 文本块序列 (如按固定大小读取的文件内容)
+            overlap: 重叠窗口大小 (字符数)
+        """
+        collectors = {category: _Collector(len(engine)) for category, engine in self._engines.items()}
+        buffer = ""
+        start = 0  # 当前缓冲区的扫描起点 (保留的前一个字符之后)
 
+        for chunk in chunks:
+            buffer += chunk
+            if len(buffer) - start < 2 * overlap:
+                continue
+            # 在换行处切分: 换行之前开始的匹配已经完整
+            boundary = buffer.rfind("\n", start, len(buffer) - overlap)
+            if boundary < 0:
+                continue
+            stop = boundary + 1
+            for category, engine in self._engines.items():
+                engine.scan(buffer, start, stop, collectors[category])
+            # 保留换行符本身, 使 ^ 与 \b 在新缓冲区中的判断与整段扫描一致
+            for collector in collectors.values():
+                collector.shift(boundary)
+            buffer = buffer[boundary:]
+            start = 1
+
+        for category, engine in self._engines.items():
+            engine.scan(buffer, start, len(buffer), collectors[category])
+        return self._build(collectors)
+
+    def _build(self, collectors: Dict[str, "_Collector"]) -> ExtractedInfo:
+        """按模式顺序合并各模式的结果并去重 (与逐个模式 findall 的顺序相同)"""
+        extracted_info = ExtractedInfo()
+        for category, collector in collectors.items():
+            items = getattr(extracted_info, category)
+            seen = set()
+            for values in collector.values:
+                for value in values:
+                    if value not in seen:
+                        seen.add(value)
+                        items.append(value)
         return extracted_info
 
     def format_extracted(self, extracted_info: ExtractedInfo) -> str:
@@ -333,40 +446,222 @@ class StructuredCompressor:
         return result, stats
 
 class ContextCache:
-    """上下文缓存 - 缓存压缩结果"""
+    """上下文缓存 - 缓存压缩结果
+
+    - 内存层: LRU, 按条目数和字节数双重限制
+    - 磁盘层 (可选): 每个结果一个 JSON 文件, 原子替换写入, 多个进程共享;
+      超出磁盘预算时按最近访问时间 (mtime) 删除最旧的文件
+    - 缓存键: blake2b(压缩器版本 + 压缩器类型 + 长度上限 + 内容)
+    - 命中/未命中通过 common.monitoring 导出
+    """
 
-    def __init__(self, max_size: int = 100):
-        self.cache: Dict[str, Tuple[str, CompressionStats]] = {}
+    def __init__(
+        self,
+        max_size: int = ContextConfig.CACHE_MAX_ENTRIES.value,
+        max_bytes: int = ContextConfig.CACHE_MAX_BYTES.value,
+        disk_dir: Optional[Path] = None,
+        max_disk_bytes: int = ContextConfig.CACHE_MAX_DISK_BYTES.value
+    ):
+        """初始化
+
+        Args:
+            max_size: 内存层最大条目数
+            max_bytes: 内存层字节预算 (超过预算的单个结果不进入内存层)
+            disk_dir: 磁盘层目录, None 表示只使用内存层
+            max_disk_bytes: 磁盘层字节预算
+        """
+        self.cache: "OrderedDict[str, Tuple[str, CompressionStats]]" = OrderedDict()
         self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()  # compress_async 在线程池中调用
+
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+        self.max_disk_bytes = max_disk_bytes
+        self._disk_writes = 0
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_project(cls, project_root: Path, **kwargs: Any) -> "ContextCache":
+        """创建带磁盘层的缓存 (目录为 <project_root>/.superagent/cache/compression)"""
+        disk_dir = Path(project_root) / Paths.CACHE_DIR.value / ContextConfig.CACHE_SUBDIR.value
+        return cls(disk_dir=disk_dir, **kwargs)
+
+    @staticmethod
+    def make_key(content: str, method: str, max_length: Optional[int]) -> str:
+        """生成缓存键 (压缩规则变化时递增 COMPRESSOR_VERSION 使旧结果失效)"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{COMPRESSOR_VERSION}:{method}:{max_length}:".encode())
+        digest.update(content.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
 
     def get_or_compress(
         self,
         content: str,
         compressor: Any,
-        target_ratio: float = 0.5
+        target_ratio: float = 0.5,
+        max_length: Optional[int] = None
     ) -> Tuple[str, CompressionStats]:
-        """获取缓存或执行压缩"""
-        # 生成缓存键 (基于内容和目标压缩率)
-        cache_key = hashlib.md5(f"{content}:{target_ratio}".encode()).hexdigest()
-
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        """获取缓存或执行压缩
 
-        # 执行压缩
-        compressed, stats = compressor.compress(content)
-
-        # 缓存结果
-        if len(self.cache) >= self.max_size:
-            # 简单清理：删除第一个
-            first_key = next(iter(self.cache))
-            del self.cache[first_key]
-
-        self.cache[cache_key] = (compressed, stats)
-        return compressed, stats
+        Args:
+            content: 原始内容
+            compressor: 压缩器 (SemanticCompressor / StructuredCompressor / SmartContextCompressor)
+            target_ratio: 目标压缩率, 未指定 max_length 时用于计算字符数上限
+            max_length: 压缩结果的字符数上限
+        """
+        if max_length is None:
+            max_length = max(1, int(len(content) * target_ratio))
+        method = type(compressor).__name__
+        key = self.make_key(content, method, max_length)
+
+        with self._lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+        if cached is not None:
+            MetricsManager.record_context_cache("memory", "hit")
+            return cached
+        MetricsManager.record_context_cache("memory", "miss")
+
+        if self.disk_dir is not None:
+            cached = self._disk_get(key)
+            MetricsManager.record_context_cache("disk", "miss" if cached is None else "hit")
+            if cached is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._put(key, cached)
+                return cached
+
+        with self._lock:
+            self.misses += 1
+
+        # 执行压缩 (SmartContextCompressor 的上限以 Token 计)
+        if isinstance(compressor, SmartContextCompressor):
+            max_tokens = max(1, int(max_length / get_tokenizer().chars_per_token(content)))
+            compressed, stats = compressor.compress(content, max_tokens)
+        else:
+            compressed, stats = compressor.compress(content, max_length)
+
+        result = (compressed, stats)
+        self._put(key, result)
+        self._disk_put(key, result)
+        return result
+
+    def _put(self, key: str, result: Tuple[str, CompressionStats]) -> None:
+        """放入内存层, 按 LRU 淘汰至满足条目数与字节预算"""
+        size = len(result[0].encode('utf-8', 'surrogatepass')) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self.cache:
+                self.total_bytes -= self._sizes[key]
+            self.cache[key] = result
+            self.cache.move_to_end(key)
+            self._sizes[key] = size
+            self.total_bytes += size
+            while len(self.cache) > self.max_size or self.total_bytes > self.max_bytes:
+                old_key, _ = self.cache.popitem(last=False)
+                self.total_bytes -= self._sizes.pop(old_key)
+            total_bytes = self.total_bytes
+        MetricsManager.update_context_cache_bytes("memory", total_bytes)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _disk_get(self, key: str) -> Optional[Tuple[str, CompressionStats]]:
+        path = self._disk_path(key)
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+            os.utime(path)  # 记录访问时间, 供磁盘层按 LRU 清理
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.debug(f"读取压缩缓存失败 {path}: {e}")
+            return None
+        stats = CompressionStats(**{k: data["stats"][k] for k in _STATS_FIELDS if k in data["stats"]})
+        return data["compressed"], stats
+
+    def _disk_put(self, key: str, result: Tuple[str, CompressionStats]) -> None:
+        if self.disk_dir is None:
+            return
+        compressed, stats = result
+        path = self._disk_path(key)
+        payload = json.dumps({
+            "compressed": compressed,
+            "stats": {k: getattr(stats, k) for k in _STATS_FIELDS},
+        }, ensure_ascii=False)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            temp_file = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            temp_file.write_text(payload, encoding='utf-8')
+            temp_file.replace(path)
+        except OSError as e:
+            logger.warning(f"写入压缩缓存失败 {path}: {e}")
+            return
+
+        with self._lock:
+            self._disk_writes += 1
+            prune = self._disk_writes % ContextConfig.CACHE_DISK_PRUNE_EVERY.value == 0
+        if prune:
+            self.prune_disk()
+
+    def prune_disk(self) -> int:
+        """磁盘层超出预算时删除最久未访问的文件, 返回删除的文件数"""
+        if self.disk_dir is None:
+            return 0
+        files = []
+        total = 0
+        for path in self.disk_dir.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue  # 其他进程刚删除
+            files.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        removed = 0
+        if total > self.max_disk_bytes:
+            files.sort()
+            for _, size, path in files:
+                if total <= self.max_disk_bytes:
+                    break
+                try:
+                    path.unlink()
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+        MetricsManager.update_context_cache_bytes("disk", total)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计 (条目数、字节数、各层命中数与命中率)"""
+        with self._lock:
+            requests = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self.cache),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / requests if requests else 0.0,
+            }
 
     def clear(self):
-        """清空缓存"""
-        self.cache.clear()
+        """清空缓存 (仅内存层)"""
+        with self._lock:
+            self.cache.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
 
 
 class SmartContextCompressor:
@@ -418,8 +713,8 @@ class SmartContextCompressor:
         if not content:
             return "", CompressionStats()
 
-        # 估算Token数(粗略: 1 token ≈ 4字符)
-        max_chars = max_tokens * 4 if max_tokens else None
+        # 按该内容的实际字符/Token 比例把 Token 上限换算为字符上限
+        max_chars = int(max_tokens * get_tokenizer().chars_per_token(content)) if max_tokens else None
 
         if method == "auto":
             # 自动选择压缩方法
@@ -565,27 +860,29 @@ class SmartContextCompressor:
         compressed_messages = []
         current_tokens = 0
 
-        for message in reversed(messages):
-            # 估算消息Token
-            content = message.get("content", "")
-            if isinstance(content, str):
-                message_tokens = len(content) // 4
-            else:
-                message_tokens = 100  # 多模态消息估算
+        # 批量估算消息Token (多模态消息按 100 估算)
+        token_counts = get_tokenizer().count_batch(
+            m.get("content", "") if isinstance(m.get("content", ""), str) else "" for m in messages
+        )
+        for message, message_tokens in zip(reversed(messages), reversed(token_counts)):
+            if not isinstance(message.get("content", ""), str):
+                message_tokens = 100
 
             # 如果加入当前消息会超过限制,跳过
             if current_tokens + message_tokens > max_tokens:
                 # 但保留最后一条用户消息
                 if message.get("role") == "user" and not compressed_messages:
                     compressed_msg = self.compress_message(message.copy())
-                    compressed_messages.insert(0, compressed_msg)
+                    compressed_messages.append(compressed_msg)
                 continue
 
-            # 压缩消息
+            # 压缩消息 (倒序收集, 最后统一反转)
             compressed_msg = self.compress_message(message.copy())
-            compressed_messages.insert(0, compressed_msg)
+            compressed_messages.append(compressed_msg)
             current_tokens += message_tokens
 
+        compressed_messages.reverse()
+
         # 构建摘要消息
         if messages and not compressed_messages:
             summary = self._create_summary_message(messages[-5:])
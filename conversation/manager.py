@@ -17,6 +17,7 @@ from .models import (
 )
 from .intent_recognizer import IntentRecognizer
 from context.smart_compressor import SmartContextCompressor
+from context.conversation_compressor import ConversationCompressor
 from config.settings import TokenOptimizationConfig
 
 
@@ -54,6 +55,11 @@ class ConversationManager:
         # 初始化上下文压缩器 (Phase 3)
         self.token_config = TokenOptimizationConfig()
         self.compressor = SmartContextCompressor()
+        # 增量历史压缩: 超出窗口的消息折叠进滚动摘要, 而不是直接丢弃
+        self.history_compressor = ConversationCompressor(
+            max_tail_tokens=self.token_config.max_message_tokens,
+            max_tail_messages=self.max_history
+        )
 
         # 需求检查模式 (通用化升级: 不再局限于特定业务领域)
         self._key_info_patterns = [
@@ -258,11 +264,13 @@ class ConversationManager:
             role: 角色(user/assistant)
             content: 内容
         """
-        self.conversation_history.append({
+        message = {
             "role": role,
             "content": content,
             "timestamp": time.time()
-        })
+        }
+        self.conversation_history.append(message)
+        self.history_compressor.add(message)
 
         # 保持历史记录在限制内
         if len(self.conversation_history) > self.max_history:
@@ -271,6 +279,7 @@ class ConversationManager:
     def clear_history(self) -> None:
         """清空对话历史"""
         self.conversation_history = []
+        self.history_compressor.clear()
         self.context = {}
         self.state = "idle"
 
@@ -283,13 +292,8 @@ class ConversationManager:
         if not self.token_config.enabled or not self.token_config.enable_message_compression:
             return self.conversation_history
 
-        # 使用 SmartContextCompressor 进行智能压缩
-        compressed_history, stats = self.compressor.compress_messages(
-            self.conversation_history,
-            max_tokens=self.token_config.max_message_tokens
-        )
-        
-        return compressed_history
+        # 滚动摘要 + 最近消息 (每条消息只在加入和折叠时处理一次)
+        return self.history_compressor.messages()
 
     # ========== 智能意图识别方法 ==========
 
@@ -2,7 +2,16 @@
 """Memory - 记忆系统"""
 
 from .memory_manager import MemoryManager
+from .storage import MemoryStorageBackend, JsonFileStorage, create_storage_backend
+from .segment_store import SegmentLogStorage
+from .sqlite_store import SQLiteMemoryStorage, migrate_memory_tree
 
 __all__ = [
     "MemoryManager",
+    "MemoryStorageBackend",
+    "JsonFileStorage",
+    "SegmentLogStorage",
+    "SQLiteMemoryStorage",
+    "migrate_memory_tree",
+    "create_storage_backend",
 ]
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+记忆查询缓存
+
+MemoryManager 使用的分段 LRU (SLRU) 缓存:
+- 每种记忆类型一个缓存段, 新条目进入试用区 (probation), 再次命中后晋升到保护区
+  (protected); 淘汰优先试用区最久未访问的条目, 兼顾访问频率与最近性
+- 所有操作 O(1) (OrderedDict 移动/弹出)
+- 按条目数 (每类型) 和字节数 (全局) 双重限制, 超大条目不缓存
+- TTL 通过时间轮惰性过期: 只处理到期槽位中的条目, 不扫描全部缓存
+- 命中/未命中/淘汰/过期计数, 供 get_statistics() 与 /health 使用
+"""
+
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# 缓存项: (条目, 字节数, 过期时间, 所在时间轮刻度)
+_Item = List[Any]
+_Key = Tuple[str, str]
+
+
+def estimate_entry_bytes(entry: Dict[str, Any]) -> int:
+    """估算条目占用的字节数 (以 UTF-8 JSON 序列化长度近似)"""
+    try:
+        return len(json.dumps(entry, ensure_ascii=False, default=str).encode('utf-8'))
+    except (TypeError, ValueError):
+        return len(str(entry).encode('utf-8'))
+
+
+class CacheSegment:
+    """单个记忆类型的 SLRU 缓存段"""
+
+    def __init__(self, max_entries: int, protected_ratio: float) -> None:
+        self.max_entries = max_entries
+        self.max_protected = max(1, int(max_entries * protected_ratio))
+        self.probation: "OrderedDict[str, _Item]" = OrderedDict()
+        self.protected: "OrderedDict[str, _Item]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.probation) + len(self.protected)
+
+    def __contains__(self, memory_id: object) -> bool:
+        return memory_id in self.probation or memory_id in self.protected
+
+    def lookup(self, memory_id: str) -> Optional[_Item]:
+        return self.protected.get(memory_id) or self.probation.get(memory_id)
+
+    def touch(self, memory_id: str) -> None:
+        """命中: 保护区内移到最近端, 试用区内晋升到保护区"""
+        if memory_id in self.protected:
+            self.protected.move_to_end(memory_id)
+            return
+        item = self.probation.pop(memory_id)
+        self.protected[memory_id] = item
+        if len(self.protected) > self.max_protected:
+            # 保护区溢出: 最久未访问的条目降级回试用区
+            demoted_id, demoted = self.protected.popitem(last=False)
+            self.probation[demoted_id] = demoted
+
+    def remove(self, memory_id: str) -> Optional[_Item]:
+        item = self.probation.pop(memory_id, None)
+        if item is None:
+            item = self.protected.pop(memory_id, None)
+        return item
+
+    def pop_victim(self) -> Optional[Tuple[str, _Item]]:
+        """弹出淘汰对象: 试用区最旧, 其次保护区最旧"""
+        if self.probation:
+            return self.probation.popitem(last=False)
+        if self.protected:
+            return self.protected.popitem(last=False)
+        return None
+
+    def clear(self) -> None:
+        self.probation.clear()
+        self.protected.clear()
+
+
+class MemoryCache:
+    """按记忆类型分段的 SLRU 缓存 (字节预算 + 时间轮 TTL)"""
+
+    def __init__(
+        self,
+        memory_types: Iterable[str],
+        max_entries: int,
+        max_bytes: int,
+        ttl: float,
+        protected_ratio: float = 0.8,
+        wheel_resolution: float = 1.0,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """初始化
+
+        Args:
+            memory_types: 记忆类型列表
+            max_entries: 每个类型的最大条目数
+            max_bytes: 所有类型合计的最大字节数
+            ttl: 条目最后一次访问后的存活时间(秒)
+            protected_ratio: 保护区占每个类型容量的比例
+            wheel_resolution: 时间轮槽位粒度(秒)
+            clock: 时钟函数 (测试可注入)
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._segments: Dict[str, CacheSegment] = {
+            mtype: CacheSegment(max_entries, protected_ratio) for mtype in memory_types
+        }
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        # 时间轮: 所有条目 TTL 相同, 单层 ceil(ttl/resolution)+1 个槽位即可覆盖
+        self._resolution = wheel_resolution
+        self._wheel: List[Set[_Key]] = [set() for _ in range(int(math.ceil(ttl / wheel_resolution)) + 1)]
+        self._wheel_tick = self._tick(clock())
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __getitem__(self, memory_type: str) -> CacheSegment:
+        return self._segments[memory_type]
+
+    def __contains__(self, memory_type: object) -> bool:
+        return memory_type in self._segments
+
+    # ========== 时间轮 ==========
+
+    def _tick(self, t: float) -> int:
+        return int(t // self._resolution)
+
+    def _schedule(self, key: _Key, item: _Item, now: float) -> None:
+        """(重新) 登记条目的过期槽位"""
+        if item[3] is not None:
+            self._wheel[item[3] % len(self._wheel)].discard(key)
+        item[2] = now + self.ttl
+        item[3] = self._tick(item[2])
+        self._wheel[item[3] % len(self._wheel)].add(key)
+
+    def _unschedule(self, key: _Key, item: _Item) -> None:
+        if item[3] is not None:
+            self._wheel[item[3] % len(self._wheel)].discard(key)
+            item[3] = None
+
+    def _advance(self, now: float) -> int:
+        """推进时间轮到当前时刻, 删除到期槽位中已过期的条目"""
+        target = self._tick(now)
+        if target <= self._wheel_tick:
+            return 0
+        # 落后超过一整圈时每个槽位只需处理一次
+        start = max(self._wheel_tick + 1, target - len(self._wheel) + 1)
+        removed = 0
+        for tick in range(start, target + 1):
+            bucket = self._wheel[tick % len(self._wheel)]
+            for key in [k for k in bucket if self._expired(k, now)]:
+                self._drop(key)
+                removed += 1
+        self._wheel_tick = target
+        self.expirations += removed
+        return removed
+
+    def _expired(self, key: _Key, now: float) -> bool:
+        item = self._segments[key[0]].lookup(key[1])
+        return item is not None and item[2] <= now
+
+    def _drop(self, key: _Key) -> Optional[_Item]:
+        item = self._segments[key[0]].remove(key[1])
+        if item is not None:
+            self._unschedule(key, item)
+            self._bytes -= item[1]
+        return item
+
+    # ========== 公共接口 ==========
+
+    def get(self, memory_type: str, memory_id: str) -> Optional[Dict[str, Any]]:
+        """读取条目; 命中时刷新 TTL 并更新 SLRU 位置"""
+        segment = self._segments.get(memory_type)
+        if segment is None:
+            return None
+        with self._lock:
+            now = self._clock()
+            item = segment.lookup(memory_id)
+            if item is not None and item[2] <= now:
+                self._drop((memory_type, memory_id))
+                self.expirations += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            segment.touch(memory_id)
+            self._schedule((memory_type, memory_id), item, now)
+            return item[0]
+
+    def put(self, memory_type: str, memory_id: str, entry: Dict[str, Any]) -> bool:
+        """写入条目, 必要时淘汰; 超过字节预算的单个条目不缓存
+
+        Returns:
+            是否已缓存
+        """
+        segment = self._segments.get(memory_type)
+        if segment is None:
+            return False
+        size = estimate_entry_bytes(entry)
+        with self._lock:
+            key = (memory_type, memory_id)
+            self._drop(key)
+            if size > self.max_bytes:
+                return False
+
+            now = self._clock()
+            item: _Item = [entry, size, 0.0, None]
+            segment.probation[memory_id] = item
+            self._schedule(key, item, now)
+            self._bytes += size
+
+            while len(segment) > segment.max_entries:
+                self._evict_from(memory_type)
+            if self._bytes > self.max_bytes:
+                self._advance(now)
+            # 字节超限: 先淘汰本类型, 本类型只剩新条目时再淘汰其他类型
+            while self._bytes > self.max_bytes and len(segment) > 1:
+                self._evict_from(memory_type)
+            for other in self._segments:
+                while self._bytes > self.max_bytes and other != memory_type and self._segments[other]:
+                    self._evict_from(other)
+            return True
+
+    def _evict_from(self, memory_type: str) -> None:
+        victim = self._segments[memory_type].pop_victim()
+        if victim is None:
+            return
+        memory_id, item = victim
+        self._unschedule((memory_type, memory_id), item)
+        self._bytes -= item[1]
+        self.evictions += 1
+
+    def invalidate(self, memory_type: str, memory_id: str) -> None:
+        """删除条目 (不计入淘汰)"""
+        if memory_type not in self._segments:
+            return
+        with self._lock:
+            self._drop((memory_type, memory_id))
+
+    def expire(self) -> int:
+        """处理已到期的时间轮槽位, 返回过期条目数"""
+        with self._lock:
+            return self._advance(self._clock())
+
+    def clear(self) -> None:
+        with self._lock:
+            for segment in self._segments.values():
+                segment.clear()
+            for bucket in self._wheel:
+                bucket.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计 (计数器累计值, O(类型数))"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "total_entries": sum(len(s) for s in self._segments.values()),
+                "entries": {t: len(s) for t, s in self._segments.items()},
+                "total_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+结构化持续记忆 (CONTINUITY)
+
+CONTINUITY 数据按段落保存为追加日志 (continuity/<section>.jsonl), 内存中保留
+各段的条目列表; CONTINUITY.md 只是渲染结果, 在防抖延迟后或 flush() 时整体重写。
+每次追加的开销与文件大小无关, 查询直接返回内存中的最新条目。
+
+多个进程共享同一目录时, 追加在跨进程锁内进行; 每个进程记录各日志已读取的
+字节偏移, 查询和渲染前只读取其他进程新追加的部分。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import aiofiles
+
+from .interprocess import InterProcessLock
+from .similarity import MinHashLSH
+
+logger = logging.getLogger(__name__)
+
+# 常量定义
+SECTION_MISTAKES = "## 📝 错误与教训"
+SECTION_PRACTICES = "## 🎯 最佳实践"
+SECTION_ARCHITECTURE = "## 🏗️ 架构决策"
+SECTION_STATISTICS = "## 📊 项目统计"
+
+# 段落键 (与 query_relevant_memory 的返回键一致) -> (标题, 英文副标题)
+SECTIONS: Dict[str, Tuple[str, str]] = {
+    "mistakes": (SECTION_MISTAKES, "Mistakes & Learnings"),
+    "best_practices": (SECTION_PRACTICES, "Best Practices"),
+    "architecture_decisions": (SECTION_ARCHITECTURE, "Architecture Decisions"),
+}
+
+# 渲染失败后按指数退避重试的最大间隔(秒)
+RENDER_RETRY_MAX_DELAY = 60.0
+
+_LEGACY_ENTRY = re.compile(r"^- \[(?P<timestamp>[^\]]+)\] \*\*(?P<category>[^*]+)\*\*: (?P<content>.*)$")
+
+
+def classify_section(memory_type: str, content: str, category: str) -> str:
+    """根据记忆类型和类别决定条目所属段落"""
+    if category == "mistake" or "mistake" in content.lower():
+        return "mistakes"
+    if memory_type == "procedural":
+        return "best_practices"
+    if category == "architecture":
+        return "architecture_decisions"
+    return "mistakes"
+
+
+class ContinuityStore:
+    """按段落追加的 CONTINUITY 存储, 延迟渲染 CONTINUITY.md"""
+
+    def __init__(
+        self,
+        memory_dir: Path,
+        stats_provider: Callable[[], Dict[str, int]],
+        render_delay: float = 1.0
+    ) -> None:
+        """初始化
+
+        Args:
+            memory_dir: 记忆根目录 (CONTINUITY.md 所在目录)
+            stats_provider: 返回 total/episodic/semantic/procedural 统计的回调
+            render_delay: 追加后延迟渲染的秒数 (防抖)
+        """
+        self.continuity_file = Path(memory_dir) / "CONTINUITY.md"
+        self.log_dir = Path(memory_dir) / "continuity"
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.render_delay = render_delay
+        self._stats_provider = stats_provider
+
+        self._sections: Dict[str, List[Dict[str, Any]]] = {key: [] for key in SECTIONS}
+        self._offsets: Dict[str, int] = {key: 0 for key in SECTIONS}  # 各日志已读取的字节数
+        self._file_lock = InterProcessLock(self.log_dir / "LOCK")
+        self._append_lock = asyncio.Lock()
+        self._dirty = False
+        self._render_timer: Optional[asyncio.TimerHandle] = None
+        self._render_task: Optional[asyncio.Task] = None  # 保留引用, 避免渲染完成前被回收
+        self._render_failures = 0
+        self._render_lock = asyncio.Lock()
+        # 相似度索引 (key 为 (section, 位置)), 首次按任务检索时构建
+        self._similarity: Optional[MinHashLSH] = None
+        self._similarity_lock = asyncio.Lock()
+
+        self._load_sync()
+
+    # ========== 加载 ==========
+
+    def _log_path(self, section: str) -> Path:
+        return self.log_dir / f"{section}.jsonl"
+
+    def _load_sync(self) -> None:
+        """加载段落日志; 首次使用时从旧版 CONTINUITY.md 导入"""
+        logs = [self._log_path(key) for key in SECTIONS]
+        if not any(p.exists() for p in logs) and self.continuity_file.exists():
+            with self._file_lock.hold():
+                # 其他进程可能已抢先导入
+                if not any(p.exists() for p in logs):
+                    self._import_legacy_sync()
+
+        self._catch_up()
+
+        rendered_mtime = (self.continuity_file.stat().st_mtime
+                          if self.continuity_file.exists() else -1.0)
+        if any(p.exists() and p.stat().st_mtime >= rendered_mtime for p in logs) \
+                or rendered_mtime < 0:
+            self.render_sync()
+
+    def _catch_up(self) -> None:
+        """读取各日志中尚未读取的完整行 (本进程与其他进程的追加都从这里进入内存)"""
+        for key in SECTIONS:
+            path = self._log_path(key)
+            try:
+                size = os.stat(path).st_size
+            except FileNotFoundError:
+                continue
+            if size <= self._offsets[key]:
+                continue
+
+            with open(path, 'rb') as f:
+                f.seek(self._offsets[key])
+                data = f.read(size - self._offsets[key])
+            # 只消费到最后一个换行, 其他进程写了一半的行留到下次
+            end = data.rfind(b"\n") + 1
+            if end == 0:
+                continue
+
+            section = self._sections[key]
+            for line in data[:end].splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    # 崩溃时可能留下半行, 跳过即可
+                    logger.warning(f"跳过损坏的 CONTINUITY 记录 {path.name}")
+                    continue
+                if self._similarity is not None:
+                    self._similarity.add((key, len(section)), record["content"])
+                section.append(record)
+            self._offsets[key] += end
+
+    def _import_legacy_sync(self) -> None:
+        """解析旧版 CONTINUITY.md 中的条目, 写入段落日志"""
+        headers = {title: key for key, (title, _) in SECTIONS.items()}
+        current: Optional[str] = None
+        entries: Dict[str, List[Dict[str, Any]]] = {key: [] for key in SECTIONS}
+
+        text = self.continuity_file.read_text(encoding='utf-8')
+        for line in text.splitlines():
+            if line.startswith("## "):
+                current = next((k for h, k in headers.items() if line.startswith(h)), None)
+                continue
+            if current is None:
+                continue
+            match = _LEGACY_ENTRY.match(line)
+            if match:
+                entries[current].append({
+                    "timestamp": match.group("timestamp"),
+                    "category": match.group("category"),
+                    "content": match.group("content"),
+                })
+            elif line.strip() and not line.startswith(("---", " (")) and entries[current]:
+                # 多行内容的续行
+                entries[current][-1]["content"] += "\n" + line
+
+        imported = 0
+        for key, items in entries.items():
+            if not items:
+                continue
+            # 旧文件中最新的条目在前, 日志按时间顺序追加
+            with open(self._log_path(key), 'w', encoding='utf-8') as f:
+                for item in reversed(items):
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            imported += len(items)
+        if imported:
+            logger.info(f"已从 CONTINUITY.md 导入 {imported} 条记录")
+
+    # ========== 追加与查询 ==========
+
+    async def append_many(
+        self,
+        items: List[Tuple[str, str, str, Optional[Dict[str, Any]]]]
+    ) -> None:
+        """追加一批记录 (每个段落一次文件追加), 并安排延迟渲染
+
+        Args:
+            items: (memory_type, content, category, details) 列表, 按保存顺序
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for memory_type, content, category, details in items:
+            record: Dict[str, Any] = {
+                "timestamp": timestamp,
+                "category": category,
+                "content": content,
+                "memory_type": memory_type,
+            }
+            if details:
+                record.update(details)
+            grouped.setdefault(classify_section(memory_type, content, category), []).append(record)
+
+        async with self._append_lock:
+            await self._file_lock.acquire()
+            try:
+                for section, records in grouped.items():
+                    lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+                    async with aiofiles.open(self._log_path(section), 'a', encoding='utf-8') as f:
+                        await f.write(lines)
+            finally:
+                self._file_lock.release()
+            self._catch_up()
+
+        self._dirty = True
+        self._schedule_render()
+
+    def top(self, section: str, limit: int) -> List[Dict[str, Any]]:
+        """返回段落中最新的 limit 条记录 (最新在前)"""
+        self._catch_up()
+        entries = self._sections.get(section, [])
+        return [dict(e) for e in reversed(entries[-limit:])] if limit > 0 else []
+
+    @staticmethod
+    def _build_similarity(contents: Dict[str, List[str]]) -> MinHashLSH:
+        index = MinHashLSH()
+        for key, texts in contents.items():
+            for position, text in enumerate(texts):
+                index.add((key, position), text)
+        return index
+
+    async def ensure_similarity(self) -> None:
+        """构建相似度索引 (在线程池中计算, 不阻塞事件循环)"""
+        if self._similarity is not None:
+            return
+        async with self._similarity_lock:
+            if self._similarity is not None:
+                return
+            self._catch_up()
+            contents = {key: [e["content"] for e in self._sections[key]] for key in SECTIONS}
+            index = await asyncio.to_thread(self._build_similarity, contents)
+            # 构建期间追加的记录已由 _catch_up 读入内存, 补入索引
+            for key in SECTIONS:
+                section = self._sections[key]
+                for position in range(len(contents[key]), len(section)):
+                    index.add((key, position), section[position]["content"])
+            self._similarity = index
+
+    def relevant(self, section: str, text: str, limit: int) -> List[Dict[str, Any]]:
+        """返回段落中与文本最相似的记录, 不足 limit 条时以最新记录补齐
+
+        异步调用方应先 await ensure_similarity(), 否则首次调用在当前线程中构建索引。
+        """
+        if limit <= 0:
+            return []
+        self._catch_up()
+        if self._similarity is None:
+            self._similarity = self._build_similarity(
+                {key: [e["content"] for e in self._sections[key]] for key in SECTIONS}
+            )
+
+        entries = self._sections.get(section, [])
+        hits = self._similarity.query(text, k=limit, accept=lambda key: key[0] == section)
+        chosen = {position for (_, position), _ in hits}
+        result = [{**entries[position], "similarity": round(score, 3)} for (_, position), score in hits]
+        for position in range(len(entries) - 1, -1, -1):
+            if len(result) >= limit:
+                break
+            if position not in chosen:
+                result.append(dict(entries[position]))
+        return result
+
+    def count(self, section: str) -> int:
+        """段落中的记录数"""
+        self._catch_up()
+        return len(self._sections.get(section, []))
+
+    # ========== 渲染 ==========
+
+    def _schedule_render(self, delay: Optional[float] = None) -> None:
+        if self._render_timer is not None:
+            return
+        self._render_timer = asyncio.get_running_loop().call_later(
+            self.render_delay if delay is None else delay, self._start_render
+        )
+
+    def _start_render(self) -> None:
+        self._render_timer = None
+        self._render_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self) -> None:
+        """如有未渲染的追加, 立即重写 CONTINUITY.md"""
+        if self._render_timer is not None:
+            self._render_timer.cancel()
+            self._render_timer = None
+        if not self._dirty:
+            return
+        async with self._render_lock:
+            self._dirty = False
+            self._catch_up()
+            content = self.render()
+            temp_file = self.continuity_file.with_name(f"CONTINUITY.{os.getpid()}.tmp")
+            try:
+                async with aiofiles.open(temp_file, 'w', encoding='utf-8') as f:
+                    await f.write(content)
+                temp_file.replace(self.continuity_file)
+                self._render_failures = 0
+            except (OSError, IOError) as e:
+                self._dirty = True
+                self._render_failures += 1
+                logger.error(f"渲染 CONTINUITY.md 失败 (IO错误): {e}")
+                # 按指数退避重新安排渲染, 否则要等下一次追加才会重试
+                self._schedule_render(
+                    min(self.render_delay * 2 ** self._render_failures, RENDER_RETRY_MAX_DELAY)
+                )
+
+    def render_sync(self) -> None:
+        """同步渲染 (初始化时使用)"""
+        temp_file = self.continuity_file.with_name(f"CONTINUITY.{os.getpid()}.tmp")
+        temp_file.write_text(self.render(), encoding='utf-8')
+        temp_file.replace(self.continuity_file)
+        self._dirty = False
+
+    def render(self) -> str:
+        """根据结构化数据生成 CONTINUITY.md 内容 (各段最新条目在前)"""
+        parts = [
+            "# SuperAgent v3.2 - 持续记忆 (CONTINUITY)\n\n"
+            "> 此文件由SuperAgent自动维护,记录项目开发过程中的重要经验、错误教训和最佳实践\n\n"
+            "---\n"
+        ]
+        for key, (title, subtitle) in SECTIONS.items():
+            parts.append(f"\n{title} ({subtitle})\n\n")
+            for entry in reversed(self._sections[key]):
+                parts.append(f"- [{entry['timestamp']}] **{entry['category']}**: {entry['content']}\n")
+            parts.append("\n---\n" if self._sections[key] else "---\n")
+
+        stats = self._stats_provider()
+        parts.append(f"""
+{SECTION_STATISTICS} (Project Statistics)
+
+- **总记忆条目**: {stats.get('total', 0)}
+- **情节记忆**: {stats.get('episodic', 0)}
+- **语义记忆**: {stats.get('semantic', 0)}
+- **程序记忆**: {stats.get('procedural', 0)}
+- **最后更新**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+""")
+        return "".join(parts)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+跨进程协调
+
+多个 uvicorn / Celery worker 共享同一个记忆目录时使用:
+- InterProcessLock: 基于 fcntl.flock 的建议锁; 异步获取时以非阻塞方式轮询,
+  不占用线程, 协程被取消也不会遗留锁
+- GenerationFile: 每次提交索引后递增的代数文件; 读取方只需一次 stat()
+  (inode + mtime + size) 即可判断其他进程是否有新提交
+
+fcntl 不可用的平台 (Windows) 上锁退化为空操作, 仅保证单进程安全。
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+HAS_FLOCK = fcntl is not None
+
+
+class InterProcessLock:
+    """基于 fcntl.flock 的跨进程互斥锁
+
+    flock 锁属于打开的文件描述, 同一进程内的协程之间不互斥,
+    调用方需要另外用 asyncio.Lock 串行化进程内的访问。
+    """
+
+    def __init__(self, path: Path, poll_interval: float = 0.005) -> None:
+        self.path = Path(path)
+        self._poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    def _ensure_fd(self) -> int:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+    def try_acquire(self, shared: bool = False) -> bool:
+        """尝试加锁, 不阻塞"""
+        if fcntl is None:
+            return True
+        mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(self._ensure_fd(), mode | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def acquire_sync(self, shared: bool = False) -> None:
+        """阻塞加锁 (同步代码使用)"""
+        if fcntl is not None:
+            fcntl.flock(self._ensure_fd(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+
+    async def acquire(self, shared: bool = False) -> None:
+        """异步加锁: 非阻塞轮询, 退避上限 50ms"""
+        delay = self._poll_interval
+        while not self.try_acquire(shared):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def release(self) -> None:
+        if fcntl is not None and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    async def __aenter__(self) -> "InterProcessLock":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+    @contextmanager
+    def hold(self, shared: bool = False) -> Iterator[None]:
+        """同步上下文管理器"""
+        self.acquire_sync(shared)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class GenerationFile:
+    """索引代数文件 (内容为十进制整数, 原子替换写入)"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._seen: Optional[Tuple[int, int, int]] = None
+
+    def _signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def changed(self) -> bool:
+        """自上次 read()/write() 以来文件是否被替换 (一次 stat)"""
+        return self._signature() != self._seen
+
+    def read(self) -> int:
+        """读取当前代数 (文件缺失或损坏时为 0)"""
+        signature = self._signature()
+        try:
+            value = int(self.path.read_text(encoding='utf-8').strip() or 0)
+        except (FileNotFoundError, ValueError):
+            value = 0
+        self._seen = signature
+        return value
+
+    def write(self, generation: int) -> None:
+        """原子写入新代数 (调用方持有跨进程锁)"""
+        temp_file = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        temp_file.write_text(str(generation), encoding='utf-8')
+        temp_file.replace(self.path)
+        self._seen = self._signature()
@@ -10,24 +10,36 @@ import asyncio
 import threading  # v3.3 优化：使用线程锁保护单例
 import logging
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple, Union
 from dataclasses import dataclass, field
 import json
+import os
 import uuid
 import aiofiles
 from common.monitoring import MetricsManager
 from common.exceptions import MemorySystemError
-from config.constants import Defaults  # P2: 使用常量替代魔法数字
+from config.constants import Defaults, MemoryConfig  # P2: 使用常量替代魔法数字
+from .storage import MEMORY_TYPES, MemoryStorageBackend, create_storage_backend
+from .cache import MemoryCache
+from .similarity import MinHashLSH
+from .interprocess import GenerationFile, InterProcessLock
+from .retention import EpisodicArchive, TimeBound
+from .continuity import (  # noqa: F401 (段落常量保持从本模块可导入)
+    ContinuityStore,
+    SECTIONS,
+    SECTION_MISTAKES,
+    SECTION_PRACTICES,
+    SECTION_ARCHITECTURE,
+    SECTION_STATISTICS,
+)
 
 logger = logging.getLogger(__name__)
 
-# 常量定义
-SECTION_MISTAKES = "## 📝 错误与教训"
-SECTION_PRACTICES = "## 🎯 最佳实践"
-SECTION_ARCHITECTURE = "## 🏗️ 架构决策"
-SECTION_STATISTICS = "## 📊 项目统计"
+# export_memories / import_memories 使用的 JSON Lines 格式标识
+EXPORT_FORMAT = "superagent-memory"
+EXPORT_VERSION = 1
 
 
 @dataclass
@@ -65,17 +77,29 @@ class MemoryManager:
                 cls._instance = super(MemoryManager, cls).__new__(cls)
             return cls._instance
 
-    def __init__(self, project_root: Optional[Path] = None) -> None:
+    def __init__(
+        self,
+        project_root: Optional[Path] = None,
+        storage_backend: Union[str, MemoryStorageBackend, None] = None,
+        write_behind: bool = False
+    ) -> None:
         """初始化记忆管理器
 
         Args:
             project_root: 项目根目录
+            storage_backend: 存储后端名称 ("json" / "segment" / "sqlite") 或后端实例, 默认 "json"
+            write_behind: 是否启用写回队列 (保存立即返回, 后台批量落盘)
         """
-        # 防止重复初始化
+        # 防止重复初始化: 存储目录和后端在首次初始化时确定, 之后传入的参数不生效
         if getattr(self, '_initialized', False):
-            # 如果已经初始化但 project_root 不同，只更新路径
             if project_root is not None and self.project_root != Path(project_root):
-                self.project_root = Path(project_root)
+                logger.warning(
+                    f"记忆管理器已在 {self.project_root} 初始化, 忽略新的项目根目录: {project_root}"
+                )
+            if storage_backend is not None and not self._uses_backend(storage_backend):
+                logger.warning(
+                    f"记忆管理器已使用 {type(self._storage).__name__} 存储后端, 忽略新的存储后端: {storage_backend}"
+                )
             return
 
         self.project_root = project_root or Path.cwd()
@@ -91,35 +115,104 @@ class MemoryManager:
 
         # 索引文件
         self.index_file = self.memory_dir / "memory_index.json"
+        # 类别/标签倒排索引 (通过 generation 与 memory_index.json 校验一致性)
+        self.postings_file = self.memory_dir / "memory_postings.json"
 
         # 锁
         self._lock = asyncio.Lock()  # 内存状态锁
         self._io_lock = asyncio.Lock()  # 文件写入锁 (防止并发写入同一文件)
-        self._cache_lock = threading.Lock()  # 缓存操作锁（使用线程锁，因为方法是同步的）
 
         # 创建目录结构
         self._init_directories()
 
-        # 加载索引
-        self.index: Dict[str, Any] = self._load_index_sync()
+        # 跨进程协调: 提交索引时持有 flock, 其他进程通过代数文件发现新提交
+        self._index_file_lock = InterProcessLock(self.memory_dir / "memory_index.lock")
+        self.generation_file = GenerationFile(self.memory_dir / "memory_index.gen")
+        # 先读代数再读索引: 两次读取之间有新提交时, 下次检查会再合并一次
+        self._synced_generation = self.generation_file.read()
+        # 本进程尚未提交的新增/移除 (合并其他进程的提交时以此区分)
+        self._uncommitted: Dict[str, List[str]] = {mtype: [] for mtype in MEMORY_TYPES}
+        self._pending_removals: Dict[str, Set[str]] = {mtype: set() for mtype in MEMORY_TYPES}
+
+        # 存储后端 (默认每条记忆一个 JSON 文件)
+        self._storage = create_storage_backend(storage_backend, self.memory_dir)
+        self._storage_backend_name = (
+            None if isinstance(storage_backend, MemoryStorageBackend) else (storage_backend or "json").lower()
+        )
 
-        # 初始化查询缓存 (使用 LRU + LFU 混合策略)
-        # 缓存结构: {type: {memory_id: (entry_dict, access_count, last_access_time)}}
-        self._cache: Dict[str, Dict[str, tuple[Dict[str, Any], int, float]]] = {
-            "episodic": {},
+        # 加载索引 (自维护顺序的后端直接从后端重建)
+        if self._storage.maintains_index:
+            self.index: Dict[str, Any] = self._load_index_from_storage()
+        else:
+            self.index = self._load_index_sync()
+
+        # 结构化持续记忆 (按段落追加, CONTINUITY.md 延迟渲染)
+        self._continuity = ContinuityStore(
+            self.memory_dir,
+            stats_provider=self._continuity_stats,
+            render_delay=MemoryConfig.CONTINUITY_RENDER_DELAY.value
+        )
+
+        # 初始化查询缓存 (分段 LRU, 按条目数与字节数限制, TTL 由时间轮惰性过期)
+        self._cache_ttl = Defaults.CACHE_TTL.value  # 使用常量
+        self._max_cache_size = Defaults.MAX_CACHE_SIZE.value  # 使用常量
+        self._cache = MemoryCache(
+            ("episodic", "semantic", "procedural"),
+            max_entries=self._max_cache_size,
+            max_bytes=MemoryConfig.CACHE_MAX_BYTES.value,
+            ttl=self._cache_ttl,
+            protected_ratio=MemoryConfig.CACHE_PROTECTED_RATIO.value,
+            wheel_resolution=MemoryConfig.CACHE_WHEEL_RESOLUTION.value
+        )
+        # 类别索引 (type -> category -> list of memory_ids)
+        self._category_index: Dict[str, Dict[str, List[str]]] = {
             "semantic": {},
             "procedural": {}
         }
-        # 类别索引 (type -> category -> list of memory_ids)
-        self._category_index: Dict[str, Dict[str, List[str]]] = {
+        # 标签索引 (type -> tag -> list of memory_ids)
+        self._tag_index: Dict[str, Dict[str, List[str]]] = {
+            "episodic": {},
             "semantic": {},
             "procedural": {}
         }
-        self._cache_ttl = Defaults.CACHE_TTL.value  # 使用常量
-        self._max_cache_size = Defaults.MAX_CACHE_SIZE.value  # 使用常量
-        self._continuity_cache: Optional[str] = None  # CONTINUITY.md 内容缓存
+        # 内容相似度索引 (MinHash LSH, key 为 (memory_type, memory_id)); 已有记忆时首次检索前构建
+        self._similarity = MinHashLSH(
+            num_perm=MemoryConfig.SIMILARITY_NUM_PERM.value,
+            bands=MemoryConfig.SIMILARITY_BANDS.value
+        )
+        self._similarity_stale = self.index.get("total_count", 0) > 0
+        # 构建期间新增/更新条目的签名 (key -> 签名), 构建完成时覆盖快照中的旧签名
+        self._similarity_building = False
+        self._similarity_backlog: Dict[Tuple[str, str], Optional[Tuple[int, ...]]] = {}
+        self._similarity_build_lock = asyncio.Lock()
+        # 持久化的倒排索引无效时, 首次按类别/标签查询前需要重建
+        self._postings_stale = not self._load_postings_sync()
         self._last_flush_time: float = 0.0
 
+        # 写回队列 (group commit): 保存只更新内存状态, 由后台任务按窗口批量落盘
+        self._write_behind = False
+        self._write_max_latency: float = MemoryConfig.WRITE_BEHIND_MAX_LATENCY.value
+        self._write_batch_size: int = MemoryConfig.WRITE_BEHIND_BATCH_SIZE.value
+        self._write_queue: List[Dict[str, Any]] = []  # 待写入的条目 (按保存顺序)
+        self._pending_entries: Dict[str, Dict[str, Any]] = {}  # 尚未落盘的条目 (供读取)
+        self._pending_continuity: List[Tuple[str, str, str, Optional[Dict[str, Any]]]] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_now: Optional[asyncio.Event] = None
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+        self._flusher_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._write_behind_error: Optional[MemorySystemError] = None
+        if write_behind:
+            self.configure_write_behind(True)
+
+        # 分层保留: 较旧的情节记忆移入按月分区的压缩归档
+        self.archive_dir = self.memory_dir / "archive" / "episodic"
+        self._archive = EpisodicArchive(self.archive_dir)
+        self._retention_max_age_days: float = MemoryConfig.RETENTION_MAX_AGE_DAYS.value
+        self._retention_max_hot_entries: int = MemoryConfig.RETENTION_MAX_HOT_ENTRIES.value
+        self._retention_interval: float = MemoryConfig.RETENTION_INTERVAL.value
+        self._retention_task: Optional[asyncio.Task] = None
+
         # 标记初始化完成
         self._initialized = True
         self._index_building = False
@@ -130,22 +223,31 @@ class MemoryManager:
         logger.info(f"记忆管理器初始化完成: {self.memory_dir}")
 
     @classmethod
-    def get_instance(cls, project_root: Optional[Path] = None) -> 'MemoryManager':
+    def get_instance(
+        cls,
+        project_root: Optional[Path] = None,
+        storage_backend: Union[str, MemoryStorageBackend, None] = None
+    ) -> 'MemoryManager':
         """获取单例，支持延迟初始化
 
         Args:
             project_root: 项目根目录（仅在首次创建时有效）
+            storage_backend: 存储后端（仅在首次创建时有效）
 
         Returns:
             MemoryManager 单例
         """
+        # __new__ 已在类锁内创建实例, 这里不能再持有同一把锁 (threading.Lock 不可重入)
         if not cls._instance:
-            with cls._class_lock:
-                if not cls._instance:
-                    instance = cls(project_root)
-                    cls._instance = instance
+            cls(project_root, storage_backend=storage_backend)
         return cls._instance
 
+    def _uses_backend(self, storage_backend: Union[str, MemoryStorageBackend]) -> bool:
+        """当前实例是否使用给定的存储后端"""
+        if isinstance(storage_backend, MemoryStorageBackend):
+            return storage_backend is self._storage
+        return storage_backend.lower() == self._storage_backend_name
+
     async def initialize_async(self, project_root: Optional[Path] = None) -> None:
         """异步初始化（可选，用于需要异步初始化的场景）
 
@@ -181,88 +283,87 @@ class MemoryManager:
             return False
 
     async def _build_category_index(self) -> None:
-        """异步构建类别索引 (v3.3 优化版：IO不在锁内 + 完成通知)"""
+        """异步重建类别/标签索引 (仅在持久化的倒排索引失效时需要)
+
+        IO 不在锁内; 重建期间并发保存的条目在合并时保留。
+        """
+        batch_size = MemoryConfig.BATCH_SIZE.value
         try:
-            for mtype in ["semantic", "procedural"]:
+            for mtype in ["episodic", "semantic", "procedural"]:
                 # 1. 先在不占锁的情况下收集所有 ID
                 async with self._lock:
                     mids = list(self.index.get(mtype, []))
 
-                for mid in mids:
+                categories: Dict[str, List[str]] = {}
+                tags: Dict[str, List[str]] = {}
+                for start in range(0, len(mids), batch_size):
+                    chunk = mids[start:start + batch_size]
                     try:
-                        folder = (self.semantic_dir if mtype == "semantic"
-                                  else self.procedural_dir)
-                        file_path = folder / f"{mid}.json"
-
-                        if file_path.exists():
-                            # 2. 读取文件 (IO)
-                            async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                                content = await f.read()
-                                memory_data = json.loads(content)
-                                category = memory_data.get("metadata", {}).get(
-                                    "category", "general"
-                                )
-
-                                # 3. 更新内存中的索引 (占锁)
-                                async with self._lock:
-                                    if category not in self._category_index[mtype]:
-                                        self._category_index[mtype][category] = []
-                                    if mid not in self._category_index[mtype][category]:
-                                        self._category_index[mtype][category].append(mid)
-                    except (FileNotFoundError, json.JSONDecodeError, PermissionError) as e:
-                        logger.error(f"构建类别索引失败 - 文件损坏或丢失 ({mid}): {e}")
+                        # 2. 从存储后端批量读取 (IO)
+                        loaded = await self._storage.read_many(mtype, chunk)
                     except (OSError, IOError) as e:
-                        logger.error(f"构建类别索引失败 - IO错误 ({mid}): {e}")
+                        logger.error(f"构建类别索引失败 - IO错误 ({mtype}): {e}")
+                        continue
                     except Exception as e:
-                        logger.error(f"构建类别索引失败 - 未知错误 ({type(e).__name__}) ({mid}): {e}")
+                        logger.error(f"构建类别索引失败 - 未知错误 ({type(e).__name__}) ({mtype}): {e}")
+                        continue
+
+                    for mid, memory_data in zip(chunk, loaded):
+                        if memory_data is None:
+                            continue
+                        if mtype in self._category_index:
+                            category = memory_data.get("metadata", {}).get("category", "general")
+                            categories.setdefault(category, []).append(mid)
+                        for tag in dict.fromkeys(memory_data.get("tags", [])):
+                            tags.setdefault(tag, []).append(mid)
+
+                # 3. 合并到内存中的索引 (占锁), 保留重建期间新保存的条目
+                async with self._lock:
+                    if mtype in self._category_index:
+                        self._category_index[mtype] = self._merge_postings(
+                            categories, self._category_index[mtype]
+                        )
+                    self._tag_index[mtype] = self._merge_postings(tags, self._tag_index[mtype])
+
+            self._postings_stale = False
+            await self._save_postings()
+        except MemorySystemError as e:
+            logger.error(f"保存类别索引失败: {e}")
         finally:
             # v3.3: 通知索引构建完成
             self._index_building = False
             self._index_ready.set()
             logger.info("类别索引构建完成")
 
+    @staticmethod
+    def _merge_postings(
+        rebuilt: Dict[str, List[str]],
+        live: Dict[str, List[str]]
+    ) -> Dict[str, List[str]]:
+        """将重建结果与当前内存中的倒排表合并"""
+        for key, ids in live.items():
+            known = set(rebuilt.get(key, []))
+            extra = [mid for mid in ids if mid not in known]
+            if extra:
+                rebuilt.setdefault(key, []).extend(extra)
+        return rebuilt
+
+    async def _ensure_postings(self) -> None:
+        """持久化的倒排索引失效时, 在首次按类别/标签查询前重建"""
+        if self._postings_stale:
+            await self.initialize_async()
+            await self.wait_for_index()
+
     def _init_directories(self) -> None:
         """初始化目录结构"""
         for d in [self.memory_dir, self.episodic_dir, self.semantic_dir, self.procedural_dir]:
             d.mkdir(parents=True, exist_ok=True)
 
-        # 初始化CONTINUITY.md(如果不存在)
-        if not self.continuity_file.exists():
-            self._init_continuity_file_sync()
 
     def _generate_id(self, prefix: str) -> str:
         """生成唯一的记忆ID"""
         return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
 
-    def _init_continuity_file_sync(self) -> None:
-        content = f"""# SuperAgent v3.2 - 持续记忆 (CONTINUITY)
-
-> 此文件由SuperAgent自动维护,记录项目开发过程中的重要经验、错误教训和最佳实践
-
----
-
-## 📝 错误与教训 (Mistakes & Learnings)
-
----
-
-## 🎯 最佳实践 (Best Practices)
-
----
-
-## 🏗️ 架构决策 (Architecture Decisions)
-
----
-
-## 📊 项目统计 (Project Statistics)
-
-- **总记忆条目**: 0
-- **情节记忆**: 0
-- **语义记忆**: 0
-- **程序记忆**: 0
-- **最后更新**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-"""
-        self.continuity_file.write_text(content, encoding='utf-8')
-
     def _load_index_sync(self) -> Dict[str, Any]:
         """同步加载记忆索引, 增加容错逻辑"""
         default_index = {
@@ -293,93 +394,147 @@ class MemoryManager:
                 logger.warning(f"备份损坏的索引文件失败: {e}")
             return default_index
 
-    def _get_from_cache(self, memory_type: str, memory_id: str) -> Optional[Dict[str, Any]]:
-        """从缓存获取记忆条目 (v3.3 LRU + LFU 混合策略)
+    def _load_index_from_storage(self) -> Dict[str, Any]:
+        """从自维护顺序的存储后端重建记忆索引"""
+        index: Dict[str, Any] = {
+            mtype: self._storage.list_ids(mtype)
+            for mtype in ("episodic", "semantic", "procedural")
+        }
+        index["total_count"] = sum(len(ids) for ids in index.values())
+        return index
 
-        Args:
-            memory_type: 记忆类型
-            memory_id: 记忆 ID
+    def _index_fingerprint(self) -> Dict[str, Any]:
+        """倒排索引校验值: 索引 generation + 各类型条目数与最后一个 ID"""
+        tails = {}
+        for mtype in ("episodic", "semantic", "procedural"):
+            ids = self.index.get(mtype, [])
+            tails[mtype] = [len(ids), ids[-1] if ids else None]
+        return {"generation": self.index.get("generation", 0), "tails": tails}
+
+    def _load_postings_sync(self) -> bool:
+        """加载持久化的类别/标签倒排索引
 
         Returns:
-            缓存的条目或 None
+            是否加载成功 (文件缺失、损坏或 generation 不匹配时返回 False)
         """
-        if memory_type not in self._cache:
-            return None
+        if not self.postings_file.exists():
+            # 空库没有需要重建的内容
+            return self.index.get("total_count", 0) == 0
 
-        # v3.3 优化：使用线程锁保护，确保原子性
-        with self._cache_lock:
-            cached_entry_data = self._cache[memory_type].get(memory_id)
-            if not cached_entry_data:
-                return None
+        try:
+            with open(self.postings_file, 'r', encoding='utf-8') as f:
+                postings = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"加载类别/标签索引失败, 将重建: {e}")
+            return False
 
-            entry, access_count, timestamp = cached_entry_data
-            if time.time() - timestamp > self._cache_ttl:
-                del self._cache[memory_type][memory_id]
-                return None
+        if postings.get("fingerprint") != self._index_fingerprint():
+            logger.info("类别/标签索引与记忆索引不一致, 将重建")
+            return False
 
-            # 访问时更新 LFU 计数和 LRU 时间戳 (原子操作)
-            self._cache[memory_type][memory_id] = (entry, access_count + 1, time.time())
-            return entry
+        for mtype in self._category_index:
+            self._category_index[mtype] = postings.get("category", {}).get(mtype, {})
+        for mtype in self._tag_index:
+            self._tag_index[mtype] = postings.get("tags", {}).get(mtype, {})
+        return True
+
+    def _dump_postings(self) -> str:
+        """序列化类别/标签倒排索引 (调用方持有 self._lock)"""
+        return json.dumps({
+            "fingerprint": self._index_fingerprint(),
+            "category": self._category_index,
+            "tags": self._tag_index,
+        }, ensure_ascii=False)
+
+    async def _save_postings(self) -> None:
+        """原子写入类别/标签倒排索引"""
+        async with self._lock:
+            content = self._dump_postings()
+        async with self._io_lock:
+            await self._atomic_write(self.postings_file, content)
+        self._last_flush_time = time.time()
 
-    def _save_to_cache(self, memory_type: str, memory_id: str, entry: Dict[str, Any]) -> None:
-        """保存记忆条目到缓存 (v3.3 LRU + LFU 混合淘汰策略)"""
-        if memory_type not in self._cache:
-            return
+    async def _atomic_write(self, path: Path, content: str) -> None:
+        """使用原子写入：先写临时文件再重命名"""
+        # 临时文件名带进程号, 多个 worker 同时写入时互不覆盖
+        temp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        async with aiofiles.open(temp_file, 'w', encoding='utf-8') as f:
+            await f.write(content)
 
-        # v3.3 优化：使用线程锁保护
-        with self._cache_lock:
-            # 当缓存满时，使用 LFU + LRU 混合策略淘汰
-            # 优先淘汰访问频率低的条目，频率相同时淘汰最久未访问的
-            if len(self._cache[memory_type]) >= self._max_cache_size:
-                candidates = []
-                for mid, (_entry, count, ts) in self._cache[memory_type].items():
-                    candidates.append((mid, count, ts))
+        # Windows 下 replace 前如果目标文件存在需要处理，但 Path.replace 应该可以处理
+        temp_file.replace(path)
 
-                # 找出访问频率最低的条目（保留至少访问过一次的）
-                min_count = min(c[1] for c in candidates) if candidates else 0
-                low_freq_items = [c for c in candidates if c[1] == min_count]
+    def _get_from_cache(self, memory_type: str, memory_id: str) -> Optional[Dict[str, Any]]:
+        """从缓存获取记忆条目 (命中时刷新 TTL, 并晋升到保护区)
 
-                # 从低频条目中找出最久未访问的
-                oldest = min(low_freq_items, key=lambda c: c[2])
-                del self._cache[memory_type][oldest[0]]
-                logger.debug(f"缓存淘汰: {oldest[0]} (访问次数: {oldest[1]})")
+        Args:
+            memory_type: 记忆类型
+            memory_id: 记忆 ID
+
+        Returns:
+            缓存的条目或 None
+        """
+        return self._cache.get(memory_type, memory_id)
 
-            # 保存新条目 (access_count=0 表示刚添加)
-            self._cache[memory_type][memory_id] = (entry, 0, time.time())
+    def _save_to_cache(self, memory_type: str, memory_id: str, entry: Dict[str, Any]) -> None:
+        """保存记忆条目到缓存 (超出条目数或字节预算时按 SLRU 淘汰)"""
+        self._cache.put(memory_type, memory_id, entry)
 
     def _clean_expired_cache(self) -> None:
-        """清理过期缓存 (v3.3 优化)"""
-        now = time.time()
-        cleaned = 0
-        for memory_type in self._cache:
-            with self._cache_lock:
-                expired_keys = [
-                    k for k, (_entry, _count, t) in self._cache[memory_type].items()
-                    if now - t > self._cache_ttl
-                ]
-                for k in expired_keys:
-                    del self._cache[memory_type][k]
-                    cleaned += 1
-
+        """清理过期缓存 (只处理时间轮中已到期的槽位)"""
+        cleaned = self._cache.expire()
         if cleaned > 0:
-            logger.debug(f"清理过期缓存: {cleaned} 个条目")
+            logger.debug(f"清理过期缓存: {cleaned} 条")
+
+    async def _save_index(self, force: bool = False) -> None:
+        """异步保存记忆索引和类别/标签倒排索引 (带 IO 锁与跨进程锁保护)
 
-    async def _save_index(self) -> None:
-        """异步保存记忆索引 (带 IO 锁保护)"""
+        提交前先合并其他进程已提交的索引, 再写入并递增代数文件
+
+        Args:
+            force: 对自维护索引的后端, 忽略落盘间隔立即保存倒排索引
+        """
         try:
-            # 1. 先准备要写入的内容 (内存操作)
-            async with self._lock:
-                content = json.dumps(self.index, indent=2, ensure_ascii=False)
+            if self._storage.maintains_index:
+                # 后端本身就是索引, 无需重写 memory_index.json, 只需通知其他进程
+                if self._storage.multi_process:
+                    async with self._io_lock:
+                        async with self._index_file_lock:
+                            await self._merge_committed()
+                            async with self._lock:
+                                self._take_uncommitted()
+                            self._commit_generation(self._synced_generation + 1)
+                # 倒排索引按间隔落盘, 未落盘的部分在下次启动时由校验值发现并重建
+                interval = MemoryConfig.POSTINGS_FLUSH_INTERVAL.value
+                if not self._postings_stale and (
+                        force or time.time() - self._last_flush_time >= interval):
+                    await self._save_postings()
+                return
 
-            # 2. 获取 IO 锁并写入文件
             async with self._io_lock:
-                # 使用原子写入：先写临时文件再重命名
-                temp_file = self.index_file.with_suffix('.tmp')
-                async with aiofiles.open(temp_file, 'w', encoding='utf-8') as f:
-                    await f.write(content)
-
-                # Windows 下 replace 前如果目标文件存在需要处理，但 Path.replace 应该可以处理
-                temp_file.replace(self.index_file)
+                async with self._index_file_lock:
+                    # 1. 合并其他进程的提交, 避免覆盖它们写入的条目
+                    await self._merge_committed()
+
+                    # 2. 准备要写入的内容 (同一把锁内保证两者校验值一致)
+                    async with self._lock:
+                        generation = max(self.index.get("generation", 0), self._synced_generation) + 1
+                        self.index["generation"] = generation
+                        content = json.dumps(self.index, indent=2, ensure_ascii=False)
+                        postings = None if self._postings_stale else self._dump_postings()
+                        taken = self._take_uncommitted()
+
+                    # 3. 先写倒排索引再写主索引: 两者之间崩溃时 generation 不一致, 启动时重建
+                    try:
+                        if postings is not None:
+                            await self._atomic_write(self.postings_file, postings)
+                        await self._atomic_write(self.index_file, content)
+                    except BaseException:
+                        async with self._lock:
+                            self._restore_uncommitted(taken)
+                        raise
+                    self._commit_generation(generation)
+            self._last_flush_time = time.time()
 
         except (OSError, IOError) as e:
             logger.error(f"保存记忆索引失败 (IO错误): {e}")
@@ -387,42 +542,228 @@ class MemoryManager:
         except (TypeError, ValueError) as e:
             logger.error(f"保存记忆索引失败 (序列化错误): {e}")
             raise MemorySystemError(f"保存记忆索引失败 (序列化错误): {str(e)}")
+        except MemorySystemError:
+            raise
         except Exception as e:
             logger.error(f"保存记忆索引遇到未知错误 ({type(e).__name__}): {e}")
             raise MemorySystemError(
                 f"保存记忆索引遇到未知错误 ({type(e).__name__}): {str(e)}"
             )
 
-    async def _save_entry(self, entry: MemoryEntry, directory: Path) -> None:
-        """通用条目保存方法 (已优化：剥离 IO 锁)"""
-        try:
-            file_path = directory / f"{entry.memory_id}.json"
-            entry_dict = entry.to_dict()
+    # ========== 跨进程同步 ==========
 
-            # 1. 先写条目文件 (不占锁)
-            async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(entry_dict, indent=2, ensure_ascii=False))
+    def _commit_generation(self, generation: int) -> None:
+        """写入代数文件 (调用方持有跨进程锁)"""
+        self.generation_file.write(generation)
+        self._synced_generation = generation
 
-            # 2. 更新缓存和内存索引 (占锁)
-            async with self._lock:
+    async def _refresh_index(self) -> None:
+        """其他进程提交过索引时增量合并 (无变化时只有一次 stat)"""
+        if not self.generation_file.changed():
+            return
+        async with self._io_lock:
+            await self._merge_committed()
+
+    async def _merge_committed(self) -> None:
+        """合并磁盘上已提交的索引, 只读取其他进程新增的条目 (调用方持有 _io_lock)"""
+        generation = self.generation_file.read()
+        if generation == self._synced_generation:
+            return
+
+        if self._storage.maintains_index:
+            committed = await asyncio.to_thread(self._load_index_from_storage)
+        else:
+            committed = await asyncio.to_thread(self._load_index_sync)
+
+        async with self._lock:
+            foreign, removed = self._merge_index(committed)
+            for mtype, ids in removed.items():
+                self._forget_ids(mtype, ids)
+        self._synced_generation = generation
+
+        if foreign:
+            await self._index_foreign_entries(foreign)
+            logger.debug(f"已合并其他进程提交的记忆: { {t: len(ids) for t, ids in foreign.items()} }")
+
+    def _merge_index(
+        self,
+        committed: Dict[str, Any]
+    ) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        """将已提交的索引合并到内存 (调用方持有 self._lock)
+
+        合并结果: 已提交的列表 (去掉本进程待提交的移除) + 本进程尚未提交的新增
+
+        Returns:
+            (其他进程新增的 ID, 其他进程移除的 ID), 均按类型分组
+        """
+        if committed.get("generation", 0) < self.index.get("generation", 0):
+            # 已提交的索引比内存中的旧 (文件缺失或损坏), 保留内存状态, 下次提交时覆盖
+            return {}, {}
+
+        foreign: Dict[str, List[str]] = {}
+        removed: Dict[str, List[str]] = {}
+        for mtype in MEMORY_TYPES:
+            ours = self.index.get(mtype, [])
+            drop = self._pending_removals[mtype]
+            theirs = [mid for mid in committed.get(mtype, []) if mid not in drop]
+            their_ids = set(theirs)
+            merged = theirs + [mid for mid in self._uncommitted[mtype] if mid not in their_ids]
+
+            our_ids = set(ours)
+            merged_ids = set(merged)
+            new_ids = [mid for mid in theirs if mid not in our_ids]
+            gone_ids = [mid for mid in ours if mid not in merged_ids]
+            if new_ids:
+                foreign[mtype] = new_ids
+            if gone_ids:
+                removed[mtype] = gone_ids
+            self.index[mtype] = merged
+
+        self.index["generation"] = max(self.index.get("generation", 0), committed.get("generation", 0))
+        self.index["total_count"] = sum(len(self.index.get(mtype, [])) for mtype in MEMORY_TYPES)
+        return foreign, removed
+
+    def _take_uncommitted(self) -> Tuple[Dict[str, List[str]], Dict[str, Set[str]]]:
+        """取出并清空待提交的新增/移除 (调用方持有 self._lock, 且内容已写入本次提交)"""
+        taken = (self._uncommitted, self._pending_removals)
+        self._uncommitted = {mtype: [] for mtype in MEMORY_TYPES}
+        self._pending_removals = {mtype: set() for mtype in MEMORY_TYPES}
+        return taken
+
+    def _restore_uncommitted(self, taken: Tuple[Dict[str, List[str]], Dict[str, Set[str]]]) -> None:
+        """提交失败时放回待提交的新增/移除 (调用方持有 self._lock)"""
+        adds, removals = taken
+        for mtype in MEMORY_TYPES:
+            self._uncommitted[mtype][:0] = adds[mtype]
+            self._pending_removals[mtype] |= removals[mtype]
+
+    def _forget_ids(self, memory_type: str, memory_ids: List[str]) -> None:
+        """从缓存、倒排索引和相似度索引中移除条目 (调用方持有 self._lock, 索引列表由调用方处理)"""
+        drop = set(memory_ids)
+        for memory_id in memory_ids:
+            self._cache.invalidate(memory_type, memory_id)
+            self._similarity.remove((memory_type, memory_id))
+            self._similarity_backlog.pop((memory_type, memory_id), None)
+        self._remove_postings(memory_type, drop)
+
+    def _remove_postings(self, memory_type: str, drop: Set[str]) -> None:
+        """从类别/标签倒排索引中移除条目 (调用方持有 self._lock)"""
+        for postings in (self._category_index.get(memory_type), self._tag_index.get(memory_type)):
+            if not postings:
+                continue
+            for key in list(postings):
+                kept = [mid for mid in postings[key] if mid not in drop]
+                if kept:
+                    postings[key] = kept
+                else:
+                    del postings[key]
+
+    async def _index_foreign_entries(self, foreign: Dict[str, List[str]]) -> None:
+        """读取其他进程新增的条目, 更新倒排索引和相似度索引"""
+        batch_size = MemoryConfig.BATCH_SIZE.value
+        entries: List[MemoryEntry] = []
+        for mtype, ids in foreign.items():
+            for i in range(0, len(ids), batch_size):
+                for entry_dict in await self._storage.read_many(mtype, ids[i:i + batch_size]):
+                    if entry_dict:
+                        entries.append(self._entry_from_dict(entry_dict))
+
+        signatures = await self._compute_signatures(entries)
+        async with self._lock:
+            for entry in entries:
+                if not self._postings_stale:
+                    self._add_postings(entry)
+                self._index_similarity(entry, signatures)
+
+    def _similarity_tracking(self) -> bool:
+        """相似度索引已构建或正在构建时, 新条目需要计算签名"""
+        return not self._similarity_stale or self._similarity_building
+
+    async def _compute_signatures(
+        self,
+        entries: List[MemoryEntry]
+    ) -> Dict[Tuple[str, str], Optional[Tuple[int, ...]]]:
+        """在线程池中计算条目的 MinHash 签名 (不占锁)"""
+        if not entries or not self._similarity_tracking():
+            return {}
+        signature = self._similarity.signature
+        return await asyncio.to_thread(
+            lambda: {(e.memory_type, e.memory_id): signature(e.content) for e in entries}
+        )
+
+    def _index_similarity(
+        self,
+        entry: MemoryEntry,
+        signatures: Dict[Tuple[str, str], Optional[Tuple[int, ...]]]
+    ) -> None:
+        """将条目加入相似度索引, 构建期间先暂存 (调用方持有 self._lock)"""
+        if not self._similarity_tracking():
+            return
+        key = (entry.memory_type, entry.memory_id)
+        # 计算签名后索引才开始构建时, 在锁内补算
+        sig = signatures[key] if key in signatures else self._similarity.signature(entry.content)
+        if self._similarity_building:
+            self._similarity_backlog[key] = sig
+        else:
+            self._similarity.add_signature(key, sig)
+
+    async def _register_entry(self, entry: MemoryEntry, entry_dict: Dict[str, Any]) -> None:
+        """更新缓存、内存索引和倒排索引 (占锁)"""
+        await self._register_entries([(entry, entry_dict)])
+
+    async def _register_entries(self, pairs: List[Tuple[MemoryEntry, Dict[str, Any]]]) -> None:
+        """批量更新缓存、内存索引和倒排索引 (一次占锁, 相似度签名在锁外计算)"""
+        signatures = await self._compute_signatures([entry for entry, _ in pairs])
+        async with self._lock:
+            # 批量时先建集合, 避免每条都线性扫描索引列表
+            known: Dict[str, set] = {}
+            if len(pairs) > 1:
+                known = {mtype: set(self.index[mtype]) for mtype in {e.memory_type for e, _ in pairs}}
+            changed: Dict[Tuple[str, str], MemoryEntry] = {}
+            overwritten: Dict[str, Set[str]] = {}
+            for entry, entry_dict in pairs:
                 # 保存到缓存
                 self._save_to_cache(entry.memory_type, entry.memory_id, entry_dict)
 
                 # 更新索引列表
-                if entry.memory_id not in self.index[entry.memory_type]:
+                ids = known.get(entry.memory_type)
+                is_new = (entry.memory_id not in ids) if ids is not None \
+                    else entry.memory_id not in self.index[entry.memory_type]
+                if is_new:
+                    if ids is not None:
+                        ids.add(entry.memory_id)
                     self.index[entry.memory_type].append(entry.memory_id)
                     self.index["total_count"] += 1
+                    self._uncommitted[entry.memory_type].append(entry.memory_id)
+                else:
+                    overwritten.setdefault(entry.memory_type, set()).add(entry.memory_id)
+                changed[(entry.memory_type, entry.memory_id)] = entry
+                self._index_similarity(entry, signatures)
 
-                # 更新类别索引
-                if entry.memory_type in self._category_index:
-                    category = entry.metadata.get("category", "general")
-                    if category not in self._category_index[entry.memory_type]:
-                        self._category_index[entry.memory_type][category] = []
-                    if entry.memory_id not in \
-                            self._category_index[entry.memory_type][category]:
-                        self._category_index[entry.memory_type][category].append(
-                            entry.memory_id
-                        )
+            # 增量更新类别/标签倒排索引: 覆盖已有 ID 时类别或标签可能变化, 先移除旧的倒排项
+            for mtype, ids in overwritten.items():
+                self._remove_postings(mtype, ids)
+            for entry in changed.values():
+                self._add_postings(entry)
+
+    async def _save_entry(self, entry: MemoryEntry) -> None:
+        """通用条目保存方法 (已优化：剥离 IO 锁)"""
+        entry_dict = entry.to_dict()
+
+        if self._write_behind:
+            # 写回模式: 只更新内存状态并入队, 由后台任务批量落盘
+            await self._register_entry(entry, entry_dict)
+            self._pending_entries[entry.memory_id] = entry_dict
+            self._write_queue.append(entry_dict)
+            self._schedule_flush()
+            return
+
+        try:
+            # 1. 先写入存储后端 (不占锁)
+            await self._storage.write(entry_dict)
+
+            # 2. 更新缓存和内存索引 (占锁)
+            await self._register_entry(entry, entry_dict)
 
             # 3. 异步保存索引文件 (IO 密集，移出主锁)
             await self._save_index()
@@ -449,6 +790,392 @@ class MemoryManager:
                 f"保存记忆条目遇到未知错误 ({type(e).__name__}): {str(e)}"
             )
 
+    # ========== 写回队列 (Group Commit) ==========
+
+    def configure_write_behind(
+        self,
+        enabled: bool = True,
+        max_latency: Optional[float] = None,
+        batch_size: Optional[int] = None
+    ) -> None:
+        """配置写回队列
+
+        关闭前应先 await drain(), 否则队列中的条目要等下一次 flush 才会落盘。
+
+        Args:
+            enabled: 是否启用
+            max_latency: 条目入队到落盘的最大等待时间 (秒)
+            batch_size: 队列达到该长度时立即落盘, 同时也是单次批量写入的上限
+        """
+        self._write_behind = enabled
+        if max_latency is not None:
+            self._write_max_latency = max_latency
+        if batch_size is not None:
+            self._write_batch_size = max(1, batch_size)
+
+    def _schedule_flush(self) -> None:
+        """唤醒 (必要时启动) 后台落盘任务"""
+        loop = asyncio.get_running_loop()
+        if (self._flusher_task is None or self._flusher_task.done()
+                or self._flusher_loop is not loop):
+            # 首次使用或事件循环已更换 (如 CLI 多次 asyncio.run)
+            self._flush_now = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._flush_timer = None
+            self._flusher_loop = loop
+            self._flusher_task = loop.create_task(self._flush_loop())
+
+        # 窗口内第一条入队时启动定时器, 保证最大延迟; 批量满时立即落盘
+        if self._flush_timer is None:
+            self._flush_timer = loop.call_later(self._write_max_latency, self._flush_now.set)
+        if len(self._write_queue) >= self._write_batch_size:
+            self._flush_now.set()
+
+    async def _flush_loop(self) -> None:
+        """后台落盘循环: 每个窗口一次批量落盘"""
+        while True:
+            await self._flush_now.wait()
+            self._flush_now.clear()
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            await self._flush_pending()
+
+    async def _flush_pending(self) -> None:
+        """落盘当前队列: 条目按 batch_size 分批写入, 之后一次索引写入和一次 CONTINUITY 渲染"""
+        async with self._flush_lock:
+            if not self._write_queue and not self._pending_continuity:
+                return
+
+            written: List[Dict[str, Any]] = []
+            continuity, self._pending_continuity = self._pending_continuity, []
+            try:
+                while self._write_queue:
+                    # 写入成功后才出队; 失败或被取消时条目留在队列中等待下次落盘
+                    batch = self._write_queue[:self._write_batch_size]
+                    await self._storage.write_many(batch)
+                    del self._write_queue[:len(batch)]
+                    written.extend(batch)
+
+                if written:
+                    await self._save_index()
+                if continuity:
+                    await self._write_continuity(continuity)
+                    continuity = []
+
+                for entry_dict in written:
+                    MetricsManager.record_memory_op(entry_dict["memory_type"], "save", "success")
+                for mtype in {e["memory_type"] for e in written}:
+                    MetricsManager.update_memory_size(mtype, len(self.index[mtype]))
+            except (OSError, IOError, MemorySystemError) as e:
+                logger.error(f"批量保存记忆失败 (剩余 {len(self._write_queue)} 条待重试): {e}")
+                MetricsManager.record_memory_op("batch", "save", "error")
+                self._write_behind_error = MemorySystemError(f"批量保存记忆失败: {str(e)}")
+            finally:
+                for entry_dict in written:
+                    self._pending_entries.pop(entry_dict["memory_id"], None)
+                if continuity:
+                    self._pending_continuity[:0] = continuity
+
+    async def flush(self) -> None:
+        """立即落盘写回队列中的全部条目, 并渲染 CONTINUITY.md
+
+        Raises:
+            MemorySystemError: 之前的批量写入失败
+        """
+        await self._flush_pending()
+        await self._continuity.flush()
+        error, self._write_behind_error = self._write_behind_error, None
+        if error is not None:
+            raise error
+
+    async def drain(self) -> None:
+        """落盘全部条目并停止后台任务 (用于进程退出前)"""
+        await self.stop_retention()
+        # 持有 flush 锁时取消, 保证后台任务不会停在批量写入中途
+        async with self._flush_lock:
+            task, self._flusher_task = self._flusher_task, None
+            if task is not None and not task.done():
+                task.cancel()
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        if task is not None and self._flusher_loop is asyncio.get_running_loop():
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    def _add_postings(self, entry: MemoryEntry) -> None:
+        """将新条目加入类别/标签倒排索引 (调用方持有 self._lock)"""
+        if entry.memory_type in self._category_index:
+            category = entry.metadata.get("category", "general")
+            self._category_index[entry.memory_type].setdefault(category, []).append(
+                entry.memory_id
+            )
+        for tag in dict.fromkeys(entry.tags):
+            self._tag_index[entry.memory_type].setdefault(tag, []).append(entry.memory_id)
+
+    async def _load_entries(
+        self,
+        memory_type: str,
+        memory_ids: List[str]
+    ) -> List[Dict[str, Any]]:
+        """按顺序加载一组条目: 先查缓存, 未命中的一次性交给后端批量读取"""
+        found: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for memory_id in memory_ids:
+            # 尝试从缓存获取, 其次是尚未落盘的写回队列
+            cached_entry = (self._get_from_cache(memory_type, memory_id)
+                            or self._pending_entries.get(memory_id))
+            if cached_entry:
+                found[memory_id] = cached_entry
+            else:
+                missing.append(memory_id)
+
+        if missing:
+            try:
+                loaded = await self._storage.read_many(memory_type, missing)
+            except (OSError, IOError) as e:
+                logger.error(f"加载记忆条目失败 (系统IO错误): {e}")
+                loaded = [None] * len(missing)
+
+            for memory_id, entry in zip(missing, loaded):
+                if entry is not None:
+                    found[memory_id] = entry
+                    # 保存到缓存
+                    self._save_to_cache(memory_type, memory_id, entry)
+
+        return [found[mid] for mid in memory_ids if mid in found]
+
+    # ========== 批量读写与导入导出 ==========
+
+    def _entry_from_dict(self, item: Dict[str, Any]) -> MemoryEntry:
+        """将批量写入/导入的字典规范化为 MemoryEntry (缺省字段按单条保存接口补齐)"""
+        memory_type = item.get("memory_type", "episodic")
+        if memory_type not in MEMORY_TYPES:
+            raise MemorySystemError(f"不支持的记忆类型: {memory_type}")
+        if not isinstance(item.get("content"), str):
+            raise MemorySystemError(f"记忆条目缺少 content: {item.get('memory_id', '')}")
+
+        metadata = dict(item.get("metadata") or {})
+        category = item.get("category") or metadata.get("category")
+        if memory_type != "episodic":
+            category = category or "general"
+            metadata.setdefault("category", category)
+
+        if item.get("memory_id"):
+            memory_id = item["memory_id"]
+        elif memory_type == "episodic":
+            memory_id = self._generate_id("episodic")
+        else:
+            memory_id = self._generate_id(f"{memory_type}_{category}")
+
+        return MemoryEntry(
+            memory_id=memory_id,
+            memory_type=memory_type,
+            timestamp=item.get("timestamp") or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            content=item["content"],
+            metadata=metadata,
+            tags=list(item.get("tags") or ([memory_type, category] if category else [memory_type]))
+        )
+
+    async def save_many(
+        self,
+        items: List[Dict[str, Any]],
+        update_continuity: bool = True
+    ) -> List[str]:
+        """批量保存记忆: 后端分批写入, 索引只更新一次
+
+        Args:
+            items: 条目字典列表, 需包含 memory_type 与 content;
+                memory_id/timestamp/category/metadata/tags 可选 (导入时保留原值)
+            update_continuity: 语义/程序记忆是否追加到 CONTINUITY (导入已有数据时应关闭)
+
+        Returns:
+            按输入顺序的记忆 ID 列表
+
+        Raises:
+            MemorySystemError: 条目格式错误或写入失败
+        """
+        entries = [self._entry_from_dict(item) for item in items]
+        if not entries:
+            return []
+        pairs = [(entry, entry.to_dict()) for entry in entries]
+
+        if self._write_behind:
+            await self._register_entries(pairs)
+            for _, entry_dict in pairs:
+                self._pending_entries[entry_dict["memory_id"]] = entry_dict
+                self._write_queue.append(entry_dict)
+            self._schedule_flush()
+        else:
+            batch_size = MemoryConfig.BATCH_SIZE.value
+            try:
+                for i in range(0, len(pairs), batch_size):
+                    await self._storage.write_many([d for _, d in pairs[i:i + batch_size]])
+            except (OSError, IOError) as e:
+                logger.error(f"批量保存记忆失败 (文件或磁盘错误): {e}")
+                MetricsManager.record_memory_op("batch", "save", "error")
+                raise MemorySystemError(f"批量保存记忆失败 (IO错误): {str(e)}")
+
+            await self._register_entries(pairs)
+            await self._save_index()
+
+            for entry in entries:
+                MetricsManager.record_memory_op(entry.memory_type, "save", "success")
+            for mtype in {entry.memory_type for entry in entries}:
+                MetricsManager.update_memory_size(mtype, len(self.index[mtype]))
+
+        if update_continuity:
+            items_for_continuity = [
+                (e.memory_type, e.content, e.metadata.get("category", "general"), None)
+                for e in entries if e.memory_type != "episodic"
+            ]
+            if items_for_continuity:
+                if self._write_behind:
+                    self._pending_continuity.extend(items_for_continuity)
+                else:
+                    await self._write_continuity(items_for_continuity)
+
+        logger.info(f"批量保存记忆: {len(entries)} 条")
+        return [entry.memory_id for entry in entries]
+
+    async def get_many(
+        self,
+        memory_ids: List[str],
+        memory_type: Optional[str] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """批量读取记忆, 结果与输入顺序一致 (缺失为 None), 读到的条目写入缓存
+
+        Args:
+            memory_ids: 记忆 ID 列表 (可混合多种类型)
+            memory_type: ID 不带类型前缀时使用的记忆类型
+
+        Returns:
+            条目列表
+        """
+        await self._refresh_index()
+        by_type: Dict[str, List[str]] = {}
+        for memory_id in memory_ids:
+            prefix = memory_id.split("_", 1)[0]
+            mtype = prefix if prefix in MEMORY_TYPES else memory_type
+            if mtype is None:
+                raise MemorySystemError(f"无法确定记忆类型: {memory_id}")
+            by_type.setdefault(mtype, []).append(memory_id)
+
+        found: Dict[str, Dict[str, Any]] = {}
+        for mtype, ids in by_type.items():
+            for entry in await self._load_entries(mtype, list(dict.fromkeys(ids))):
+                found[entry["memory_id"]] = entry
+        return [found.get(memory_id) for memory_id in memory_ids]
+
+    async def export_memories(
+        self,
+        path: Union[str, Path],
+        memory_types: Optional[List[str]] = None
+    ) -> Dict[str, int]:
+        """流式导出记忆到 JSON Lines 文件 (首行为格式头, 之后每行一条记忆)
+
+        按批读取并逐行写出, 内存占用与记忆总量无关
+
+        Args:
+            path: 导出文件路径
+            memory_types: 导出的记忆类型 (None 表示全部)
+
+        Returns:
+            各类型导出条数
+        """
+        types = memory_types or list(MEMORY_TYPES)
+        counts = {mtype: 0 for mtype in types}
+        batch_size = MemoryConfig.BATCH_SIZE.value
+        await self.flush()
+        await self._refresh_index()
+
+        async with aiofiles.open(path, 'w', encoding='utf-8') as f:
+            await f.write(json.dumps({
+                "format": EXPORT_FORMAT,
+                "version": EXPORT_VERSION,
+                "export_time": datetime.now().isoformat(),
+                "counts": {mtype: len(self.index.get(mtype, [])) for mtype in types},
+            }, ensure_ascii=False) + "\n")
+
+            for mtype in types:
+                ids = list(self.index.get(mtype, []))
+                for i in range(0, len(ids), batch_size):
+                    # 直接读后端, 避免导出把查询缓存挤满
+                    entries = await self._storage.read_many(mtype, ids[i:i + batch_size])
+                    lines = [json.dumps(e, ensure_ascii=False) + "\n" for e in entries if e]
+                    await f.write("".join(lines))
+                    counts[mtype] += len(lines)
+
+        logger.info(f"记忆已导出: {path} {counts}")
+        return counts
+
+    async def import_memories(
+        self,
+        path: Union[str, Path],
+        batch_size: Optional[int] = None
+    ) -> Dict[str, int]:
+        """流式导入 export_memories 生成的文件 (也兼容旧版 CLI 导出的单个 JSON)
+
+        逐行读取, 每 batch_size 条调用一次 save_many; 保留原 memory_id,
+        已存在的 ID 会被覆盖
+
+        Args:
+            path: 导入文件路径
+            batch_size: 每批写入条数
+
+        Returns:
+            各类型导入条数
+        """
+        batch_size = batch_size or MemoryConfig.IMPORT_BATCH_SIZE.value
+        counts = {mtype: 0 for mtype in MEMORY_TYPES}
+        batch: List[Dict[str, Any]] = []
+
+        async def flush_batch() -> None:
+            for entry_dict in batch:
+                counts[entry_dict.get("memory_type", "episodic")] = \
+                    counts.get(entry_dict.get("memory_type", "episodic"), 0) + 1
+            await self.save_many(batch, update_continuity=False)
+            batch.clear()
+
+        async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+            first = await f.readline()
+            try:
+                header = json.loads(first) if first.strip() else {}
+            except json.JSONDecodeError:
+                header = None
+
+            if header is None or header.get("format") != EXPORT_FORMAT:
+                # 旧版导出: 整个文件是一个 JSON 对象
+                legacy = json.loads(first + await f.read())
+                for mtype in counts:
+                    for entry_dict in legacy.get(mtype, []):
+                        batch.append({"memory_type": mtype, **entry_dict})
+                        if len(batch) >= batch_size:
+                            await flush_batch()
+            else:
+                line_no = 1
+                async for line in f:
+                    line_no += 1
+                    if not line.strip():
+                        continue
+                    try:
+                        batch.append(json.loads(line))
+                    except json.JSONDecodeError as e:
+                        raise MemorySystemError(f"导入文件格式错误 (第 {line_no} 行): {e}")
+                    if len(batch) >= batch_size:
+                        await flush_batch()
+
+        if batch:
+            await flush_batch()
+        await self.flush()
+
+        logger.info(f"记忆已导入: {path} {counts}")
+        return counts
+
     # ========== Episodic Memory (情节记忆) ==========
 
     async def save_episodic_memory(
@@ -476,7 +1203,7 @@ class MemoryManager:
         if agent_type:
             entry.tags.append(f"agent:{agent_type}")
 
-        await self._save_entry(entry, self.episodic_dir)
+        await self._save_entry(entry)
 
         logger.info(f"保存情节记忆: {memory_id}")
         return memory_id
@@ -509,32 +1236,175 @@ class MemoryManager:
 
     async def get_episodic_memories(
         self,
-        limit: int = 10
+        limit: int = 10,
+        include_archived: bool = False
     ) -> List[Dict[str, Any]]:
-        """获取最近的情节记忆"""
+        """获取最近的情节记忆
+
+        Args:
+            limit: 返回数量
+            include_archived: 热数据不足 limit 条时, 是否从冷归档补齐
+        """
         MetricsManager.record_memory_op("episodic", "query", "start")
+        await self._refresh_index()
         memories = []
         recent_ids = self.index.get("episodic", [])[-limit:]
 
         self._clean_expired_cache()
 
-        for memory_id in reversed(recent_ids):
-            # 尝试从缓存获取
-            cached_entry = self._get_from_cache("episodic", memory_id)
-            if cached_entry:
-                memories.append(cached_entry)
-                continue
+        memories.extend(await self._load_entries("episodic", list(reversed(recent_ids))))
+        if include_archived and len(memories) < limit:
+            hot_ids = {m["memory_id"] for m in memories}
+            archived = await self.query_episodic_archive(limit=limit)
+            memories.extend(m for m in archived if m["memory_id"] not in hot_ids)
+            memories = memories[:limit]
+        return memories
 
-            file_path = self.episodic_dir / f"{memory_id}.json"
-            if file_path.exists():
-                async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                    content = await f.read()
-                    entry = json.loads(content)
-                    memories.append(entry)
-                    # 保存到缓存
-                    self._save_to_cache("episodic", memory_id, entry)
+    # ========== 分层保留 (情节记忆冷归档) ==========
 
-        return memories
+    def configure_retention(
+        self,
+        max_age_days: Optional[float] = None,
+        max_hot_entries: Optional[int] = None,
+        interval: Optional[float] = None
+    ) -> None:
+        """配置情节记忆的保留策略
+
+        Args:
+            max_age_days: 超过该天数的情节记忆移入归档
+            max_hot_entries: 热存储最多保留的情节记忆条数, 超出部分从最旧的开始归档
+            interval: 后台归档任务的运行间隔 (秒)
+        """
+        if max_age_days is not None:
+            self._retention_max_age_days = max_age_days
+        if max_hot_entries is not None:
+            self._retention_max_hot_entries = max(0, max_hot_entries)
+        if interval is not None:
+            self._retention_interval = interval
+
+    def start_retention(self) -> None:
+        """在当前事件循环中启动后台归档任务 (重复调用无副作用)"""
+        if self._retention_task is None or self._retention_task.done():
+            self._retention_task = asyncio.get_running_loop().create_task(self._retention_loop())
+
+    async def stop_retention(self) -> None:
+        """停止后台归档任务"""
+        task, self._retention_task = self._retention_task, None
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _retention_loop(self) -> None:
+        """后台归档循环: 每个间隔运行一次, 失败只记录日志"""
+        while True:
+            try:
+                await self.archive_episodic()
+                # 归档删除的条目在追加写的后端中只留下墓碑, 按死字节占比回收空间
+                await self._storage.compact()
+            except (OSError, MemorySystemError) as e:
+                logger.error(f"情节记忆归档失败: {e}")
+            except Exception as e:
+                # 非预期异常也不能终止后台任务, 下个间隔重试
+                logger.exception(f"情节记忆归档失败 - 未知错误 ({type(e).__name__}): {e}")
+            await asyncio.sleep(self._retention_interval)
+
+    async def archive_episodic(self) -> int:
+        """将超龄或超出热存储上限的情节记忆移入冷归档
+
+        从最旧的条目开始分批处理: 先写归档, 再删除热数据并提交索引。
+        其他进程正在归档时直接返回。保存不受影响 (只在更新内存索引时短暂持有锁)。
+
+        Returns:
+            本次归档的条目数
+        """
+        if not self._archive.lock.try_acquire():
+            logger.debug("其他进程正在归档情节记忆, 跳过")
+            return 0
+
+        archived = 0
+        batch_size = MemoryConfig.RETENTION_BATCH_SIZE.value
+        try:
+            while True:
+                await self._refresh_index()
+                cutoff = (datetime.now() - timedelta(days=self._retention_max_age_days)).strftime(
+                    '%Y-%m-%d %H:%M:%S'
+                )
+                async with self._lock:
+                    hot_ids = self.index.get("episodic", [])
+                    overflow = len(hot_ids) - self._retention_max_hot_entries
+                    candidates = hot_ids[:batch_size]
+                if not candidates:
+                    break
+
+                # 尚未落盘的写回条目不归档 (它们也是最新的条目)
+                candidates = [mid for mid in candidates if mid not in self._pending_entries]
+                loaded = await self._storage.read_many("episodic", candidates)
+
+                # 索引按保存顺序排列: 遇到第一个既未超龄又未超出上限的条目即停止
+                selected: List[str] = []
+                entries: List[Dict[str, Any]] = []
+                for memory_id, entry in zip(candidates, loaded):
+                    if entry is not None and len(selected) >= overflow and entry["timestamp"] >= cutoff:
+                        break
+                    selected.append(memory_id)
+                    if entry is not None:
+                        entries.append(entry)
+                if not selected:
+                    break
+
+                await asyncio.to_thread(self._archive.append_sync, entries)
+                for memory_id in selected:
+                    await self._storage.delete("episodic", memory_id)
+                await self._remove_from_index("episodic", selected)
+                await self._save_index(force=True)
+                archived += len(entries)
+
+                if len(selected) < len(candidates) or len(candidates) < batch_size:
+                    break
+        finally:
+            self._archive.lock.release()
+
+        if archived:
+            MetricsManager.update_memory_size("episodic", len(self.index["episodic"]))
+            logger.info(f"已归档 {archived} 条情节记忆")
+        return archived
+
+    async def _remove_from_index(self, memory_type: str, memory_ids: List[str]) -> None:
+        """从内存索引移除条目, 并记为待提交的移除 (下次 _save_index 时提交)"""
+        drop = set(memory_ids)
+        async with self._lock:
+            before = len(self.index[memory_type])
+            self.index[memory_type] = [mid for mid in self.index[memory_type] if mid not in drop]
+            self.index["total_count"] -= before - len(self.index[memory_type])
+            self._uncommitted[memory_type] = [
+                mid for mid in self._uncommitted[memory_type] if mid not in drop
+            ]
+            self._pending_removals[memory_type].update(drop)
+            self._forget_ids(memory_type, memory_ids)
+
+    async def query_episodic_archive(
+        self,
+        start: TimeBound = None,
+        end: TimeBound = None,
+        limit: Optional[int] = 100
+    ) -> List[Dict[str, Any]]:
+        """按时间范围查询已归档的情节记忆 (最新的在前)
+
+        Args:
+            start: 起始时间 (含), datetime 或 "YYYY-MM-DD HH:MM:SS"
+            end: 结束时间 (含)
+            limit: 最多返回条数, None 表示不限
+        """
+        MetricsManager.record_memory_op("episodic", "archive_query", "start")
+        try:
+            return await asyncio.to_thread(self._archive.query_sync, start, end, limit)
+        except (OSError, ValueError) as e:
+            logger.error(f"查询情节记忆归档失败: {e}")
+            raise MemorySystemError(f"查询情节记忆归档失败: {str(e)}")
 
     # ========== Semantic Memory (语义记忆) ==========
 
@@ -563,7 +1433,7 @@ class MemoryManager:
             tags=["semantic", category] + (tags or [])
         )
 
-        await self._save_entry(entry, self.semantic_dir)
+        await self._save_entry(entry)
 
         # 更新CONTINUITY.md
         await self._append_to_continuity("semantic", knowledge, category)
@@ -574,48 +1444,86 @@ class MemoryManager:
     async def query_semantic_memory(
         self,
         category: Optional[str] = None,
-        keywords: Optional[List[str]] = None
+        keywords: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        tags: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
-        """查询语义记忆 (利用索引优化版)"""
-        MetricsManager.record_memory_op("semantic", "query", "start")
+        """查询语义记忆 (利用索引优化版)
+
+        Args:
+            category: 类别过滤
+            keywords: 关键词 (任一命中即可)
+            limit: 返回条数上限, None 表示不限
+            offset: 分页偏移
+            tags: 标签过滤 (需全部命中)
+        """
+        return await self._query_memories("semantic", category, keywords, limit, offset, tags)
+
+    async def _query_memories(
+        self,
+        memory_type: str,
+        category: Optional[str],
+        keywords: Optional[List[str]],
+        limit: Optional[int],
+        offset: int,
+        tags: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """语义/程序记忆的通用查询 (支持检索的后端在库内完成过滤、排序和分页)"""
+        MetricsManager.record_memory_op(memory_type, "query", "start")
+
+        if self._storage.supports_search:
+            # 写回模式下尚未落盘的条目不在库中, 需要合并进检索结果
+            pending = {
+                mid: entry for mid, entry in self._pending_entries.items()
+                if entry.get("memory_type") == memory_type
+            }
+            search_limit, search_offset = limit, offset
+            if pending:
+                # 从头多取被替换的条目数, 合并后再分页
+                search_limit = None if limit is None else offset + limit + len(pending)
+                search_offset = 0
+            try:
+                memories = await self._storage.search(
+                    memory_type, keywords=keywords, category=category,
+                    limit=search_limit, offset=search_offset, tags=tags
+                )
+            except MemorySystemError as e:
+                logger.error(f"记忆检索失败: {e}")
+                MetricsManager.record_memory_op(memory_type, "query", "error")
+                return []
+            if pending:
+                memories = self._merge_pending(memories, pending, category, keywords, tags)
+                end = offset + limit if limit is not None else None
+                memories = memories[offset:end]
+            for entry in memories:
+                self._save_to_cache(memory_type, entry["memory_id"], entry)
+            return memories
+
         memories = []
+        await self._refresh_index()
+
+        if category or tags:
+            await self._ensure_postings()
 
         # 获取待查 memory_ids
         if category:
             # 如果指定了类别，直接从类别索引获取 ID
-            target_ids = self._category_index["semantic"].get(category, [])
+            target_ids = self._category_index[memory_type].get(category, [])
         else:
-            # 否则获取所有语义记忆 ID
-            target_ids = self.index.get("semantic", [])
+            # 否则获取所有该类型记忆 ID
+            target_ids = self.index.get(memory_type, [])
+
+        if tags:
+            # 标签过滤只需倒排表求交集, 无需读取条目
+            target_ids = self._filter_by_tags(
+                memory_type, tags, within=target_ids if category else None
+            )
 
         self._clean_expired_cache()
 
         # 批量加载和过滤
-        for memory_id in target_ids:
-            # 尝试从缓存获取
-            entry = self._get_from_cache("semantic", memory_id)
-
-            if not entry:
-                file_path = self.semantic_dir / f"{memory_id}.json"
-                if not file_path.exists():
-                    continue
-
-                try:
-                    async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                        content = await f.read()
-                        entry = json.loads(content)
-                        # 保存到缓存
-                        self._save_to_cache("semantic", memory_id, entry)
-                except (FileNotFoundError, json.JSONDecodeError, UnicodeDecodeError) as e:
-                    logger.error(f"加载记忆文件失败 (文件损坏或编码错误) {memory_id}: {e}")
-                    continue
-                except (OSError, IOError) as e:
-                    logger.error(f"加载记忆文件失败 (系统IO错误) {memory_id}: {e}")
-                    continue
-                except Exception as e:
-                    logger.error(f"加载记忆文件遇到非预期错误 ({type(e).__name__}) {memory_id}: {e}")
-                    continue
-
+        for entry in await self._load_entries(memory_type, list(target_ids)):
             # 关键词过滤
             if keywords:
                 content_text = entry.get("content", "").lower()
@@ -624,7 +1532,8 @@ class MemoryManager:
 
             memories.append(entry)
 
-        return memories
+        end = offset + limit if limit is not None else None
+        return memories[offset:end]
 
     # ========== Procedural Memory (程序记忆) ==========
 
@@ -658,7 +1567,7 @@ class MemoryManager:
         if agent_type:
             entry.tags.append(f"agent:{agent_type}")
 
-        await self._save_entry(entry, self.procedural_dir)
+        await self._save_entry(entry)
 
         # 更新CONTINUITY.md
         await self._append_to_continuity("procedural", practice, category)
@@ -666,109 +1575,206 @@ class MemoryManager:
         logger.info(f"保存程序记忆: {memory_id} (分类: {category})")
         return memory_id
 
-    async def _append_to_continuity(
+    def _merge_pending(
+        self,
+        memories: List[Dict[str, Any]],
+        pending: Dict[str, Dict[str, Any]],
+        category: Optional[str],
+        keywords: Optional[List[str]],
+        tags: Optional[List[str]]
+    ) -> List[Dict[str, Any]]:
+        """将未落盘的条目合并进后端检索结果 (按后端 search() 的规则过滤)
+
+        库中已有的条目被未落盘的新版本替换 (新版本不再匹配时移除), 其余未落盘条目按写入顺序追加。
+        """
+        def matches(entry: Dict[str, Any]) -> bool:
+            return self._storage.matches(entry, keywords=keywords, category=category, tags=tags)
+
+        merged = []
+        for entry in memories:
+            newer = pending.get(entry["memory_id"])
+            if newer is None:
+                merged.append(entry)
+            elif matches(newer):
+                merged.append(newer)
+        seen = {entry["memory_id"] for entry in memories}
+        merged.extend(entry for mid, entry in pending.items() if mid not in seen and matches(entry))
+        return merged
+
+    def _filter_by_tags(
         self,
         memory_type: str,
-        content: str,
-        category: str
-    ) -> None:
-        """异步更新 CONTINUITY.md (优化版：IO 与内存操作分离)"""
-        try:
-            # 1. 读取当前内容 (IO 占 IO 锁)
-            async with self._io_lock:
-                if self._continuity_cache is None:
-                    if self.continuity_file.exists():
-                        async with aiofiles.open(self.continuity_file, 'r', encoding='utf-8') as f:
-                            full_content = await f.read()
-                    else:
-                        full_content = "# SuperAgent v3.2 - 持续记忆 (CONTINUITY)\n\n"
-                else:
-                    full_content = self._continuity_cache
-
-            # 2. 在内存中处理内容 (不占锁，因为是局部变量)
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            new_entry = f"\n- [{timestamp}] **{category}**: {content}\n"
-
-            if category == "mistake" or "mistake" in content.lower():
-                section = SECTION_MISTAKES
-            elif memory_type == "procedural":
-                section = SECTION_PRACTICES
-            elif category == "architecture":
-                section = SECTION_ARCHITECTURE
-            else:
-                section = SECTION_MISTAKES
+        tags: List[str],
+        within: Optional[List[str]] = None
+    ) -> List[str]:
+        """按标签倒排表求交集 (保持写入顺序)
 
-            if section and section in full_content:
-                parts = full_content.split(section)
-                full_content = parts[0] + section + new_entry + parts[1]
+        Args:
+            memory_type: 记忆类型
+            tags: 需全部命中的标签
+            within: 额外限定的候选 ID (如类别过滤结果)
+        """
+        postings = [self._tag_index[memory_type].get(tag, []) for tag in tags]
+        if within is not None:
+            postings.append(within)
+        shortest = min(postings, key=len)
+        required = [set(p) for p in postings if p is not shortest]
+        return [mid for mid in shortest if all(mid in s for s in required)]
+
+    async def query_procedural_memory(
+        self,
+        category: Optional[str] = None,
+        keywords: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        tags: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """查询程序记忆 (参数同 query_semantic_memory)"""
+        return await self._query_memories("procedural", category, keywords, limit, offset, tags)
+
+    async def _ensure_similarity(self) -> None:
+        """首次相似检索前, 从存储批量读取已有记忆构建 MinHash 索引
 
-            # 更新统计信息
+        按索引快照读取存储并在线程池中计算签名, 不占状态锁 (构建期间保存照常进行);
+        构建期间新增/更新的条目先暂存, 安装时覆盖快照中的旧签名, 期间删除的条目不加入。
+        """
+        if not self._similarity_stale:
+            return
+        async with self._similarity_build_lock:
+            if not self._similarity_stale:
+                return
             async with self._lock:
-                stats = {
-                    "total": self.index.get("total_count", 0),
-                    "episodic": len(self.index.get("episodic", [])),
-                    "semantic": len(self.index.get("semantic", [])),
-                    "procedural": len(self.index.get("procedural", [])),
-                }
-
-            # 3. 更新统计部分内容 (字符串操作)
-            stat_content = f"""## 📊 项目统计
-
-- **总记忆条目**: {stats['total']}
-- **情节记忆**: {stats['episodic']}
-- **语义记忆**: {stats['semantic']}
-- **程序记忆**: {stats['procedural']}
-- **最后更新**: {timestamp}
-"""
-            if SECTION_STATISTICS in full_content:
-                full_content = full_content.split(SECTION_STATISTICS)[0] + stat_content
+                snapshot = {mtype: list(self.index.get(mtype, [])) for mtype in MEMORY_TYPES}
+                pending = dict(self._pending_entries)
+                self._similarity_building = True
+                self._similarity_backlog = {}
 
-            # 4. 写入文件 (IO 占 IO 锁)
-            async with self._io_lock:
-                async with aiofiles.open(self.continuity_file, 'w', encoding='utf-8') as f:
-                    await f.write(full_content)
-                self._continuity_cache = full_content
+            try:
+                items: List[Tuple[Tuple[str, str], str]] = []
+                batch_size = MemoryConfig.BATCH_SIZE.value
+                for memory_type, ids in snapshot.items():
+                    for i in range(0, len(ids), batch_size):
+                        batch = ids[i:i + batch_size]
+                        for memory_id, entry in zip(batch, await self._storage.read_many(memory_type, batch)):
+                            entry = pending.get(memory_id, entry)
+                            if entry:
+                                items.append(((memory_type, memory_id), entry.get("content", "")))
+
+                signature = self._similarity.signature
+                signatures = await asyncio.to_thread(lambda: [(key, signature(text)) for key, text in items])
 
-        except (OSError, IOError) as e:
-            logger.error(f"更新 CONTINUITY.md 失败 (IO错误): {e}")
-        except Exception as e:
-            logger.error(f"更新 CONTINUITY.md 失败 (未知错误 - {type(e).__name__}): {e}")
+                async with self._lock:
+                    present = {mtype: set(self.index.get(mtype, [])) for mtype in MEMORY_TYPES}
+                    for key, sig in signatures:
+                        if key[1] in present[key[0]] and key not in self._similarity_backlog:
+                            self._similarity.add_signature(key, sig)
+                    for key, sig in self._similarity_backlog.items():
+                        self._similarity.add_signature(key, sig)
+                    self._similarity_stale = False
+            finally:
+                self._similarity_building = False
+                self._similarity_backlog = {}
+            logger.info(f"相似度索引构建完成: {len(self._similarity)} 条")
+
+    async def find_similar(
+        self,
+        text: str,
+        memory_types: Optional[List[str]] = None,
+        limit: int = 5,
+        min_similarity: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """按内容相似度检索记忆 (MinHash LSH 近邻, 无需全量扫描)
 
-    # ========== 综合查询 ==========
+        Args:
+            text: 查询文本
+            memory_types: 限定的记忆类型 (None 表示全部)
+            limit: 返回数量
+            min_similarity: 最低相似度 (Jaccard 估计值, 0~1)
 
-    async def query_relevant_memory(
+        Returns:
+            记忆条目列表 (附带 similarity 字段), 按相似度降序
+        """
+        await self._refresh_index()
+        await self._ensure_similarity()
+        types = set(memory_types) if memory_types else None
+        sig = await asyncio.to_thread(self._similarity.signature, text)
+        hits = self._similarity.query_signature(
+            sig, k=limit, min_similarity=min_similarity,
+            accept=(lambda key: key[0] in types) if types else None
+        )
+
+        results: List[Dict[str, Any]] = []
+        for (memory_type, memory_id), score in hits:
+            loaded = await self._load_entries(memory_type, [memory_id])
+            if loaded:
+                results.append({**loaded[0], "similarity": round(score, 3)})
+        return results
+
+    async def get_procedural_memories(
         self,
-        task: str,
-        agent_type: Optional[str] = None
-    ) -> Dict[str, List[str]]:
-        """查询相关记忆,避免重复错误"""
-        relevant = {
-            "mistakes": [],
-            "best_practices": [],
-            "architecture_decisions": []
-        }
+        category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """获取程序记忆 (CLI 使用)"""
+        return await self.query_procedural_memory(category=category)
+
+    async def _append_to_continuity(
+        self,
+        memory_type: str,
+        content: str,
+        category: str,
+        details: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """追加一条 CONTINUITY 记录 (写回模式下随下一次批量落盘一起写入)"""
+        if self._write_behind:
+            self._pending_continuity.append((memory_type, content, category, details))
+            self._schedule_flush()
+            return
+        await self._write_continuity([(memory_type, content, category, details)])
+
+    async def _write_continuity(
+        self,
+        items: List[Tuple[str, str, str, Optional[Dict[str, Any]]]]
+    ) -> None:
+        """将记录追加到段落日志, CONTINUITY.md 由 ContinuityStore 延迟渲染
 
+        Args:
+            items: (memory_type, content, category, details) 列表, 按保存顺序
+        """
         try:
-            async with aiofiles.open(self.continuity_file, 'r', encoding='utf-8') as f:
-                continuity = await f.read()
+            await self._continuity.append_many(items)
+        except (OSError, IOError) as e:
+            logger.error(f"更新 CONTINUITY 失败 (IO错误): {e}")
 
-            if "## 📝 错误与教训" in continuity:
-                relevant["mistakes"].append("查看 .superagent/memory/CONTINUITY.md")
+    def _continuity_stats(self) -> Dict[str, int]:
+        """CONTINUITY.md 统计段使用的计数"""
+        return {
+            "total": self.index.get("total_count", 0),
+            "episodic": len(self.index.get("episodic", [])),
+            "semantic": len(self.index.get("semantic", [])),
+            "procedural": len(self.index.get("procedural", [])),
+        }
 
-            if "## 🎯 最佳实践" in continuity:
-                relevant["best_practices"].append("查看 .superagent/memory/CONTINUITY.md")
+    # ========== 综合查询 ==========
 
-            if "## 🏗️ 架构决策" in continuity:
-                relevant["architecture_decisions"].append("查看 .superagent/memory/CONTINUITY.md")
+    async def query_relevant_memory(
+        self,
+        task: str,
+        agent_type: Optional[str] = None,
+        limit: int = 5
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """查询相关记忆,避免重复错误
 
-        except (FileNotFoundError, UnicodeDecodeError) as e:
-            logger.error(f"查询相关记忆失败 (文件缺失或编码错误): {e}")
-        except (OSError, IOError) as e:
-            logger.error(f"查询相关记忆失败 (系统IO错误): {e}")
-        except Exception as e:
-            logger.error(f"查询相关记忆遇到非预期错误 ({type(e).__name__}): {e}")
+        Args:
+            task: 任务描述
+            agent_type: Agent 类型
+            limit: 每个段落返回的条目数
 
-        return relevant
+        Returns:
+            {"mistakes": [...], "best_practices": [...], "architecture_decisions": [...]},
+            每段 limit 条记录: 先按与任务的相似度 (附带 similarity 字段), 不足时以最新记录补齐
+        """
+        await self._continuity.ensure_similarity()
+        return {section: self._continuity.relevant(section, task, limit) for section in SECTIONS}
 
     async def save_mistake(
         self,
@@ -800,7 +1806,12 @@ class MemoryManager:
 
         # 2. 委托更新 CONTINUITY.md
         summary = f"错误: {error_name} | 上下文: {context} | 方案: {fix}"
-        await self._append_to_continuity("episodic", summary, "mistake")
+        await self._append_to_continuity("episodic", summary, "mistake", {
+            "error_type": error_name,
+            "context": context,
+            "fix": fix,
+            "learning": learning,
+        })
 
         logger.info(f"保存错误教训: {error_name}")
 
@@ -810,30 +1821,37 @@ class MemoryManager:
         """获取记忆统计信息 (v3.3 优化：包含缓存命中率)"""
         idx = self.index
 
-        # v3.3 计算缓存命中率
-        total_access = sum(
-            sum(entry[1] for entry in cache.values()) + len(cache)
-            for cache in self._cache.values()
-        )
-        cache_hits = sum(
-            sum(entry[1] for entry in cache.values())
-            for cache in self._cache.values()
-        )
-        cache_hit_rate = (cache_hits / total_access * 100) if total_access > 0 else 0
+        cache_stats = self._cache.stats()
+
+        categories: Dict[str, int] = {}
+        for postings in self._category_index.values():
+            for category, ids in postings.items():
+                categories[category] = categories.get(category, 0) + len(ids)
+        tags: Dict[str, int] = {}
+        for postings in self._tag_index.values():
+            for tag, ids in postings.items():
+                tags[tag] = tags.get(tag, 0) + len(ids)
 
         return {
             "total_memories": idx.get("total_count", 0),
             "episodic_count": len(idx.get("episodic", [])),
             "semantic_count": len(idx.get("semantic", [])),
             "procedural_count": len(idx.get("procedural", [])),
+            "archived_episodic_count": self._archive.count(),
+            "categories": categories,
+            "tags": tags,
             "memory_dir": str(self.memory_dir),
-            "cache_size": {t: len(c) for t, c in self._cache.items()},
-            "cache_hit_rate": round(cache_hit_rate, 2),
+            "cache_size": cache_stats["entries"],
+            "cache_bytes": cache_stats["total_bytes"],
+            "cache_hit_rate": cache_stats["hit_rate"],
             "index_ready": not self._index_building
         }
 
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取查询缓存统计 (条目数、字节数、命中/未命中/淘汰/过期计数)"""
+        return self._cache.stats()
+
     def clear_cache(self) -> None:
         """清除所有查询缓存 (v3.3)"""
-        for cache_type in self._cache:
-            self._cache[cache_type].clear()
+        self._cache.clear()
         logger.info("记忆查询缓存已清除")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+情节记忆分层保留 (冷归档)
+
+较旧的情节记忆从热存储移入按月分区的 gzip 归档 (archive/episodic/YYYY-MM.jsonl.gz):
+- 每次归档向分区文件追加一个独立的 gzip member, 已写入的数据不再改写
+- 稀疏时间索引 (index.json) 记录每个 member 的偏移、长度、条数和时间范围,
+  查询时只解压与时间范围重叠的 member
+- 归档先写归档文件再删除热数据; 中途崩溃时条目可能被归档两次, 查询按 memory_id 去重
+
+多个进程共享同一目录时, 同一时刻只有持有 archive/episodic/LOCK 的进程执行归档。
+"""
+
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .interprocess import InterProcessLock
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+TimeBound = Union[str, datetime, None]
+
+
+def _normalize_bound(value: TimeBound) -> Optional[str]:
+    """时间边界统一为与条目 timestamp 相同格式的字符串 (可直接按字典序比较)"""
+    if isinstance(value, datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    return value
+
+
+class EpisodicArchive:
+    """按月分区的情节记忆冷归档"""
+
+    def __init__(self, archive_dir: Path) -> None:
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.archive_dir / "index.json"
+        self.lock = InterProcessLock(self.archive_dir / "LOCK")
+
+        # 分区 -> member 列表; 按索引文件的 stat 签名判断是否需要重新读取
+        self._index: Dict[str, List[Dict[str, Any]]] = {}
+        self._index_signature: Optional[Tuple[int, int, int]] = None
+
+    def _partition_path(self, partition: str) -> Path:
+        return self.archive_dir / f"{partition}.jsonl.gz"
+
+    def _load_index(self) -> Dict[str, List[Dict[str, Any]]]:
+        """读取稀疏时间索引 (未变化时直接返回内存副本)"""
+        try:
+            st = os.stat(self.index_file)
+        except FileNotFoundError:
+            self._index, self._index_signature = {}, None
+            return self._index
+
+        signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if signature != self._index_signature:
+            try:
+                self._index = json.loads(self.index_file.read_text(encoding='utf-8'))
+            except (json.JSONDecodeError, OSError) as e:
+                logger.error(f"读取归档索引失败: {e}")
+                self._index = {}
+            self._index_signature = signature
+        return self._index
+
+    def count(self) -> int:
+        """已归档条目数 (崩溃重试导致的重复条目会被重复计数)"""
+        return sum(member["count"] for members in self._load_index().values() for member in members)
+
+    def append_sync(self, entries: List[Dict[str, Any]]) -> int:
+        """将条目追加到各自的月份分区 (调用方持有 self.lock)
+
+        Returns:
+            写入的条目数
+        """
+        partitions: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            partitions.setdefault(entry["timestamp"][:7], []).append(entry)
+        if not partitions:
+            return 0
+
+        index = {partition: list(members) for partition, members in self._load_index().items()}
+        for partition, items in sorted(partitions.items()):
+            items.sort(key=lambda e: e["timestamp"])
+            data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in items).encode('utf-8')
+            member = gzip.compress(data)
+            with open(self._partition_path(partition), 'ab') as f:
+                offset = f.tell()
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+            index.setdefault(partition, []).append({
+                "offset": offset,
+                "length": len(member),
+                "count": len(items),
+                "first_ts": items[0]["timestamp"],
+                "last_ts": items[-1]["timestamp"],
+            })
+
+        # 索引最后原子替换: 之前崩溃只会在分区末尾留下未被引用的字节
+        temp_file = self.index_file.with_name(f"index.{os.getpid()}.tmp")
+        temp_file.write_text(json.dumps(index, ensure_ascii=False), encoding='utf-8')
+        temp_file.replace(self.index_file)
+        self._load_index()
+        return len(entries)
+
+    def query_sync(
+        self,
+        start: TimeBound = None,
+        end: TimeBound = None,
+        limit: Optional[int] = 100
+    ) -> List[Dict[str, Any]]:
+        """按时间范围查询归档条目, 最新的在前
+
+        Args:
+            start: 起始时间 (含), None 表示不限
+            end: 结束时间 (含), None 表示不限
+            limit: 最多返回条数, None 表示不限
+        """
+        start_ts, end_ts = _normalize_bound(start), _normalize_bound(end)
+        results: List[Dict[str, Any]] = []
+        seen = set()
+
+        # 分区之间时间不重叠: 从最新的分区开始, 凑够 limit 即可停止
+        for partition, members in sorted(self._load_index().items(), reverse=True):
+            if start_ts is not None and partition < start_ts[:7]:
+                break
+            if end_ts is not None and partition > end_ts[:7]:
+                continue
+
+            matched: List[Dict[str, Any]] = []
+            with open(self._partition_path(partition), 'rb') as f:
+                for member in members:
+                    if start_ts is not None and member["last_ts"] < start_ts:
+                        continue
+                    if end_ts is not None and member["first_ts"] > end_ts:
+                        continue
+                    f.seek(member["offset"])
+                    data = gzip.decompress(f.read(member["length"]))
+                    for line in data.decode('utf-8').splitlines():
+                        entry = json.loads(line)
+                        ts = entry["timestamp"]
+                        if start_ts is not None and ts < start_ts:
+                            continue
+                        if end_ts is not None and ts > end_ts:
+                            continue
+                        if entry["memory_id"] not in seen:
+                            seen.add(entry["memory_id"])
+                            matched.append(entry)
+
+            matched.sort(key=lambda e: e["timestamp"], reverse=True)
+            results.extend(matched)
+            if limit is not None and len(results) >= limit:
+                return results[:limit]
+        return results
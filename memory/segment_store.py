@@ -0,0 +1,419 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+追加写分段日志存储
+
+所有记忆条目以记录的形式追加到分段文件 (00000001.seg, 00000002.seg, ...),
+内存中维护 memory_id -> (段号, 偏移, 长度) 的偏移索引:
+- 写入为 O(1) 追加, 活动段超过阈值时滚动到新段
+- 读取按偏移直接定位, 无需每条记忆一个文件
+- 启动时扫描段文件重建索引; 末尾段中被截断或校验失败的记录会被截掉 (崩溃恢复)
+- 覆盖和删除只追加新记录, 旧记录成为死字节; 死字节占比超过阈值时 compact() 把存活记录
+  按写入顺序重写到一个新段并删除旧段 (由 MemoryManager 的后台归档任务调用)
+
+记录格式 (大端):
+    flags(1) | type(1) | id_len(2) | payload_len(4) | crc32(4) | memory_id | payload
+crc32 覆盖 memory_id + payload; flags=1 表示删除墓碑 (payload 为空)。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from common.exceptions import MemorySystemError
+from .interprocess import InterProcessLock
+from .storage import MemoryStorageBackend, MEMORY_TYPES
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">BBHII")
+_FLAG_PUT = 0
+_FLAG_DELETE = 1
+_TYPE_CODES = {mtype: code for code, mtype in enumerate(MEMORY_TYPES)}
+_SEGMENT_SUFFIX = ".seg"
+
+DEFAULT_MAX_SEGMENT_BYTES = 16 * 1024 * 1024  # 16MB
+DEFAULT_COMPACT_MIN_DEAD_RATIO = 0.5  # 死字节占比达到该值时压缩
+
+# 压缩过程文件: 先写临时段, 再写标记 (内容为目标段号), 标记存在即表示临时段已完整
+_COMPACT_TMP = "compact.tmp"
+_COMPACT_MARKER = "COMPACT"
+
+
+class SegmentLogStorage(MemoryStorageBackend):
+    """追加写分段日志存储后端"""
+
+    name = "segment"
+    multi_process = False
+    maintains_index = True
+
+    def __init__(
+        self,
+        segment_dir: Path,
+        max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+        fsync: bool = False,
+        compact_min_dead_ratio: float = DEFAULT_COMPACT_MIN_DEAD_RATIO
+    ) -> None:
+        """初始化分段存储
+
+        Args:
+            segment_dir: 段文件目录
+            max_segment_bytes: 单个段的最大字节数, 超过后滚动
+            fsync: 每次追加后是否 fsync (更安全但更慢)
+            compact_min_dead_ratio: compact() 在死字节占总字节的比例达到该值时才执行
+        """
+        self.segment_dir = Path(segment_dir)
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync = fsync
+        self.compact_min_dead_ratio = compact_min_dead_ratio
+
+        # 偏移索引只存在于本进程内存中, 多进程同时追加会互相覆盖, 因此独占目录
+        self._process_lock = InterProcessLock(self.segment_dir / "LOCK")
+        if not self._process_lock.try_acquire():
+            self._process_lock.close()
+            raise MemorySystemError(
+                f"分段日志存储已被其他进程打开: {self.segment_dir} "
+                f"(多进程部署请使用 json 或 sqlite 后端)"
+            )
+
+        self._lock = threading.Lock()
+        # memory_id -> (segment_no, offset, record_length)
+        self._offsets: Dict[str, Tuple[int, int, int]] = {}
+        # 每种类型按写入顺序保存 ID (dict 保序且删除为 O(1))
+        self._order: Dict[str, Dict[str, None]] = {mtype: {} for mtype in MEMORY_TYPES}
+        self._readers: Dict[int, BinaryIO] = {}
+        # 段号 -> 段文件字节数 / 其中存活记录的字节数 (二者之差为可回收的死字节)
+        self._segment_bytes: Dict[int, int] = {}
+        self._live_bytes: Dict[int, int] = {}
+        self._active_no = 0
+        self._active_size = 0
+        self._active: Optional[BinaryIO] = None
+
+        self._recover()
+
+    # ========== 启动恢复 ==========
+
+    def _segment_path(self, segment_no: int) -> Path:
+        return self.segment_dir / f"{segment_no:08d}{_SEGMENT_SUFFIX}"
+
+    def _list_segments(self) -> List[int]:
+        numbers = []
+        for path in self.segment_dir.glob(f"*{_SEGMENT_SUFFIX}"):
+            try:
+                numbers.append(int(path.stem))
+            except ValueError:
+                logger.warning(f"忽略无法识别的段文件: {path.name}")
+        return sorted(numbers)
+
+    def _finish_compaction(self) -> None:
+        """完成中断的压缩: 有标记时临时段已完整写入, 用它替换目标段并删除更早的段"""
+        marker = self.segment_dir / _COMPACT_MARKER
+        tmp_path = self.segment_dir / _COMPACT_TMP
+        if not marker.exists():
+            tmp_path.unlink(missing_ok=True)  # 写临时段时中断, 旧段完好
+            return
+        target = int(marker.read_text(encoding='utf-8'))
+        if tmp_path.exists():
+            os.replace(tmp_path, self._segment_path(target))
+        for segment_no in self._list_segments():
+            if segment_no < target:
+                self._segment_path(segment_no).unlink()
+        marker.unlink()
+        logger.info(f"已完成中断的段压缩: {self._segment_path(target).name}")
+
+    def _recover(self) -> None:
+        """扫描所有段重建偏移索引, 并截断末尾段中的残缺记录"""
+        self._finish_compaction()
+        segments = self._list_segments()
+        for i, segment_no in enumerate(segments):
+            is_tail = i == len(segments) - 1
+            path = self._segment_path(segment_no)
+            valid_end = self._scan_segment(segment_no, path, verify=is_tail)
+            file_size = path.stat().st_size
+
+            if valid_end < file_size:
+                if is_tail:
+                    logger.warning(
+                        f"段 {path.name} 末尾存在残缺记录, 截断 {file_size - valid_end} 字节"
+                    )
+                    with open(path, 'r+b') as f:
+                        f.truncate(valid_end)
+                else:
+                    logger.error(
+                        f"段 {path.name} 在偏移 {valid_end} 处损坏, 之后的记录已忽略"
+                    )
+            self._segment_bytes[segment_no] = path.stat().st_size
+
+        self._active_no = segments[-1] if segments else 1
+        self._open_active()
+
+    def _scan_segment(self, segment_no: int, path: Path, verify: bool) -> int:
+        """扫描单个段, 返回最后一条有效记录的结束偏移
+
+        已封存的段只读取记录头和 ID 并跳过 payload; 末尾段需要校验 CRC。
+        """
+        offset = 0
+        file_size = path.stat().st_size
+        with open(path, 'rb') as f:
+            while offset + _HEADER.size <= file_size:
+                f.seek(offset)
+                header = f.read(_HEADER.size)
+                flags, type_code, id_len, payload_len, crc = _HEADER.unpack(header)
+                record_len = _HEADER.size + id_len + payload_len
+                if (flags not in (_FLAG_PUT, _FLAG_DELETE)
+                        or type_code >= len(MEMORY_TYPES)
+                        or offset + record_len > file_size):
+                    break
+
+                id_bytes = f.read(id_len)
+                if verify:
+                    payload = f.read(payload_len)
+                    if zlib.crc32(payload, zlib.crc32(id_bytes)) != crc:
+                        break
+
+                try:
+                    memory_id = id_bytes.decode('utf-8')
+                except UnicodeDecodeError:
+                    break
+
+                self._apply(memory_id, MEMORY_TYPES[type_code], flags,
+                            (segment_no, offset, record_len))
+                offset += record_len
+        return offset
+
+    def _apply(
+        self,
+        memory_id: str,
+        memory_type: str,
+        flags: int,
+        location: Tuple[int, int, int]
+    ) -> None:
+        """将一条记录应用到内存索引 (调用方持有锁或处于初始化阶段)"""
+        order = self._order[memory_type]
+        previous = self._offsets.pop(memory_id, None)
+        if previous is not None:
+            self._live_bytes[previous[0]] -= previous[2]
+        if flags == _FLAG_DELETE:
+            order.pop(memory_id, None)
+            return
+        self._offsets[memory_id] = location
+        self._live_bytes[location[0]] = self._live_bytes.get(location[0], 0) + location[2]
+        order[memory_id] = None
+
+    def _open_active(self) -> None:
+        path = self._segment_path(self._active_no)
+        self._active = open(path, 'ab')
+        self._active_size = self._active.tell()
+        self._segment_bytes[self._active_no] = self._active_size
+
+    def _rollover(self) -> None:
+        """封存活动段并打开新段"""
+        if self._active is not None:
+            self._active.close()
+        self._active_no += 1
+        self._open_active()
+        logger.debug(f"记忆段滚动: {self._segment_path(self._active_no).name}")
+
+    # ========== 同步读写 (在线程中执行) ==========
+
+    @staticmethod
+    def _encode(memory_id: str, memory_type: str, flags: int, payload: bytes) -> bytes:
+        if memory_type not in _TYPE_CODES:
+            raise MemorySystemError(f"不支持的记忆类型: {memory_type}")
+        id_bytes = memory_id.encode('utf-8')
+        crc = zlib.crc32(payload, zlib.crc32(id_bytes))
+        header = _HEADER.pack(flags, _TYPE_CODES[memory_type], len(id_bytes), len(payload), crc)
+        return header + id_bytes + payload
+
+    def _append_sync(self, records: List[Tuple[str, str, int, bytes]]) -> None:
+        """追加一批记录, 一次 flush"""
+        with self._lock:
+            if self._active is None:
+                raise MemorySystemError("分段存储已关闭")
+            for memory_id, memory_type, flags, payload in records:
+                data = self._encode(memory_id, memory_type, flags, payload)
+                if self._active_size > 0 and self._active_size + len(data) > self.max_segment_bytes:
+                    self._active.flush()
+                    self._rollover()
+                offset = self._active_size
+                self._active.write(data)
+                self._active_size += len(data)
+                self._segment_bytes[self._active_no] = self._active_size
+                self._apply(memory_id, memory_type, flags,
+                            (self._active_no, offset, len(data)))
+            self._active.flush()
+            if self.fsync:
+                os.fsync(self._active.fileno())
+
+    def _reader(self, segment_no: int) -> BinaryIO:
+        reader = self._readers.get(segment_no)
+        if reader is None:
+            reader = open(self._segment_path(segment_no), 'rb')
+            self._readers[segment_no] = reader
+        return reader
+
+    def _read_sync(self, memory_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        results: List[Optional[Dict[str, Any]]] = []
+        with self._lock:
+            for memory_id in memory_ids:
+                location = self._offsets.get(memory_id)
+                if location is None:
+                    results.append(None)
+                    continue
+                segment_no, offset, record_len = location
+                reader = self._reader(segment_no)
+                reader.seek(offset)
+                record = reader.read(record_len)
+                try:
+                    results.append(self._decode(memory_id, record))
+                except (MemorySystemError, json.JSONDecodeError, UnicodeDecodeError) as e:
+                    logger.error(f"加载记忆条目失败 (记录损坏) {memory_id}: {e}")
+                    results.append(None)
+        return results
+
+    @staticmethod
+    def _decode(memory_id: str, record: bytes) -> Dict[str, Any]:
+        _flags, _type, id_len, payload_len, crc = _HEADER.unpack_from(record)
+        start = _HEADER.size
+        id_bytes = record[start:start + id_len]
+        payload = record[start + id_len:start + id_len + payload_len]
+        if len(payload) != payload_len or zlib.crc32(payload, zlib.crc32(id_bytes)) != crc:
+            raise MemorySystemError(f"记忆记录校验失败: {memory_id}")
+        return json.loads(payload.decode('utf-8'))
+
+    def _compact_sync(self) -> int:
+        """把存活记录按写入顺序重写到一个新段, 删除旧段, 返回回收的字节数
+
+        先滚动活动段, 此后所有旧段都不再变化, 复制时不持锁 (写入进入新的活动段)。
+        复制期间被覆盖或删除的条目, 其新记录位于更新的段中, 回放时仍以新记录为准。
+        """
+        with self._lock:
+            if self._active is None:
+                raise MemorySystemError("分段存储已关闭")
+            total = sum(self._segment_bytes.values())
+            dead = total - sum(self._live_bytes.values())
+            if dead <= 0 or dead < total * self.compact_min_dead_ratio:
+                return 0
+            if self._active_size > 0:
+                self._active.flush()
+                self._rollover()
+            sealed = sorted(no for no in self._segment_bytes if no < self._active_no)
+            if not sealed:
+                return 0
+            target = sealed[-1]
+            live = [
+                (memory_id, self._offsets[memory_id])
+                for mtype in MEMORY_TYPES for memory_id in self._order[mtype]
+                if self._offsets[memory_id][0] < self._active_no
+            ]
+
+        tmp_path = self.segment_dir / _COMPACT_TMP
+        moved: List[Tuple[str, Tuple[int, int, int], Tuple[int, int, int]]] = []
+        sources: Dict[int, BinaryIO] = {}
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as out:
+                for memory_id, (segment_no, offset, length) in live:
+                    source = sources.get(segment_no)
+                    if source is None:
+                        source = sources[segment_no] = open(self._segment_path(segment_no), 'rb')
+                    source.seek(offset)
+                    out.write(source.read(length))  # 原样复制, 校验值不变
+                    moved.append((memory_id, (segment_no, offset, length), (target, size, length)))
+                    size += length
+                out.flush()
+                os.fsync(out.fileno())
+        finally:
+            for source in sources.values():
+                source.close()
+
+        with self._lock:
+            marker_tmp = self.segment_dir / f"{_COMPACT_MARKER}.tmp"
+            with open(marker_tmp, 'w', encoding='utf-8') as f:
+                f.write(str(target))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(marker_tmp, self.segment_dir / _COMPACT_MARKER)
+
+            for segment_no in sealed:
+                reader = self._readers.pop(segment_no, None)
+                if reader is not None:
+                    reader.close()
+            reclaimed = sum(self._segment_bytes.pop(no) for no in sealed) - size
+            for segment_no in sealed:
+                self._live_bytes.pop(segment_no, None)
+            self._finish_compaction()
+
+            # 复制期间未变化的条目指向新段中的位置
+            self._segment_bytes[target] = size
+            self._live_bytes[target] = 0
+            for memory_id, old, new in moved:
+                if self._offsets.get(memory_id) == old:
+                    self._offsets[memory_id] = new
+                    self._live_bytes[target] += new[2]
+
+        logger.info(f"记忆段压缩完成: {len(sealed)} 个段 -> {self._segment_path(target).name}, "
+                    f"回收 {reclaimed} 字节")
+        return reclaimed
+
+    # ========== 异步接口 ==========
+
+    async def write(self, entry: Dict[str, Any]) -> None:
+        await self.write_many([entry])
+
+    async def write_many(self, entries: List[Dict[str, Any]]) -> None:
+        """批量追加 (一次加锁, 一次 flush)"""
+        records = [
+            (e["memory_id"], e["memory_type"], _FLAG_PUT,
+             json.dumps(e, ensure_ascii=False).encode('utf-8'))
+            for e in entries
+        ]
+        await asyncio.to_thread(self._append_sync, records)
+
+    async def read(self, memory_type: str, memory_id: str) -> Optional[Dict[str, Any]]:
+        return (await self.read_many(memory_type, [memory_id]))[0]
+
+    async def read_many(
+        self,
+        memory_type: str,
+        memory_ids: List[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        return await asyncio.to_thread(self._read_sync, list(memory_ids))
+
+    async def delete(self, memory_type: str, memory_id: str) -> bool:
+        with self._lock:
+            exists = memory_id in self._offsets
+        if exists:
+            await asyncio.to_thread(
+                self._append_sync, [(memory_id, memory_type, _FLAG_DELETE, b"")]
+            )
+        return exists
+
+    async def compact(self) -> int:
+        """死字节占比达到 compact_min_dead_ratio 时压缩段文件, 返回回收的字节数"""
+        return await asyncio.to_thread(self._compact_sync)
+
+    def list_ids(self, memory_type: str) -> List[str]:
+        with self._lock:
+            return list(self._order.get(memory_type, {}))
+
+    def segment_count(self) -> int:
+        """当前段文件数量"""
+        return len(self._list_segments())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+            for reader in self._readers.values():
+                reader.close()
+            self._readers.clear()
+        self._process_lock.close()
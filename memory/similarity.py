@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+近似相似度索引 (MinHash + LSH)
+
+用于在记忆内容上做近邻检索, 无需全量扫描:
+- 分词 (shingle): 中文等 CJK 字符取相邻二元组, 英文/数字按单词小写,
+  适用于中英文混合文本
+- MinHash 签名 (one permutation hashing): 每个 shingle 只做一次 64 位哈希,
+  按哈希值分到 num_perm 个桶并保留各桶最小值, 空桶按固定的随机探测顺序借用第一个非空桶的值
+  (optimal densification);
+  计算量与 shingle 数成正比, 与签名长度无关
+- LSH 分桶: 签名切成 bands 段, 任一段完全相同即成为候选,
+  候选按签名一致比例 (Jaccard 估计值) 排序
+- 增量更新: add/remove 只影响该条目所在的桶
+- signature 是纯函数, 调用方可在线程池中计算后用 add_signature / query_signature 操作索引
+"""
+
+import hashlib
+import random
+import re
+import struct
+from collections import Counter
+from operator import eq
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+_MAX_HASH = (1 << 32) - 1
+_EMPTY = 1 << 64
+# 精排的候选数 = k * _RERANK_FACTOR
+_RERANK_FACTOR = 4
+
+# CJK 统一表意文字、日文假名、韩文
+_CJK = r"぀-ヿ㐀-䶿一-鿿가-힯"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[a-z0-9_]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+
+def shingles(text: str) -> Set[str]:
+    """将文本切分为 shingle 集合 (CJK 二元组 + 英文单词)"""
+    result: Set[str] = set()
+    for token in _TOKEN_RE.findall(text.lower()):
+        if _CJK_RE.match(token):
+            if len(token) == 1:
+                result.add(token)
+            else:
+                result.update(token[i:i + 2] for i in range(len(token) - 1))
+        elif len(token) > 1 or token.isdigit():
+            result.add(token)
+    return result
+
+
+def _hash_shingle(shingle: str) -> int:
+    return struct.unpack('<Q', hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest())[0]
+
+
+class MinHashLSH:
+    """MinHash 签名 + LSH 分桶的近邻索引"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 32, seed: int = 1) -> None:
+        """初始化
+
+        Args:
+            num_perm: 签名长度
+            bands: LSH 段数 (每段 num_perm // bands 行; 段越多召回越高)
+            seed: 哈希混合值与探测顺序的随机种子 (固定种子保证签名跨进程一致)
+        """
+        if num_perm % bands != 0:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = random.Random(seed)
+        self._seed_mix = rng.getrandbits(64)
+        # 每个桶的探测顺序 (空桶依次尝试, 借用第一个非空桶); 所有文本共用, 保证签名可比
+        self._probes: List[List[int]] = [rng.sample(range(num_perm), num_perm) for _ in range(num_perm)]
+        self._signatures: Dict[Hashable, Tuple[int, ...]] = {}
+        self._buckets: List[Dict[Tuple[int, ...], Set[Hashable]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._signatures
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """计算文本的 MinHash 签名, 无有效 shingle 时返回 None"""
+        items = shingles(text)
+        if not items:
+            return None
+        n = self.num_perm
+        mix = self._seed_mix
+        bins = [_EMPTY] * n
+        for shingle in items:
+            value, b = divmod(_hash_shingle(shingle) ^ mix, n)
+            if value < bins[b]:
+                bins[b] = value
+        return self._densify(bins)
+
+    def _densify(self, bins: List[int]) -> Tuple[int, ...]:
+        """空桶按探测顺序借用第一个非空桶的值"""
+        sig = list(bins)
+        for i, value in enumerate(bins):
+            if value == _EMPTY:
+                sig[i] = next(bins[j] for j in self._probes[i] if bins[j] != _EMPTY)
+        return tuple(value & _MAX_HASH for value in sig)
+
+    def _band_keys(self, sig: Tuple[int, ...]) -> Iterable[Tuple[int, Tuple[int, ...]]]:
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, sig[band * rows:(band + 1) * rows]
+
+    def add(self, key: Hashable, text: str) -> None:
+        """加入或更新一条文本"""
+        self.add_signature(key, self.signature(text))
+
+    def add_signature(self, key: Hashable, sig: Optional[Tuple[int, ...]]) -> None:
+        """用预先计算的签名加入或更新一条文本 (None 表示无有效 shingle, 只移除旧条目)"""
+        self.remove(key)
+        if sig is None:
+            return
+        self._signatures[key] = sig
+        for band, band_key in self._band_keys(sig):
+            self._buckets[band].setdefault(band_key, set()).add(key)
+
+    def remove(self, key: Hashable) -> None:
+        """移除一条文本"""
+        sig = self._signatures.pop(key, None)
+        if sig is None:
+            return
+        for band, band_key in self._band_keys(sig):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+    def clear(self) -> None:
+        self._signatures.clear()
+        for buckets in self._buckets:
+            buckets.clear()
+
+    def query(
+        self,
+        text: str,
+        k: int = 5,
+        min_similarity: float = 0.0,
+        accept: Optional[Callable[[Hashable], bool]] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """返回与文本最相似的 k 个条目
+
+        Args:
+            text: 查询文本
+            k: 返回数量
+            min_similarity: 最低 Jaccard 估计值
+            accept: 候选过滤函数 (None 表示全部)
+
+        Returns:
+            [(key, 相似度估计)], 按相似度降序
+        """
+        return self.query_signature(self.signature(text), k, min_similarity, accept)
+
+    def query_signature(
+        self,
+        sig: Optional[Tuple[int, ...]],
+        k: int = 5,
+        min_similarity: float = 0.0,
+        accept: Optional[Callable[[Hashable], bool]] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """用预先计算的签名检索 (参数同 query)"""
+        if sig is None:
+            return []
+
+        # 命中段数与相似度正相关: 先按命中段数取前若干候选, 再用完整签名精排,
+        # 避免模板化文本 (大量条目互相碰撞) 时逐一比较全部候选
+        hits: Counter = Counter()
+        for band, band_key in self._band_keys(sig):
+            bucket = self._buckets[band].get(band_key)
+            if bucket:
+                hits.update(bucket)
+
+        if accept is not None:
+            hits = Counter({key: n for key, n in hits.items() if accept(key)})
+
+        scored = []
+        for key, _ in hits.most_common(k * _RERANK_FACTOR):
+            score = sum(map(eq, sig, self._signatures[key])) / self.num_perm
+            if score >= min_similarity:
+                scored.append((key, score))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:k]
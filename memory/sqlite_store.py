@@ -0,0 +1,450 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+SQLite/FTS5 记忆存储后端
+
+仅依赖标准库 sqlite3:
+- memories 表保存完整条目 JSON, 并按 (memory_type, category) 建索引
+- memories_fts (FTS5) 索引 content / tags / metadata.category, 支持 bm25 排序
+- 关键词查询、类别过滤和分页都在数据库内完成
+- 所有数据库操作由单个连接线程串行执行, 异步接口通过 Future 等待结果
+
+中文没有空格分词, 写入和查询时会把每个 CJK 字符拆成独立 token,
+查询词转为短语查询 ("架 构"*), 以保持原先子串匹配的效果。
+
+迁移已有的 .superagent/memory 目录:
+    python -m memory.sqlite_store .superagent/memory
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import logging
+import queue
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from common.exceptions import MemorySystemError
+from .storage import MemoryStorageBackend, MEMORY_TYPES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_NAME = "memory.db"
+
+_CJK_PATTERN = re.compile(r"([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af])")
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+_SQL_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    memory_id TEXT NOT NULL UNIQUE,
+    memory_type TEXT NOT NULL,
+    timestamp TEXT,
+    category TEXT,
+    content TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_memories_type_category ON memories(memory_type, category, seq);
+CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+    content, tags, category, tokenize = "unicode61 tokenchars '_'"
+);
+"""
+
+
+def _fts_text(text: str) -> str:
+    """把 CJK 字符拆成独立 token, 其余文本保持原样交给 unicode61 分词"""
+    return _CJK_PATTERN.sub(r" \1 ", text or "")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(_fts_text((text or "").lower()))
+
+
+def _keyword_phrases(keywords: List[str]) -> List[List[str]]:
+    """每个关键词的 token 序列 (没有可索引 token 的关键词被忽略)"""
+    return [tokens for tokens in map(_tokens, keywords) if tokens]
+
+
+def build_match_expression(keywords: List[str]) -> Optional[str]:
+    """将关键词列表转换为 FTS5 MATCH 表达式 (任一关键词命中即可)
+
+    Returns:
+        MATCH 表达式; 关键词中没有可索引的 token 时返回 None
+    """
+    phrases = ['"' + " ".join(tokens) + '"*' for tokens in _keyword_phrases(keywords)]
+    return " OR ".join(phrases) if phrases else None
+
+
+def _phrase_in(phrase: List[str], tokens: List[str]) -> bool:
+    """前缀短语 ("a b"*) 的匹配: 连续的 token 相同, 最后一个 token 按前缀匹配"""
+    n = len(phrase)
+    for i in range(len(tokens) - n + 1):
+        if tokens[i:i + n - 1] == phrase[:-1] and tokens[i + n - 1].startswith(phrase[-1]):
+            return True
+    return False
+
+
+def entry_matches(
+    entry: Dict[str, Any],
+    keywords: Optional[List[str]],
+    category: Optional[str],
+    tags: Optional[List[str]]
+) -> bool:
+    """条目是否满足 _search 的过滤条件 (在内存中判断尚未写入数据库的条目)
+
+    关键词与 FTS 索引一样在 content / tags / category 三列上按相同的分词规则匹配。
+    """
+    entry_category = (entry.get("metadata") or {}).get("category")
+    if category and entry_category != category:
+        return False
+    if tags and not set(tags) <= set(entry.get("tags") or []):
+        return False
+    if not keywords:
+        return True
+
+    phrases = _keyword_phrases(keywords)
+    if not phrases:
+        # 与 _search 相同: 关键词无法分词时退化为 content 子串匹配
+        content = (entry.get("content") or "").lower()
+        return any(kw.lower() in content for kw in keywords)
+    columns = [
+        _tokens(entry.get("content") or ""),
+        _tokens(" ".join(entry.get("tags") or [])),
+        _tokens(entry_category or ""),
+    ]
+    return any(_phrase_in(phrase, column) for phrase in phrases for column in columns)
+
+
+class _ConnectionThread(threading.Thread):
+    """持有唯一 sqlite3 连接的工作线程 (单写者)"""
+
+    def __init__(self, db_path: Path) -> None:
+        super().__init__(name="memory-sqlite", daemon=True)
+        self.db_path = db_path
+        self._queue: "queue.Queue[Optional[Tuple[Callable, tuple, concurrent.futures.Future]]]" = \
+            queue.Queue()
+        self._ready = threading.Event()
+        self._startup_error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        try:
+            conn = sqlite3.connect(str(self.db_path))
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            conn.commit()
+        except sqlite3.Error as e:
+            self._startup_error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            func, args, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = func(conn, *args)
+                conn.commit()
+                future.set_result(result)
+            except BaseException as e:  # 异常交给调用方处理
+                conn.rollback()
+                future.set_exception(e)
+        conn.close()
+
+    def wait_ready(self) -> None:
+        self._ready.wait()
+        if self._startup_error is not None:
+            raise MemorySystemError(
+                f"初始化 SQLite 记忆库失败 (可能缺少 FTS5 支持): {self._startup_error}"
+            )
+
+    def submit(self, func: Callable, *args: Any) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._queue.put((func, args, future))
+        return future
+
+    def stop(self) -> None:
+        self._queue.put(None)
+        self.join()
+
+
+# ========== 在连接线程中执行的 SQL 操作 ==========
+
+def _upsert(conn: sqlite3.Connection, entries: List[Dict[str, Any]]) -> None:
+    for entry in entries:
+        category = (entry.get("metadata") or {}).get("category")
+        content = entry.get("content", "")
+        conn.execute(
+            "INSERT INTO memories (memory_id, memory_type, timestamp, category, content, data) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(memory_id) DO UPDATE SET memory_type=excluded.memory_type, "
+            "timestamp=excluded.timestamp, category=excluded.category, "
+            "content=excluded.content, data=excluded.data",
+            (entry["memory_id"], entry["memory_type"], entry.get("timestamp"),
+             category, content, json.dumps(entry, ensure_ascii=False))
+        )
+        seq = conn.execute(
+            "SELECT seq FROM memories WHERE memory_id = ?", (entry["memory_id"],)
+        ).fetchone()[0]
+        conn.execute("DELETE FROM memories_fts WHERE rowid = ?", (seq,))
+        conn.execute(
+            "INSERT INTO memories_fts (rowid, content, tags, category) VALUES (?, ?, ?, ?)",
+            (seq, _fts_text(content), _fts_text(" ".join(entry.get("tags") or [])),
+             _fts_text(category or ""))
+        )
+
+
+def _select_many(conn: sqlite3.Connection, memory_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    found: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(memory_ids), _SQL_CHUNK):
+        chunk = memory_ids[i:i + _SQL_CHUNK]
+        placeholders = ",".join("?" * len(chunk))
+        for memory_id, data in conn.execute(
+            f"SELECT memory_id, data FROM memories WHERE memory_id IN ({placeholders})", chunk
+        ):
+            found[memory_id] = json.loads(data)
+    return found
+
+
+def _delete(conn: sqlite3.Connection, memory_id: str) -> bool:
+    row = conn.execute("SELECT seq FROM memories WHERE memory_id = ?", (memory_id,)).fetchone()
+    if row is None:
+        return False
+    conn.execute("DELETE FROM memories_fts WHERE rowid = ?", (row[0],))
+    conn.execute("DELETE FROM memories WHERE seq = ?", (row[0],))
+    return True
+
+
+def _list_ids(conn: sqlite3.Connection, memory_type: str) -> List[str]:
+    return [row[0] for row in conn.execute(
+        "SELECT memory_id FROM memories WHERE memory_type = ? ORDER BY seq", (memory_type,)
+    )]
+
+
+def _search(
+    conn: sqlite3.Connection,
+    memory_type: str,
+    keywords: Optional[List[str]],
+    category: Optional[str],
+    tags: Optional[List[str]],
+    limit: Optional[int],
+    offset: int
+) -> List[Dict[str, Any]]:
+    sql = "SELECT m.data FROM memories m"
+    where = ["m.memory_type = ?"]
+    params: List[Any] = [memory_type]
+    order = "m.seq"
+
+    if keywords:
+        match = build_match_expression(keywords)
+        if match is not None:
+            sql += " JOIN memories_fts ON memories_fts.rowid = m.seq"
+            where.append("memories_fts MATCH ?")
+            params.append(match)
+            # content 权重最高, 其次是标签和类别
+            order = "bm25(memories_fts, 10.0, 2.0, 1.0), m.seq"
+        else:
+            # 关键词全是标点等无法分词的字符, 退化为子串匹配
+            where.append("(" + " OR ".join("instr(lower(m.content), ?) > 0" for _ in keywords) + ")")
+            params.extend(kw.lower() for kw in keywords)
+
+    if category:
+        where.append("m.category = ?")
+        params.append(category)
+
+    for tag in tags or []:
+        where.append("EXISTS (SELECT 1 FROM json_each(m.data, '$.tags') WHERE value = ?)")
+        params.append(tag)
+
+    sql += " WHERE " + " AND ".join(where) + f" ORDER BY {order} LIMIT ? OFFSET ?"
+    params.extend([limit if limit is not None else -1, max(offset, 0)])
+    return [json.loads(row[0]) for row in conn.execute(sql, params)]
+
+
+class SQLiteMemoryStorage(MemoryStorageBackend):
+    """SQLite + FTS5 记忆存储后端"""
+
+    name = "sqlite"
+    maintains_index = True
+    supports_search = True
+
+    def __init__(self, db_path: Path) -> None:
+        """初始化 SQLite 存储
+
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._worker = _ConnectionThread(self.db_path)
+        self._worker.start()
+        self._worker.wait_ready()
+        self._closed = False
+
+    async def _call(self, func: Callable, *args: Any) -> Any:
+        if self._closed:
+            raise MemorySystemError("SQLite 记忆存储已关闭")
+        return await asyncio.wrap_future(self._worker.submit(func, *args))
+
+    def _call_sync(self, func: Callable, *args: Any) -> Any:
+        if self._closed:
+            raise MemorySystemError("SQLite 记忆存储已关闭")
+        return self._worker.submit(func, *args).result()
+
+    async def write(self, entry: Dict[str, Any]) -> None:
+        await self._call(_upsert, [entry])
+
+    async def write_many(self, entries: List[Dict[str, Any]]) -> None:
+        """批量写入 (单个事务)"""
+        await self._call(_upsert, list(entries))
+
+    async def read(self, memory_type: str, memory_id: str) -> Optional[Dict[str, Any]]:
+        return (await self.read_many(memory_type, [memory_id]))[0]
+
+    async def read_many(
+        self,
+        memory_type: str,
+        memory_ids: List[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        found = await self._call(_select_many, list(memory_ids))
+        return [found.get(mid) for mid in memory_ids]
+
+    async def delete(self, memory_type: str, memory_id: str) -> bool:
+        return await self._call(_delete, memory_id)
+
+    def list_ids(self, memory_type: str) -> List[str]:
+        return self._call_sync(_list_ids, memory_type)
+
+    async def search(
+        self,
+        memory_type: str,
+        keywords: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        tags: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """在数据库内完成关键词排序、类别/标签过滤和分页
+
+        Args:
+            memory_type: 记忆类型
+            keywords: 关键词 (任一命中), 结果按 bm25 相关度排序
+            category: 类别过滤 (metadata.category)
+            limit: 返回条数上限, None 表示不限
+            offset: 分页偏移
+            tags: 标签过滤 (需全部命中)
+
+        Returns:
+            条目字典列表
+        """
+        return await self._call(_search, memory_type, keywords, category, tags, limit, offset)
+
+    def matches(
+        self,
+        entry: Dict[str, Any],
+        keywords: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> bool:
+        """条目是否会被 search() 以相同参数返回 (用于合并尚未落盘的条目)"""
+        return entry_matches(entry, keywords, category, tags)
+
+    def import_entries(self, entries: List[Dict[str, Any]]) -> None:
+        """同步批量导入 (供迁移工具使用)"""
+        self._call_sync(_upsert, list(entries))
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._worker.stop()
+
+
+def migrate_memory_tree(
+    memory_dir: Path,
+    db_path: Optional[Path] = None,
+    batch_size: int = 500
+) -> Dict[str, int]:
+    """将 JSON 文件形式的 .superagent/memory 目录导入 SQLite
+
+    条目顺序以 memory_index.json 为准, 索引中缺失的文件按文件名顺序追加。
+    重复执行是安全的 (按 memory_id 覆盖)。
+
+    Args:
+        memory_dir: 记忆根目录
+        db_path: 目标数据库, 默认 memory_dir/memory.db
+        batch_size: 每个事务导入的条目数
+
+    Returns:
+        各类型导入数量
+    """
+    memory_dir = Path(memory_dir)
+    index_file = memory_dir / "memory_index.json"
+    index: Dict[str, Any] = {}
+    if index_file.exists():
+        try:
+            index = json.loads(index_file.read_text(encoding='utf-8') or "{}")
+        except json.JSONDecodeError as e:
+            logger.warning(f"memory_index.json 已损坏, 按文件名顺序迁移: {e}")
+
+    store = SQLiteMemoryStorage(db_path or memory_dir / DEFAULT_DB_NAME)
+    counts: Dict[str, int] = {}
+    try:
+        for mtype in MEMORY_TYPES:
+            folder = memory_dir / mtype
+            ordered = list(index.get(mtype, []))
+            known = set(ordered)
+            if folder.exists():
+                ordered.extend(sorted(p.stem for p in folder.glob("*.json") if p.stem not in known))
+
+            batch: List[Dict[str, Any]] = []
+            counts[mtype] = 0
+            for memory_id in ordered:
+                file_path = folder / f"{memory_id}.json"
+                try:
+                    entry = json.loads(file_path.read_text(encoding='utf-8'))
+                except FileNotFoundError:
+                    continue
+                except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                    logger.error(f"迁移跳过损坏的记忆文件 {file_path}: {e}")
+                    continue
+                entry.setdefault("memory_type", mtype)
+                entry.setdefault("memory_id", memory_id)
+                batch.append(entry)
+                if len(batch) >= batch_size:
+                    store.import_entries(batch)
+                    counts[mtype] += len(batch)
+                    batch = []
+            if batch:
+                store.import_entries(batch)
+                counts[mtype] += len(batch)
+    finally:
+        store.close()
+
+    logger.info(f"记忆迁移完成: {counts}")
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口: 迁移 JSON 记忆目录到 SQLite"""
+    parser = argparse.ArgumentParser(description="迁移 .superagent/memory 到 SQLite/FTS5 存储")
+    parser.add_argument("memory_dir", nargs="?", default=".superagent/memory",
+                        help="记忆根目录 (默认 .superagent/memory)")
+    parser.add_argument("--db", default=None, help="目标数据库路径 (默认 <memory_dir>/memory.db)")
+    args = parser.parse_args(argv)
+
+    counts = migrate_memory_tree(Path(args.memory_dir), Path(args.db) if args.db else None)
+    print(f"✓ 已迁移 {sum(counts.values())} 条记忆: {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+记忆存储后端
+
+将 MemoryManager 的条目持久化逻辑抽象为可插拔后端:
+- JsonFileStorage: 每条记忆一个 JSON 文件 (默认, 兼容历史目录结构)
+- SegmentLogStorage: 追加写分段日志 (见 segment_store.py)
+- SQLiteMemoryStorage: SQLite + FTS5 全文检索 (见 sqlite_store.py)
+"""
+
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import aiofiles
+
+from common.exceptions import MemorySystemError
+
+logger = logging.getLogger(__name__)
+
+MEMORY_TYPES = ("episodic", "semantic", "procedural")
+
+
+class MemoryStorageBackend(ABC):
+    """记忆存储后端基类"""
+
+    # 后端名称
+    name: str = "base"
+
+    # 后端是否自行维护条目顺序 (为 True 时 MemoryManager 无需重写 memory_index.json)
+    maintains_index: bool = False
+
+    # 后端是否支持库内检索 (提供 search() 方法, 以及按相同规则判断单个条目的 matches() 方法)
+    supports_search: bool = False
+
+    # read_many 默认实现的并发读取上限
+    read_concurrency: int = 16
+
+    # 是否允许多个进程同时打开同一存储 (为 False 的后端由自身保证独占)
+    multi_process: bool = True
+
+    @abstractmethod
+    async def write(self, entry: Dict[str, Any]) -> None:
+        """写入一条记忆 (相同 memory_id 覆盖旧值)"""
+
+    async def write_many(self, entries: List[Dict[str, Any]]) -> None:
+        """批量写入 (默认逐条写入, 后端可覆盖为一次 IO)"""
+        for entry in entries:
+            await self.write(entry)
+
+    @abstractmethod
+    async def read(self, memory_type: str, memory_id: str) -> Optional[Dict[str, Any]]:
+        """读取一条记忆, 不存在时返回 None"""
+
+    async def read_many(
+        self,
+        memory_type: str,
+        memory_ids: List[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """按顺序批量读取, 缺失或损坏的条目对应位置为 None
+
+        默认实现以 read_concurrency 为上限并发调用 read(), 后端可覆盖为一次 IO
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(memory_ids)
+        positions = iter(range(len(memory_ids)))
+
+        async def worker() -> None:
+            # 固定数量的 worker 依次领取位置, 任务数不随 ID 数增长
+            for i in positions:
+                try:
+                    results[i] = await self.read(memory_type, memory_ids[i])
+                except (json.JSONDecodeError, UnicodeDecodeError, MemorySystemError) as e:
+                    logger.error(f"加载记忆条目失败 (文件损坏或编码错误) {memory_ids[i]}: {e}")
+
+        await asyncio.gather(*(worker() for _ in range(min(self.read_concurrency, len(memory_ids)))))
+        return results
+
+    @abstractmethod
+    async def delete(self, memory_type: str, memory_id: str) -> bool:
+        """删除一条记忆, 返回是否存在"""
+
+    def list_ids(self, memory_type: str) -> List[str]:
+        """按写入顺序列出 ID (仅 maintains_index=True 的后端需要实现)"""
+        raise NotImplementedError
+
+    async def compact(self) -> int:
+        """回收被覆盖或删除的条目占用的空间, 返回回收的字节数 (默认无需压缩)"""
+        return 0
+
+    def close(self) -> None:
+        """释放后端资源"""
+
+
+class JsonFileStorage(MemoryStorageBackend):
+    """每条记忆一个 JSON 文件 (v3.x 默认存储格式)"""
+
+    name = "json"
+
+    def __init__(self, memory_dir: Path) -> None:
+        self.memory_dir = Path(memory_dir)
+        self._dirs = {mtype: self.memory_dir / mtype for mtype in MEMORY_TYPES}
+        for d in self._dirs.values():
+            d.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, memory_type: str, memory_id: str) -> Path:
+        if memory_type not in self._dirs:
+            raise MemorySystemError(f"不支持的记忆类型: {memory_type}")
+        return self._dirs[memory_type] / f"{memory_id}.json"
+
+    async def write(self, entry: Dict[str, Any]) -> None:
+        file_path = self._path(entry["memory_type"], entry["memory_id"])
+        async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
+            await f.write(json.dumps(entry, indent=2, ensure_ascii=False))
+
+    async def read(self, memory_type: str, memory_id: str) -> Optional[Dict[str, Any]]:
+        file_path = self._path(memory_type, memory_id)
+        if not file_path.exists():
+            return None
+        async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
+            return json.loads(await f.read())
+
+    async def delete(self, memory_type: str, memory_id: str) -> bool:
+        file_path = self._path(memory_type, memory_id)
+        try:
+            file_path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+
+def create_storage_backend(
+    backend: Union[str, MemoryStorageBackend, None],
+    memory_dir: Path
+) -> MemoryStorageBackend:
+    """根据名称或实例创建存储后端
+
+    Args:
+        backend: 后端名称 ("json" / "segment" / "sqlite") 或已构造的后端实例
+        memory_dir: 记忆根目录
+
+    Returns:
+        存储后端实例
+    """
+    if isinstance(backend, MemoryStorageBackend):
+        return backend
+
+    name = (backend or "json").lower()
+    if name == "json":
+        return JsonFileStorage(memory_dir)
+    if name == "segment":
+        from .segment_store import SegmentLogStorage
+        return SegmentLogStorage(memory_dir / "segments")
+    if name == "sqlite":
+        from .sqlite_store import SQLiteMemoryStorage, DEFAULT_DB_NAME
+        return SQLiteMemoryStorage(memory_dir / DEFAULT_DB_NAME)
+
+    raise MemorySystemError(f"未知的记忆存储后端: {backend}")
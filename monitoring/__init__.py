@@ -6,10 +6,11 @@
 提供Token使用监控和性能分析功能
 """
 
-from .token_monitor import TokenMonitor, TokenMonitorConfig, TokenUsageRecord
+from .token_monitor import TokenMonitor, TokenMonitorConfig, TokenReservation, TokenUsageRecord
 
 __all__ = [
     "TokenMonitor",
     "TokenMonitorConfig",
+    "TokenReservation",
     "TokenUsageRecord"
 ]
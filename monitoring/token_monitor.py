@@ -16,6 +16,7 @@ from dataclasses import dataclass, field, asdict
 from datetime import datetime, timedelta
 from collections import defaultdict
 from common.monitoring import MetricsManager
+from common.tokenizer import Tokenizer, get_tokenizer
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +40,20 @@ class TokenUsageRecord:
         return asdict(self)
 
 
+@dataclass
+class TokenReservation:
+    """Token 预留 (任务准入时预留估算值, 结束时按实际使用量结算)"""
+    task_id: str
+    tokens: int                 # 预留的 Token 数
+    used: int = 0               # 预留期间该任务已记录的实际使用量
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    @property
+    def outstanding(self) -> int:
+        """尚未被实际使用抵扣的预留量"""
+        return max(0, self.tokens - self.used)
+
+
 @dataclass
 class TokenMonitorConfig:
     """Token监控配置"""
@@ -62,15 +77,18 @@ class TokenMonitor:
     def __init__(
         self,
         project_root: Path = None,
-        config: TokenMonitorConfig = None
+        config: TokenMonitorConfig = None,
+        tokenizer: Optional[Tokenizer] = None
     ):
         """初始化Token监控器
 
         Args:
             project_root: 项目根目录
             config: 配置
+            tokenizer: 分词器 (None 表示使用进程默认分词器)
         """
         self.config = config or TokenMonitorConfig()
+        self._tokenizer = tokenizer
         self.project_root = Path(project_root) if project_root else Path.cwd()
 
         # 日志文件
@@ -84,6 +102,11 @@ class TokenMonitor:
         # 异步锁，确保写入顺序
         self._lock = asyncio.Lock()
 
+        # 预算预留: 并发任务准入时预留估算值, 避免同时运行的任务共同超出预算
+        self._reservations: Dict[str, TokenReservation] = {}
+        self.reserved_tokens = 0
+        self._budget_changed = asyncio.Condition()
+
         logger.info(f"Token监控器初始化完成: {self.log_file}")
 
     async def check_budget(self, estimated_tokens: int = 0) -> Tuple[bool, str]:
@@ -117,8 +140,101 @@ class TokenMonitor:
 
         return True, ""
 
+    @property
+    def available_tokens(self) -> Optional[int]:
+        """扣除已使用量和未结算预留后的剩余预算 (未启用预算时为 None)"""
+        if not self.config.enable_budget:
+            return None
+        return self.config.total_budget - self.total_usage - self.reserved_tokens
+
+    def _fits(self, tokens: int) -> bool:
+        if not self.config.enable_budget or not self.config.stop_on_exceed:
+            return True
+        return tokens <= self.available_tokens
+
+    async def reserve(
+        self,
+        task_id: str,
+        tokens: int,
+        wait: bool = False,
+        timeout: Optional[float] = None
+    ) -> Optional[TokenReservation]:
+        """为任务预留 Token
+
+        预留量计入 available_tokens, 直到 commit/release。预算不足时返回 None;
+        wait=True 时等待其他预留结算后重试 (没有其他预留或超时则返回 None)。
+
+        Args:
+            task_id: 任务ID (log_usage 按此ID抵扣预留)
+            tokens: 预留的 Token 数
+            wait: 预算不足时是否等待
+            timeout: 最长等待时间 (秒)
+
+        Returns:
+            Optional[TokenReservation]: 预留, 预算不足时为 None
+        """
+        async with self._budget_changed:
+            if task_id in self._reservations:
+                raise ValueError(f"任务 {task_id} 已有未结算的 Token 预留")
+            if not self._fits(tokens):
+                if not wait:
+                    return None
+                try:
+                    await asyncio.wait_for(
+                        self._budget_changed.wait_for(lambda: self._fits(tokens) or not self._reservations),
+                        timeout
+                    )
+                except asyncio.TimeoutError:
+                    return None
+                if not self._fits(tokens):
+                    return None
+
+            reservation = TokenReservation(task_id=task_id, tokens=tokens)
+            self._reservations[task_id] = reservation
+            self.reserved_tokens += tokens
+            logger.debug(f"Token 预留: {task_id} {tokens}, 剩余预算: {self.available_tokens}")
+            return reservation
+
+    async def commit(self, reservation: TokenReservation, actual_tokens: Optional[int] = None) -> int:
+        """结算预留: 释放未使用的部分
+
+        Args:
+            reservation: 预留
+            actual_tokens: 任务的实际使用量; 超出已通过 log_usage 记录部分的差额计入累计使用量
+
+        Returns:
+            int: 释放的 Token 数
+        """
+        async with self._budget_changed:
+            if self._reservations.get(reservation.task_id) is not reservation:
+                return 0
+            del self._reservations[reservation.task_id]
+            if actual_tokens is not None and actual_tokens > reservation.used:
+                self.total_usage += actual_tokens - reservation.used
+            released = reservation.outstanding
+            self.reserved_tokens -= released
+            self._budget_changed.notify_all()
+            return released
+
+    async def release(self, reservation: TokenReservation) -> int:
+        """取消预留 (任务未执行), 返回释放的 Token 数"""
+        return await self.commit(reservation)
+
+    def _charge_reservation(self, task_id: str, tokens: int) -> None:
+        """实际使用量抵扣该任务的预留"""
+        reservation = self._reservations.get(task_id)
+        if reservation is None:
+            return
+        before = reservation.outstanding
+        reservation.used += tokens
+        self.reserved_tokens -= before - reservation.outstanding
+
+    @property
+    def tokenizer(self) -> Tokenizer:
+        return self._tokenizer or get_tokenizer()
+
     def estimate_tokens(self, content: str, multiplier: float = 1.2) -> int:
-        """粗略估算字符串的 Token 数
+        """估算字符串的 Token 数
         
         Args:
             content: 内容
@@ -129,12 +245,11 @@ class TokenMonitor:
         """
         if not content:
             return 0
-        
-        # 经验公式: 1 token ≈ 4 字符 (中文可能更高, 这里取 2 字符 1 token 以保守估计)
-        # 对于中英文混合, 我们取平均值或更保守的估计
-        char_count = len(content)
-        estimated = int(char_count / 2 * multiplier)
-        return estimated
+        return int(self.tokenizer.count(content) * multiplier)
+
+    def estimate_tokens_batch(self, contents: List[str], multiplier: float = 1.2) -> List[int]:
+        """批量估算 Token 数 (相同内容只计算一次)"""
+        return [int(tokens * multiplier) for tokens in self.tokenizer.count_batch(contents)]
 
     async def log_usage(
         self,
@@ -190,6 +305,7 @@ class TokenMonitor:
         # 累计使用量
         self.total_usage += compressed_tokens or original_tokens
         self._usage_by_agent[agent_type] += compressed_tokens or original_tokens
+        self._charge_reservation(task_id, compressed_tokens or original_tokens)
 
         # 写入日志文件 (异步)
         await self._append_record(record)
@@ -284,13 +284,15 @@ class AgentDispatcher:
     async def execute_batch(
         self,
         tasks: List[TaskExecution],
-        max_concurrent: int = 3
+        max_concurrent: int = 3,
+        ranks: Optional[Dict[str, float]] = None
     ) -> List[TaskExecution]:
         """批量执行任务 (尊重资源限制和优先级)
 
         Args:
             tasks: 任务列表
             max_concurrent: 总最大并行任务数
+            ranks: 步骤的关键路径秩 (同一优先级内秩大的先执行)
 
         Returns:
             List[TaskExecution]: 更新后的任务列表
@@ -305,9 +307,10 @@ class AgentDispatcher:
             ExecutionPriority.LOW: 3
         }
 
+        ranks = ranks or {}
         sorted_tasks = sorted(
             tasks,
-            key=lambda t: priority_order.get(t.priority, 2)
+            key=lambda t: (priority_order.get(t.priority, 2), -ranks.get(t.step_id, 0.0))
         )
 
         # 使用信号量限制总并发
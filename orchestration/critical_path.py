@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+关键路径优先排序 (CriticalPathRanker)
+
+就绪任务按 HEFT 上行秩排序: 步骤预计耗时 + 下游最长路径的预计耗时。
+处在长依赖链头部的任务先启动, 短的独立任务填充剩余的并发槽位, 宽 DAG 的总耗时更短。
+
+任务结束后用实际耗时修正同类 Agent 的预计耗时 (累计实际耗时 / 累计预计耗时),
+修正系数相对上次计算的偏差超过 RERANK_DRIFT 时重新计算秩;
+两次重新计算之间至少间隔 min_interval 个任务, 总开销与任务数近似线性。
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+from planning.dependency_analyzer import DependencyAnalyzer
+from planning.models import Step
+
+logger = logging.getLogger(__name__)
+
+# 修正系数的相对偏差超过此值时重新计算秩
+RERANK_DRIFT = 0.25
+
+
+class CriticalPathRanker:
+    """按剩余最长路径为步骤排序"""
+
+    def __init__(
+        self,
+        steps: List[Step],
+        analyzer: Optional[DependencyAnalyzer] = None,
+        min_interval: Optional[int] = None
+    ) -> None:
+        self.steps = steps
+        self.analyzer = analyzer or DependencyAnalyzer()
+        self.min_interval = min_interval if min_interval is not None else max(1, len(steps) // 100)
+
+        self._estimates = {step.id: step.estimated_time.total_seconds() for step in steps}
+        self._groups = {step.id: step.agent_type.value for step in steps}
+        self._estimated_total: Dict[str, float] = {}
+        self._actual_total: Dict[str, float] = {}
+        self._applied: Dict[str, float] = {}  # 上次计算秩时使用的修正系数
+        self._since_rerank = 0
+        self.ranks = self.analyzer.compute_upward_ranks(steps)
+
+    def rank(self, step_id: str) -> float:
+        return self.ranks.get(step_id, 0.0)
+
+    def _factor(self, group: str) -> float:
+        estimated = self._estimated_total.get(group, 0.0)
+        return self._actual_total[group] / estimated if estimated > 0 else 1.0
+
+    def observe(self, step_id: str, duration: float) -> bool:
+        """记录步骤的实际耗时, 重新计算了秩时返回 True"""
+        group = self._groups.get(step_id)
+        if group is None:
+            return False
+        self._estimated_total[group] = self._estimated_total.get(group, 0.0) + self._estimates[step_id]
+        self._actual_total[group] = self._actual_total.get(group, 0.0) + duration
+        self._since_rerank += 1
+
+        factor = self._factor(group)
+        applied = self._applied.get(group, 1.0)
+        if self._since_rerank < self.min_interval or abs(factor - applied) <= RERANK_DRIFT * applied:
+            return False
+
+        for name in self._actual_total:
+            self._applied[name] = self._factor(name)
+        durations = {
+            sid: estimate * self._applied.get(self._groups[sid], 1.0)
+            for sid, estimate in self._estimates.items()
+        }
+        self.ranks = self.analyzer.compute_upward_ranks(self.steps, durations)
+        self._since_rerank = 0
+        logger.debug(f"按实际耗时重新计算关键路径: {self._applied}")
+        return True
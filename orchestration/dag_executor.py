@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+事件驱动的 DAG 执行器 (DagExecutor)
+
+按依赖关系执行任务, 不再按批次同步等待:
+- 为每个任务维护未完成的依赖计数和下游任务列表, 任务完成时只更新它的下游任务
+- 任务的最后一个依赖完成后立即进入就绪队列, 在并发上限内马上启动,
+  不必等待同批次中最慢的任务
+- 就绪队列按优先级排序; 提供 ranker (CriticalPathRanker) 时同一优先级内按关键路径优先,
+  ranker 根据实际耗时重新计算秩后就绪队列随之重排
+- 准入控制: admit 拒绝就绪队列头部的任务时 (例如 Token 预算预留不足), 暂停启动,
+  等运行中的任务结束释放资源后重试, 并行度随之降低; 没有运行中的任务仍无法准入时停止
+- 完成回调按完成顺序串行执行 (同步 worktree、保存记忆、Git 提交等不会相互交错)
+- 快速失败: 有任务失败时不再启动新任务, 运行中的任务结束后把其余任务标记为取消状态
+- 依赖未完成的任务被跳过; 因循环依赖或依赖不存在而永远无法就绪的任务标记为失败
+- 开始时已是完成状态的任务 (从执行日志恢复) 不再执行, 直接释放下游任务
+- on_state_change 在任务就绪、启动和结束时同步调用 (用于写执行日志)
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .models import ExecutionPriority, TaskExecution, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+# 就绪队列中的优先级顺序 (数值越小越先启动)
+PRIORITY_ORDER = {
+    ExecutionPriority.CRITICAL: 0,
+    ExecutionPriority.HIGH: 1,
+    ExecutionPriority.NORMAL: 2,
+    ExecutionPriority.LOW: 3
+}
+
+RunTask = Callable[[TaskExecution], Awaitable[TaskExecution]]
+TaskCallback = Callable[[TaskExecution], Awaitable[None]]
+StateCallback = Callable[[TaskExecution], None]
+
+
+class DagExecutor:
+    """事件驱动的任务 DAG 执行器
+
+    Args:
+        tasks: 任务列表 (dependencies 为所依赖任务的 step_id)
+        run_task: 执行单个任务的协程, 返回更新后的任务
+        max_parallel: 最大并行任务数
+        fail_fast: 有任务失败时停止启动新任务
+        cancel_status: 快速失败时未启动任务的状态
+        on_task_done: 任务结束后的回调 (串行调用, 可修改任务状态)
+        before_launch: 每轮启动任务前的检查, 返回 False 时停止启动新任务
+        task_cost: 任务成本估算 (例如 Token 数), 用于维护 pending_cost
+        ranker: 关键路径排序器 (见 CriticalPathRanker)
+        admit: 任务启动前的准入检查 (task, executor), 返回 False 时暂缓启动
+        on_state_change: 任务状态变化 (就绪/已分配/结束) 时的同步回调
+    """
+
+    def __init__(
+        self,
+        tasks: List[TaskExecution],
+        run_task: RunTask,
+        max_parallel: int = 3,
+        fail_fast: bool = True,
+        cancel_status: TaskStatus = TaskStatus.CANCELLED,
+        on_task_done: Optional[TaskCallback] = None,
+        before_launch: Optional[Callable[["DagExecutor"], Awaitable[bool]]] = None,
+        task_cost: Optional[Callable[[TaskExecution], int]] = None,
+        ranker: Optional[Any] = None,
+        admit: Optional[Callable[[TaskExecution, "DagExecutor"], Awaitable[bool]]] = None,
+        on_state_change: Optional[StateCallback] = None
+    ) -> None:
+        self.tasks = tasks
+        self.run_task = run_task
+        self.max_parallel = max(1, max_parallel)
+        self.fail_fast = fail_fast
+        self.cancel_status = cancel_status
+        self.on_task_done = on_task_done
+        self.before_launch = before_launch
+        self.task_cost = task_cost
+        self.ranker = ranker
+        self.admit = admit
+        self.on_state_change = on_state_change
+
+        self.executed: List[TaskExecution] = []
+        self.pending_cost = 0  # 尚未启动任务的成本之和
+        self._stop: Optional[Tuple[TaskStatus, Optional[str]]] = None
+        self._costs: Dict[str, int] = {}
+        self._index: Dict[str, int] = {}
+        self._waiting: Dict[str, int] = {}
+        self._dependents: Dict[str, List[TaskExecution]] = {}
+        self._ready: List[Tuple[Any, ...]] = []
+        self._started: set = set()
+        self._start_times: Dict[str, float] = {}
+        self._running: Dict[asyncio.Future, TaskExecution] = {}
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop is not None
+
+    def stop(self, status: TaskStatus, error: Optional[str] = None) -> None:
+        """停止启动新任务; 尚未启动的任务在运行中的任务结束后标记为 status"""
+        if self._stop is None:
+            self._stop = (status, error)
+
+    @property
+    def running_count(self) -> int:
+        """运行中的任务数"""
+        return len(self._running)
+
+    def pending_tasks(self) -> List[TaskExecution]:
+        """尚未启动的任务"""
+        return [t for t in self.tasks if t.task_id not in self._started]
+
+    def _priority_key(self, task: TaskExecution) -> Tuple[Any, ...]:
+        """就绪队列排序键: 优先级, 关键路径秩 (越大越先), 计划中的顺序"""
+        rank = self.ranker.rank(task.step_id) if self.ranker else 0.0
+        return (PRIORITY_ORDER.get(task.priority, 2), -rank, self._index[task.task_id])
+
+    def _observe(self, task: TaskExecution) -> None:
+        """把实际耗时交给 ranker; 秩重新计算后重排就绪队列"""
+        started = self._start_times.pop(task.task_id, None)
+        if self.ranker is None or started is None or task.status != TaskStatus.COMPLETED:
+            return
+        if self.ranker.observe(task.step_id, time.monotonic() - started):
+            self._ready = [self._priority_key(entry[-1]) + (entry[-1],) for entry in self._ready]
+            heapq.heapify(self._ready)
+
+    def _notify(self, task: TaskExecution) -> None:
+        if self.on_state_change:
+            self.on_state_change(task)
+
+    def _build_graph(self) -> None:
+        by_step = {task.step_id: task for task in self.tasks}
+        restored = [task for task in self.tasks if task.status == TaskStatus.COMPLETED]
+        for index, task in enumerate(self.tasks):
+            self._index[task.task_id] = index
+            self._dependents.setdefault(task.step_id, [])
+            if task.status == TaskStatus.COMPLETED:
+                self._started.add(task.task_id)
+            elif self.task_cost:
+                cost = self.task_cost(task)
+                self._costs[task.task_id] = cost
+                self.pending_cost += cost
+
+        for task in self.tasks:
+            dependencies = set(task.dependencies)
+            for dep_id in dependencies:
+                if dep_id in by_step:
+                    self._dependents[dep_id].append(task)
+            # 不存在的依赖也计入, 使任务永远无法就绪
+            self._waiting[task.task_id] = len(dependencies)
+            if not dependencies and task.task_id not in self._started:
+                self._push_ready(task)
+
+        # 已完成的任务视为刚刚结束
+        for task in restored:
+            self.executed.append(task)
+            self._release_dependents(task)
+        if restored:
+            logger.info(f"跳过 {len(restored)} 个已完成的任务")
+
+    def _push_ready(self, task: TaskExecution) -> None:
+        task.status = TaskStatus.READY
+        heapq.heappush(self._ready, self._priority_key(task) + (task,))
+        self._notify(task)
+
+    def _mark_started(self, task: TaskExecution) -> None:
+        self._started.add(task.task_id)
+        self.pending_cost -= self._costs.get(task.task_id, 0)
+
+    def _finish_unstarted(self, task: TaskExecution, status: TaskStatus, error: Optional[str]) -> None:
+        self._mark_started(task)
+        task.status = status
+        if error:
+            task.error = error
+        self.executed.append(task)
+        self._notify(task)
+
+    def _release_dependents(self, task: TaskExecution) -> None:
+        """任务结束: 成功时下游任务依赖计数减一, 否则跳过所有下游任务"""
+        if task.status == TaskStatus.COMPLETED:
+            for dependent in self._dependents.get(task.step_id, ()):
+                self._waiting[dependent.task_id] -= 1
+                if self._waiting[dependent.task_id] == 0 and dependent.task_id not in self._started:
+                    self._push_ready(dependent)
+            return
+
+        stack = [task]
+        while stack:
+            failed = stack.pop()
+            for dependent in self._dependents.get(failed.step_id, ()):
+                if dependent.task_id in self._started:
+                    continue
+                self._finish_unstarted(dependent, TaskStatus.SKIPPED, f"依赖任务 {failed.step_id} 未完成")
+                stack.append(dependent)
+
+    async def _run_one(self, task: TaskExecution) -> TaskExecution:
+        try:
+            return await self.run_task(task)
+        except Exception as e:
+            logger.exception(f"执行任务 {task.task_id} 时发生未捕获异常 ({type(e).__name__}): {e}")
+            task.status = TaskStatus.FAILED
+            task.error = f"未捕获的任务执行异常 ({type(e).__name__}): {str(e)}"
+            task.completed_at = datetime.now()
+            return task
+
+    async def _launch_ready(self) -> None:
+        running = self._running
+        if self.stopped or not self._ready or len(running) >= self.max_parallel:
+            return
+        if self.before_launch and not await self.before_launch(self):
+            self.stop(self.cancel_status)
+            return
+        while self._ready and len(running) < self.max_parallel and not self.stopped:
+            task = self._ready[0][-1]
+            if self.admit and not await self.admit(task, self):
+                if not running:
+                    # 没有可释放资源的任务, 永远无法准入
+                    self.stop(TaskStatus.FAILED, f"任务 {task.task_id} 未通过准入检查")
+                break
+            heapq.heappop(self._ready)
+            self._mark_started(task)
+            task.status = TaskStatus.ASSIGNED
+            self._notify(task)
+            self._start_times[task.task_id] = time.monotonic()
+            running[asyncio.ensure_future(self._run_one(task))] = task
+
+    async def run(self) -> List[TaskExecution]:
+        """执行所有任务, 按结束顺序返回任务列表"""
+        self._build_graph()
+        logger.info(f"DAG 执行器开始执行: {len(self.tasks)} 个任务, 最大并行数 {self.max_parallel}")
+
+        running = self._running
+        try:
+            while True:
+                await self._launch_ready()
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in sorted(done, key=lambda f: self._index[running[f].task_id]):
+                    del running[future]
+                    task = future.result()
+                    self.executed.append(task)
+                    self._observe(task)
+                    if self.on_task_done:
+                        await self.on_task_done(task)
+                    self._notify(task)
+                    self._release_dependents(task)
+                    if self.fail_fast and task.status == TaskStatus.FAILED:
+                        logger.error(f"任务 {task.task_id} 失败, 停止启动后续任务")
+                        self.stop(self.cancel_status)
+        finally:
+            for future in running:
+                future.cancel()
+
+        # 未启动的任务: 已停止时标记为停止状态, 否则说明依赖永远无法满足
+        unstarted = self.pending_tasks()
+        if unstarted:
+            if self._stop is not None:
+                status, error = self._stop
+            else:
+                logger.error(f"检测到循环依赖或缺失的依赖, {len(unstarted)} 个任务无法就绪")
+                status, error = TaskStatus.FAILED, "循环依赖或依赖不存在导致任务无法就绪"
+            for task in unstarted:
+                self._finish_unstarted(task, status, error)
+
+        return self.executed
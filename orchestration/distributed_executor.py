@@ -9,9 +9,10 @@
 import logging
 import asyncio
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from .models import TaskExecution, TaskStatus, ExecutionContext
+from .step_cache import StepResultCache
 from .task_executor import TaskExecutor
 from config.settings import SuperAgentConfig
 
@@ -21,14 +22,20 @@ logger = logging.getLogger(__name__)
 class DistributedTaskExecutor(TaskExecutor):
     """分布式任务执行器"""
 
-    def __init__(self, context: ExecutionContext, config: SuperAgentConfig):
+    def __init__(
+        self,
+        context: ExecutionContext,
+        config: SuperAgentConfig,
+        step_cache: Optional[StepResultCache] = None
+    ):
         """初始化分布式任务执行器
 
         Args:
             context: 执行上下文
             config: 全局配置
+            step_cache: 步骤结果缓存 (本地执行时使用)
         """
-        super().__init__(context)
+        super().__init__(context, step_cache)
         self.config = config
         self.use_distribution = config.distribution.enabled
 
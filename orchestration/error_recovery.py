@@ -238,8 +238,10 @@ class MemoryBasedRecovery:
             List[Dict[str, Any]]: 相似错误列表
         """
         try:
-            # 从情节记忆中查找
-            episodic_memories = await self.memory_manager.get_episodic_memories(
+            # 从情节记忆中按内容相似度检索 (MinHash LSH 近邻)
+            episodic_memories = await self.memory_manager.find_similar(
+                error_message,
+                memory_types=["episodic"],
                 limit=limit * 2  # 获取更多,然后过滤
             )
 
@@ -254,12 +256,13 @@ class MemoryBasedRecovery:
                         "memory_type": "episodic",
                         "content": content,
                         "timestamp": memory.get("timestamp", ""),
-                        "metadata": memory.get("metadata", {})
+                        "metadata": memory.get("metadata", {}),
+                        "similarity": memory.get("similarity", 0.0)
                     })
 
-            # 按相关性排序(这里简单按时间倒序)
+            # 按相似度排序, 相似度相同时较新的在前
             similar_errors.sort(
-                key=lambda x: x.get("timestamp", ""),
+                key=lambda x: (x["similarity"], x.get("timestamp", "")),
                 reverse=True
             )
 
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+计划执行预写日志 (PlanExecutionLog)
+
+任务状态的每次变化 (就绪、运行、完成/失败/跳过) 以一行记录追加到日志文件,
+编排器进程中途退出后, 重新执行同一计划时回放日志即可恢复 DAG 前沿:
+已完成的步骤直接跳过, 只重新执行未完成的工作。
+
+- 每个计划一个目录 (按步骤内容计算的计划指纹命名): wal.jsonl 为日志, results/ 存放任务结果
+- 记录格式: "crc32(8位十六进制) JSON\\n"; 回放时末尾被截断或校验失败的记录会被截掉
+- 完成记录引用结果文件 (先原子写入结果文件, 再追加记录)
+- 终态记录追加后 fsync; 就绪/运行记录只描述进行中的工作, 丢失时这些任务会被重新执行, 不做 fsync
+- 恢复时把日志压缩为已完成任务的记录, 日志大小与计划规模成正比
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from planning.models import ExecutionPlan
+from .models import TaskExecution, TaskExecutionResult, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+WAL_FILE = "wal.jsonl"
+RESULTS_DIR = "results"
+
+TERMINAL_STATUSES = {
+    TaskStatus.COMPLETED,
+    TaskStatus.FAILED,
+    TaskStatus.SKIPPED,
+    TaskStatus.CANCELLED
+}
+
+
+def plan_fingerprint(plan: ExecutionPlan) -> str:
+    """计划指纹: 需求描述和各步骤 (ID、名称、描述、Agent 类型、依赖) 都相同的计划共享执行日志"""
+    digest = hashlib.sha256(plan.description.encode('utf-8'))
+    for step in plan.steps:
+        digest.update(json.dumps(
+            [step.id, step.name, step.description, step.agent_type.value, sorted(step.dependencies)],
+            ensure_ascii=False
+        ).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _encode_result(result: Any) -> Any:
+    if isinstance(result, TaskExecutionResult):
+        return {
+            "__type__": "ExecutionResult",
+            "success": result.success,
+            "content": result.content,
+            "status": result.status.value,
+            "error": result.error,
+            "metadata": result.metadata,
+            "execution_time": result.execution_time,
+            "timestamp": result.timestamp.isoformat()
+        }
+    return result
+
+
+def _decode_result(data: Any) -> Any:
+    if isinstance(data, dict) and data.get("__type__") == "ExecutionResult":
+        return TaskExecutionResult(
+            success=data["success"],
+            content=data["content"],
+            status=TaskStatus(data["status"]),
+            error=data.get("error"),
+            metadata=data.get("metadata") or {},
+            execution_time=data.get("execution_time", 0.0),
+            timestamp=datetime.fromisoformat(data["timestamp"])
+        )
+    return data
+
+
+def _encode_line(record: Dict[str, Any]) -> str:
+    payload = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+    return f"{zlib.crc32(payload.encode('utf-8')):08x} {payload}\n"
+
+
+def _decode_line(line: bytes) -> Optional[Dict[str, Any]]:
+    """解码一行记录 (含换行符); 写了一半、校验失败或无法解码时返回 None"""
+    if not line.endswith(b"\n") or len(line) < 10 or line[8:9] != b" ":
+        return None
+    payload = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload.decode('utf-8'))
+    except ValueError:  # 包括 UnicodeDecodeError
+        return None
+
+
+class PlanExecutionLog:
+    """计划执行状态的预写日志"""
+
+    def __init__(self, log_dir: Path, fsync: bool = True) -> None:
+        """初始化执行日志
+
+        Args:
+            log_dir: 本计划的日志目录
+            fsync: 终态记录追加后是否 fsync
+        """
+        self.log_dir = Path(log_dir)
+        self.results_dir = self.log_dir / RESULTS_DIR
+        self.wal_path = self.log_dir / WAL_FILE
+        self.fsync = fsync
+        self._file = None
+        self._seq = 0
+
+    @classmethod
+    def for_plan(cls, root_dir: Path, plan: ExecutionPlan, fsync: bool = True) -> "PlanExecutionLog":
+        """按计划指纹定位日志目录"""
+        return cls(Path(root_dir) / plan_fingerprint(plan), fsync=fsync)
+
+    def replay(self) -> Dict[str, Dict[str, Any]]:
+        """回放日志, 返回每个任务的最后一条记录 (task_id -> 记录)
+
+        末尾无效的记录 (进程退出时写了一半) 会被截掉, 之后的追加从有效位置开始。
+        """
+        latest: Dict[str, Dict[str, Any]] = {}
+        if not self.wal_path.exists():
+            return latest
+
+        valid_bytes = 0
+        with open(self.wal_path, 'rb') as f:
+            for line in f:
+                record = _decode_line(line)
+                if record is None:
+                    break
+                valid_bytes += len(line)
+                latest[record["task_id"]] = record
+                self._seq = max(self._seq, record.get("seq", 0))
+
+        if valid_bytes < self.wal_path.stat().st_size:
+            logger.warning(f"执行日志末尾存在不完整的记录, 已截断: {self.wal_path}")
+            with open(self.wal_path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        return latest
+
+    def restore(self, tasks: List[TaskExecution]) -> int:
+        """按日志恢复已完成的任务 (状态、输出和结果), 返回恢复的任务数
+
+        其余任务 (未开始、进行中或失败) 保持原状态, 将被重新执行。
+        恢复后日志被压缩为已完成任务的记录。
+        """
+        latest = self.replay()
+        by_id = {task.task_id: task for task in tasks}
+        completed = []
+        for task_id, record in latest.items():
+            task = by_id.get(task_id)
+            if task is None or record["status"] != TaskStatus.COMPLETED.value:
+                continue
+            if record.get("step_id") != task.step_id:
+                continue
+            try:
+                self._load_result(task, record.get("result_ref"))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"读取任务结果失败, 将重新执行 ({type(e).__name__}): {task_id}, {e}")
+                continue
+            task.status = TaskStatus.COMPLETED
+            completed.append(record)
+
+        if latest:
+            self._compact(completed)
+        if completed:
+            logger.info(f"从执行日志恢复 {len(completed)}/{len(tasks)} 个已完成的步骤: {self.log_dir}")
+        return len(completed)
+
+    def record(self, task: TaskExecution) -> None:
+        """追加任务的当前状态; 终态记录附带结果引用"""
+        record: Dict[str, Any] = {
+            "seq": self._seq + 1,
+            "ts": datetime.now().isoformat(),
+            "task_id": task.task_id,
+            "step_id": task.step_id,
+            "status": task.status.value
+        }
+        terminal = task.status in TERMINAL_STATUSES
+        if task.status == TaskStatus.COMPLETED:
+            record["result_ref"] = self._save_result(task)
+        elif terminal and task.error:
+            record["error"] = task.error
+
+        self._append(_encode_line(record), sync=terminal)
+        self._seq += 1
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self) -> None:
+        """删除日志 (计划已全部完成, 再次执行时应从头开始)"""
+        self.close()
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+
+    def _append(self, line: str, sync: bool) -> None:
+        if self._file is None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.wal_path, 'a', encoding='utf-8', newline='')
+        self._file.write(line)
+        self._file.flush()
+        if sync and self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _compact(self, records: List[Dict[str, Any]]) -> None:
+        """用给定记录原子替换日志, 并清理不再引用的结果文件"""
+        self.close()
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.wal_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            for record in records:
+                f.write(_encode_line(record))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.wal_path)
+
+        referenced = {record.get("result_ref") for record in records}
+        if self.results_dir.exists():
+            for path in self.results_dir.iterdir():
+                if f"{RESULTS_DIR}/{path.name}" not in referenced:
+                    path.unlink(missing_ok=True)
+
+    def _save_result(self, task: TaskExecution) -> str:
+        """原子写入任务结果, 返回相对日志目录的引用"""
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{hashlib.sha1(task.task_id.encode('utf-8')).hexdigest()[:16]}-{self._seq + 1}.json"
+        path = self.results_dir / name
+        data = {
+            "task_id": task.task_id,
+            "result": _encode_result(task.result),
+            "outputs": task.outputs,
+            "completed_at": task.completed_at.isoformat() if task.completed_at else None
+        }
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return f"{RESULTS_DIR}/{name}"
+
+    def _load_result(self, task: TaskExecution, result_ref: Optional[str]) -> None:
+        if not result_ref:
+            return
+        with open(self.log_dir / result_ref, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        task.result = _decode_result(data.get("result"))
+        task.outputs = data.get("outputs") or {}
+        if data.get("completed_at"):
+            task.completed_at = datetime.fromisoformat(data["completed_at"])
@@ -336,6 +336,13 @@ class OrchestrationConfig:
     enable_parallel_execution: bool = True      # 启用并行执行
     enable_auto_retry: bool = True              # 启用自动重试
     enable_early_failure: bool = True           # 启用快速失败(有任务失败时停止)
+    enable_critical_path_scheduling: bool = True  # 就绪任务按关键路径 (剩余最长路径) 优先启动
+    enable_execution_log: bool = True           # 记录任务状态预写日志, 中断后重新执行时跳过已完成步骤
+    execution_log_dir: str = ".superagent/plans"  # 执行日志目录 (相对项目根目录)
+    execution_log_fsync: bool = True            # 终态记录写入后 fsync
+    # 步骤结果缓存 (默认关闭): 命中时不调用 Agent, Agent 写入的源文件等副作用不会重现,
+    # 只应对无副作用、并通过 inputs["input_files"] 声明了全部输入的步骤启用
+    enable_step_cache: bool = False
 
     # 代码审查配置
     enable_code_review: bool = True             # 启用代码审查
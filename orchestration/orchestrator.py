@@ -35,11 +35,14 @@ from .models import (
 )
 from .worktree_manager import GitWorktreeManager
 from .task_executor import TaskExecutor
+from .step_cache import StepResultCache
 from .distributed_executor import DistributedTaskExecutor
 from .agent_dispatcher import AgentDispatcher
 from .error_recovery import ErrorRecoverySystem
 from .review_orchestrator import ReviewOrchestrator
 from .scheduler import TaskScheduler
+from .dag_executor import DagExecutor
+from .execution_log import PlanExecutionLog
 from .result_handler import ExecutionResultHandler
 from .worktree_orchestrator import WorktreeOrchestrator
 from .git_manager import GitAutoCommitManager
@@ -99,7 +102,10 @@ class Orchestrator(BaseOrchestrator):
         self.agent_dispatcher = self._init_dispatcher()
 
         # 3. 初始化外部服务 (Memory & Recovery)
-        self.memory_manager = MemoryManager(self.project_root) if MEMORY_AVAILABLE else None
+        self.memory_manager = MemoryManager(
+            self.project_root,
+            storage_backend=self.global_config.memory.storage_backend
+        ) if MEMORY_AVAILABLE else None
         self.error_recovery = (ErrorRecoverySystem(self.memory_manager)
                                if self.memory_manager else None)
 
@@ -204,16 +210,17 @@ class Orchestrator(BaseOrchestrator):
 
     def _init_executor(self):
         """初始化任务执行器"""
+        step_cache = StepResultCache.for_project(self.project_root) if self.config.enable_step_cache else None
         if self.global_config.distribution.enabled:
             try:
-                executor = DistributedTaskExecutor(self.context, self.global_config)
+                executor = DistributedTaskExecutor(self.context, self.global_config, step_cache)
                 logger.info("分布式任务执行器已启用")
                 return executor
             except Exception as e:
                 logger.error(f"分布式任务执行器启动失败: {type(e).__name__}: {e}。自动降级。")
 
         logger.info("本地任务执行器已启用")
-        return TaskExecutor(self.context)
+        return TaskExecutor(self.context, step_cache)
 
     def _init_dispatcher(self) -> AgentDispatcher:
         """初始化Agent调度器"""
@@ -456,134 +463,167 @@ class Orchestrator(BaseOrchestrator):
         tasks: List[TaskExecution],
         plan: ExecutionPlan
     ) -> List[TaskExecution]:
-        """按依赖关系执行任务 (重构版 - 职责分离)
+        """按依赖关系执行任务 (事件驱动, 依赖完成后立即启动下游任务)
 
         v3.3 新增: 任务级生命周期钩子集成
         """
-        executed = []
-        remaining = tasks.copy()
-
-        while remaining:
-            # v3.3: 执行 PreTask 钩子检查
-            if self._hook_manager:
-                # 检查是否应该创建检查点
-                should_checkpoint = await self._session_manager.should_auto_checkpoint(
-                    len(executed)
-                ) if self._session_manager else False
-
-                if should_checkpoint:
-                    task_status = {t.step_id: t.status.value for t in remaining}
-                    memory_stats = (
-                        self.memory_manager.get_statistics()
-                        if self.memory_manager else {}
-                    )
-                    await self._session_manager.create_checkpoint(
-                        task_status=task_status,
-                        memory_summary=memory_stats,
-                        context_summary=f"已完成 {len(executed)} 个任务"
-                    )
-
-            # 1. Token 预算检查
-            if not await self._check_token_budget_for_remaining(remaining, executed):
-                break
-
-            # 2. 获取就绪任务
-            ready_tasks = self.scheduler.find_ready_tasks(remaining, executed)
-            if not ready_tasks:
-                if remaining:
-                    logger.error("检测到可能的循环依赖")
-                break
+        # 每个任务的描述 Token 数 + 2000 (上下文与输出的预留), 只估算一次
+        estimates = self.token_monitor.estimate_tokens_batch(
+            [task.inputs.get("description") or "" for task in tasks]
+        )
+        token_estimates = {task.task_id: tokens + 2000 for task, tokens in zip(tasks, estimates)}
+        self._actions_since_checkpoint = 0
+        self.state.completed_tasks = self.state.failed_tasks = 0
+        steps = {step.id: step for step in plan.steps}
 
-            logger.info(f"执行批次: {len(ready_tasks)} 个任务")
+        # 回放执行日志: 上次中断前已完成的步骤不再执行
+        execution_log = self._open_execution_log(plan, tasks)
+        for task in tasks:
+            if task.status == TaskStatus.COMPLETED:
+                self.result_handler.record_task(task)
 
-            # 3. 执行批次任务
-            batch_results = await self._execute_task_batch(ready_tasks, plan)
+        reservations: Dict[str, Any] = {}
 
-            # 4. 批次后处理 (同步, 记忆, 验证, Git提交, 钩子)
-            await self._process_batch_results(batch_results, plan)
+        async def admit(task: TaskExecution, executor: DagExecutor) -> bool:
+            return await self._reserve_token_budget(task, token_estimates[task.task_id], reservations, executor)
 
-            executed.extend(batch_results)
-            remaining = [t for t in remaining if t not in batch_results]
-            self.result_handler.update_state(executed)
+        async def run_task(task: TaskExecution) -> TaskExecution:
+            try:
+                step = steps.get(task.step_id)
+                if step:
+                    await self.worktree_orchestrator.create_for_task(task, step.agent_type.value)
+                if execution_log:
+                    task.status = TaskStatus.RUNNING
+                    execution_log.record(task)
+                return await self.agent_dispatcher.execute_with_agent(task)
+            finally:
+                # 按实际使用量结算 Token 预留, 释放未用完的部分
+                reservation = reservations.pop(task.task_id, None)
+                if reservation:
+                    await self.token_monitor.commit(reservation)
+
+        async def on_task_done(task: TaskExecution) -> None:
+            # v3.3: 检查是否应该创建检查点
+            await self._maybe_checkpoint(executor)
+
+            # 任务后处理 (同步, 记忆, 验证, Git提交)
+            await self._process_task_result(task, plan)
+            self.result_handler.record_task(task)
 
             # v3.3: 执行 PostTask 钩子
             if self._hook_manager:
-                for task in batch_results:
-                    step = plan.get_step_by_id(task.step_id)
-                    task_dict = {
-                        "task_id": task.step_id,
-                        "name": task.step_id,
-                        "status": task.status.value,
-                        "agent_type": step.agent_type.value if step else None
-                    }
-                    await self._hook_manager.execute_post_task(task_dict, task.status.value)
-
-            # 5. 快速失败逻辑
-            if self.config.enable_early_failure and any(
-                t.status == TaskStatus.FAILED for t in batch_results
-            ):
-                logger.error("检测到任务失败, 停止后续执行")
-                for task in remaining:
-                    task.status = TaskStatus.SKIPPED
-                executed.extend(remaining)
-                break
+                step = steps.get(task.step_id)
+                task_dict = {
+                    "task_id": task.step_id,
+                    "name": task.step_id,
+                    "status": task.status.value,
+                    "agent_type": step.agent_type.value if step else None
+                }
+                await self._hook_manager.execute_post_task(task_dict, task.status.value)
+
+        executor = self.scheduler.create_executor(
+            tasks,
+            run_task,
+            plan,
+            fail_fast=self.config.enable_early_failure,
+            cancel_status=TaskStatus.SKIPPED,
+            on_task_done=on_task_done,
+            admit=admit,
+            on_state_change=execution_log.record if execution_log else None
+        )
+        try:
+            executed = await executor.run()
+        finally:
+            if execution_log:
+                execution_log.close()
+        self.result_handler.update_state(executed)
 
+        # 全部完成后删除日志, 再次执行同一计划时从头开始; 否则保留以便恢复
+        if execution_log and all(t.status == TaskStatus.COMPLETED for t in executed):
+            execution_log.discard()
         return executed
 
-    async def _check_token_budget_for_remaining(
-        self,
-        remaining: List[TaskExecution],
-        executed: List[TaskExecution]
-    ) -> bool:
-        """检查剩余任务的 Token 预算"""
-        total_estimated = 0
-        for task in remaining:
-            task_content = task.description or ""
-            total_estimated += self.token_monitor.estimate_tokens(task_content) + 2000
-
-        is_sufficient, budget_msg = await self.token_monitor.check_budget(total_estimated)
-        if not is_sufficient:
-            logger.error(f"由于 Token 预算限制，停止执行: {budget_msg}")
-            for task in remaining:
-                task.status = TaskStatus.FAILED
-                task.error = budget_msg
-            executed.extend(remaining)
-            return False
-        elif budget_msg:
-            self.add_log(f"预算提示: {budget_msg}")
-        return True
-
-    async def _execute_task_batch(
+    def _open_execution_log(
         self,
-        ready_tasks: List[TaskExecution],
-        plan: ExecutionPlan
-    ) -> List[TaskExecution]:
-        """执行一批就绪任务"""
-        async def create_wt(task):
-            step = plan.get_step_by_id(task.step_id)
-            if step:
-                await self.worktree_orchestrator.create_for_task(task, step.agent_type.value)
+        plan: ExecutionPlan,
+        tasks: List[TaskExecution]
+    ) -> Optional[PlanExecutionLog]:
+        """打开计划的执行日志并恢复已完成的任务 (日志不可用时不记录)"""
+        if not self.config.enable_execution_log:
+            return None
+        execution_log = PlanExecutionLog.for_plan(
+            self.project_root / self.config.execution_log_dir,
+            plan,
+            fsync=self.config.execution_log_fsync
+        )
+        try:
+            execution_log.restore(tasks)
+        except (OSError, ValueError) as e:
+            logger.warning(f"执行日志不可用, 本次执行不记录 ({type(e).__name__}): {e}")
+            return None
+        return execution_log
 
-        return await self.scheduler.execute_batch(ready_tasks, worktree_creator_callback=create_wt)
+    async def _maybe_checkpoint(self, executor: DagExecutor) -> None:
+        """v3.3: 按完成任务数或时间间隔自动创建会话检查点"""
+        if not (self._hook_manager and self._session_manager):
+            return
+        self._actions_since_checkpoint += 1
+        if not await self._session_manager.should_auto_checkpoint(self._actions_since_checkpoint):
+            return
+
+        task_status = {t.step_id: t.status.value for t in executor.pending_tasks()}
+        memory_stats = (
+            self.memory_manager.get_statistics()
+            if self.memory_manager else {}
+        )
+        await self._session_manager.create_checkpoint(
+            task_status=task_status,
+            memory_summary=memory_stats,
+            context_summary=f"已完成 {len(executor.executed)} 个任务"
+        )
+        self._actions_since_checkpoint = 0
 
-    async def _process_batch_results(
+    async def _reserve_token_budget(
         self,
-        batch_results: List[TaskExecution],
-        plan: ExecutionPlan
-    ):
-        """对批次执行结果进行后处理"""
-        for task in batch_results:
-            # 同步 Worktree
-            await self.worktree_orchestrator.sync_to_root(task)
+        task: TaskExecution,
+        estimate: int,
+        reservations: Dict[str, Any],
+        executor: DagExecutor
+    ) -> bool:
+        """任务准入: 预留预估的 Token 数
+
+        预留不足时暂缓启动, 等运行中的任务结算后重试 (预算紧张时自动降低并行度);
+        没有运行中的任务仍无法预留时, 剩余任务因预算不足失败。
+        """
+        reservation = await self.token_monitor.reserve(task.task_id, estimate)
+        if reservation:
+            reservations[task.task_id] = reservation
+            return True
+
+        if executor.running_count == 0:
+            budget_msg = (
+                f"Token 预算不足: 任务 {task.task_id} 预估 {estimate}, "
+                f"剩余 {self.token_monitor.available_tokens}"
+            )
+            logger.error(f"由于 Token 预算限制，停止执行: {budget_msg}")
+            executor.stop(TaskStatus.FAILED, budget_msg)
+        else:
+            logger.debug(f"Token 预留不足, 任务 {task.task_id} 等待运行中的任务结算")
+        return False
+
+    async def _process_task_result(self, task: TaskExecution, plan: ExecutionPlan) -> None:
+        """对单个任务的执行结果进行后处理"""
+        # 同步 Worktree
+        await self.worktree_orchestrator.sync_to_root(task)
 
-            # 保存任务记忆
-            await self.result_handler.save_task_memory(task, plan.description)
+        # 保存任务记忆
+        await self.result_handler.save_task_memory(task, plan.description)
 
-            # 单任务焦点模式验证
-            await self._handle_single_task_mode_validation(task)
+        # 单任务焦点模式验证
+        await self._handle_single_task_mode_validation(task)
 
-            # Git 自动提交
-            await self._handle_git_auto_commit(task, plan)
+        # Git 自动提交
+        await self._handle_git_auto_commit(task, plan)
 
     async def _handle_single_task_mode_validation(self, task: TaskExecution):
         """处理单任务焦点模式的验证与自动拆分"""
@@ -57,6 +57,19 @@ class ExecutionResultHandler:
         msg = f"进度更新: {self.state.progress:.1f}% ({completed_count}/{self.state.total_tasks})"
         logger.debug(msg)
 
+    def record_task(self, task: TaskExecution) -> None:
+        """记录单个结束的任务 (增量更新进度, 不必重新统计全部任务)"""
+        if task.status == TaskStatus.COMPLETED:
+            self.state.completed_tasks += 1
+        elif task.status == TaskStatus.FAILED:
+            self.state.failed_tasks += 1
+        else:
+            return
+
+        if self.state.total_tasks > 0:
+            self.state.progress = (self.state.completed_tasks + self.state.failed_tasks) / self.state.total_tasks * 100
+            logger.debug(f"进度更新: {self.state.progress:.1f}% ({self.state.completed_tasks}/{self.state.total_tasks})")
+
     async def save_task_memory(self, task: TaskExecution, plan_description: str) -> None:
         """保存任务执行到记忆系统"""
         if not self.memory_manager:
@@ -220,16 +220,23 @@ class ReviewOrchestrator(BaseOrchestrator):
         improvement_summary = "\n".join([f"- {imp.get('description')}" for imp in improvements])
 
         repair_tasks = []
+        # 修复任务相互独立, 关键路径即自身耗时; 以文件大小粗略估计耗时, 大文件先启动
+        ranks: Optional[Dict[str, float]] = (
+            {} if self.config.enable_critical_path_scheduling else None
+        )
         for filename, content in improved_code.items():
+            step_id = f"repair-{filename}"
+            if ranks is not None:
+                ranks[step_id] = float(len(content))
             repair_task = TaskExecution(
                 task_id=f"repair-{filename}-{datetime.now().strftime('%H%M%S')}",
-                step_id="repair",
+                step_id=step_id,
                 status=TaskStatus.PENDING,
                 priority=ExecutionPriority.HIGH
             )
             repair_task.inputs = {
                 "description": f"根据以下建议修复代码文件 {filename}:\n{improvement_summary}",
-                "agent_type": AgentType.CODER.value,
+                "agent_type": AgentType.CODE_REFACTORING.value,
                 "file_path": filename,
                 "current_content": content,
                 "improvements": improvements
@@ -243,7 +250,8 @@ class ReviewOrchestrator(BaseOrchestrator):
 
         batch_results = await self.agent_dispatcher.execute_batch(
             repair_tasks,
-            max_parallel=self.config.max_parallel_tasks
+            max_concurrent=self.config.max_parallel_tasks,
+            ranks=ranks
         )
 
         for repair_result in batch_results:
@@ -2,13 +2,15 @@
 # -*- coding: utf-8 -*-
 """
 任务调度器 (TaskScheduler)
-负责任务依赖解析、批处理与执行顺序管理
+负责任务依赖解析、批处理与执行顺序管理 (按依赖执行由 DagExecutor 完成)
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 from planning.models import ExecutionPlan
+from .critical_path import CriticalPathRanker
+from .dag_executor import DagExecutor
 from .models import TaskExecution, TaskStatus, ExecutionPriority
 
 logger = logging.getLogger(__name__)
@@ -62,57 +64,45 @@ class TaskScheduler:
                 ready_tasks.append(task)
         return ready_tasks
 
+    def create_executor(
+        self,
+        tasks: List[TaskExecution],
+        run_task: Callable[[TaskExecution], Awaitable[TaskExecution]],
+        plan: Optional[ExecutionPlan] = None,
+        **kwargs: Any
+    ) -> DagExecutor:
+        """创建 DAG 执行器
+
+        并发上限取自配置 (未启用并行时串行执行); 提供计划且启用关键路径调度时,
+        就绪任务按步骤预计耗时计算的剩余最长路径排序。
+        """
+        max_parallel = self.config.max_parallel_tasks if self.config.enable_parallel_execution else 1
+        if plan is not None and self.config.enable_critical_path_scheduling:
+            kwargs.setdefault("ranker", CriticalPathRanker(plan.steps))
+        return DagExecutor(tasks, run_task, max_parallel=max_parallel, **kwargs)
+
     async def schedule_and_run(
         self,
         plan: ExecutionPlan,
         executor: Any,
         worktree_creator_callback: Optional[Any] = None
     ) -> List[TaskExecution]:
-        """调度并运行整个计划"""
-        # 1. 创建任务执行记录
-        remaining = self.create_task_executions(plan)
-        executed = []
-
-        logger.info(f"调度器开始执行计划: {plan.project_id}, 总任务数: {len(remaining)}")
-
-        # 2. 调度循环
-        while remaining:
-            # 2.1 找出就绪的任务
-            ready_tasks = self.find_ready_tasks(remaining, executed)
-
-            if not ready_tasks:
-                if remaining:
-                    # 如果还有剩余任务但没有就绪任务,说明存在循环依赖
-                    logger.error("检测到循环依赖,无法继续执行")
-                    for t in remaining:
-                        t.status = TaskStatus.FAILED
-                        t.error = "循环依赖导致任务无法就绪"
-                        executed.append(t)
-                    break
-                else:
-                    break
-
-            # 2.2 执行当前批次
-            logger.info(f"调度批次: {len(ready_tasks)} 个就绪任务")
-            batch_results = await self.execute_batch(ready_tasks, worktree_creator_callback)
-
-            # 2.3 更新状态
-            for task in batch_results:
-                executed.append(task)
-                # 从剩余任务中移除
-                remaining = [t for t in remaining if t.task_id != task.task_id]
-
-            # 2.4 检查是否有失败任务(如果配置了失败即停止)
-            if any(t.status == TaskStatus.FAILED for t in batch_results):
-                logger.warning("批次中有任务失败,根据策略停止调度")
-                # 将剩余任务标记为取消
-                for t in remaining:
-                    t.status = TaskStatus.CANCELLED
-                    executed.append(t)
-                remaining = []
-                break
-
-        logger.info(f"计划执行完成: {plan.project_id}, 完成任务: {len(executed)}")
+        """调度并运行整个计划
+
+        任务在最后一个依赖完成后立即启动; 有任务失败时停止调度, 未启动的任务标记为取消。
+        """
+        tasks = self.create_task_executions(plan)
+        logger.info(f"调度器开始执行计划, 总任务数: {len(tasks)}")
+
+        async def run_task(task: TaskExecution) -> TaskExecution:
+            if worktree_creator_callback:
+                await worktree_creator_callback(task)
+            return await self.agent_dispatcher.execute_with_agent(task)
+
+        executed = await self.create_executor(tasks, run_task, plan, fail_fast=True).run()
+
+        completed = sum(1 for t in executed if t.status == TaskStatus.COMPLETED)
+        logger.info(f"计划执行完成, 完成任务: {completed}/{len(executed)}")
         return executed
 
     async def execute_batch(
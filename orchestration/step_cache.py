@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+步骤结果缓存 (StepResultCache)
+
+重新规划同一功能或失败后重试计划时, 输入和依赖文件都没有变化的步骤直接复用上次的结果,
+不再调用 Agent。
+
+- 缓存键: blake2b(缓存版本 + Agent 类型 + 规范化的 task.inputs + 声明的输入文件内容指纹)
+- 输入文件由 inputs["input_files"] (或 inputs["files"]) 声明, 相对路径基于 worktree/项目根目录
+- 每个结果一个 JSON 文件, 原子替换写入; 超出磁盘预算时按最近访问时间 (mtime) 删除最旧的文件
+- 只缓存声明了输入文件的步骤 (未声明时缓存键不反映项目状态), 步骤可通过 inputs["cache"] = False 关闭;
+  只缓存成功的结果
+- 命中时不调用 Agent, Agent 写入的源文件等副作用不会重现, 上游任务的输出也不在缓存键中,
+  因此只应对无副作用的步骤启用 (OrchestrationConfig.enable_step_cache 默认关闭)
+- 命中/未命中通过 common.monitoring 导出
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from common.monitoring import MetricsManager
+from config.constants import Paths, StepCacheConfig
+
+logger = logging.getLogger(__name__)
+
+# 缓存内容或键的计算方式变化时递增, 使旧结果失效
+STEP_CACHE_VERSION = 1
+
+# 步骤输入中关闭缓存的开关 (不参与缓存键)
+CACHE_OPT_OUT_KEY = "cache"
+
+# 声明输入文件的字段 (按顺序取第一个存在的)
+INPUT_FILES_KEYS = ("input_files", "files")
+
+
+def declared_input_files(inputs: Dict[str, Any]) -> List[str]:
+    """步骤声明的输入文件 (去重并排序)"""
+    for name in INPUT_FILES_KEYS:
+        files = inputs.get(name)
+        if files:
+            if isinstance(files, (str, Path)):
+                files = [files]
+            return sorted({str(f) for f in files})
+    return []
+
+
+def _hash_file(digest: Any, path: Path) -> None:
+    with open(path, 'rb') as f:
+        while chunk := f.read(StepCacheConfig.HASH_CHUNK_SIZE.value):
+            digest.update(chunk)
+
+
+def file_fingerprint(path: Path) -> str:
+    """文件内容指纹; 目录按相对路径顺序合并其中所有文件, 不存在的路径记为 missing"""
+    if not path.exists():
+        return "missing"
+    digest = hashlib.blake2b(digest_size=16)
+    if path.is_dir():
+        for child in sorted(p for p in path.rglob("*") if p.is_file()):
+            digest.update(child.relative_to(path).as_posix().encode('utf-8') + b"\0")
+            _hash_file(digest, child)
+    else:
+        _hash_file(digest, path)
+    return digest.hexdigest()
+
+
+class StepResultCache:
+    """按输入与输入文件指纹缓存步骤结果的磁盘缓存"""
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_disk_bytes: int = StepCacheConfig.MAX_DISK_BYTES.value,
+        prune_every: int = StepCacheConfig.PRUNE_EVERY.value
+    ) -> None:
+        """初始化
+
+        Args:
+            cache_dir: 缓存目录
+            max_disk_bytes: 磁盘字节预算
+            prune_every: 每写入多少个结果检查一次预算
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_disk_bytes = max_disk_bytes
+        self.prune_every = max(1, prune_every)
+        self._writes = 0
+        self._lock = threading.Lock()  # 读写与缓存键计算都在线程池中执行
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_project(cls, project_root: Path, **kwargs: Any) -> "StepResultCache":
+        """创建项目级缓存 (目录为 <project_root>/.superagent/cache/steps)"""
+        return cls(Path(project_root) / Paths.CACHE_DIR.value / StepCacheConfig.SUBDIR.value, **kwargs)
+
+    @staticmethod
+    def is_enabled_for(inputs: Dict[str, Any]) -> bool:
+        """步骤是否允许使用缓存: 需声明输入文件, inputs["cache"] = False 时关闭"""
+        if inputs.get(CACHE_OPT_OUT_KEY, True) is False:
+            return False
+        return bool(declared_input_files(inputs))
+
+    @staticmethod
+    def make_key(agent_type: str, inputs: Dict[str, Any], base_dir: Path) -> Optional[str]:
+        """生成缓存键; 输入文件无法读取时返回 None (不使用缓存)"""
+        normalized = {k: v for k, v in inputs.items() if k != CACHE_OPT_OUT_KEY}
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{STEP_CACHE_VERSION}:{agent_type}:".encode())
+        digest.update(json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+
+        for name in declared_input_files(inputs):
+            path = Path(name)
+            if not path.is_absolute():
+                path = Path(base_dir) / path
+            try:
+                fingerprint = file_fingerprint(path)
+            except OSError as e:
+                logger.debug(f"计算输入文件指纹失败, 不使用步骤缓存 {path}: {e}")
+                return None
+            digest.update(f"\0{name}\0{fingerprint}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的结果 ({"result", "artifacts"}), 未命中时返回 None"""
+        path = self._path(key)
+        entry = None
+        try:
+            entry = json.loads(path.read_text(encoding='utf-8'))
+            os.utime(path)  # 记录访问时间, 供按 LRU 清理
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.debug(f"读取步骤缓存失败 {path}: {e}")
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        MetricsManager.record_step_cache("miss" if entry is None else "hit")
+        return entry
+
+    def put(self, key: str, result: Dict[str, Any], artifacts: Optional[List[str]] = None) -> None:
+        """写入步骤结果"""
+        path = self._path(key)
+        payload = json.dumps({
+            "version": STEP_CACHE_VERSION,
+            "result": result,
+            "artifacts": artifacts or [],
+            "created_at": datetime.now().isoformat()
+        }, ensure_ascii=False, default=str)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            temp_file.write_text(payload, encoding='utf-8')
+            temp_file.replace(path)
+        except OSError as e:
+            logger.warning(f"写入步骤缓存失败 {path}: {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """超出磁盘预算时删除最久未访问的结果, 返回删除的文件数"""
+        files = []
+        total = 0
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue  # 其他进程刚删除
+            files.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        removed = 0
+        if total > self.max_disk_bytes:
+            files.sort()
+            for _, size, path in files:
+                if total <= self.max_disk_bytes:
+                    break
+                try:
+                    path.unlink()
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+        MetricsManager.update_step_cache_bytes(total)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计 (命中数、未命中数与命中率)"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
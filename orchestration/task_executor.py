@@ -19,6 +19,7 @@ from .models import (
     ExecutionContext
 )
 from .agent_factory import AgentFactory
+from .step_cache import StepResultCache
 from common.models import AgentType
 from execution import AgentContext, AgentConfig
 
@@ -29,13 +30,15 @@ logger = logging.getLogger(__name__)
 class TaskExecutor:
     """任务执行器"""
 
-    def __init__(self, context: ExecutionContext) -> None:
+    def __init__(self, context: ExecutionContext, step_cache: Optional[StepResultCache] = None) -> None:
         """初始化任务执行器
 
         Args:
             context: 执行上下文
+            step_cache: 步骤结果缓存 (None 表示不缓存)
         """
         self.context: ExecutionContext = context
+        self.step_cache: Optional[StepResultCache] = step_cache
         self.running_tasks: Dict[str, TaskExecution] = {}
         self._active_async_tasks: Dict[str, asyncio.Task] = {}  # 存储实际的 asyncio.Task
         self._lock: asyncio.Lock = asyncio.Lock()  # 用于同步操作的锁
@@ -143,6 +146,25 @@ class TaskExecutor:
             except (ValueError, KeyError):
                 raise ValueError(f"不支持的Agent类型: {agent_type_str}")
 
+        # 输入与输入文件都未变化时复用缓存的结果, 不调用 Agent (缓存的文件 IO 都在线程池中执行)
+        cache_key = None
+        if self.step_cache and StepResultCache.is_enabled_for(task.inputs):
+            base_dir = task.worktree_path or self.context.worktree_path or self.context.project_root
+            cache_key = await asyncio.to_thread(
+                StepResultCache.make_key, agent_type.value, task.inputs, base_dir
+            )
+            cached = await asyncio.to_thread(self.step_cache.get, cache_key) if cache_key else None
+            if cached is not None:
+                logger.info(f"任务 {task.task_id} 命中步骤结果缓存, 跳过 Agent 执行")
+                task.logs.append("命中步骤结果缓存")
+                if cached["artifacts"]:
+                    await self._persist_artifacts(
+                        cached["artifacts"],
+                        self.context.project_root,
+                        task.worktree_path
+                    )
+                return cached["result"]
+
         # 获取或创建Agent实例 (每个任务使用独立的Agent实例以确保隔离性)
         # 创建Agent配置
         agent_config = AgentConfig(
@@ -175,7 +197,11 @@ class TaskExecutor:
                 task.worktree_path
             )
 
-        return result if isinstance(result, dict) else {"result": str(result)}
+        output = result if isinstance(result, dict) else {"result": str(result)}
+        if cache_key and getattr(result, 'success', True) is not False:
+            artifacts = [str(artifact) for artifact in getattr(result, 'artifacts', None) or []]
+            await asyncio.to_thread(self.step_cache.put, cache_key, output, artifacts)
+        return output
 
     async def execute_batch(
         self,
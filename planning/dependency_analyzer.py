@@ -7,7 +7,7 @@
 """
 
 import logging
-from typing import List
+from typing import Dict, List, Optional
 
 from .models import Step, DependencyGraph, RequirementAnalysis
 
@@ -179,3 +179,47 @@ class DependencyAnalyzer:
 
         # 计算所有步骤的路径时间,返回最大值
         return max(get_path_time(step_id) for step_id in graph.nodes.keys())
+
+    def compute_upward_ranks(
+        self,
+        steps: List[Step],
+        durations: Optional[Dict[str, float]] = None
+    ) -> Dict[str, float]:
+        """计算每个步骤的上行秩 (HEFT): 自身耗时 + 下游最长路径耗时 (秒)
+
+        秩越大, 步骤离计划结束越远, 应越早启动。按逆拓扑序迭代计算, 不受递归深度限制;
+        循环依赖中的步骤只计自身耗时。
+
+        Args:
+            steps: 步骤列表
+            durations: 步骤耗时 (秒), 缺省时使用 estimated_time
+
+        Returns:
+            Dict[str, float]: 步骤ID -> 上行秩
+        """
+        weights = {
+            step.id: (durations[step.id] if durations and step.id in durations
+                      else step.estimated_time.total_seconds())
+            for step in steps
+        }
+        dependents: Dict[str, List[str]] = {step.id: [] for step in steps}
+        dependencies: Dict[str, List[str]] = {}
+        for step in steps:
+            dependencies[step.id] = [dep for dep in set(step.dependencies) if dep in dependents]
+            for dep_id in dependencies[step.id]:
+                dependents[dep_id].append(step.id)
+
+        unranked = {step_id: len(children) for step_id, children in dependents.items()}
+        stack = [step_id for step_id, count in unranked.items() if count == 0]
+        ranks: Dict[str, float] = {}
+        while stack:
+            step_id = stack.pop()
+            ranks[step_id] = weights[step_id] + max((ranks[c] for c in dependents[step_id]), default=0.0)
+            for dep_id in dependencies[step_id]:
+                unranked[dep_id] -= 1
+                if unranked[dep_id] == 0:
+                    stack.append(dep_id)
+
+        for step_id in dependents:
+            ranks.setdefault(step_id, weights[step_id])
+        return ranks
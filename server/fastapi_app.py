@@ -166,9 +166,22 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     logger.info("Starting SuperAgent API Server v3.4.0...")
     logger.info("Features: Natural Language Chat, Project Guide, Task Execution")
+
+    # 后台归档较旧的情节记忆 (不阻塞保存)
+    # 单例按服务的项目根目录和配置的存储后端创建, 之后的 Orchestrator 复用同一实例
+    from config.settings import load_config
+    from memory.memory_manager import MemoryManager
+    memory_config = load_config(project_root=PROJECT_ROOT).memory
+    MemoryManager.get_instance(
+        PROJECT_ROOT, storage_backend=memory_config.storage_backend
+    ).start_retention()
     yield
     logger.info("Shutting down SuperAgent API Server...")
 
+    # 落盘记忆写回队列中尚未保存的条目, 停止归档任务
+    if MemoryManager._instance is not None:
+        await MemoryManager._instance.drain()
+
 
 app = FastAPI(
     title="SuperAgent API",
@@ -269,10 +282,15 @@ async def health_check():
     try:
         from memory.memory_manager import MemoryManager
         mm = MemoryManager.get_instance()
+        cache_stats = mm.get_cache_stats()
         health_info["components"]["memory_manager"] = {
             "status": "healthy",
             "memory_dir": str(mm.memory_dir),
-            "cache_size": mm.get_cache_stats()["total_entries"]
+            "cache_size": cache_stats["total_entries"],
+            "cache_bytes": cache_stats["total_bytes"],
+            "cache_hits": cache_stats["hits"],
+            "cache_misses": cache_stats["misses"],
+            "cache_hit_rate": cache_stats["hit_rate"]
         }
     except Exception as e:
         health_info["components"]["memory_manager"] = {
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+内容定义分块单元测试
+"""
+
+import random
+import unittest
+from pathlib import Path
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from context.chunking import apply_chunk_delta, chunk_delta, chunk_text
+
+
+def _document(rng: random.Random, lines: int) -> str:
+    return "".join(f"line {rng.randint(0, 10**6)} {'y' * rng.randint(0, 60)}\n" for _ in range(lines))
+
+
+class TestChunking(unittest.TestCase):
+    """测试 chunk_text / chunk_delta"""
+
+    def test_chunks_cover_text(self):
+        text = _document(random.Random(1), 5000)
+        chunks = chunk_text(text, min_size=256, avg_size=2048, max_size=8192)
+        self.assertEqual(sum(c.length for c in chunks), len(text))
+        self.assertTrue(all(c.length <= 8192 + 200 for c in chunks))
+        self.assertTrue(all(text[c.start + c.length - 1] == "\n" for c in chunks))
+
+    def test_insert_only_touches_nearby_chunks(self):
+        """中间插入内容后, 增量大小与改动成正比"""
+        text = _document(random.Random(2), 20000)
+        middle = len(text) // 2
+        middle = text.index("\n", middle) + 1
+        new_text = text[:middle] + "inserted\n" + text[middle:]
+
+        delta = chunk_delta(text, new_text)
+        self.assertLess(delta["inserted"], 4 * 32768)
+        self.assertLess(delta["ratio"], 0.1)
+        self.assertEqual(apply_chunk_delta(text, delta), new_text)
+
+    def test_roundtrip_random(self):
+        rng = random.Random(3)
+        for _ in range(50):
+            old = _document(rng, rng.randint(0, 300))
+            lines = old.splitlines(keepends=True)
+            for _ in range(rng.randint(0, 5)):
+                position = rng.randint(0, len(lines))
+                if lines and rng.random() < 0.5:
+                    del lines[min(position, len(lines) - 1)]
+                else:
+                    lines.insert(position, _document(rng, 1))
+            new = "".join(lines)
+            delta = chunk_delta(old, new, min_size=64, avg_size=256, max_size=1024)
+            self.assertEqual(apply_chunk_delta(old, delta), new)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -45,6 +45,7 @@ class TestEnvConfig:
             "SUPERAGENT_ORCHESTRATION_PARALLEL",
             "SUPERAGENT_EXPERIENCE_LEVEL",
             "SUPERAGENT_ORCHESTRATION_MAX_TASKS",
+            "SUPERAGENT_MEMORY_BACKEND",
         ]:
             os.environ.pop(key, None)
 
@@ -86,6 +87,15 @@ class TestEnvConfig:
         assert "orchestration" in overrides
         assert overrides["orchestration"]["max_parallel_tasks"] == 5
 
+    def test_memory_backend_override(self):
+        """测试记忆存储后端环境变量"""
+        os.environ["SUPERAGENT_MEMORY_BACKEND"] = "SQLite"
+
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config = load_config(project_root=Path(tmpdir))
+            assert config.memory.storage_backend == "sqlite"
+
     def test_load_config_from_env_experience_level(self):
         """测试经验等级环境变量"""
         os.environ["SUPERAGENT_EXPERIENCE_LEVEL"] = "master"
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+增量对话历史压缩器单元测试
+"""
+
+import json
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from context.conversation_compressor import ConversationCompressor
+from context.smart_compressor import KeyInformationExtractor
+
+
+def _message(role: str, content: str) -> dict:
+    return {"role": role, "content": content}
+
+
+class TestConversationCompressor(unittest.TestCase):
+    """测试滚动摘要与尾部窗口"""
+
+    def test_tail_bounded_and_evicted_folded(self):
+        """尾部不超过 Token 上限, 移出的消息进入摘要"""
+        compressor = ConversationCompressor(max_tail_tokens=80)
+        compressor.add(_message("user", "技术栈: Python, FastAPI" + "。补充说明" * 10))
+        compressor.add(_message("assistant", "约束: 响应时间小于 200ms" + "。补充说明" * 10))
+        compressor.add(_message("user", "下一步做什么?"))
+
+        self.assertLessEqual(compressor.tail_tokens, 80)
+        messages = compressor.messages()
+        self.assertEqual(messages[0]["role"], "system")
+        self.assertIn("技术/Tech: FastAPI; Python", messages[0]["content"])
+        self.assertEqual(messages[-1]["content"], "下一步做什么?")
+        self.assertEqual(compressor.folded_count, 1)
+        self.assertEqual(len(messages), 3)
+
+    def test_message_count_limit(self):
+        """按条数限制时只保留最近的消息"""
+        compressor = ConversationCompressor(max_tail_messages=3)
+        for i in range(10):
+            compressor.add(_message("user", f"需求: 功能{i}"))
+
+        self.assertEqual([m["content"] for m in compressor.messages()[1:]],
+                         ["需求: 功能7", "需求: 功能8", "需求: 功能9"])
+        self.assertEqual(compressor.folded_count, 7)
+        # 最近折叠的信息排在前面
+        self.assertIn("功能6; 功能5", compressor.summary())
+
+    def test_incremental_cost(self):
+        """每条消息只在折叠时提取一次关键信息"""
+        compressor = ConversationCompressor(max_tail_messages=2)
+        with patch.object(KeyInformationExtractor, "extract", wraps=compressor._extractor.extract) as extract:
+            for i in range(50):
+                compressor.add(_message("user", f"需求: 功能{i}"))
+                compressor.messages()
+        self.assertEqual(extract.call_count, 48)
+
+    def test_oversized_message_kept_compressed(self):
+        """单条超长消息压缩后保留, 不会清空尾部"""
+        compressor = ConversationCompressor(max_tail_tokens=50)
+        compressor.add(_message("user", "需求: 支持导出报表\n" + "很长的描述。" * 200))
+
+        self.assertEqual(len(compressor), 1)
+        self.assertLessEqual(compressor.tail_tokens, 50)
+        self.assertIn("导出报表", compressor.messages()[0]["content"])
+
+    def test_state_roundtrip(self):
+        """状态可 JSON 序列化, 恢复后继续累积"""
+        compressor = ConversationCompressor(max_tail_messages=2)
+        for i in range(5):
+            compressor.add(_message("user", f"决策: 方案{i}"))
+
+        state = json.loads(json.dumps(compressor.to_dict(), ensure_ascii=False))
+        restored = ConversationCompressor.from_dict(state)
+        self.assertEqual(restored.messages(), compressor.messages())
+
+        restored.add(_message("user", "决策: 方案5"))
+        self.assertEqual(restored.folded_count, 4)
+        self.assertIn("方案2", restored.summary())
+
+        with self.assertRaises(ValueError):
+            ConversationCompressor.from_dict({"version": 99})
+
+    def test_clear(self):
+        compressor = ConversationCompressor(max_tail_messages=1)
+        compressor.extend([_message("user", "需求: a"), _message("user", "需求: b")])
+        compressor.clear()
+        self.assertEqual(compressor.messages(), [])
+        self.assertEqual(compressor.summary(), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+事件驱动 DAG 执行器单元测试
+"""
+
+import asyncio
+import time
+import unittest
+from pathlib import Path
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from common.models import AgentType
+from datetime import timedelta
+
+from orchestration.agent_dispatcher import AgentDispatcher
+from orchestration.critical_path import CriticalPathRanker
+from orchestration.dag_executor import DagExecutor
+from orchestration.models import AgentResource, OrchestrationConfig, TaskExecution, TaskStatus
+from orchestration.scheduler import TaskScheduler
+from planning.models import DependencyGraph, ExecutionPlan, RequirementAnalysis, Requirements, Step
+
+
+def _task(step_id: str, *dependencies: str) -> TaskExecution:
+    return TaskExecution(
+        task_id=f"task-{step_id}",
+        step_id=step_id,
+        status=TaskStatus.PENDING,
+        dependencies=list(dependencies)
+    )
+
+
+class _Runner:
+    """按 step_id 配置耗时与结果的任务执行函数, 记录启动/结束时间与最大并发数"""
+
+    def __init__(self, durations=None, failing=()):
+        self.durations = durations or {}
+        self.failing = set(failing)
+        self.started = {}
+        self.finished = {}
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, task: TaskExecution) -> TaskExecution:
+        self.started[task.step_id] = time.monotonic()
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.durations.get(task.step_id, 0))
+        finally:
+            self.running -= 1
+        self.finished[task.step_id] = time.monotonic()
+        task.status = TaskStatus.FAILED if task.step_id in self.failing else TaskStatus.COMPLETED
+        return task
+
+
+def _statuses(executed):
+    return {t.step_id: t.status for t in executed}
+
+
+class TestDagExecutor(unittest.IsolatedAsyncioTestCase):
+    """测试 DagExecutor"""
+
+    async def test_dependent_starts_without_waiting_for_slow_sibling(self):
+        """慢任务不阻塞无关的任务链"""
+        runner = _Runner({"backend": 0.3, "frontend": 0.01, "frontend_test": 0.01})
+        tasks = [_task("backend"), _task("frontend"), _task("frontend_test", "frontend")]
+
+        executed = await DagExecutor(tasks, runner).run()
+
+        self.assertEqual(set(_statuses(executed).values()), {TaskStatus.COMPLETED})
+        self.assertLess(runner.finished["frontend_test"], runner.finished["backend"])
+        self.assertEqual([t.step_id for t in executed], ["frontend", "frontend_test", "backend"])
+
+    async def test_dependencies_and_parallel_limit(self):
+        runner = _Runner({f"s{i}": 0.01 for i in range(10)})
+        tasks = [_task(f"s{i}") for i in range(8)] + [_task("s8", "s0", "s7"), _task("s9", "s8")]
+
+        executed = await DagExecutor(tasks, runner, max_parallel=3).run()
+
+        self.assertEqual(len(executed), 10)
+        self.assertEqual(runner.max_running, 3)
+        self.assertGreaterEqual(runner.started["s8"], max(runner.finished["s0"], runner.finished["s7"]))
+        self.assertGreaterEqual(runner.started["s9"], runner.finished["s8"])
+
+    async def test_fail_fast(self):
+        """失败后不再启动新任务, 运行中的任务正常结束"""
+        runner = _Runner({"a": 0.01, "b": 0.05}, failing={"a"})
+        tasks = [_task("a"), _task("b"), _task("c", "b"), _task("d", "a")]
+
+        executed = await DagExecutor(tasks, runner, cancel_status=TaskStatus.SKIPPED).run()
+
+        self.assertEqual(_statuses(executed), {
+            "a": TaskStatus.FAILED,
+            "b": TaskStatus.COMPLETED,
+            "c": TaskStatus.SKIPPED,
+            "d": TaskStatus.SKIPPED
+        })
+        self.assertNotIn("c", runner.started)
+
+    async def test_failure_skips_only_dependents(self):
+        runner = _Runner(failing={"a"})
+        tasks = [_task("a"), _task("b", "a"), _task("c", "b"), _task("d")]
+
+        executed = await DagExecutor(tasks, runner, fail_fast=False).run()
+
+        self.assertEqual(_statuses(executed), {
+            "a": TaskStatus.FAILED,
+            "b": TaskStatus.SKIPPED,
+            "c": TaskStatus.SKIPPED,
+            "d": TaskStatus.COMPLETED
+        })
+        self.assertIn("a", executed[1].error)
+
+    async def test_cycle_and_missing_dependency(self):
+        runner = _Runner()
+        tasks = [_task("a", "b"), _task("b", "a"), _task("c", "missing"), _task("d")]
+
+        executed = await DagExecutor(tasks, runner).run()
+
+        statuses = _statuses(executed)
+        self.assertEqual(statuses.pop("d"), TaskStatus.COMPLETED)
+        self.assertEqual(set(statuses.values()), {TaskStatus.FAILED})
+
+    async def test_callbacks_and_stop(self):
+        """完成回调可修改状态; before_launch 可停止启动并指定未启动任务的状态"""
+        runner = _Runner()
+        tasks = [_task("a"), _task("b", "a"), _task("c", "b")]
+
+        async def on_task_done(task):
+            if task.step_id == "a":
+                task.outputs["checked"] = True
+
+        async def before_launch(executor):
+            if executor.pending_cost <= 2:
+                executor.stop(TaskStatus.FAILED, "预算不足")
+                return False
+            return True
+
+        executor = DagExecutor(
+            tasks, runner, on_task_done=on_task_done, before_launch=before_launch, task_cost=lambda t: 1
+        )
+        executed = await executor.run()
+
+        self.assertTrue(executed[0].outputs["checked"])
+        self.assertEqual(_statuses(executed), {
+            "a": TaskStatus.COMPLETED,
+            "b": TaskStatus.FAILED,
+            "c": TaskStatus.FAILED
+        })
+        self.assertEqual(executed[1].error, "预算不足")
+
+    async def test_admission_throttles_parallelism(self):
+        """准入检查拒绝时等待运行中的任务结束后重试, 而不是让任务失败"""
+        runner = _Runner({f"s{i}": 0.01 for i in range(6)})
+        tasks = [_task(f"s{i}") for i in range(6)]
+        slots = {"free": 2}
+
+        async def admit(task, executor):
+            if slots["free"] == 0:
+                return False
+            slots["free"] -= 1
+            return True
+
+        async def on_task_done(task):
+            slots["free"] += 1
+
+        executed = await DagExecutor(tasks, runner, max_parallel=6, admit=admit, on_task_done=on_task_done).run()
+
+        self.assertEqual(set(_statuses(executed).values()), {TaskStatus.COMPLETED})
+        self.assertEqual(runner.max_running, 2)
+
+    async def test_admission_never_possible(self):
+        async def admit(task, executor):
+            return False
+
+        executed = await DagExecutor([_task("a"), _task("b", "a")], _Runner(), admit=admit).run()
+        self.assertEqual(set(_statuses(executed).values()), {TaskStatus.FAILED})
+
+    async def test_task_exception_marks_failed(self):
+        async def boom(task):
+            raise RuntimeError("boom")
+
+        executed = await DagExecutor([_task("a"), _task("b", "a")], boom).run()
+        self.assertEqual(_statuses(executed), {"a": TaskStatus.FAILED, "b": TaskStatus.SKIPPED})
+        self.assertIn("RuntimeError", executed[0].error)
+
+
+def _wide_dag_with_chain(chain_length: int, width: int):
+    """一条长依赖链 (排在计划末尾) + width 个独立的短任务, 每个步骤预计 1 分钟"""
+    steps = [Step(id=f"w{i}", name=f"w{i}", description="", agent_type=AgentType.FRONTEND_DEV) for i in range(width)]
+    for i in range(chain_length):
+        steps.append(Step(
+            id=f"c{i}", name=f"c{i}", description="", agent_type=AgentType.BACKEND_DEV,
+            dependencies=[f"c{i - 1}"] if i else []
+        ))
+    for step in steps:
+        step.estimated_time = timedelta(minutes=1)
+    tasks = [_task(step.id, *step.dependencies) for step in steps]
+    return steps, tasks
+
+
+class TestCriticalPathScheduling(unittest.IsolatedAsyncioTestCase):
+    """测试关键路径优先调度"""
+
+    async def test_long_chain_starts_first(self):
+        """长依赖链的头部先启动, 总耗时更短"""
+        steps, tasks = _wide_dag_with_chain(chain_length=10, width=20)
+        durations = {step.id: 0.01 for step in steps}
+
+        start = time.monotonic()
+        await DagExecutor(tasks, _Runner(durations), max_parallel=3).run()
+        fifo = time.monotonic() - start
+
+        steps, tasks = _wide_dag_with_chain(chain_length=10, width=20)
+        runner = _Runner(durations)
+        start = time.monotonic()
+        await DagExecutor(tasks, runner, max_parallel=3, ranker=CriticalPathRanker(steps)).run()
+        ranked = time.monotonic() - start
+
+        self.assertEqual(min(runner.started, key=runner.started.get), "c0")
+        self.assertLess(ranked, fifo)
+
+    def test_rerank_from_observed_durations(self):
+        """某类 Agent 的实际耗时远超预计时重新计算秩"""
+        steps, _ = _wide_dag_with_chain(chain_length=2, width=2)
+        ranker = CriticalPathRanker(steps, min_interval=1)
+        self.assertEqual(ranker.rank("c0"), 120.0)
+        self.assertEqual(ranker.rank("w0"), 60.0)
+
+        self.assertFalse(ranker.observe("w1", 65.0))
+        self.assertTrue(ranker.observe("w0", 600.0))
+        self.assertGreater(ranker.rank("w0"), ranker.rank("c0"))
+
+
+class _Dispatcher:
+    def __init__(self, runner):
+        self.runner = runner
+
+    async def execute_with_agent(self, task):
+        return await self.runner(task)
+
+
+class TestTaskSchedulerDag(unittest.IsolatedAsyncioTestCase):
+    """测试 TaskScheduler.schedule_and_run"""
+
+    def _plan(self, *steps):
+        return ExecutionPlan(
+            requirements=Requirements(user_input="demo"),
+            steps=[
+                Step(id=sid, name=sid, description=sid, agent_type=AgentType.BACKEND_DEV, dependencies=list(deps))
+                for sid, *deps in steps
+            ],
+            dependencies=DependencyGraph(),
+            analysis=RequirementAnalysis()
+        )
+
+    async def test_schedule_and_run(self):
+        runner = _Runner({"slow": 0.2})
+        scheduler = TaskScheduler(OrchestrationConfig(max_parallel_tasks=2), _Dispatcher(runner))
+        created = []
+
+        async def create_worktree(task):
+            created.append(task.step_id)
+
+        executed = await scheduler.schedule_and_run(
+            self._plan(("slow",), ("a",), ("b", "a")), executor=None, worktree_creator_callback=create_worktree
+        )
+
+        self.assertEqual([t.step_id for t in executed], ["a", "b", "slow"])
+        self.assertEqual(sorted(created), ["a", "b", "slow"])
+
+    async def test_create_executor_uses_critical_path(self):
+        plan = self._plan(("a",), ("b", "a"))
+        scheduler = TaskScheduler(OrchestrationConfig(), _Dispatcher(_Runner()))
+        self.assertIsNotNone(scheduler.create_executor([], _Runner(), plan).ranker)
+
+        scheduler.config.enable_critical_path_scheduling = False
+        self.assertIsNone(scheduler.create_executor([], _Runner(), plan).ranker)
+
+    async def test_dispatcher_batch_follows_critical_path(self):
+        """批量执行时同一优先级内按关键路径秩启动, 与计划中的顺序无关"""
+        started = []
+
+        class _Executor:
+            async def execute(self, task):
+                started.append(task.step_id)
+                task.status = TaskStatus.COMPLETED
+                return task
+
+        dispatcher = AgentDispatcher({"backend-dev": AgentResource(agent_type="backend-dev", max_concurrent=1)})
+        dispatcher.task_executor = _Executor()
+        scheduler = TaskScheduler(OrchestrationConfig(max_parallel_tasks=1), dispatcher)
+        plan = self._plan(("x",), ("a",), ("b", "a"), ("c", "b"))
+        ready = [t for t in scheduler.create_task_executions(plan) if not t.dependencies]
+
+        await dispatcher.execute_batch(ready, 1, ranks=CriticalPathRanker(plan.steps).ranks)
+        self.assertEqual(started, ["a", "x"])
+
+        started.clear()
+        await dispatcher.execute_batch(ready, 1)
+        self.assertEqual(started, ["x", "a"])
+
+    async def test_repair_ranks_follow_config_flag(self):
+        """审查修复任务仅在启用关键路径调度时附带排序秩"""
+        from orchestration.review_orchestrator import ReviewOrchestrator
+
+        calls = []
+
+        class _BatchDispatcher:
+            async def execute_batch(self, tasks, max_concurrent=5, ranks=None):
+                calls.append(ranks)
+                return tasks
+
+        code = {"big.py": "x" * 100, "small.py": "x"}
+        for enabled in (True, False):
+            config = OrchestrationConfig(enable_code_review=False, enable_critical_path_scheduling=enabled)
+            orchestrator = ReviewOrchestrator(Path("."), config, agent_dispatcher=_BatchDispatcher())
+            await orchestrator._improvement_callback(code, [])
+
+        self.assertEqual(calls[0], {"repair-big.py": 100.0, "repair-small.py": 1.0})
+        self.assertIsNone(calls[1])
+
+    async def test_serial_when_parallel_disabled(self):
+        runner = _Runner({"a": 0.01, "b": 0.01})
+        config = OrchestrationConfig(enable_parallel_execution=False)
+        scheduler = TaskScheduler(config, _Dispatcher(runner))
+
+        await scheduler.schedule_and_run(self._plan(("a",), ("b",)), executor=None)
+        self.assertEqual(runner.max_running, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
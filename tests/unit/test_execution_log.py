@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+计划执行预写日志单元测试
+"""
+
+import asyncio
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+from pathlib import Path
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from common.models import AgentType
+from orchestration.dag_executor import DagExecutor
+from orchestration.execution_log import PlanExecutionLog, plan_fingerprint
+from orchestration.models import TaskExecution, TaskExecutionResult, TaskStatus
+from planning.models import DependencyGraph, ExecutionPlan, RequirementAnalysis, Requirements, Step
+
+
+def _task(step_id: str, *dependencies: str) -> TaskExecution:
+    return TaskExecution(
+        task_id=f"task-{step_id}",
+        step_id=step_id,
+        status=TaskStatus.PENDING,
+        dependencies=list(dependencies)
+    )
+
+
+def _chain_tasks():
+    """a -> b -> c, a -> d (串行执行顺序: a, b, d, c)"""
+    return [_task("a"), _task("b", "a"), _task("d", "a"), _task("c", "b")]
+
+
+def _plan(description: str = "计划") -> ExecutionPlan:
+    steps = [
+        Step(
+            id=step_id,
+            name=step_id,
+            description=f"步骤 {step_id}",
+            agent_type=AgentType.BACKEND_DEV,
+            estimated_time=timedelta(minutes=1),
+            dependencies=list(dependencies)
+        )
+        for step_id, dependencies in [("a", []), ("b", ["a"])]
+    ]
+    return ExecutionPlan(
+        requirements=Requirements(user_input=description),
+        steps=steps,
+        analysis=RequirementAnalysis(),
+        dependencies=DependencyGraph()
+    )
+
+
+class _Runner:
+    """记录执行过的步骤; 执行到 crash_on 时模拟进程中断"""
+
+    def __init__(self, crash_on=None):
+        self.crash_on = crash_on
+        self.ran = []
+
+    async def __call__(self, task: TaskExecution) -> TaskExecution:
+        if task.step_id == self.crash_on:
+            raise asyncio.CancelledError()
+        await asyncio.sleep(0)
+        self.ran.append(task.step_id)
+        task.status = TaskStatus.COMPLETED
+        task.outputs = {"step": task.step_id}
+        task.result = TaskExecutionResult(success=True, content=f"{task.step_id} 完成", status=TaskStatus.COMPLETED)
+        return task
+
+
+class TestPlanExecutionLog(unittest.TestCase):
+    """测试日志记录与回放"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_replay_returns_latest_record_per_task(self):
+        """回放得到每个任务的最后状态, 完成记录带结果引用"""
+        log = PlanExecutionLog(self.temp_dir, fsync=False)
+        task = _task("a")
+        for status in (TaskStatus.READY, TaskStatus.ASSIGNED, TaskStatus.RUNNING, TaskStatus.COMPLETED):
+            task.status = status
+            log.record(task)
+        other = _task("b", "a")
+        other.status = TaskStatus.READY
+        log.record(other)
+        log.close()
+
+        latest = PlanExecutionLog(self.temp_dir).replay()
+        self.assertEqual(latest["task-a"]["status"], "completed")
+        self.assertTrue(latest["task-a"]["result_ref"].startswith("results/"))
+        self.assertEqual(latest["task-b"]["status"], "ready")
+        self.assertEqual(latest["task-b"]["seq"], 5)
+
+    def test_torn_tail_is_truncated(self):
+        """末尾写了一半或校验失败的记录被截掉, 之后可以继续追加"""
+        log = PlanExecutionLog(self.temp_dir, fsync=False)
+        task = _task("a")
+        task.status = TaskStatus.COMPLETED
+        log.record(task)
+        log.close()
+        valid_size = log.wal_path.stat().st_size
+        with open(log.wal_path, "a", encoding="utf-8") as f:
+            f.write('0badc0de {"seq":2,"task_id":"task-b"')
+
+        reopened = PlanExecutionLog(self.temp_dir, fsync=False)
+        self.assertEqual(list(reopened.replay()), ["task-a"])
+        self.assertEqual(reopened.wal_path.stat().st_size, valid_size)
+
+        other = _task("b")
+        other.status = TaskStatus.FAILED
+        other.error = "失败"
+        reopened.record(other)
+        reopened.close()
+        latest = PlanExecutionLog(self.temp_dir).replay()
+        self.assertEqual(latest["task-b"]["status"], "failed")
+        self.assertEqual(latest["task-b"]["seq"], 2)
+
+    def test_torn_multibyte_tail_is_truncated(self):
+        """末尾记录在多字节字符中间被截断时同样截掉, 不影响恢复"""
+        log = PlanExecutionLog(self.temp_dir, fsync=False)
+        done = _task("a")
+        done.status = TaskStatus.COMPLETED
+        log.record(done)
+        failed = _task("b", "a")
+        failed.status = TaskStatus.FAILED
+        failed.error = "执行失败: 依赖缺失"
+        log.record(failed)
+        log.close()
+
+        data = log.wal_path.read_bytes()
+        valid_size = data.index(b"\n") + 1
+        torn = data[:data.index("失败".encode("utf-8")) + 1]  # 停在多字节字符中间
+        log.wal_path.write_bytes(torn)
+
+        tasks = [_task("a"), _task("b", "a")]
+        self.assertEqual(PlanExecutionLog(self.temp_dir, fsync=False).restore(tasks), 1)
+        self.assertEqual(tasks[0].status, TaskStatus.COMPLETED)
+        self.assertEqual(log.wal_path.stat().st_size, valid_size)
+
+    def test_restore_loads_completed_results_and_compacts(self):
+        """恢复已完成任务的结果与输出, 其余任务保持原状态; 日志只保留完成记录"""
+        log = PlanExecutionLog(self.temp_dir, fsync=False)
+        done = _task("a")
+        done.status = TaskStatus.COMPLETED
+        done.outputs = {"files": ["a.py"]}
+        done.result = TaskExecutionResult(success=True, content="代码", status=TaskStatus.COMPLETED)
+        log.record(done)
+        running = _task("b", "a")
+        running.status = TaskStatus.RUNNING
+        log.record(running)
+        log.close()
+
+        tasks = [_task("a"), _task("b", "a")]
+        restored = PlanExecutionLog(self.temp_dir, fsync=False)
+        self.assertEqual(restored.restore(tasks), 1)
+        self.assertEqual(tasks[0].status, TaskStatus.COMPLETED)
+        self.assertEqual(tasks[0].outputs, {"files": ["a.py"]})
+        self.assertIsInstance(tasks[0].result, TaskExecutionResult)
+        self.assertEqual(tasks[0].result.content, "代码")
+        self.assertEqual(tasks[1].status, TaskStatus.PENDING)
+        self.assertEqual(list(PlanExecutionLog(self.temp_dir).replay()), ["task-a"])
+
+    def test_plan_fingerprint_depends_on_steps(self):
+        """需求与步骤相同的计划共享日志, 任一变化后使用新的日志"""
+        plan = _plan()
+        self.assertEqual(plan_fingerprint(plan), plan_fingerprint(_plan()))
+        changed = _plan()
+        changed.steps[1].dependencies = []
+        self.assertNotEqual(plan_fingerprint(plan), plan_fingerprint(changed))
+        self.assertNotEqual(plan_fingerprint(plan), plan_fingerprint(_plan("另一个计划")))
+        self.assertEqual(
+            PlanExecutionLog.for_plan(self.temp_dir, plan).log_dir,
+            self.temp_dir / plan_fingerprint(plan)
+        )
+
+
+class TestResumeFromLog(unittest.IsolatedAsyncioTestCase):
+    """测试中断后按日志恢复执行"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_executor_skips_completed_tasks(self):
+        """已完成的任务不再执行, 其下游任务正常就绪"""
+        tasks = _chain_tasks()
+        tasks[0].status = TaskStatus.COMPLETED
+        runner = _Runner()
+
+        executed = await DagExecutor(tasks, runner, max_parallel=2).run()
+
+        self.assertNotIn("a", runner.ran)
+        self.assertCountEqual(runner.ran, ["b", "c", "d"])
+        self.assertEqual(len(executed), 4)
+        self.assertTrue(all(t.status == TaskStatus.COMPLETED for t in executed))
+
+    async def test_resume_after_crash_runs_only_unfinished_steps(self):
+        """进程在执行 c 时中断, 重新执行时只运行 c"""
+        log = PlanExecutionLog(self.temp_dir, fsync=False)
+        first = _Runner(crash_on="c")
+        with self.assertRaises(asyncio.CancelledError):
+            await DagExecutor(_chain_tasks(), first, max_parallel=1, on_state_change=log.record).run()
+        log.close()
+        self.assertCountEqual(first.ran, ["a", "b", "d"])
+
+        tasks = _chain_tasks()
+        resumed_log = PlanExecutionLog(self.temp_dir, fsync=False)
+        self.assertEqual(resumed_log.restore(tasks), 3)
+        second = _Runner()
+        executed = await DagExecutor(tasks, second, on_state_change=resumed_log.record).run()
+        resumed_log.close()
+
+        self.assertEqual(second.ran, ["c"])
+        self.assertTrue(all(t.status == TaskStatus.COMPLETED for t in executed))
+        self.assertEqual(tasks[1].outputs, {"step": "b"})
+        self.assertEqual(
+            {record["status"] for record in PlanExecutionLog(self.temp_dir).replay().values()},
+            {"completed"}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,14 +12,20 @@ from datetime import datetime
 import sys
 import os
 import asyncio
+import shutil
+import subprocess
+from unittest.mock import patch
 
 # 添加模块路径
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+from context import incremental_updater
+from context.fs_watcher import GitIgnoreRules
 from context.incremental_updater import (
     FileSnapshot,
     ChangeRecord,
+    IncrementalConfig,
     IncrementalUpdater,
     IncrementalUpdateManager
 )
@@ -349,5 +355,383 @@ class TestDiffGeneration(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(ratio1, 0.0)
 
 
+class TestProjectSnapshotFastPath(unittest.IsolatedAsyncioTestCase):
+    """测试项目快照的 stat 快速路径"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="superagent_fastpath_"))
+        old = datetime.now().timestamp() - 60
+        for name in ("a.py", "b.py", "pkg/c.py"):
+            path = self.temp_dir / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"# {name}\n", encoding='utf-8')
+            os.utime(path, (old, old))
+        (self.temp_dir / "node_modules").mkdir()
+        (self.temp_dir / "node_modules" / "dep.js").write_text("x", encoding='utf-8')
+        self.updater = IncrementalUpdater(self.temp_dir)
+
+    async def asyncTearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_unchanged_files_not_rehashed(self):
+        """元数据未变化的文件复用已保存的哈希"""
+        first = await self.updater.take_project_snapshot()
+        self.assertEqual(set(first), {"a.py", "b.py", os.path.join("pkg", "c.py")})
+
+        (self.temp_dir / "b.py").write_text("# changed\n", encoding='utf-8')
+        with patch.object(incremental_updater, "hash_file", wraps=incremental_updater.hash_file) as hashed:
+            second = await self.updater.take_project_snapshot()
+
+        self.assertEqual(hashed.call_count, 1)
+        self.assertEqual(second["a.py"].hash, first["a.py"].hash)
+        self.assertNotEqual(second["b.py"].hash, first["b.py"].hash)
+
+    async def test_recently_modified_files_rehashed(self):
+        """快照前刚修改过的文件 (同一 mtime 内可能再次写入) 不走快速路径"""
+        (self.temp_dir / "a.py").write_text("# fresh\n", encoding='utf-8')
+        await self.updater.take_project_snapshot()
+
+        with patch.object(incremental_updater, "hash_file", wraps=incremental_updater.hash_file) as hashed:
+            await self.updater.take_project_snapshot()
+        self.assertEqual(hashed.call_count, 1)
+
+    async def test_binary_file_snapshot(self):
+        """二进制文件按字节哈希, 不缓存内容"""
+        binary = self.temp_dir / "image.bin"
+        binary.write_bytes(b"\x89PNG\xff\xfe\x00")
+        snapshot = await self.updater.take_snapshot("image.bin")
+
+        self.assertIsNotNone(snapshot)
+        self.assertIsNone(snapshot.content)
+
+        binary.write_bytes(b"\x89PNG\xff\xfe\x01")
+        changes = await self.updater.detect_changes(["image.bin"])
+        self.assertEqual(changes[0].change_type, "modified")
+        self.assertEqual(changes[0].diff_ratio, 1.0)
+        self.assertIsNone(changes[0].diff)
+
+    async def test_without_content_cache_reuses_loaded_index(self):
+        """不缓存内容时, 重启后从索引加载的快照同样可以复用"""
+        config = IncrementalConfig(cache_content=False)
+        await IncrementalUpdater(self.temp_dir, config).take_project_snapshot()
+
+        reloaded = IncrementalUpdater(self.temp_dir, config)
+        with patch.object(incremental_updater, "hash_file", wraps=incremental_updater.hash_file) as hashed:
+            await reloaded.take_project_snapshot()
+        self.assertEqual(hashed.call_count, 0)
+
+
+class TestSnapshotBlobStore(unittest.IsolatedAsyncioTestCase):
+    """测试快照内容的内容寻址存储"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="superagent_blobs_"))
+        self.updater = IncrementalUpdater(self.temp_dir, IncrementalConfig(max_snapshots_per_file=2))
+
+    async def asyncTearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_index_holds_metadata_only(self):
+        """索引不含内容, 相同内容只存一份 blob"""
+        for name in ("a.py", "b.py"):
+            (self.temp_dir / name).write_text("same = 1\n", encoding='utf-8')
+        await self.updater.take_snapshot(["a.py", "b.py"])
+
+        index = json.loads(self.updater.index_file.read_text(encoding='utf-8'))
+        self.assertEqual(index["version"], 2)
+        self.assertTrue(all(d["content"] is None for d in index["snapshots"].values()))
+        self.assertEqual(len(list(self.updater.blobs.iter_hashes())), 1)
+        self.assertIsNone(self.updater.snapshots["a.py"].content)
+
+    async def test_diff_after_restart_loads_blob(self):
+        """重启后计算 diff 时按需读取 blob"""
+        test_file = self.temp_dir / "test.py"
+        original = "".join(f"line{i}\n" for i in range(20))
+        test_file.write_text(original, encoding='utf-8')
+        await self.updater.take_snapshot("test.py")
+
+        test_file.write_text(original + "line20\n", encoding='utf-8')
+        reloaded = IncrementalUpdater(self.temp_dir)
+        update = await reloaded.get_incremental_update("test.py")
+
+        self.assertTrue(update["use_incremental"])
+        self.assertIn("+line20", update["diff"])
+
+    async def test_history_limit_and_gc(self):
+        """历史版本受 max_snapshots_per_file 限制, 清理时回收未引用的 blob"""
+        test_file = self.temp_dir / "test.py"
+        for version in range(4):
+            test_file.write_text(f"version = {version}\n", encoding='utf-8')
+            await self.updater.take_snapshot("test.py")
+
+        self.assertEqual(len(self.updater.get_history("test.py")), 1)
+        self.assertEqual(len(list(self.updater.blobs.iter_hashes())), 4)
+
+        self.updater.blobs.gc_grace_seconds = 0
+        await self.updater.cleanup_old_snapshots()
+        self.assertEqual(len(list(self.updater.blobs.iter_hashes())), 2)
+
+        reloaded = IncrementalUpdater(self.temp_dir)
+        self.assertEqual(len(reloaded.get_history("test.py")), 1)
+        self.assertEqual(await reloaded.load_content(reloaded.snapshots["test.py"]), "version = 3\n")
+
+    async def test_load_legacy_index(self):
+        """兼容旧版扁平索引"""
+        legacy = {"test.py": FileSnapshot("test.py", 1, 1.0, "abc", 1.0).to_dict()}
+        del legacy["test.py"]["inode"]
+        self.updater.index_file.write_text(json.dumps(legacy), encoding='utf-8')
+
+        reloaded = IncrementalUpdater(self.temp_dir)
+        self.assertEqual(reloaded.snapshots["test.py"].hash, "abc")
+        self.assertEqual(reloaded.get_history("test.py"), [])
+
+
+class TestRenameAndChunkDelta(unittest.IsolatedAsyncioTestCase):
+    """测试重命名/复制检测与大文件块级增量"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="superagent_renames_"))
+        self.body = "".join(f"value_{i} = {i}\n" for i in range(40))
+        (self.temp_dir / "old.py").write_text(self.body, encoding='utf-8')
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def _detect(self, config: IncrementalConfig = None, mutate=None):
+        updater = IncrementalUpdater(self.temp_dir, config)
+        await updater.take_project_snapshot()
+        mutate()
+        return updater, await updater.detect_project_changes()
+
+    async def test_exact_rename(self):
+        """内容不变的移动合并为一条 renamed 记录"""
+        _, changes = await self._detect(mutate=lambda: (self.temp_dir / "old.py").rename(self.temp_dir / "new.py"))
+
+        self.assertEqual([(c.path, c.change_type, c.old_path) for c in changes], [("new.py", "renamed", "old.py")])
+        summary = IncrementalUpdater.summarize_changes(changes)
+        self.assertEqual(summary["moved_from"], {"new.py": "old.py"})
+        self.assertEqual(summary["added"] + summary["deleted"], [])
+
+    async def test_similar_rename(self):
+        """开启相似度检测后, 移动并小幅修改的文件附带 diff"""
+        def mutate():
+            (self.temp_dir / "old.py").unlink()
+            (self.temp_dir / "new.py").write_text(self.body + "extra = 1\n", encoding='utf-8')
+
+        _, changes = await self._detect(IncrementalConfig(rename_similarity=0.8), mutate)
+        self.assertEqual(len(changes), 1)
+        self.assertEqual((changes[0].change_type, changes[0].old_path), ("renamed", "old.py"))
+        self.assertIn("+extra = 1", changes[0].diff)
+
+        # 默认只识别内容完全相同的重命名
+        (self.temp_dir / "new.py").unlink()
+        (self.temp_dir / "old.py").write_text(self.body, encoding='utf-8')
+        _, changes = await self._detect(mutate=mutate)
+        self.assertEqual(sorted(c.change_type for c in changes), ["added", "deleted"])
+
+    async def test_copy(self):
+        """开启复制检测后, 与已有文件内容相同的新增文件记为 copied"""
+        def mutate():
+            shutil.copy(self.temp_dir / "old.py", self.temp_dir / "copy.py")
+
+        _, changes = await self._detect(IncrementalConfig(detect_copies=True), mutate)
+        self.assertEqual([(c.path, c.change_type, c.old_path) for c in changes], [("copy.py", "copied", "old.py")])
+
+    async def test_large_file_chunk_delta(self):
+        """大文件的增量以块级增量表示, 应用后得到新内容"""
+        big = self.temp_dir / "big.txt"
+        original = "".join(f"record {i}: {'x' * (i % 50)}\n" for i in range(20000))
+        big.write_text(original, encoding='utf-8')
+        changed = original[:300_000] + "inserted line\n" + original[300_000:]
+
+        updater, changes = await self._detect(
+            IncrementalConfig(chunk_min_size=64 * 1024),
+            lambda: big.write_text(changed, encoding='utf-8')
+        )
+        self.assertEqual([c.change_type for c in changes], ["modified"])
+        self.assertIsNotNone(changes[0].chunk_delta)
+        self.assertLess(changes[0].chunk_delta["inserted"], 40_000)
+
+        update = await updater.get_incremental_update("big.txt")
+        self.assertTrue(update["use_incremental"])
+        self.assertLess(update["diff_size"], 40_000)
+        big.write_text(original, encoding='utf-8')
+        self.assertTrue(await updater.apply_incremental_update(update, original))
+        self.assertEqual(big.read_text(encoding='utf-8'), changed)
+
+
+def _git(cwd: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, capture_output=True
+    )
+
+
+@unittest.skipIf(shutil.which("git") is None, "需要 git")
+class TestGitChangeDetection(unittest.IsolatedAsyncioTestCase):
+    """测试基于 Git 脏文件集合的变更检测"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="superagent_git_"))
+        _git(self.temp_dir, "init", "-q")
+        self.a_content = "".join(f"x{i} = {i}\n" for i in range(20))
+        (self.temp_dir / "a.py").write_text(self.a_content, encoding='utf-8')
+        for name in ("b.py", "c.py"):
+            (self.temp_dir / name).write_text(f"# {name}\n", encoding='utf-8')
+        _git(self.temp_dir, "add", ".")
+        _git(self.temp_dir, "commit", "-q", "-m", "init")
+        self.manager = IncrementalUpdateManager(self.temp_dir)
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_only_dirty_paths_compared(self):
+        """检查点后的修改、新增、删除和提交都能检测到, 且不扫描整个项目"""
+        (self.temp_dir / "b.py").write_text("# dirty before\n", encoding='utf-8')
+        with patch.object(IncrementalUpdater, "take_project_snapshot") as full_scan:
+            await self.manager.before_agent_execution()
+
+            (self.temp_dir / "a.py").write_text(self.a_content + "print('changed')\n", encoding='utf-8')
+            (self.temp_dir / "b.py").write_text("# dirty after\n", encoding='utf-8')
+            (self.temp_dir / "c.py").unlink()
+            (self.temp_dir / "new.py").write_text("# new\n", encoding='utf-8')
+            _git(self.temp_dir, "add", "a.py")
+            _git(self.temp_dir, "commit", "-q", "-m", "agent")
+
+            changes = {c.path: c for c in await self.manager.get_updates()}
+        full_scan.assert_not_called()
+
+        self.assertEqual(
+            {path: c.change_type for path, c in changes.items()},
+            {"a.py": "modified", "b.py": "modified", "c.py": "deleted", "new.py": "added"}
+        )
+        # 检查点时干净的文件从 Git 读取旧内容计算 diff
+        self.assertIn("+print('changed')", changes["a.py"].diff)
+
+    async def test_after_agent_execution_counts_changes(self):
+        await self.manager.before_agent_execution()
+        (self.temp_dir / "a.py").write_text("# changed\n", encoding='utf-8')
+
+        result = await self.manager.after_agent_execution()
+        self.assertEqual(result["change_count"], 1)
+        self.assertEqual(result["changes"][0]["path"], "a.py")
+
+    async def test_untracked_heavy_falls_back(self):
+        """未跟踪文件过多时退回文件系统扫描"""
+        manager = IncrementalUpdateManager(self.temp_dir, IncrementalConfig(git_max_untracked=1))
+        for i in range(3):
+            (self.temp_dir / f"untracked_{i}.txt").write_text("x", encoding='utf-8')
+
+        await manager.before_agent_execution()
+        self.assertIsNone(manager._checkpoint)
+        (self.temp_dir / "a.py").write_text("# changed\n", encoding='utf-8')
+        changes = await manager.get_updates()
+        self.assertEqual([c.path for c in changes], ["a.py"])
+
+    async def test_filesystem_mode(self):
+        manager = IncrementalUpdateManager(self.temp_dir, IncrementalConfig(change_detection="filesystem"))
+        self.assertIsNone(manager.git)
+
+
+class TestGitIgnoreRules(unittest.TestCase):
+    """测试 .gitignore 规则匹配"""
+
+    def test_patterns(self):
+        temp_dir = Path(tempfile.mkdtemp(prefix="superagent_ignore_"))
+        try:
+            (temp_dir / ".gitignore").write_text(
+                "# comment\n*.log\n!keep.log\nbuild/\n/dist\ndocs/**/*.tmp\n", encoding='utf-8'
+            )
+            (temp_dir / "pkg").mkdir()
+            (temp_dir / "pkg" / ".gitignore").write_text("generated.py\n", encoding='utf-8')
+            rules = GitIgnoreRules()
+            rules.load("", temp_dir / ".gitignore")
+            rules.load("pkg", temp_dir / "pkg" / ".gitignore")
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        self.assertTrue(rules.is_ignored("a/debug.log", False))
+        self.assertFalse(rules.is_ignored("keep.log", False))
+        self.assertTrue(rules.is_ignored("src/build", True))
+        self.assertFalse(rules.is_ignored("src/build", False))
+        self.assertTrue(rules.is_ignored("dist", True))
+        self.assertFalse(rules.is_ignored("src/dist", True))
+        self.assertTrue(rules.is_ignored("docs/a/b/x.tmp", False))
+        self.assertTrue(rules.is_ignored("pkg/sub/generated.py", False))
+        self.assertFalse(rules.is_ignored("generated.py", False))
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify 仅支持 Linux")
+class TestWatchMode(unittest.IsolatedAsyncioTestCase):
+    """测试 inotify 实时脏文件跟踪"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="superagent_watch_"))
+        (self.temp_dir / ".gitignore").write_text("build/\n", encoding='utf-8')
+        (self.temp_dir / "old").mkdir()
+        for name in ("a.py", "b.py", "old/c.py"):
+            (self.temp_dir / name).write_text(f"# {name}\n", encoding='utf-8')
+        self.manager = IncrementalUpdateManager(
+            self.temp_dir, IncrementalConfig(watch=True, change_detection="filesystem")
+        )
+        await self.manager.before_agent_execution()
+        if self.manager._watcher is None:
+            self.skipTest("inotify 不可用")
+
+    async def asyncTearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_changes_since_checkpoint(self):
+        """只比较监视到的脏路径, 忽略跳过目录和 .gitignore 中的路径"""
+        (self.temp_dir / "a.py").write_text("# changed\n", encoding='utf-8')
+        (self.temp_dir / "b.py").unlink()
+        shutil.rmtree(self.temp_dir / "old")
+        (self.temp_dir / "new" / "deep").mkdir(parents=True)
+        (self.temp_dir / "new" / "deep" / "d.py").write_text("# d\n", encoding='utf-8')
+        (self.temp_dir / "build").mkdir()
+        (self.temp_dir / "build" / "out.txt").write_text("x", encoding='utf-8')
+        (self.temp_dir / "node_modules").mkdir()
+        (self.temp_dir / "node_modules" / "dep.js").write_text("x", encoding='utf-8')
+
+        with patch.object(IncrementalUpdater, "take_project_snapshot") as full_scan:
+            changes = await self.manager.get_updates()
+        full_scan.assert_not_called()
+
+        self.assertEqual(
+            {c.path: c.change_type for c in changes},
+            {
+                "a.py": "modified",
+                "b.py": "deleted",
+                os.path.join("old", "c.py"): "deleted",
+                os.path.join("new", "deep", "d.py"): "added",
+            }
+        )
+
+    async def test_checkpoint_resets_dirty_set(self):
+        (self.temp_dir / "a.py").write_text("# changed\n", encoding='utf-8')
+        with patch.object(IncrementalUpdater, "take_project_snapshot") as full_scan:
+            await self.manager.before_agent_execution()
+        full_scan.assert_not_called()
+        self.assertEqual(await self.manager.get_updates(), [])
+
+        (self.temp_dir / "b.py").write_text("# changed\n", encoding='utf-8')
+        self.assertEqual([c.path for c in await self.manager.get_updates()], ["b.py"])
+
+    async def test_overflow_falls_back_to_rescan(self):
+        """事件队列溢出后退回全量扫描"""
+        (self.temp_dir / "a.py").write_text("# changed\n", encoding='utf-8')
+        self.manager._watcher.overflowed = True
+
+        changes = await self.manager.get_updates()
+        self.assertEqual([c.path for c in changes], ["a.py"])
+
+        await self.manager.before_agent_execution()
+        self.assertFalse(self.manager._watcher.overflowed)
+        self.assertEqual(await self.manager.get_updates(), [])
+
+
 if __name__ == "__main__":
     unittest.main()
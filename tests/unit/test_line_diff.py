@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+按行 diff 引擎单元测试
+"""
+
+import difflib
+import random
+import tempfile
+import shutil
+import time
+import unittest
+from pathlib import Path
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from context.incremental_updater import IncrementalUpdater
+from context.line_diff import diff_texts
+
+
+def _unified(old: str, new: str) -> str:
+    return ''.join(difflib.unified_diff(
+        old.splitlines(keepends=True), new.splitlines(keepends=True), fromfile='before', tofile='after'
+    ))
+
+
+class TestLineDiff(unittest.TestCase):
+    """测试 diff_texts"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix="superagent_line_diff_")
+        self.updater = IncrementalUpdater(Path(self.temp_dir))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_same_format_as_difflib(self):
+        """简单修改的输出与 difflib.unified_diff 一致"""
+        cases = [
+            ("def hello():\n    pass\n", "def hello():\n    print('hi')\n    pass\n"),
+            ("".join(f"line{i}\n" for i in range(30)), "".join(f"line{i}\n" for i in range(30) if i != 15)),
+            ("a\nb\nc\n", "a\nB\nc\n"),
+        ]
+        for old, new in cases:
+            self.assertEqual(diff_texts(old, new).diff, _unified(old, new))
+
+    def test_ratio(self):
+        self.assertEqual(diff_texts("hello", "hello").ratio, 0.0)
+        self.assertEqual(diff_texts("", "new\n").ratio, 1.0)
+        result = diff_texts("a\nb\nc\nd\n", "a\nb\nc\nX\n")
+        self.assertAlmostEqual(result.ratio, 0.25)
+
+    def test_roundtrip_random(self):
+        """随机输入生成的 diff 应用后得到新内容"""
+        rng = random.Random(7)
+        for _ in range(300):
+            vocab = [f"v{i}\n" for i in range(rng.randint(1, 5))]
+            old = "".join(rng.choice(vocab) for _ in range(rng.randint(1, 20)))
+            new = "".join(rng.choice(vocab) for _ in range(rng.randint(1, 20)))
+            result = diff_texts(old, new)
+            self.assertTrue(result.complete)
+            self.assertEqual(self.updater._apply_diff(old, result.diff), new)
+
+    def test_repetitive_file_is_fast(self):
+        """大量重复行的大文件不会退化为二次复杂度"""
+        old = "x = 1\n" * 200_000
+        new = old[:600_000] + "y = 2\n" + old[600_000:]
+        start = time.monotonic()
+        result = diff_texts(old, new)
+        self.assertLess(time.monotonic() - start, 5.0)
+        self.assertTrue(result.complete)
+        self.assertIn("+y = 2\n", result.diff)
+        self.assertLess(result.ratio, 0.001)
+
+    def test_size_ratio_cutoff(self):
+        """大小差异已超过阈值时直接返回比例下界"""
+        result = diff_texts("a\n", "a\n" + "b\n" * 10, max_ratio=0.3)
+        self.assertFalse(result.complete)
+        self.assertIsNone(result.diff)
+        self.assertGreaterEqual(result.ratio, 0.3)
+
+    def test_budgets(self):
+        """超出大小或时间预算时退回全量内容"""
+        old = "".join(f"line{i}\n" for i in range(5000))
+        new = "".join(f"line{i}\n" if i % 3 else f"changed{i}\n" for i in range(5000))
+
+        result = diff_texts(old, new, max_bytes=1000)
+        self.assertEqual((result.ratio, result.complete), (1.0, False))
+
+        result = diff_texts(old, new, time_budget=-1)
+        self.assertEqual((result.ratio, result.complete), (1.0, False))
+
+
+if __name__ == '__main__':
+    unittest.main()
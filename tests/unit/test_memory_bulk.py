@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+MemoryManager 批量读写与导入导出单元测试
+"""
+
+import json
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from common.exceptions import MemorySystemError
+from memory.memory_manager import MemoryManager
+
+
+class TestBulkMemory(unittest.IsolatedAsyncioTestCase):
+    """测试 save_many / get_many / export / import"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        MemoryManager._instance = None
+        self.mm = MemoryManager(self.temp_dir)
+
+    async def asyncTearDown(self):
+        await self.mm.drain()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        MemoryManager._instance = None
+
+    async def test_save_many_single_index_write(self):
+        """批量保存只写一次索引, 类别倒排同步更新"""
+        items = [{"memory_type": "episodic", "content": f"事件{i}"} for i in range(120)]
+        items.append({"memory_type": "semantic", "content": "分层架构", "category": "arch"})
+
+        with patch.object(self.mm, "_save_index", wraps=self.mm._save_index) as save_index:
+            ids = await self.mm.save_many(items)
+        self.assertEqual(save_index.call_count, 1)
+        self.assertEqual(len(ids), 121)
+        self.assertEqual(self.mm.index["total_count"], 121)
+
+        semantic = await self.mm.query_semantic_memory(category="arch")
+        self.assertEqual([m["memory_id"] for m in semantic], [ids[-1]])
+
+        with self.assertRaises(MemorySystemError):
+            await self.mm.save_many([{"memory_type": "unknown", "content": "x"}])
+
+    async def test_get_many_keeps_order_and_fills_cache(self):
+        """批量读取保持顺序, 缺失为 None, 读到的条目进入缓存"""
+        ids = await self.mm.save_many([
+            {"memory_type": "episodic", "content": "a"},
+            {"memory_type": "procedural", "content": "b", "category": "workflow"},
+        ])
+        self.mm.clear_cache()
+
+        results = await self.mm.get_many([ids[1], "episodic_missing", ids[0]])
+        self.assertEqual(results[0]["content"], "b")
+        self.assertIsNone(results[1])
+        self.assertEqual(results[2]["content"], "a")
+        self.assertEqual(self.mm.get_cache_stats()["total_entries"], 2)
+
+    async def test_export_import_roundtrip(self):
+        """导出为 JSON Lines 后可导入到新的记忆目录"""
+        await self.mm.save_many([{"memory_type": "episodic", "content": f"事件{i}"} for i in range(75)])
+        await self.mm.save_semantic_memory("使用消息队列解耦", "architecture")
+
+        export_file = self.temp_dir / "export.jsonl"
+        counts = await self.mm.export_memories(export_file)
+        self.assertEqual(counts, {"episodic": 75, "semantic": 1, "procedural": 0})
+        lines = export_file.read_text(encoding='utf-8').splitlines()
+        self.assertEqual(json.loads(lines[0])["format"], "superagent-memory")
+        self.assertEqual(len(lines), 77)
+
+        target = self.temp_dir / "other"
+        await self.mm.drain()
+        MemoryManager._instance = None
+        self.mm = MemoryManager(target)
+        counts = await self.mm.import_memories(export_file, batch_size=20)
+        self.assertEqual(counts["episodic"], 75)
+        self.assertEqual(self.mm.index["total_count"], 76)
+
+        memories = await self.mm.get_episodic_memories(limit=1)
+        self.assertEqual(memories[0]["content"], "事件74")
+        semantic = await self.mm.query_semantic_memory(category="architecture")
+        self.assertEqual(semantic[0]["content"], "使用消息队列解耦")
+
+    async def test_import_legacy_export(self):
+        """兼容旧版 CLI 导出的单个 JSON 文件"""
+        legacy_file = self.temp_dir / "legacy.json"
+        legacy_file.write_text(json.dumps({
+            "export_time": "2026-01-01",
+            "episodic": [{"memory_id": "episodic_old_1", "content": "旧事件",
+                          "timestamp": "2026-01-01 00:00:00", "metadata": {}, "tags": ["episodic"]}],
+            "semantic": [],
+            "procedural": [],
+        }, ensure_ascii=False), encoding='utf-8')
+
+        counts = await self.mm.import_memories(legacy_file)
+        self.assertEqual(counts["episodic"], 1)
+        self.assertEqual((await self.mm.get_many(["episodic_old_1"]))[0]["content"], "旧事件")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+MemoryCache (SLRU + 字节预算 + 时间轮 TTL) 单元测试
+"""
+
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from memory.cache import MemoryCache, estimate_entry_bytes
+from memory.memory_manager import MemoryManager
+
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMemoryCache(unittest.TestCase):
+    """测试缓存淘汰与过期"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = MemoryCache(
+            ("episodic", "semantic"), max_entries=4, max_bytes=10_000,
+            ttl=10, protected_ratio=0.5, clock=self.clock
+        )
+
+    def test_hit_miss_counters(self):
+        """命中/未命中计数准确"""
+        self.cache.put("episodic", "a", {"content": "x"})
+        self.assertEqual(self.cache.get("episodic", "a"), {"content": "x"})
+        self.assertIsNone(self.cache.get("episodic", "b"))
+
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 50.0)
+
+    def test_frequently_used_entries_survive(self):
+        """再次命中过的条目进入保护区, 淘汰优先试用区"""
+        for mid in ("a", "b"):
+            self.cache.put("episodic", mid, {"id": mid})
+            self.cache.get("episodic", mid)
+        for mid in ("c", "d", "e", "f"):
+            self.cache.put("episodic", mid, {"id": mid})
+
+        segment = self.cache["episodic"]
+        self.assertEqual(len(segment), 4)
+        self.assertIn("a", segment)
+        self.assertIn("b", segment)
+        self.assertNotIn("c", segment)
+        self.assertEqual(self.cache.stats()["evictions"], 2)
+
+    def test_byte_budget(self):
+        """字节预算跨类型生效, 超大条目不缓存"""
+        big = {"content": "x" * 4000}
+        size = estimate_entry_bytes(big)
+        self.cache.put("semantic", "s1", big)
+        self.cache.put("episodic", "e1", big)
+        self.cache.put("episodic", "e2", big)
+
+        stats = self.cache.stats()
+        self.assertLessEqual(stats["total_bytes"], 10_000)
+        self.assertEqual(stats["total_bytes"], 2 * size)
+        self.assertNotIn("e1", self.cache["episodic"])
+
+        self.assertFalse(self.cache.put("episodic", "huge", {"content": "x" * 20_000}))
+
+    def test_ttl_expiry_via_wheel(self):
+        """到期条目由时间轮批量清理, 访问会刷新 TTL"""
+        self.cache.put("episodic", "a", {"id": "a"})
+        self.cache.put("episodic", "b", {"id": "b"})
+
+        self.clock.now += 6
+        self.cache.get("episodic", "a")
+        self.clock.now += 6
+
+        self.assertEqual(self.cache.expire(), 1)
+        self.assertIn("a", self.cache["episodic"])
+        self.assertNotIn("b", self.cache["episodic"])
+
+        self.clock.now += 100
+        self.assertIsNone(self.cache.get("episodic", "a"))
+        self.assertEqual(self.cache.stats()["total_bytes"], 0)
+
+
+class TestMemoryManagerCacheStats(unittest.IsolatedAsyncioTestCase):
+    """测试 MemoryManager 缓存统计"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        MemoryManager._instance = None
+        self.mm = MemoryManager(self.temp_dir)
+
+    async def asyncTearDown(self):
+        await self.mm.drain()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        MemoryManager._instance = None
+
+    async def test_cache_stats(self):
+        """查询走缓存并反映在统计中"""
+        await self.mm.save_episodic_memory("事件")
+        await self.mm.get_episodic_memories(limit=1)
+        self.mm.clear_cache()
+        await self.mm.get_episodic_memories(limit=1)
+
+        stats = self.mm.get_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["total_entries"], 1)
+        self.assertGreater(stats["total_bytes"], 0)
+        self.assertEqual(self.mm.get_statistics()["cache_hit_rate"], 50.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+ContinuityStore 结构化持续记忆单元测试
+"""
+
+import asyncio
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from memory.memory_manager import MemoryManager
+from unittest.mock import patch
+
+from memory.continuity import ContinuityStore
+
+
+def _stats():
+    return {"total": 0, "episodic": 0, "semantic": 0, "procedural": 0}
+
+
+class TestContinuityStore(unittest.IsolatedAsyncioTestCase):
+    """测试按段落追加与延迟渲染"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.store = ContinuityStore(self.temp_dir, _stats, render_delay=60)
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_append_is_rendered_on_flush(self):
+        """追加只写段落日志, flush 时才重写 CONTINUITY.md"""
+        await self.store.append_many([
+            ("semantic", "缓存采用两级结构", "architecture", None),
+            ("procedural", "先写测试", "workflow", None),
+        ])
+        rendered = self.store.continuity_file.read_text(encoding='utf-8')
+        self.assertNotIn("缓存采用两级结构", rendered)
+
+        await self.store.flush()
+        rendered = self.store.continuity_file.read_text(encoding='utf-8')
+        self.assertIn("**architecture**: 缓存采用两级结构", rendered)
+        self.assertLess(rendered.index("## 🎯 最佳实践"), rendered.index("先写测试"))
+        self.assertLess(rendered.index("先写测试"), rendered.index("## 🏗️ 架构决策"))
+
+    async def test_similarity_index_built_off_loop(self):
+        """相似度索引在线程池中构建, 构建期间追加的记录也会被索引"""
+        await self.store.append_many([("procedural", "提交前运行全部单元测试", "workflow", None)])
+        real_to_thread = asyncio.to_thread
+
+        async def to_thread(func, *args):
+            # 构建期间另一个协程追加记录
+            await self.store.append_many([("procedural", "发布前运行全部集成测试", "workflow", None)])
+            return await real_to_thread(func, *args)
+
+        with patch("memory.continuity.asyncio.to_thread", side_effect=to_thread) as spy:
+            await self.store.ensure_similarity()
+        spy.assert_called_once()
+
+        hits = self.store.relevant("best_practices", "发布前运行全部集成测试", 1)
+        self.assertEqual(hits[0]["content"], "发布前运行全部集成测试")
+        self.assertIn("similarity", hits[0])
+
+    async def test_failed_render_is_retried(self):
+        """延迟渲染失败后自动重试, 不必等待下一次追加"""
+        store = ContinuityStore(self.temp_dir / "retry", _stats, render_delay=0.01)
+        store.continuity_file.unlink()
+        store.continuity_file.mkdir()  # 替换为目录使渲染失败
+
+        with self.assertLogs("memory.continuity", level="ERROR"):
+            await store.append_many([("procedural", "先写测试", "workflow", None)])
+            for _ in range(100):
+                if store._render_failures:
+                    break
+                await asyncio.sleep(0.01)
+        self.assertIsNotNone(store._render_task)
+        self.assertIsNotNone(store._render_timer)
+
+        store.continuity_file.rmdir()
+        for _ in range(100):
+            if store.continuity_file.is_file():
+                break
+            await asyncio.sleep(0.01)
+        await store._render_task
+        self.assertIn("先写测试", store.continuity_file.read_text(encoding='utf-8'))
+        self.assertEqual(store._render_failures, 0)
+
+    async def test_top_returns_newest_first(self):
+        """top 按最新在前返回结构化记录"""
+        for i in range(4):
+            await self.store.append_many([("procedural", f"实践{i}", "workflow", None)])
+        top = self.store.top("best_practices", 2)
+        self.assertEqual([e["content"] for e in top], ["实践3", "实践2"])
+
+    async def test_reload_from_logs(self):
+        """重启后从段落日志恢复, 过期的 CONTINUITY.md 被重新渲染"""
+        await self.store.append_many([("episodic", "错误: KeyError", "mistake", {"error_type": "KeyError"})])
+
+        store = ContinuityStore(self.temp_dir, _stats)
+        self.assertEqual(store.top("mistakes", 5)[0]["error_type"], "KeyError")
+        self.assertIn("错误: KeyError", store.continuity_file.read_text(encoding='utf-8'))
+
+    async def test_import_legacy_file(self):
+        """首次使用时导入旧版 CONTINUITY.md 中的条目"""
+        shutil.rmtree(self.temp_dir / "continuity")
+        self.store.continuity_file.write_text(
+            "# SuperAgent v3.2 - 持续记忆 (CONTINUITY)\n\n---\n\n"
+            "## 📝 错误与教训\n- [2026-01-02 00:00:00] **mistake**: 新错误\n\n"
+            "- [2026-01-01 00:00:00] **mistake**: 旧错误\n (Mistakes & Learnings)\n\n---\n\n"
+            "## 🎯 最佳实践 (Best Practices)\n\n---\n\n"
+            "## 🏗️ 架构决策\n- [2026-01-01 00:00:00] **architecture**: 分层设计\n (Architecture Decisions)\n",
+            encoding='utf-8'
+        )
+
+        store = ContinuityStore(self.temp_dir, _stats)
+        self.assertEqual([e["content"] for e in store.top("mistakes", 5)], ["新错误", "旧错误"])
+        self.assertEqual(store.count("architecture_decisions"), 1)
+        self.assertEqual(store.count("best_practices"), 0)
+
+
+class TestMemoryManagerContinuity(unittest.IsolatedAsyncioTestCase):
+    """测试 MemoryManager 的持续记忆查询"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        MemoryManager._instance = None
+        self.mm = MemoryManager(self.temp_dir)
+
+    async def asyncTearDown(self):
+        await self.mm.drain()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        MemoryManager._instance = None
+
+    async def test_query_relevant_memory_returns_entries(self):
+        """query_relevant_memory 返回各段的实际条目"""
+        await self.mm.save_mistake(ValueError("bad"), "解析配置", "校验输入", "先校验再使用")
+        await self.mm.save_procedural_memory("提交前运行测试", "workflow")
+        await self.mm.save_semantic_memory("服务间使用消息队列", "architecture")
+
+        relevant = await self.mm.query_relevant_memory("配置")
+        self.assertEqual(relevant["mistakes"][0]["error_type"], "ValueError")
+        self.assertEqual(relevant["mistakes"][0]["learning"], "先校验再使用")
+        self.assertEqual(relevant["best_practices"][0]["content"], "提交前运行测试")
+        self.assertEqual(relevant["architecture_decisions"][0]["category"], "architecture")
+
+        await self.mm.flush()
+        content = (self.temp_dir / ".superagent" / "memory" / "CONTINUITY.md").read_text(encoding='utf-8')
+        self.assertIn("- **总记忆条目**: 3", content)
+
+
+if __name__ == '__main__':
+    unittest.main()
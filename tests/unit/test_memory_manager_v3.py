@@ -41,6 +41,23 @@ class TestMemoryManagerV3(unittest.IsolatedAsyncioTestCase):
         mm2 = MemoryManager(self.temp_dir)
         self.assertIs(self.mm, mm2)
 
+    def test_reinit_with_different_root_or_backend_warns(self):
+        """单例已初始化时, 不同的项目根目录或存储后端不生效并记录警告"""
+        other = self.temp_dir / "other"
+        with self.assertLogs("memory.memory_manager", level="WARNING") as logs:
+            mm2 = MemoryManager(other, storage_backend="sqlite")
+        self.assertIs(mm2, self.mm)
+        self.assertEqual(self.mm.project_root, self.temp_dir)
+        self.assertEqual(len(logs.records), 2)
+        self.assertIs(MemoryManager.get_instance(other), self.mm)
+
+    def test_get_instance_creates_with_root_and_backend(self):
+        """首次通过 get_instance 创建时使用传入的项目根目录和存储后端"""
+        MemoryManager._instance = None
+        mm = MemoryManager.get_instance(self.temp_dir, storage_backend="segment")
+        self.assertEqual(mm.memory_dir, self.temp_dir / ".superagent" / "memory")
+        self.assertEqual(type(mm._storage).__name__, "SegmentLogStorage")
+
     def test_init_directories(self):
         """测试目录初始化"""
         self.assertTrue((self.temp_dir / ".superagent" / "memory").exists())
@@ -90,7 +107,8 @@ class TestMemoryManagerV3(unittest.IsolatedAsyncioTestCase):
         # 验证索引更新
         self.assertIn(memory_id, self.mm.index["semantic"])
         
-        # 验证CONTINUITY.md更新
+        # 验证CONTINUITY.md更新 (渲染是延迟的, flush 后立即可见)
+        await self.mm.flush()
         content = (self.temp_dir / ".superagent" / "memory" / "CONTINUITY.md").read_text(encoding='utf-8')
         self.assertIn(knowledge, content)
 
@@ -117,7 +135,8 @@ class TestMemoryManagerV3(unittest.IsolatedAsyncioTestCase):
         
         self.assertTrue(memory_id.startswith("procedural_"))
         
-        # 验证CONTINUITY.md更新
+        # 验证CONTINUITY.md更新 (渲染是延迟的, flush 后立即可见)
+        await self.mm.flush()
         content = (self.temp_dir / ".superagent" / "memory" / "CONTINUITY.md").read_text(encoding='utf-8')
         self.assertIn(practice, content)
 
@@ -134,6 +153,103 @@ class TestMemoryManagerV3(unittest.IsolatedAsyncioTestCase):
         mm_new = MemoryManager(self.temp_dir)
         self.assertEqual(mm_new.index["total_count"], 1)
 
+    async def test_postings_loaded_on_restart(self):
+        """重启后直接加载持久化的类别/标签索引, 无需重建"""
+        mid = await self.mm.save_semantic_memory("知识1", "tech", tags=["python"])
+        await self.mm.save_semantic_memory("知识2", "arch")
+
+        MemoryManager._instance = None
+        mm_new = MemoryManager(self.temp_dir)
+        self.assertFalse(mm_new._postings_stale)
+        self.assertEqual(mm_new._category_index["semantic"]["tech"], [mid])
+        self.assertEqual(mm_new._tag_index["semantic"]["python"], [mid])
+
+        results = await mm_new.query_semantic_memory(category="tech")
+        self.assertEqual([r["memory_id"] for r in results], [mid])
+
+    async def test_stale_postings_rebuilt(self):
+        """generation 不一致时, 首次按类别查询前重建倒排索引"""
+        await self.mm.save_semantic_memory("知识1", "tech")
+
+        postings_file = self.temp_dir / ".superagent" / "memory" / "memory_postings.json"
+        data = json.loads(postings_file.read_text(encoding='utf-8'))
+        data["fingerprint"]["generation"] -= 1
+        postings_file.write_text(json.dumps(data), encoding='utf-8')
+
+        MemoryManager._instance = None
+        mm_new = MemoryManager(self.temp_dir)
+        self.assertTrue(mm_new._postings_stale)
+
+        results = await mm_new.query_semantic_memory(category="tech")
+        self.assertEqual(len(results), 1)
+        self.assertFalse(mm_new._postings_stale)
+
+    async def test_query_by_tags(self):
+        """按标签过滤 (全部命中)"""
+        await self.mm.save_semantic_memory("知识1", "tech", tags=["python", "async"])
+        await self.mm.save_semantic_memory("知识2", "tech", tags=["python"])
+        await self.mm.save_semantic_memory("知识3", "arch", tags=["async"])
+
+        results = await self.mm.query_semantic_memory(tags=["python", "async"])
+        self.assertEqual([r["content"] for r in results], ["知识1"])
+
+        results = await self.mm.query_semantic_memory(category="arch", tags=["async"])
+        self.assertEqual([r["content"] for r in results], ["知识3"])
+
+        stats = self.mm.get_statistics()
+        self.assertEqual(stats["categories"]["tech"], 2)
+        self.assertEqual(stats["tags"]["python"], 2)
+
+    async def test_overwrite_replaces_postings(self):
+        """同一 ID 覆盖写入后, 旧的类别/标签不再命中该条目"""
+        mid = await self.mm.save_semantic_memory("知识1", "tech", tags=["python", "async"])
+        other = await self.mm.save_semantic_memory("知识2", "tech", tags=["python"])
+
+        await self.mm.save_many([{
+            "memory_id": mid, "memory_type": "semantic",
+            "content": "知识1 (更新)", "category": "arch", "tags": ["rust", "async"]
+        }])
+
+        self.assertEqual([r["content"] for r in await self.mm.query_semantic_memory(tags=["python"])], ["知识2"])
+        self.assertEqual(await self.mm.query_semantic_memory(tags=["python", "async"]), [])
+        results = await self.mm.query_semantic_memory(category="arch", tags=["async"])
+        self.assertEqual([r["content"] for r in results], ["知识1 (更新)"])
+        self.assertEqual(self.mm._category_index["semantic"]["tech"], [other])
+        self.assertEqual(self.mm._tag_index["semantic"]["async"], [mid])
+
+    async def test_write_behind_batches_saves(self):
+        """写回模式: 保存立即返回, flush 后统一落盘"""
+        self.mm.configure_write_behind(True, max_latency=60, batch_size=1000)
+        ids = [await self.mm.save_episodic_memory(f"事件{i}") for i in range(20)]
+        await self.mm.save_semantic_memory("批量知识", "architecture")
+
+        episodic_dir = self.temp_dir / ".superagent" / "memory" / "episodic"
+        self.assertFalse((episodic_dir / f"{ids[0]}.json").exists())
+
+        # 未落盘的条目也可以读到
+        self.mm.clear_cache()
+        memories = await self.mm.get_episodic_memories(limit=3)
+        self.assertEqual([m["content"] for m in memories], ["事件19", "事件18", "事件17"])
+
+        await self.mm.drain()
+        self.assertTrue(all((episodic_dir / f"{mid}.json").exists() for mid in ids))
+        index = json.loads(
+            (self.temp_dir / ".superagent" / "memory" / "memory_index.json").read_text(encoding='utf-8')
+        )
+        self.assertEqual(index["total_count"], 21)
+        content = (self.temp_dir / ".superagent" / "memory" / "CONTINUITY.md").read_text(encoding='utf-8')
+        self.assertIn("批量知识", content)
+
+    async def test_write_behind_flushes_within_latency(self):
+        """写回模式: 超过最大延迟后后台任务自动落盘"""
+        self.mm.configure_write_behind(True, max_latency=0.01, batch_size=1000)
+        mid = await self.mm.save_episodic_memory("延迟落盘")
+        await asyncio.sleep(0.2)
+
+        file_path = self.temp_dir / ".superagent" / "memory" / "episodic" / f"{mid}.json"
+        self.assertTrue(file_path.exists())
+        await self.mm.drain()
+
 
 if __name__ == '__main__':
     unittest.main()
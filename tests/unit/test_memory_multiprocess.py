@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+MemoryManager 多进程并发写入测试
+"""
+
+import asyncio
+import json
+import multiprocessing
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from memory.interprocess import HAS_FLOCK
+from memory.memory_manager import MemoryManager
+
+WORKERS = 4
+SAVES_PER_WORKER = 40
+SEMANTIC_EVERY = 5
+
+
+def _save_worker(root: str, worker_no: int) -> None:
+    """子进程: 并发保存情节记忆和语义记忆"""
+    async def run() -> None:
+        mm = MemoryManager(Path(root))
+
+        async def save(i: int) -> None:
+            await mm.save_episodic_memory(f"worker{worker_no}-event{i}")
+            if i % SEMANTIC_EVERY == 0:
+                await mm.save_semantic_memory(f"worker{worker_no}-知识{i}", "shared")
+
+        # 每次并发 4 个保存, 同时与其他进程竞争
+        for start in range(0, SAVES_PER_WORKER, 4):
+            await asyncio.gather(*(save(i) for i in range(start, start + 4)))
+        await mm.drain()
+
+    asyncio.run(run())
+
+
+@unittest.skipUnless(HAS_FLOCK, "需要 fcntl")
+class TestMultiProcessStress(unittest.TestCase):
+    """N 个进程同时保存, 不丢失任何条目"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        MemoryManager._instance = None
+
+    def tearDown(self):
+        MemoryManager._instance = None
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_concurrent_processes_lose_no_writes(self):
+        ctx = multiprocessing.get_context("spawn")
+        processes = [
+            ctx.Process(target=_save_worker, args=(str(self.temp_dir), n)) for n in range(WORKERS)
+        ]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join(timeout=120)
+            self.assertEqual(p.exitcode, 0)
+
+        semantic_total = WORKERS * SAVES_PER_WORKER // SEMANTIC_EVERY
+        index = json.loads(
+            (self.temp_dir / ".superagent" / "memory" / "memory_index.json").read_text(encoding='utf-8')
+        )
+        self.assertEqual(len(index["episodic"]), WORKERS * SAVES_PER_WORKER)
+        self.assertEqual(len(set(index["episodic"])), WORKERS * SAVES_PER_WORKER)
+        self.assertEqual(len(index["semantic"]), semantic_total)
+        self.assertEqual(index["total_count"], WORKERS * SAVES_PER_WORKER + semantic_total)
+
+        async def verify():
+            mm = MemoryManager(self.temp_dir)
+            memories = await mm.get_episodic_memories(limit=WORKERS * SAVES_PER_WORKER)
+            contents = {m["content"] for m in memories}
+            self.assertEqual(contents, {
+                f"worker{n}-event{i}" for n in range(WORKERS) for i in range(SAVES_PER_WORKER)
+            })
+            shared = await mm.query_semantic_memory(category="shared")
+            self.assertEqual(len(shared), semantic_total)
+            relevant = await mm.query_relevant_memory("知识", limit=semantic_total * 2)
+            self.assertEqual(len(relevant["mistakes"]), semantic_total)
+
+        asyncio.run(verify())
+
+
+@unittest.skipUnless(HAS_FLOCK, "需要 fcntl")
+class TestIncrementalReload(unittest.IsolatedAsyncioTestCase):
+    """两个实例 (模拟两个 worker) 通过代数文件发现彼此的提交"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        MemoryManager._instance = None
+        self.mm1 = MemoryManager(self.temp_dir)
+        MemoryManager._instance = None
+        self.mm2 = MemoryManager(self.temp_dir)
+
+    async def asyncTearDown(self):
+        MemoryManager._instance = None
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_other_worker_commits_become_visible(self):
+        await self.mm1.save_semantic_memory("来自 worker1 的知识", "shared")
+        await self.mm1.save_episodic_memory("worker1 事件")
+
+        memories = await self.mm2.get_episodic_memories(limit=5)
+        self.assertEqual([m["content"] for m in memories], ["worker1 事件"])
+        shared = await self.mm2.query_semantic_memory(category="shared")
+        self.assertEqual([m["content"] for m in shared], ["来自 worker1 的知识"])
+
+        await self.mm2.save_episodic_memory("worker2 事件")
+        memories = await self.mm1.get_episodic_memories(limit=5)
+        self.assertEqual([m["content"] for m in memories], ["worker2 事件", "worker1 事件"])
+
+        relevant = await self.mm2.query_relevant_memory("知识")
+        self.assertEqual(relevant["mistakes"][0]["content"], "来自 worker1 的知识")
+
+        index = json.loads(self.mm1.index_file.read_text(encoding='utf-8'))
+        self.assertEqual(index["total_count"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
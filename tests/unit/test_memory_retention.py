@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+情节记忆分层保留 (冷归档) 单元测试
+"""
+
+import asyncio
+import json
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from memory.memory_manager import MemoryManager
+from memory.retention import EpisodicArchive
+
+
+def _entry(memory_id: str, timestamp: str) -> dict:
+    return {
+        "memory_id": memory_id,
+        "memory_type": "episodic",
+        "timestamp": timestamp,
+        "content": f"事件 {memory_id}",
+        "metadata": {},
+        "tags": ["episodic"],
+    }
+
+
+class TestEpisodicArchive(unittest.TestCase):
+    """测试归档文件与稀疏时间索引"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.archive = EpisodicArchive(self.temp_dir)
+
+    def tearDown(self):
+        self.archive.lock.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_monthly_partitions_and_time_range(self):
+        """按月分区, 时间范围查询只返回范围内条目, 最新的在前"""
+        self.archive.append_sync([
+            _entry("a", "2026-01-05 10:00:00"),
+            _entry("b", "2026-02-10 10:00:00"),
+            _entry("c", "2026-02-20 10:00:00"),
+        ])
+        self.archive.append_sync([_entry("d", "2026-03-01 08:00:00")])
+
+        self.assertEqual(
+            sorted(p.name for p in self.temp_dir.glob("*.jsonl.gz")),
+            ["2026-01.jsonl.gz", "2026-02.jsonl.gz", "2026-03.jsonl.gz"]
+        )
+        self.assertEqual(self.archive.count(), 4)
+
+        results = self.archive.query_sync(start="2026-02-01 00:00:00", end="2026-02-28 23:59:59")
+        self.assertEqual([e["memory_id"] for e in results], ["c", "b"])
+        self.assertEqual([e["memory_id"] for e in self.archive.query_sync(limit=2)], ["d", "c"])
+
+    def test_query_skips_non_overlapping_members(self):
+        """只解压与时间范围重叠的 member; 重复归档的条目去重"""
+        self.archive.append_sync([_entry("a", "2026-05-01 00:00:00")])
+        self.archive.append_sync([_entry("b", "2026-05-20 00:00:00"), _entry("a", "2026-05-01 00:00:00")])
+
+        index = json.loads((self.temp_dir / "index.json").read_text(encoding='utf-8'))
+        self.assertEqual(len(index["2026-05"]), 2)
+
+        # 破坏第一个 member: 查询范围不覆盖它时不应被读取
+        path = self.temp_dir / "2026-05.jsonl.gz"
+        data = bytearray(path.read_bytes())
+        data[index["2026-05"][0]["offset"] + 12] ^= 0xFF
+        path.write_bytes(bytes(data))
+        results = self.archive.query_sync(start="2026-05-10 00:00:00")
+        self.assertEqual([e["memory_id"] for e in results], ["b"])
+
+        self.archive.append_sync([])
+        self.assertEqual(len(json.loads((self.temp_dir / "index.json").read_text(encoding='utf-8'))["2026-05"]), 2)
+
+
+class TestMemoryRetention(unittest.IsolatedAsyncioTestCase):
+    """测试 MemoryManager 分层保留"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        MemoryManager._instance = None
+        self.mm = MemoryManager(self.temp_dir)
+
+    async def asyncTearDown(self):
+        await self.mm.drain()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        MemoryManager._instance = None
+
+    async def test_archive_by_age(self):
+        """超龄条目移入归档, 热存储和索引只保留较新的条目"""
+        await self.mm.save_many([
+            {"memory_type": "episodic", "content": f"旧事件{i}", "timestamp": f"2020-01-0{i + 1} 00:00:00"}
+            for i in range(3)
+        ])
+        recent_id = await self.mm.save_episodic_memory("新事件")
+
+        archived = await self.mm.archive_episodic()
+        self.assertEqual(archived, 3)
+        self.assertEqual(self.mm.index["episodic"], [recent_id])
+        self.assertEqual(self.mm.index["total_count"], 1)
+        self.assertEqual(len(list((self.temp_dir / ".superagent" / "memory" / "episodic").glob("*.json"))), 1)
+
+        index = json.loads(self.mm.index_file.read_text(encoding='utf-8'))
+        self.assertEqual(index["episodic"], [recent_id])
+        self.assertEqual(self.mm.get_statistics()["archived_episodic_count"], 3)
+
+        archived = await self.mm.query_episodic_archive(end="2020-01-02 23:59:59")
+        self.assertEqual([m["content"] for m in archived], ["旧事件1", "旧事件0"])
+
+        memories = await self.mm.get_episodic_memories(limit=3, include_archived=True)
+        self.assertEqual([m["content"] for m in memories], ["新事件", "旧事件2", "旧事件1"])
+        self.assertEqual(len(await self.mm.get_episodic_memories(limit=3)), 1)
+
+    async def test_archive_by_hot_budget(self):
+        """热存储超出上限时从最旧的条目开始归档"""
+        ids = await self.mm.save_many([{"memory_type": "episodic", "content": f"事件{i}"} for i in range(10)])
+        self.mm.configure_retention(max_hot_entries=4)
+
+        self.assertEqual(await self.mm.archive_episodic(), 6)
+        self.assertEqual(self.mm.index["episodic"], ids[6:])
+        self.assertEqual(await self.mm.archive_episodic(), 0)
+
+    async def test_archived_ids_not_resurrected_by_other_process(self):
+        """另一个实例提交时不会把已归档的条目合并回索引"""
+        await self.mm.save_many([
+            {"memory_type": "episodic", "content": "旧事件", "timestamp": "2020-01-01 00:00:00"}
+        ])
+        MemoryManager._instance = None
+        other = MemoryManager(self.temp_dir)
+        await other.get_episodic_memories()
+
+        self.assertEqual(await self.mm.archive_episodic(), 1)
+        new_id = await other.save_episodic_memory("另一个进程的事件")
+
+        index = json.loads(self.mm.index_file.read_text(encoding='utf-8'))
+        self.assertEqual(index["episodic"], [new_id])
+        self.assertEqual([m["content"] for m in await self.mm.get_episodic_memories()], ["另一个进程的事件"])
+        await other.drain()
+
+    async def test_background_task_stops_on_drain(self):
+        """后台归档任务运行一次后可随 drain 停止"""
+        await self.mm.save_many([
+            {"memory_type": "episodic", "content": "旧事件", "timestamp": "2020-01-01 00:00:00"}
+        ])
+        self.mm.configure_retention(interval=3600)
+        self.mm.start_retention()
+        for _ in range(100):
+            if not self.mm.index["episodic"]:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(self.mm.index["episodic"], [])
+
+        await self.mm.drain()
+        self.assertIsNone(self.mm._retention_task)
+
+    async def test_background_task_survives_unexpected_error(self):
+        """归档抛出非预期异常时后台任务继续运行, 下个间隔重试"""
+        calls = []
+
+        async def archive_episodic():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                raise KeyError("损坏的索引")
+            return 0
+
+        self.mm.archive_episodic = archive_episodic
+        self.mm.configure_retention(interval=0.01)
+        with self.assertLogs("memory.memory_manager", level="ERROR"):
+            self.mm.start_retention()
+            for _ in range(100):
+                if len(calls) >= 2:
+                    break
+                await asyncio.sleep(0.01)
+        self.assertGreaterEqual(len(calls), 2)
+        self.assertFalse(self.mm._retention_task.done())
+
+
+if __name__ == '__main__':
+    unittest.main()
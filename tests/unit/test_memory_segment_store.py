@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+SegmentLogStorage 分段日志存储单元测试
+"""
+
+import json
+import os
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from memory.memory_manager import MemoryManager
+from memory.segment_store import SegmentLogStorage
+
+
+def _entry(memory_id: str, memory_type: str = "episodic", content: str = "内容"):
+    return {
+        "memory_id": memory_id,
+        "memory_type": memory_type,
+        "timestamp": "2026-01-01 00:00:00",
+        "content": content,
+        "metadata": {},
+        "tags": [memory_type],
+    }
+
+
+class TestSegmentLogStorage(unittest.IsolatedAsyncioTestCase):
+    """测试分段日志存储后端"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.store = SegmentLogStorage(self.temp_dir / "segments")
+
+    async def asyncTearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_write_and_read(self):
+        """写入后可以按偏移读取"""
+        await self.store.write(_entry("e1", content="第一条"))
+        await self.store.write(_entry("s1", "semantic", "知识"))
+
+        self.assertEqual((await self.store.read("episodic", "e1"))["content"], "第一条")
+        self.assertEqual((await self.store.read("semantic", "s1"))["content"], "知识")
+        self.assertIsNone(await self.store.read("episodic", "missing"))
+        self.assertEqual(self.store.list_ids("episodic"), ["e1"])
+
+    async def test_read_many_keeps_order(self):
+        """批量读取保持请求顺序, 缺失位置为 None"""
+        await self.store.write_many([_entry(f"e{i}", content=str(i)) for i in range(5)])
+        results = await self.store.read_many("episodic", ["e3", "nope", "e0"])
+        self.assertEqual(results[0]["content"], "3")
+        self.assertIsNone(results[1])
+        self.assertEqual(results[2]["content"], "0")
+
+    async def test_rollover(self):
+        """超过段大小阈值后滚动到新段"""
+        self.store.close()
+        self.store = SegmentLogStorage(self.temp_dir / "segments", max_segment_bytes=512)
+        for i in range(20):
+            await self.store.write(_entry(f"e{i}", content="x" * 100))
+
+        self.assertGreater(self.store.segment_count(), 1)
+        self.assertEqual((await self.store.read("episodic", "e0"))["content"], "x" * 100)
+        self.assertEqual((await self.store.read("episodic", "e19"))["content"], "x" * 100)
+
+    async def test_reopen_rebuilds_index(self):
+        """重新打开时从段文件重建偏移索引"""
+        for i in range(3):
+            await self.store.write(_entry(f"e{i}"))
+        await self.store.delete("episodic", "e1")
+        self.store.close()
+
+        self.store = SegmentLogStorage(self.temp_dir / "segments")
+        self.assertEqual(self.store.list_ids("episodic"), ["e0", "e2"])
+        self.assertIsNotNone(await self.store.read("episodic", "e2"))
+
+    async def test_torn_tail_is_truncated(self):
+        """末尾残缺记录在启动时被截断, 之前的记录完好"""
+        await self.store.write(_entry("e0", content="完整"))
+        await self.store.write(_entry("e1", content="会被截断"))
+        self.store.close()
+
+        segment = sorted((self.temp_dir / "segments").glob("*.seg"))[-1]
+        data = segment.read_bytes()
+        segment.write_bytes(data[:-5])
+
+        self.store = SegmentLogStorage(self.temp_dir / "segments")
+        self.assertEqual(self.store.list_ids("episodic"), ["e0"])
+        self.assertEqual((await self.store.read("episodic", "e0"))["content"], "完整")
+
+        # 截断后可以继续追加
+        await self.store.write(_entry("e2"))
+        self.store.close()
+        self.store = SegmentLogStorage(self.temp_dir / "segments")
+        self.assertEqual(self.store.list_ids("episodic"), ["e0", "e2"])
+
+    def _segment_bytes(self):
+        return sum(p.stat().st_size for p in (self.temp_dir / "segments").glob("*.seg"))
+
+    async def test_compact_reclaims_dead_records(self):
+        """压缩后只保留存活记录, 写入顺序和内容不变, 删除的条目重启后不会复活"""
+        self.store.close()
+        self.store = SegmentLogStorage(self.temp_dir / "segments", max_segment_bytes=1024)
+        await self.store.write_many([_entry(f"e{i}", content="x" * 100) for i in range(20)])
+        await self.store.write(_entry("e0", content="更新"))
+        for i in range(1, 15):
+            await self.store.delete("episodic", f"e{i}")
+        before = self._segment_bytes()
+
+        reclaimed = await self.store.compact()
+        self.assertGreater(reclaimed, 0)
+        self.assertEqual(self._segment_bytes(), before - reclaimed)
+        self.assertEqual(self.store.segment_count(), 2)  # 压缩后的段 + 新的活动段
+        self.assertEqual(await self.store.compact(), 0)
+
+        expected = ["e0"] + [f"e{i}" for i in range(15, 20)]
+        self.assertEqual(self.store.list_ids("episodic"), expected)
+        self.assertEqual((await self.store.read("episodic", "e0"))["content"], "更新")
+        await self.store.write(_entry("e20"))
+
+        self.store.close()
+        self.store = SegmentLogStorage(self.temp_dir / "segments")
+        self.assertEqual(self.store.list_ids("episodic"), expected + ["e20"])
+        self.assertEqual((await self.store.read("episodic", "e19"))["content"], "x" * 100)
+
+    async def test_writes_during_compaction_win(self):
+        """复制期间覆盖或删除的条目以新记录为准 (重启后同样如此)"""
+        await self.store.write_many([_entry(f"e{i}", content="旧") for i in range(10)])
+        for i in range(2, 10):
+            await self.store.delete("episodic", f"e{i}")
+
+        real_fsync = os.fsync
+
+        def fsync(fd):
+            # 临时段写完、替换之前, 另一个写入方覆盖 e0 并删除 e1
+            os.fsync = real_fsync
+            self.store._append_sync([
+                ("e0", "episodic", 0, json.dumps(_entry("e0", content="新")).encode('utf-8')),
+                ("e1", "episodic", 1, b""),
+            ])
+            real_fsync(fd)
+
+        with patch("memory.segment_store.os.fsync", side_effect=fsync):
+            self.assertGreater(await self.store.compact(), 0)
+
+        self.assertEqual(self.store.list_ids("episodic"), ["e0"])
+        self.assertEqual((await self.store.read("episodic", "e0"))["content"], "新")
+        self.store.close()
+        self.store = SegmentLogStorage(self.temp_dir / "segments")
+        self.assertEqual(self.store.list_ids("episodic"), ["e0"])
+        self.assertEqual((await self.store.read("episodic", "e0"))["content"], "新")
+
+    async def test_compact_below_threshold_is_noop(self):
+        """死字节占比未达到阈值时不压缩"""
+        await self.store.write_many([_entry(f"e{i}") for i in range(10)])
+        await self.store.delete("episodic", "e0")
+        self.assertEqual(await self.store.compact(), 0)
+        self.assertEqual(self.store.segment_count(), 1)
+
+    async def test_interrupted_compaction_is_finished_on_open(self):
+        """写完临时段和标记后中断的压缩, 在下次打开时完成"""
+        self.store.close()
+        self.store = SegmentLogStorage(self.temp_dir / "segments", max_segment_bytes=512)
+        await self.store.write_many([_entry(f"e{i}", content="x" * 100) for i in range(6)])
+        for i in range(5):
+            await self.store.delete("episodic", f"e{i}")
+        segments = self.store.segment_count()
+        self.store.close()
+
+        # 模拟: 临时段 (只含 e5) 与标记已写入, 旧段尚未替换和删除
+        segment_dir = self.temp_dir / "segments"
+        survivor = SegmentLogStorage._encode(
+            "e5", "episodic", 0, json.dumps(_entry("e5", content="x" * 100), ensure_ascii=False).encode('utf-8')
+        )
+        (segment_dir / "compact.tmp").write_bytes(survivor)
+        (segment_dir / "COMPACT").write_text(str(segments), encoding='utf-8')
+
+        self.store = SegmentLogStorage(segment_dir)
+        self.assertEqual(self.store.segment_count(), 1)
+        self.assertEqual(self.store.list_ids("episodic"), ["e5"])
+        self.assertFalse((segment_dir / "COMPACT").exists())
+
+
+class TestMemoryManagerSegmentBackend(unittest.IsolatedAsyncioTestCase):
+    """测试 MemoryManager 使用分段存储后端"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        MemoryManager._instance = None
+        self.mm = MemoryManager(self.temp_dir, storage_backend="segment")
+
+    async def asyncTearDown(self):
+        self.mm._storage.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        MemoryManager._instance = None
+
+    async def test_save_and_query(self):
+        """保存不再产生单独的 JSON 文件, 查询结果一致"""
+        await self.mm.save_episodic_memory("事件1")
+        await self.mm.save_episodic_memory("事件2")
+        await self.mm.save_semantic_memory("架构知识", "arch")
+
+        episodic_dir = self.temp_dir / ".superagent" / "memory" / "episodic"
+        self.assertEqual(list(episodic_dir.glob("*.json")), [])
+
+        self.mm.clear_cache()
+        memories = await self.mm.get_episodic_memories(limit=5)
+        self.assertEqual([m["content"] for m in memories], ["事件2", "事件1"])
+
+        semantic = await self.mm.query_semantic_memory(keywords=["架构"])
+        self.assertEqual(len(semantic), 1)
+
+    async def test_index_rebuilt_from_segments(self):
+        """重启后索引从段文件恢复"""
+        await self.mm.save_episodic_memory("持久化")
+        self.mm._storage.close()
+
+        MemoryManager._instance = None
+        self.mm = MemoryManager(self.temp_dir, storage_backend="segment")
+        self.assertEqual(self.mm.index["total_count"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+MinHashLSH 相似度索引单元测试
+"""
+
+import asyncio
+import random
+import time
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from memory.memory_manager import MemoryManager
+from memory.similarity import MinHashLSH, shingles
+
+
+class TestMinHashLSH(unittest.TestCase):
+    """测试分词与近邻检索"""
+
+    def setUp(self):
+        self.index = MinHashLSH()
+
+    def test_mixed_language_shingles(self):
+        """中文取二元组, 英文按单词"""
+        self.assertEqual(shingles("数据库 Connection timeout"), {"数据", "据库", "connection", "timeout"})
+        self.assertEqual(shingles("!!!"), set())
+
+    def test_near_duplicate_ranks_first(self):
+        """近似重复文本排在最前, 无关文本不返回"""
+        self.index.add("a", "数据库连接超时 ConnectionError: timeout after 30s")
+        self.index.add("b", "前端按钮样式在移动端错位")
+        self.index.add("c", "数据库连接池耗尽导致请求失败")
+
+        hits = self.index.query("数据库连接超时 ConnectionError: timeout after 60s", k=3)
+        self.assertEqual(hits[0][0], "a")
+        self.assertGreater(hits[0][1], 0.5)
+        self.assertNotIn("b", [key for key, _ in hits])
+
+    def test_incremental_update(self):
+        """更新与删除只影响对应条目"""
+        self.index.add("a", "KeyError: 'user_id' missing in payload")
+        self.index.add("a", "样式调整")
+        self.assertEqual(self.index.query("KeyError: 'user_id' missing in payload"), [])
+
+        self.index.remove("a")
+        self.assertEqual(len(self.index), 0)
+        self.assertEqual(self.index.query("样式调整"), [])
+
+    def test_lookup_latency(self):
+        """上千条记录下 top-k 检索不做全量扫描"""
+        rng = random.Random(7)
+        vocab = [f"word{i}" for i in range(500)] + [chr(0x4e00 + i) for i in range(500)]
+        texts = [" ".join(rng.choice(vocab) for _ in range(20)) for _ in range(2000)]
+        for i, text in enumerate(texts):
+            self.index.add(i, text)
+
+        start = time.perf_counter()
+        for _ in range(20):
+            hits = self.index.query(texts[1234], k=5)
+        elapsed = (time.perf_counter() - start) / 20
+        self.assertEqual(hits[0][0], 1234)
+        self.assertLess(elapsed, 0.005)
+
+
+class TestMemoryManagerSimilarity(unittest.IsolatedAsyncioTestCase):
+    """测试 MemoryManager 相似检索"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        MemoryManager._instance = None
+        self.mm = MemoryManager(self.temp_dir)
+
+    async def asyncTearDown(self):
+        await self.mm.drain()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        MemoryManager._instance = None
+
+    async def test_find_similar_after_restart(self):
+        """重启后首次检索从存储构建索引, 之后增量更新"""
+        await self.mm.save_episodic_memory("ImportError: No module named 'requests' 缺少依赖")
+        await self.mm.save_semantic_memory("使用 JWT 做接口鉴权", "security")
+        MemoryManager._instance = None
+
+        self.mm = MemoryManager(self.temp_dir)
+        await self.mm.save_episodic_memory("页面渲染缓慢")
+
+        results = await self.mm.find_similar("ImportError: No module named 'yaml' 缺少依赖")
+        self.assertTrue(results[0]["content"].startswith("ImportError"))
+        self.assertIn("similarity", results[0])
+
+        results = await self.mm.find_similar("页面渲染缓慢", memory_types=["episodic"])
+        self.assertEqual(results[0]["content"], "页面渲染缓慢")
+        self.assertEqual(await self.mm.find_similar("JWT 鉴权", memory_types=["procedural"]), [])
+
+    async def test_saves_not_blocked_by_index_build(self):
+        """构建索引期间保存不必等待, 期间保存/删除的条目在构建完成后正确反映"""
+        await self.mm.save_episodic_memory("ImportError: No module named 'requests' 缺少依赖")
+        removed = await self.mm.save_episodic_memory("TimeoutError: 第三方接口响应超时")
+        MemoryManager._instance = None
+        self.mm = MemoryManager(self.temp_dir)
+
+        release = asyncio.Event()
+        read_many = self.mm._storage.read_many
+
+        async def slow_read_many(memory_type, ids):
+            await release.wait()
+            return await read_many(memory_type, ids)
+
+        self.mm._storage.read_many = slow_read_many
+        build = asyncio.create_task(self.mm.find_similar("ImportError: No module named 'yaml' 缺少依赖"))
+        await asyncio.sleep(0)
+        self.assertTrue(self.mm._similarity_building)
+
+        await asyncio.wait_for(self.mm.save_episodic_memory("ImportError: No module named 'numpy' 缺少依赖"), 1)
+        async with self.mm._lock:
+            self.mm._forget_ids("episodic", [removed])
+            self.mm.index["episodic"].remove(removed)
+        release.set()
+        await build
+
+        results = await self.mm.find_similar("ImportError: No module named 'yaml' 缺少依赖")
+        contents = [r["content"] for r in results]
+        self.assertIn("ImportError: No module named 'numpy' 缺少依赖", contents)
+        self.assertIn("ImportError: No module named 'requests' 缺少依赖", contents)
+        self.assertNotIn(("episodic", removed), self.mm._similarity)
+
+    async def test_query_relevant_memory_ranks_by_task(self):
+        """相关记忆按与任务的相似度排序, 不足时以最新记录补齐"""
+        await self.mm.save_procedural_memory("数据库迁移前先备份", "workflow")
+        await self.mm.save_procedural_memory("提交前运行单元测试", "workflow")
+        await self.mm.save_procedural_memory("代码评审关注边界条件", "workflow")
+
+        relevant = await self.mm.query_relevant_memory("执行数据库迁移", limit=2)
+        practices = relevant["best_practices"]
+        self.assertEqual(practices[0]["content"], "数据库迁移前先备份")
+        self.assertIn("similarity", practices[0])
+        self.assertEqual(practices[1]["content"], "代码评审关注边界条件")
+
+
+if __name__ == '__main__':
+    unittest.main()
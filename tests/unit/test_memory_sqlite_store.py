@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+SQLiteMemoryStorage (SQLite/FTS5) 单元测试
+"""
+
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from memory.memory_manager import MemoryManager
+from memory.sqlite_store import SQLiteMemoryStorage, migrate_memory_tree
+
+
+def _entry(memory_id, content, category="general", memory_type="semantic"):
+    return {
+        "memory_id": memory_id,
+        "memory_type": memory_type,
+        "timestamp": "2026-01-01 00:00:00",
+        "content": content,
+        "metadata": {"category": category},
+        "tags": [memory_type, category],
+    }
+
+
+class TestSQLiteMemoryStorage(unittest.IsolatedAsyncioTestCase):
+    """测试 SQLite 存储后端"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.store = SQLiteMemoryStorage(self.temp_dir / "memory.db")
+
+    async def asyncTearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_read_write_and_order(self):
+        """写入/读取/删除, list_ids 保持写入顺序"""
+        await self.store.write_many([_entry("s1", "一"), _entry("s2", "二")])
+        await self.store.write(_entry("s1", "一 (更新)"))
+
+        self.assertEqual((await self.store.read("semantic", "s1"))["content"], "一 (更新)")
+        self.assertEqual(self.store.list_ids("semantic"), ["s1", "s2"])
+        self.assertTrue(await self.store.delete("semantic", "s1"))
+        self.assertIsNone(await self.store.read("semantic", "s1"))
+
+    async def test_keyword_search_mixed_language(self):
+        """中英文关键词检索"""
+        await self.store.write_many([
+            _entry("s1", "使用 JWT 做用户认证"),
+            _entry("s2", "数据库架构采用读写分离", "architecture"),
+            _entry("s3", "Prefer dependency injection for services"),
+        ])
+
+        results = await self.store.search("semantic", keywords=["架构"])
+        self.assertEqual([r["memory_id"] for r in results], ["s2"])
+
+        results = await self.store.search("semantic", keywords=["jwt", "inject"])
+        self.assertEqual({r["memory_id"] for r in results}, {"s1", "s3"})
+
+    async def test_category_filter_and_pagination(self):
+        """类别过滤与库内分页"""
+        await self.store.write_many(
+            [_entry(f"s{i}", f"条目 {i}", "tech") for i in range(5)] + [_entry("x", "其他", "misc")]
+        )
+
+        page = await self.store.search("semantic", category="tech", limit=2, offset=2)
+        self.assertEqual([r["memory_id"] for r in page], ["s2", "s3"])
+
+        tagged = await self.store.search("semantic", tags=["semantic", "misc"])
+        self.assertEqual([r["memory_id"] for r in tagged], ["x"])
+
+
+    async def test_matches_agrees_with_search(self):
+        """matches() 与库内检索对同一条件给出相同结果"""
+        entries = [
+            _entry("s1", "使用 JWT 做用户认证", "security"),
+            _entry("s2", "数据库架构采用读写分离", "architecture"),
+            _entry("s3", "Prefer dependency_injection for services", "style"),
+            {**_entry("s4", "命名规范", "style"), "tags": ["semantic", "lint_rules"]},
+        ]
+        await self.store.write_many(entries)
+
+        for keywords in (["架构"], ["构采"], ["jwt"], ["depend"], ["injection"], ["lint"], ["securi"],
+                         ["architecture 读写"], ["!!"], ["规范", "arch"]):
+            found = {r["memory_id"] for r in await self.store.search("semantic", keywords=keywords)}
+            matched = {e["memory_id"] for e in entries if self.store.matches(e, keywords=keywords)}
+            self.assertEqual(matched, found, keywords)
+        self.assertTrue(self.store.matches(entries[3], keywords=["lint"], category="style", tags=["lint_rules"]))
+        self.assertFalse(self.store.matches(entries[3], keywords=["lint"], category="misc"))
+
+
+class TestMigration(unittest.IsolatedAsyncioTestCase):
+    """测试 JSON 目录迁移与 MemoryManager 集成"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        MemoryManager._instance = None
+
+    async def asyncTearDown(self):
+        MemoryManager._instance = None
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_migrate_and_query(self):
+        """迁移已有 JSON 记忆后通过 sqlite 后端查询"""
+        mm = MemoryManager(self.temp_dir)
+        await mm.save_semantic_memory("缓存架构决策", "architecture")
+        await mm.save_semantic_memory("命名规范", "style")
+        await mm.save_procedural_memory("先写测试再实现", "workflow")
+        MemoryManager._instance = None
+
+        memory_dir = self.temp_dir / ".superagent" / "memory"
+        counts = migrate_memory_tree(memory_dir)
+        self.assertEqual(counts, {"episodic": 0, "semantic": 2, "procedural": 1})
+
+        mm = MemoryManager(self.temp_dir, storage_backend="sqlite")
+        try:
+            self.assertEqual(mm.index["total_count"], 3)
+            results = await mm.query_semantic_memory(keywords=["架构"])
+            self.assertEqual([r["content"] for r in results], ["缓存架构决策"])
+            results = await mm.query_procedural_memory(category="workflow")
+            self.assertEqual(len(results), 1)
+        finally:
+            mm._storage.close()
+
+    async def test_query_includes_pending_write_behind_entries(self):
+        """写回模式下尚未落盘的条目也出现在检索结果中"""
+        mm = MemoryManager(self.temp_dir, storage_backend="sqlite", write_behind=True)
+        mm.configure_write_behind(max_latency=60)
+        try:
+            await mm.save_semantic_memory("已落盘的架构决策", "architecture")
+            await mm.flush()
+            await mm.save_semantic_memory("未落盘的架构决策", "architecture")
+            await mm.save_semantic_memory("未落盘的命名规范", "style", tags=["lint_rules"])
+            self.assertEqual(len(mm._pending_entries), 2)
+
+            results = await mm.query_semantic_memory(keywords=["架构"])
+            self.assertEqual([r["content"] for r in results], ["已落盘的架构决策", "未落盘的架构决策"])
+            results = await mm.query_semantic_memory(category="style")
+            self.assertEqual([r["content"] for r in results], ["未落盘的命名规范"])
+            results = await mm.query_semantic_memory(limit=1, offset=1)
+            self.assertEqual([r["content"] for r in results], ["未落盘的架构决策"])
+
+            # 关键词只命中标签或类别时同样返回未落盘的条目
+            for keywords in (["lint"], ["styl"]):
+                results = await mm.query_semantic_memory(keywords=keywords)
+                self.assertEqual([r["content"] for r in results], ["未落盘的命名规范"], keywords)
+        finally:
+            await mm.drain()
+            mm._storage.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
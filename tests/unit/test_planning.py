@@ -307,6 +307,28 @@ class TestDependencyAnalyzer(unittest.TestCase):
         # 关键路径应该是 5 + 10 = 15分钟
         self.assertEqual(critical_time, 15)
 
+    def test_compute_upward_ranks(self):
+        """测试上行秩: 自身耗时 + 下游最长路径"""
+        def step(step_id, minutes, *deps):
+            return Step(
+                id=step_id,
+                name=step_id,
+                description="测试",
+                agent_type=AgentType.BACKEND_DEV,
+                dependencies=list(deps),
+                estimated_time=timedelta(minutes=minutes)
+            )
+
+        steps = [step("a", 1), step("b", 5, "a"), step("c", 2, "a"), step("d", 1, "b", "c"), step("e", 3)]
+        ranks = self.analyzer.compute_upward_ranks(steps)
+
+        self.assertEqual(ranks, {"a": 420.0, "b": 360.0, "c": 180.0, "d": 60.0, "e": 180.0})
+        self.assertEqual(self.analyzer.compute_upward_ranks(steps, {"c": 600.0})["a"], 720.0)
+
+        # 长依赖链不受递归深度限制
+        chain = [step("s0", 1)] + [step(f"s{i}", 1, f"s{i - 1}") for i in range(1, 5000)]
+        self.assertEqual(self.analyzer.compute_upward_ranks(chain)["s0"], 5000 * 60.0)
+
 
 class TestDataModels(unittest.TestCase):
     """数据模型测试套件"""
@@ -66,6 +66,27 @@ class TestKeyInformationExtractor(unittest.TestCase):
         self.assertIn("Test Product", summary)
         self.assertIn("Python", summary)
 
+    def test_results_follow_pattern_order_and_dedup(self):
+        """结果按模式顺序排列, 同一内容只保留一次"""
+        content = "Using Redis for cache\n技术栈: Python\n技术栈: Python\nPython 很好用"
+        extracted = self.extractor.extract(content)
+        self.assertEqual(extracted.tech, ["Python", "Redis"])
+
+    def test_extract_stream_matches_extract(self):
+        """流式提取与整段提取的结果一致, 包括跨块的匹配"""
+        lines = [
+            "# 设计文档", "产品名称: SuperAgent", "技术栈: Python, FastAPI",
+            "需要支持 1000 并发用户", "Decision: use PostgreSQL for storage",
+            "Using React\nfor frontend", "约束: 响应时间小于 200ms", "不能删除用户数据",
+        ]
+        content = "\n".join(f"{lines[i % len(lines)]} {i}" for i in range(300))
+        chunks = [content[i:i + 97] for i in range(0, len(content), 97)]
+
+        expected = self.extractor.extract(content).to_dict()
+        self.assertEqual(self.extractor.extract_stream(chunks, overlap=64).to_dict(), expected)
+        self.assertEqual(self.extractor.extract_stream(iter([content])).to_dict(), expected)
+        self.assertIn("React", expected["decisions"])
+
 
 class TestSemanticCompressor(unittest.TestCase):
     """测试语义压缩器"""
@@ -155,6 +176,57 @@ class TestContextCache(unittest.TestCase):
         self.assertEqual(result1[0], result2[0])
         self.assertEqual(len(self.cache.cache), 1)
 
+    def test_key_includes_length_and_compressor(self):
+        """目标长度与压缩器类型不同的请求不共用结果, 且目标长度会传给压缩器"""
+        content = "需求: 支持多租户\n约束: 响应时间小于 200ms\n" * 20
+        short, _ = self.cache.get_or_compress(content, self.compressor, target_ratio=0.05)
+        longer, _ = self.cache.get_or_compress(content, self.compressor, target_ratio=0.5)
+        self.assertLessEqual(len(short), int(len(content) * 0.05))
+        self.assertNotEqual(short, longer)
+
+        self.cache.get_or_compress(content, StructuredCompressor(), target_ratio=0.5)
+        self.assertEqual(len(self.cache.cache), 3)
+        self.assertEqual(self.cache.stats()["misses"], 3)
+
+    def test_lru_byte_budget(self):
+        """超出字节预算时淘汰最久未使用的结果"""
+        contents = [f"Feature: 功能{i} " + "x" * 300 for i in range(4)]
+        probe = ContextCache()
+        probe.get_or_compress(contents[0], self.compressor, max_length=400)
+        entry_bytes = probe.total_bytes
+
+        # 预算恰好容纳 3 个结果
+        cache = ContextCache(max_size=100, max_bytes=entry_bytes * 3 + 10)
+        for content in contents[:3]:
+            cache.get_or_compress(content, self.compressor, max_length=400)
+        cache.get_or_compress(contents[0], self.compressor, max_length=400)  # 访问后变为最近使用
+        cache.get_or_compress(contents[3], self.compressor, max_length=400)
+
+        self.assertEqual(len(cache.cache), 3)
+        keys = [ContextCache.make_key(c, "SemanticCompressor", 400) for c in contents]
+        self.assertIn(keys[0], cache.cache)
+        self.assertNotIn(keys[1], cache.cache)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_disk_tier_shared_between_instances(self):
+        """磁盘层在实例 (进程) 之间共享, 超出预算时清理最旧的文件"""
+        import shutil
+        import tempfile
+        temp_dir = Path(tempfile.mkdtemp())
+        try:
+            writer = ContextCache.for_project(temp_dir)
+            result = writer.get_or_compress("需求: 导出 PDF 报表", self.compressor)
+            self.assertTrue((temp_dir / ".superagent" / "cache" / "compression").is_dir())
+
+            reader = ContextCache.for_project(temp_dir)
+            self.assertEqual(reader.get_or_compress("需求: 导出 PDF 报表", self.compressor)[0], result[0])
+            self.assertEqual(reader.stats()["disk_hits"], 1)
+
+            reader.max_disk_bytes = 0
+            self.assertEqual(reader.prune_disk(), 1)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
 
 if __name__ == "__main__":
     unittest.main()
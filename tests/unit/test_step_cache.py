@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+步骤结果缓存单元测试
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from orchestration.models import ExecutionContext, TaskExecution, TaskStatus
+from orchestration.step_cache import StepResultCache
+from orchestration.task_executor import TaskExecutor
+
+
+class _Agent:
+    """记录调用次数的 Agent"""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def run(self, description):
+        self.calls.append(description)
+        return {"files": ["app.py"], "summary": f"完成: {description}"}
+
+
+def _task(task_id: str = "task-1", **inputs) -> TaskExecution:
+    task_inputs = {"name": "实现接口", "description": "实现用户接口", "agent_type": "backend-dev"}
+    task_inputs.update(inputs)
+    return TaskExecution(task_id=task_id, step_id="step-1", status=TaskStatus.PENDING, inputs=task_inputs)
+
+
+class TestStepResultCache(unittest.TestCase):
+    """测试缓存键与磁盘存储"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.project = self.temp_dir / "project"
+        self.project.mkdir()
+        (self.project / "spec.md").write_text("v1", encoding="utf-8")
+        self.cache = StepResultCache(self.temp_dir / "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_key_depends_on_inputs_and_file_contents(self):
+        """缓存键随 Agent 类型、输入和输入文件内容变化, 与字段顺序和 cache 开关无关"""
+        inputs = {"description": "实现", "input_files": ["spec.md"]}
+        key = StepResultCache.make_key("backend-dev", inputs, self.project)
+
+        reordered = {"input_files": ["spec.md"], "description": "实现", "cache": True}
+        self.assertEqual(StepResultCache.make_key("backend-dev", reordered, self.project), key)
+        self.assertNotEqual(StepResultCache.make_key("frontend-dev", inputs, self.project), key)
+        self.assertNotEqual(
+            StepResultCache.make_key("backend-dev", {**inputs, "description": "重构"}, self.project), key
+        )
+
+        (self.project / "spec.md").write_text("v2", encoding="utf-8")
+        self.assertNotEqual(StepResultCache.make_key("backend-dev", inputs, self.project), key)
+
+    def test_only_steps_with_declared_input_files_are_cacheable(self):
+        """未声明输入文件或 inputs["cache"] = False 的步骤不使用缓存"""
+        self.assertFalse(StepResultCache.is_enabled_for({"description": "实现"}))
+        self.assertTrue(StepResultCache.is_enabled_for({"input_files": ["spec.md"]}))
+        self.assertFalse(StepResultCache.is_enabled_for({"input_files": ["spec.md"], "cache": False}))
+
+    def test_get_put_and_stats(self):
+        """写入后命中, 统计命中率"""
+        self.assertIsNone(self.cache.get("ab" * 16))
+        self.cache.put("ab" * 16, {"result": "ok"}, ["artifact"])
+        entry = self.cache.get("ab" * 16)
+        self.assertEqual(entry["result"], {"result": "ok"})
+        self.assertEqual(entry["artifacts"], ["artifact"])
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1, "hit_rate": 0.5})
+
+    def test_prune_removes_least_recently_used(self):
+        """超出磁盘预算时删除最久未访问的结果"""
+        keys = [f"{i:02d}" * 16 for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, {"result": "x" * 100})
+            path = self.cache._path(key)
+            os.utime(path, (1000 + i, 1000 + i))
+        self.cache.get(keys[0])  # 访问后成为最近使用
+
+        entry_size = self.cache._path(keys[0]).stat().st_size
+        self.cache.max_disk_bytes = entry_size * 2
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertFalse(self.cache._path(keys[1]).exists())
+        self.assertTrue(self.cache._path(keys[0]).exists())
+        self.assertTrue(self.cache._path(keys[2]).exists())
+
+
+class TestTaskExecutorCache(unittest.IsolatedAsyncioTestCase):
+    """测试 TaskExecutor 使用步骤结果缓存"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        (self.temp_dir / "spec.md").write_text("v1", encoding="utf-8")
+        self.cache = StepResultCache(self.temp_dir / ".superagent" / "cache" / "steps")
+        self.executor = TaskExecutor(ExecutionContext(project_root=self.temp_dir), self.cache)
+        self.calls = []
+        # 只替换 Agent 的构造, 测试缓存包装的行为
+        for patcher in (
+            patch(
+                "orchestration.task_executor.AgentFactory.get_agent",
+                side_effect=lambda agent_type, context: _Agent(self.calls),
+                create=True
+            ),
+            patch("orchestration.task_executor.AgentConfig", MagicMock()),
+            patch("orchestration.task_executor.AgentContext", MagicMock())
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    async def test_hit_skips_agent(self):
+        """输入未变化时第二次执行直接复用结果"""
+        first = await self.executor.execute(_task(input_files=["spec.md"]))
+        second = await self.executor.execute(_task("task-2", input_files=["spec.md"]))
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(second.status, TaskStatus.COMPLETED)
+        self.assertEqual(second.result, first.result)
+        self.assertEqual(second.outputs, first.outputs)
+        self.assertIn("命中步骤结果缓存", second.logs)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    async def test_cache_io_runs_off_event_loop(self):
+        """缓存读写 (含按预算清理) 不在事件循环线程中执行"""
+        loop_thread = threading.get_ident()
+        io_threads = []
+        for name in ("get", "put"):
+            original = getattr(self.cache, name)
+
+            def record(*args, _original=original, **kwargs):
+                io_threads.append(threading.get_ident())
+                return _original(*args, **kwargs)
+            setattr(self.cache, name, record)
+
+        await self.executor.execute(_task(input_files=["spec.md"]))
+        await self.executor.execute(_task("task-2", input_files=["spec.md"]))
+
+        self.assertEqual(len(io_threads), 3)  # 未命中的 get, put, 命中的 get
+        self.assertNotIn(loop_thread, io_threads)
+
+    async def test_changed_input_file_misses(self):
+        """输入文件内容变化后重新执行"""
+        await self.executor.execute(_task(input_files=["spec.md"]))
+        (self.temp_dir / "spec.md").write_text("v2", encoding="utf-8")
+        await self.executor.execute(_task(input_files=["spec.md"]))
+        self.assertEqual(len(self.calls), 2)
+
+    async def test_step_without_input_files_always_runs_agent(self):
+        """未声明输入文件的步骤每次都调用 Agent, 也不写入缓存"""
+        await self.executor.execute(_task())
+        await self.executor.execute(_task())
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.cache.stats()["misses"], 0)
+        self.assertEqual(list(self.cache.cache_dir.glob("*/*.json")), [])
+
+    async def test_opt_out_always_runs_agent(self):
+        """关闭缓存的步骤每次都调用 Agent, 也不写入缓存"""
+        await self.executor.execute(_task(input_files=["spec.md"], cache=False))
+        await self.executor.execute(_task(input_files=["spec.md"], cache=False))
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.cache.stats()["misses"], 0)
+        self.assertEqual(list(self.cache.cache_dir.glob("*/*.json")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -191,5 +191,63 @@ class TestTokenMonitor(unittest.IsolatedAsyncioTestCase):
         print("\n[PASS] Get trend test passed!")
 
 
+
+class TestTokenReservation(unittest.IsolatedAsyncioTestCase):
+    """Token 预算预留测试"""
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.monitor = TokenMonitor(
+            project_root=Path(self.tmpdir.name),
+            config=TokenMonitorConfig(enable_budget=True, total_budget=10000)
+        )
+
+    async def asyncTearDown(self):
+        self.tmpdir.cleanup()
+
+    async def test_reserve_within_budget(self):
+        first = await self.monitor.reserve("task-1", 6000)
+        self.assertIsNotNone(first)
+        self.assertEqual(self.monitor.available_tokens, 4000)
+        self.assertIsNone(await self.monitor.reserve("task-2", 6000))
+        with self.assertRaises(ValueError):
+            await self.monitor.reserve("task-1", 1)
+
+    async def test_usage_charges_reservation_and_commit_releases_rest(self):
+        reservation = await self.monitor.reserve("task-1", 6000)
+        await self.monitor.log_usage("coding", "task-1", original_tokens=2500)
+        self.assertEqual((self.monitor.total_usage, self.monitor.reserved_tokens), (2500, 3500))
+
+        released = await self.monitor.commit(reservation)
+        self.assertEqual(released, 3500)
+        self.assertEqual((self.monitor.total_usage, self.monitor.reserved_tokens), (2500, 0))
+        self.assertEqual(await self.monitor.commit(reservation), 0)
+
+    async def test_commit_with_actual_tokens(self):
+        """未通过 log_usage 记录的实际使用量在结算时计入"""
+        reservation = await self.monitor.reserve("task-1", 3000)
+        await self.monitor.commit(reservation, actual_tokens=4000)
+        self.assertEqual((self.monitor.total_usage, self.monitor.available_tokens), (4000, 6000))
+
+    async def test_concurrent_reservations_never_overshoot(self):
+        results = await asyncio.gather(*(self.monitor.reserve(f"task-{i}", 3000) for i in range(10)))
+        self.assertEqual(sum(r is not None for r in results), 3)
+        self.assertLessEqual(self.monitor.reserved_tokens, 10000)
+
+    async def test_wait_for_release(self):
+        first = await self.monitor.reserve("task-1", 8000)
+        waiter = asyncio.ensure_future(self.monitor.reserve("task-2", 5000, wait=True))
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+
+        await self.monitor.release(first)
+        self.assertIsNotNone(await waiter)
+        self.assertIsNone(await self.monitor.reserve("task-3", 6000, wait=True, timeout=0.05))
+
+    async def test_budget_disabled_always_admits(self):
+        self.monitor.config.enable_budget = False
+        self.assertIsNotNone(await self.monitor.reserve("task-1", 10 ** 9))
+        self.assertIsNone(self.monitor.available_tokens)
+
 if __name__ == "__main__":
     unittest.main()
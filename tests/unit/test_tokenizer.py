@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Token 计数单元测试
+"""
+
+import base64
+import os
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+# 添加项目根目录到路径
+import sys
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from common.tokenizer import (
+    BPETokenizer, HeuristicTokenizer, Tokenizer, VOCAB_ENV,
+    count_tokens, get_tokenizer, load_tokenizer, set_tokenizer
+)
+from context.smart_compressor import SmartContextCompressor
+from monitoring.token_monitor import TokenMonitor
+
+
+class _FixedTokenizer(Tokenizer):
+    """每个字符算 1 个 Token"""
+
+    name = "fixed"
+
+    def _count(self, text: str) -> int:
+        return len(text)
+
+
+class TestTokenizers(unittest.TestCase):
+    """测试分词器实现"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.vocab = self.temp_dir / "tiny.tiktoken"
+        tokens = [bytes([b]) for b in range(256)] + [b"he", b"ll", b"hell", b"hello", b" wor", b" world"]
+        tokens.insert(256, b" w")
+        self.vocab.write_bytes(b"".join(
+            base64.b64encode(token) + b" " + str(rank).encode() + b"\n" for rank, token in enumerate(tokens)
+        ))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_bpe_merges_by_rank(self):
+        """按 rank 合并: 词表内的单词为 1 个 Token"""
+        tokenizer = BPETokenizer.from_file(self.vocab)
+        self.assertEqual(tokenizer.encode("hello world"), [b"hello", b" world"])
+        self.assertEqual(tokenizer.count("hello world!"), 3)
+        self.assertEqual(tokenizer.count("你"), 3)  # 未合并的 UTF-8 字节
+        self.assertEqual(tokenizer.count_batch(["hello", "", "hello"]), [1, 0, 1])
+
+    def test_heuristic_estimates(self):
+        """启发式: CJK 每字 1 个, 英文按单词长度, 数字每 3 位 1 个"""
+        tokenizer = HeuristicTokenizer()
+        self.assertEqual(tokenizer.count("你好世界"), 4)
+        self.assertEqual(tokenizer.count("hello world"), 2)
+        self.assertEqual(tokenizer.count("1234567"), 3)
+        self.assertEqual(tokenizer.count("a, b."), 4)
+
+    def test_counts_memoized(self):
+        """相同内容只计算一次"""
+        tokenizer = HeuristicTokenizer()
+        text = "数据库连接池配置 " * 50
+        with patch.object(HeuristicTokenizer, "_count", wraps=tokenizer._count) as count:
+            self.assertEqual(tokenizer.count_batch([text, text, "短文本"]), [tokenizer.count(text)] * 2 + [3])
+            tokenizer.count(text)
+        self.assertEqual(count.call_count, 2)
+
+    def test_load_fallback(self):
+        """词表缺失或格式错误时退回启发式"""
+        self.assertIsInstance(load_tokenizer(self.vocab), BPETokenizer)
+        self.assertIsInstance(load_tokenizer(self.temp_dir / "missing"), HeuristicTokenizer)
+        bad = self.temp_dir / "bad.tiktoken"
+        bad.write_text("not-a-vocab\n")
+        self.assertIsInstance(load_tokenizer(bad), HeuristicTokenizer)
+
+        with patch.dict(os.environ, {VOCAB_ENV: str(self.vocab)}):
+            set_tokenizer(None)
+            try:
+                self.assertIsInstance(get_tokenizer(), BPETokenizer)
+            finally:
+                set_tokenizer(None)
+
+
+class TestTokenizerCallSites(unittest.TestCase):
+    """测试调用方统一使用默认分词器"""
+
+    def setUp(self):
+        set_tokenizer(_FixedTokenizer())
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        set_tokenizer(None)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_token_monitor(self):
+        monitor = TokenMonitor(project_root=self.temp_dir)
+        self.assertEqual(monitor.estimate_tokens("abcdefghij"), 12)
+        self.assertEqual(monitor.estimate_tokens_batch(["ab", "abcde"], multiplier=1.0), [2, 5])
+        self.assertEqual(count_tokens("abc"), 3)
+
+    def test_compress_messages_budget(self):
+        """消息历史按分词器的计数控制预算"""
+        messages = [{"role": "user", "content": "x" * 30} for _ in range(5)]
+        compressed, _ = SmartContextCompressor().compress_messages(messages, max_tokens=70)
+        self.assertEqual(len(compressed), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()